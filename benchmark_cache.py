@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Benchmark the MarketDataCache write and read paths
+Compares the old per-row iterrows() insert with the bulk save_data path,
+per-symbol DataFrame reads with the single-query NumPy read, and the
+SQLite read with the memory-mapped columnar store, and the v1 market_data
+schema with the compact v2 schema, on synthetic NIFTY 50 sized data
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data.cache_manager import MarketDataCache
+from data.columnar_store import ColumnarBarStore, migrate_from_sqlite
+from data.cache_v2 import CompactBarStore, database_size
+
+
+def create_history(n_bars: int, freq: str = "D", seed: int = 0) -> pd.DataFrame:
+    """Synthetic OHLCV history with IST-aware dates (like Kite returns)"""
+    rng = np.random.default_rng(seed)
+    close = 1000 + np.cumsum(rng.normal(0, 5, n_bars))
+    return pd.DataFrame({
+        'date': pd.date_range("2016-01-01 09:15", periods=n_bars, freq=freq, tz='Asia/Kolkata'),
+        'open': close + rng.normal(0, 1, n_bars),
+        'high': close + np.abs(rng.normal(0, 3, n_bars)),
+        'low': close - np.abs(rng.normal(0, 3, n_bars)),
+        'close': close,
+        'volume': rng.integers(10_000, 1_000_000, n_bars),
+    })
+
+
+def legacy_save(cache: MarketDataCache, symbol: str, data: pd.DataFrame, interval: str):
+    """Previous save_data: iterrows() + execute per row + full metadata scan"""
+    with sqlite3.connect(cache.db_path) as conn:
+        data_to_insert = data.copy()
+        data_to_insert['symbol'] = symbol
+        data_to_insert['interval'] = interval
+        data_to_insert['date'] = data_to_insert['date'].astype(str)
+        for _, row in data_to_insert.iterrows():
+            conn.execute("""
+                INSERT OR REPLACE INTO market_data
+                (symbol, date, interval, open, high, low, close, volume)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (row['symbol'], row['date'], row['interval'],
+                  row['open'], row['high'], row['low'], row['close'], row['volume']))
+        cache._update_metadata(conn, symbol, interval)
+
+
+def run(save, frames, interval: str) -> float:
+    """Save all frames into a fresh cache, return rows/second"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(tmp)
+        rows = sum(len(frame) for frame in frames.values())
+        start = time.perf_counter()
+        for symbol, frame in frames.items():
+            save(cache, symbol, frame, interval)
+        elapsed = time.perf_counter() - start
+    return rows / elapsed
+
+
+def run_reads(frames, interval: str):
+    """Time per-symbol DataFrame reads vs one multi-symbol NumPy read"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(tmp)
+        for symbol, frame in frames.items():
+            cache.save_data(symbol, frame, interval)
+        symbols = list(frames)
+        start, end = datetime(2000, 1, 1), datetime(2100, 1, 1)
+
+        t0 = time.perf_counter()
+        for symbol in symbols:
+            cache.get_cached_data(symbol, start, end, interval).to_dict('records')
+        t1 = time.perf_counter()
+        cache.get_arrays_multi(symbols, start, end, interval)
+        t2 = time.perf_counter()
+
+        columnar_dir = os.path.join(tmp, "columnar")
+        migrate_from_sqlite(cache, ColumnarBarStore(columnar_dir))
+        t3 = time.perf_counter()
+        # Fresh store: cold load reads only index.json and maps the files
+        ColumnarBarStore(columnar_dir).get_arrays_multi(symbols, start, end, interval)
+        t4 = time.perf_counter()
+        cache.close()
+    return t1 - t0, t2 - t1, t4 - t3
+
+
+def run_schema(make_store, frames, interval: str):
+    """Insert rate, size on disk and range-scan rate of one schema"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        rows = sum(len(frame) for frame in frames.values())
+        symbols = list(frames)
+
+        t0 = time.perf_counter()
+        for symbol, frame in frames.items():
+            store.save_data(symbol, frame, interval)
+        t1 = time.perf_counter()
+        size = database_size(store.db_path)
+
+        # Middle half of every series, one query per symbol
+        dates = next(iter(frames.values()))['date']
+        start = dates.iloc[len(dates) // 4].to_pydatetime()
+        end = dates.iloc[3 * len(dates) // 4].to_pydatetime()
+        t2 = time.perf_counter()
+        scanned = sum(len(store.get_arrays(symbol, start, end, interval)['timestamp'])
+                      for symbol in symbols)
+        t3 = time.perf_counter()
+        store.close()
+    return rows / (t1 - t0), size, scanned / (t3 - t2)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark MarketDataCache writes and reads")
+    parser.add_argument("--symbols", type=int, default=50, help="Number of symbols (default: 50)")
+    parser.add_argument("--bars", type=int, default=3000, help="Bars per symbol (default: 3000)")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only run the bulk path")
+    args = parser.parse_args()
+
+    frames = {f"SYM{i}": create_history(args.bars, seed=i) for i in range(args.symbols)}
+    total = args.symbols * args.bars
+    print(f"=== MarketDataCache write benchmark: {args.symbols} symbols x {args.bars} bars "
+          f"({total:,} rows) ===\n")
+
+    bulk = run(lambda cache, symbol, frame, interval: cache.save_data(symbol, frame, interval),
+               frames, "day")
+    print(f"Bulk save_data:    {bulk:>12,.0f} rows/s")
+
+    if not args.skip_legacy:
+        legacy = run(legacy_save, frames, "day")
+        print(f"Legacy iterrows:   {legacy:>12,.0f} rows/s")
+        print(f"\nSpeedup: {bulk / legacy:.1f}x")
+
+    frames_time, arrays_time, columnar_time = run_reads(frames, "day")
+    print(f"\nRead {args.symbols} symbols:")
+    print(f"DataFrame + to_dict per symbol: {frames_time * 1000:>8.1f} ms")
+    print(f"get_arrays_multi (one query):   {arrays_time * 1000:>8.1f} ms")
+    print(f"ColumnarBarStore (memmap):      {columnar_time * 1000:>8.1f} ms")
+
+    print(f"\nSchema v1 vs v2 ({total:,} rows):")
+    print(f"{'':<22}{'size MB':>10}{'insert rows/s':>16}{'scan rows/s':>16}")
+    schemas = [
+        ("v1 market_data", MarketDataCache),
+        ("v2 REAL prices", CompactBarStore),
+        ("v2 scaled prices", lambda path: CompactBarStore(path, price_scale=100)),
+    ]
+    for name, make_store in schemas:
+        insert_rate, size, scan_rate = run_schema(make_store, frames, "day")
+        print(f"{name:<22}{size / 1e6:>10.1f}{insert_rate:>16,.0f}{scan_rate:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Load-test the live pipeline with the simulated feed
+Simulated ticks -> CandleAggregator -> BarScheduler -> EnhancedBarProcessor,
+first unpaced (raw capacity), then paced at rising time compression until
+the pipeline can no longer keep up with the feed
+
+A pace is sustainable when the feed never falls more than --max-lag wall
+seconds, nor 5% of the run, behind its schedule (the callbacks run on the
+feed thread, so slow processing shows up as feed lag).
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import contextlib
+from datetime import datetime
+
+import numpy as np
+
+from config.settings import TradingConfig
+from data.candle_aggregator import CandleAggregator
+from data.feed_simulator import FeedConfig, SimulatedTicker
+from data.trading_calendar import to_epoch
+from scanner.bar_scheduler import BarScheduler, ScheduledBar
+from scanner.enhanced_bar_processor import EnhancedBarProcessor
+from utils.latency import LatencyTracer
+
+
+def create_series(n_symbols: int, n_bars: int, seed: int = 0):
+    """Random-walk minute bars from a session open, like MarketDataCache.get_arrays_multi"""
+    rng = np.random.default_rng(seed)
+    start = to_epoch(datetime(2024, 1, 2, 9, 15))
+    series = {}
+    for s in range(n_symbols):
+        close = 500 + np.cumsum(rng.normal(0, 1, n_bars))
+        open_ = close + rng.normal(0, 0.5, n_bars)
+        spread = np.abs(rng.normal(0, 1, n_bars))
+        series[f"SYM{s}"] = {
+            'timestamp': start + 60 * np.arange(n_bars, dtype=np.int64),
+            'open': open_, 'close': close,
+            'high': np.maximum(open_, close) + spread,
+            'low': np.minimum(open_, close) - spread,
+            'volume': rng.integers(1000, 50_000, n_bars).astype(float),
+        }
+    return series
+
+
+def run(series, feed_config: FeedConfig, config: TradingConfig, use_dicts: bool):
+    """One replay through the pipeline; (feed stats, bars processed, tracer)"""
+    ticker = SimulatedTicker(series, "minute", feed_config)
+    aggregator = CandleAggregator(("minute",))
+    tracer = LatencyTracer()
+    processors = {}
+    scheduler = BarScheduler(
+        lambda symbol: processors.get(symbol) or processors.setdefault(
+            symbol, EnhancedBarProcessor(config, symbol, "minute")),
+        tracer=tracer)
+
+    def on_bars(interval, bars):
+        for bar in bars:
+            scheduler.submit(ScheduledBar(
+                ticker.symbols[int(bar['instrument_token'])], int(bar['timestamp']),
+                bar['open'], bar['high'], bar['low'], bar['close'], bar['volume'],
+                received=float(bar['received'])))
+        scheduler.run()
+
+    aggregator.subscribe(on_bars)
+    if use_dicts:
+        ticker.on_ticks = aggregator.on_kite_ticks
+    else:
+        ticker.on_tick_arrays = lambda ws, *batch: aggregator.on_arrays(*batch)
+    ticker.on_connect = lambda ws, response: (
+        ws.subscribe(ws.instrument_tokens), ws.set_mode(ws.MODE_FULL, ws.instrument_tokens))
+    # Keep the processors' debug prints off the report
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        ticker.connect()
+        aggregator.close_due(int(ticker.timeline[-1]) + ticker.interval_seconds)
+    return ticker.stats, sum(scheduler.processed), tracer
+
+
+def report(label: str, stats, bars: int, tracer: LatencyTracer):
+    elapsed = stats['elapsed']
+    p99 = tracer.since_first['process_end'].percentile(0.99)
+    print(f"{label:<16} {stats['ticks'] / elapsed:>12,.0f} ticks/s {bars / elapsed:>9,.0f} bars/s  "
+          f"lag {stats['max_lag']:>6.2f} s  p99 tick->signal {p99 * 1e3:>8.1f} ms")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load-test the live pipeline on a simulated feed")
+    parser.add_argument("--symbols", type=int, default=10, help="Cached series (default: 10)")
+    parser.add_argument("--instruments", type=int, default=50,
+                        help="Instruments replayed from the series (default: 50)")
+    parser.add_argument("--bars", type=int, default=150, help="Bars per series (default: 150)")
+    parser.add_argument("--ticks-per-bar", type=int, default=12,
+                        help="Ticks per instrument per bar (default: 12)")
+    parser.add_argument("--burst-every", type=int, default=0,
+                        help="Every Nth bar is a 10x tick burst (default: none)")
+    parser.add_argument("--dicts", action="store_true",
+                        help="Deliver KiteTicker tick dicts instead of arrays")
+    parser.add_argument("--start-speed", type=float, default=60.0,
+                        help="First time compression tried (default: 60x)")
+    parser.add_argument("--max-lag", type=float, default=1.0,
+                        help="Feed lag (s) above which a pace is not sustainable (default: 1)")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    series = create_series(args.symbols, args.bars)
+    config = TradingConfig(max_bars_back=100)
+    profile = dict(instruments=args.instruments, ticks_per_bar=args.ticks_per_bar,
+                   burst_every=args.burst_every)
+    print(f"=== Simulated feed: {args.instruments} instruments x {args.bars} minute bars, "
+          f"{args.ticks_per_bar} ticks/bar, {'dict' if args.dicts else 'array'} path ===\n")
+
+    stats, bars, tracer = run(series, FeedConfig(**profile), config, args.dicts)
+    report("unpaced", stats, bars, tracer)
+    sim_span = args.bars * 60
+    capacity = sim_span / stats['elapsed']
+    print(f"{'':<16} capacity ~{capacity:,.0f}x real time\n")
+
+    best = None
+    speed = args.start_speed
+    while speed <= capacity * 2:
+        stats, bars, tracer = run(series, FeedConfig(speed=speed, **profile), config, args.dicts)
+        report(f"{speed:,.0f}x", stats, bars, tracer)
+        if stats['max_lag'] > min(args.max_lag, 0.05 * sim_span / speed):
+            break
+        best = (speed, stats['ticks'] / stats['elapsed'], bars / stats['elapsed'])
+        speed *= 2
+
+    if best is None:
+        print(f"\nNot sustainable at {args.start_speed:,.0f}x (try a lower --start-speed)")
+    else:
+        speed, ticks, bars = best
+        print(f"\nMax sustainable: {speed:,.0f}x real time = {ticks:,.0f} ticks/s, "
+              f"{bars:,.0f} bars/s ({args.instruments * speed:,.0f} instruments at 1x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark the sharded scanning engine
+Throughput (closed bars/second) for 1..N worker processes on a synthetic
+live feed, to check scaling with cores
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import time
+
+import numpy as np
+
+from config.settings import TradingConfig
+from scanner.sharded_engine import ClosedBar, ShardedScanEngine
+
+
+def create_feed(n_symbols: int, n_bars: int, seed: int = 0):
+    """Interleaved random-walk bars: every symbol's bar i, then bar i + 1"""
+    rng = np.random.default_rng(seed)
+    close = 500 + np.cumsum(rng.normal(0, 3, (n_symbols, n_bars)), axis=1)
+    spread = np.abs(rng.normal(0, 2, (n_symbols, n_bars)))
+    return [
+        ClosedBar(f"SYM{s}", 1_700_000_000 + 300 * i, close[s, i], close[s, i] + spread[s, i],
+                  close[s, i] - spread[s, i], close[s, i], 1000.0)
+        for i in range(n_bars) for s in range(n_symbols)
+    ]
+
+
+def run(feed, workers: int, config: TradingConfig) -> float:
+    """Bars per second through an engine with this many workers"""
+    engine = ShardedScanEngine(config, workers=workers)
+    engine.start()
+    start = time.perf_counter()
+    for lo in range(0, len(feed), 500):
+        engine.submit_many(feed[lo:lo + 500])
+    engine.stop()
+    return len(feed) / (time.perf_counter() - start)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark ShardedScanEngine scaling")
+    parser.add_argument("--symbols", type=int, default=48, help="Number of symbols (default: 48)")
+    parser.add_argument("--bars", type=int, default=300, help="Bars per symbol (default: 300)")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1,
+                        help="Largest worker count to try (default: all cores)")
+    args = parser.parse_args()
+
+    feed = create_feed(args.symbols, args.bars)
+    config = TradingConfig(max_bars_back=100)
+    counts = sorted({1, *[2 ** k for k in range(1, 8) if 2 ** k <= args.max_workers],
+                     args.max_workers})
+
+    results = [(workers, run(feed, workers, config)) for workers in counts]
+    print(f"\n=== ShardedScanEngine: {args.symbols} symbols x {args.bars} bars "
+          f"({len(feed):,} bars), {os.cpu_count()} cores ===\n")
+    base = results[0][1]
+    for workers, rate in results:
+        print(f"{workers:>3} workers: {rate:>10,.0f} bars/s  ({rate / base:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -62,39 +62,40 @@ def cache_nifty50_data(days: int = 3000, interval: str = "day"):
     # Track progress
     successful = []
     failed = []
+    to_fetch = []
+    
+    # Skip stocks that are already cached
+    for symbol in NIFTY_50_STOCKS:
+        if symbol in initial_symbols:
+            symbol_cache = initial_cache[initial_cache['symbol'] == symbol]
+            if not symbol_cache.empty:
+                records = symbol_cache.iloc[0]['total_records']
+                print(f"  ✓ {symbol} already cached: {records} records")
+                successful.append(symbol)
+                continue
+        to_fetch.append(symbol)
     
-    # Process each stock
-    for i, symbol in enumerate(NIFTY_50_STOCKS, 1):
-        print(f"[{i}/{len(NIFTY_50_STOCKS)}] Processing {symbol}...")
-        
+    # Fetch all remaining stocks concurrently (shared 3 requests/second limit)
+    if to_fetch:
+        print(f"\nFetching {len(to_fetch)} stocks concurrently...")
+        start_time = time.time()
         try:
-            # Check if already cached
-            if symbol in initial_symbols:
-                symbol_cache = initial_cache[initial_cache['symbol'] == symbol]
-                if not symbol_cache.empty:
-                    records = symbol_cache.iloc[0]['total_records']
-                    print(f"  ✓ Already cached: {records} records")
-                    successful.append(symbol)
-                    continue
-            
-            # Fetch data
-            start_time = time.time()
-            data = client.get_historical_data(symbol, interval, days=days)
-            end_time = time.time()
-            
-            if data:
-                print(f"  ✅ Cached {len(data)} bars in {end_time - start_time:.2f}s")
+            fetched = client.prefetch_historical_data(to_fetch, interval, days=days)
+        except Exception as e:
+            print(f"  ❌ Error: {str(e)}")
+            fetched = {}
+        end_time = time.time()
+        
+        for symbol in to_fetch:
+            bars = fetched.get(symbol, 0)
+            if bars:
+                print(f"  ✅ {symbol}: cached {bars} bars")
                 successful.append(symbol)
             else:
-                print(f"  ⚠️ No data returned")
+                print(f"  ⚠️ {symbol}: no data returned")
                 failed.append(symbol)
-                
-        except Exception as e:
-            print(f"  ❌ Error: {str(e)}")
-            failed.append(symbol)
         
-        # Respect rate limits (3 requests/second for historical API)
-        time.sleep(0.35)  # ~2.8 requests/second to be safe
+        print(f"\nFetched in {end_time - start_time:.2f}s using {client.fetcher.api_calls} API calls")
     
     # Summary
     print("\n" + "="*50)
@@ -129,32 +130,58 @@ def cache_nifty50_data(days: int = 3000, interval: str = "day"):
     print("2. Data loads instantly from local SQLite database")
     print("3. No API calls needed until you want to update with recent data")
 
-def update_recent_data(days: int = 30):
+def update_recent_data(interval: str = "day"):
     """
     Update cache with recent data for all cached stocks
-    Useful for keeping the cache current
+    Tail sync: fetches only the bars after each symbol's last cached bar
     """
-    print(f"\n=== Updating Recent Data ({days} days) ===\n")
+    print(f"\n=== Syncing Recent Data ({interval}) ===\n")
     
     # Initialize client
     client = ZerodhaClient(use_cache=True, cache_dir="data_cache")
     
-    # Get current cache info
-    cache_info = client.get_cache_info()
-    if cache_info.empty:
+    synced = client.sync_tail(interval)
+    if not synced:
         print("❌ No cached data found")
         return
     
-    # Update each cached symbol
-    symbols = cache_info['symbol'].unique()
-    for symbol in symbols:
-        print(f"Updating {symbol}...")
-        try:
-            data = client.get_historical_data(symbol, "day", days=days)
-            print(f"  ✅ Updated with {len(data)} bars")
-        except Exception as e:
-            print(f"  ❌ Error: {str(e)}")
-        time.sleep(0.35)  # Rate limit
+    for symbol, bars in synced.items():
+        if bars:
+            print(f"  ✅ {symbol}: {bars} new bars")
+    print(f"Synced {len(synced)} symbols using {client.fetcher.api_calls} API calls")
+
+def sync_forever(interval: str = "day", every_minutes: float = 5):
+    """
+    Keep the cache current: tail sync on a fixed schedule (Ctrl+C to stop)
+    Outside market hours a sync makes no API calls
+    """
+    from data.tail_sync import run_every
+    
+    client = ZerodhaClient(use_cache=True, cache_dir="data_cache")
+    print(f"Syncing {interval} data every {every_minutes:g} minutes (Ctrl+C to stop)")
+    try:
+        run_every(lambda: client.sync_tail(interval), every_minutes * 60)
+    except KeyboardInterrupt:
+        print("\nStopped")
+
+def migrate_to_compact_schema(price_scale: int = 100):
+    """
+    Copy the cache into the compact v2 schema (market_data_v2.db)
+    Safe to run while the cache is in use; re-running resumes and copies new bars
+    """
+    from data.cache_manager import MarketDataCache
+    from data.cache_v2 import CompactBarStore, migrate_to_v2, database_size
+    
+    print("\n=== Migrating cache to schema v2 ===\n")
+    cache = MarketDataCache("data_cache")
+    store = CompactBarStore("data_cache", price_scale=price_scale or None)
+    
+    start_time = time.time()
+    migrated = migrate_to_v2(cache, store)
+    copied = sum(migrated.values())
+    print(f"Copied {copied:,} bars for {len(migrated)} series in {time.time() - start_time:.2f}s")
+    print(f"💾 v1: {database_size(cache.db_path) / 1e6:.2f} MB, "
+          f"v2: {database_size(store.db_path) / 1e6:.2f} MB")
 
 if __name__ == "__main__":
     import argparse
@@ -164,12 +191,22 @@ if __name__ == "__main__":
                        help="Number of days to fetch (default: 3000)")
     parser.add_argument("--update", action="store_true",
                        help="Update recent data for cached stocks")
-    parser.add_argument("--update-days", type=int, default=30,
-                       help="Days to update when using --update (default: 30)")
+    parser.add_argument("--interval", default="day",
+                       help="Interval to cache or sync (default: day)")
+    parser.add_argument("--every", type=float, default=0,
+                       help="With --update, repeat the sync every N minutes (e.g. 5)")
+    parser.add_argument("--migrate-v2", action="store_true",
+                       help="Copy the cache into the compact v2 schema")
+    parser.add_argument("--price-scale", type=int, default=100,
+                       help="With --migrate-v2, store prices x N as integers (0 = REAL)")
     
     args = parser.parse_args()
     
-    if args.update:
-        update_recent_data(args.update_days)
+    if args.migrate_v2:
+        migrate_to_compact_schema(args.price_scale)
+    elif args.update and args.every > 0:
+        sync_forever(args.interval, args.every)
+    elif args.update:
+        update_recent_data(args.interval)
     else:
-        cache_nifty50_data(days=args.days)
\ No newline at end of file
+        cache_nifty50_data(days=args.days, interval=args.interval)
\ No newline at end of file
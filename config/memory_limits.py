@@ -43,4 +43,13 @@ def should_cleanup(current_size: int, max_size: int) -> bool:
 
 def calculate_items_to_remove(current_size: int) -> int:
     """Calculate how many items to remove during cleanup"""
-    return int(current_size * CLEANUP_REMOVE_PERCENT / 100)
\ No newline at end of file
+    return int(current_size * CLEANUP_REMOVE_PERCENT / 100)
+
+# Diagnostics ring buffers (core/diagnostics.py)
+# Debug records are kept in fixed-size rings so long-running processes
+# never accumulate unbounded debug history
+DIAGNOSTICS_BUFFER_SIZE = 256
+
+# Regime filter debug sampling (bars logged in addition to every Nth bar)
+REGIME_DEBUG_SAMPLE_BARS = (1, 10, 20, 30, 40, 50, 100, 150, 200)
+REGIME_DEBUG_SAMPLE_EVERY = 50
@@ -63,11 +63,15 @@ from .pine_functions import (
 from .history_referencing import (
     PineScriptSeries,
     PineArray,
+    RingHistoryBuffer,
     PineScriptData,
     create_series,
     lookback
 )
 
+# Cross-sectional (universe-wide) indicators
+from .indicator_pool import IndicatorPool
+
 __all__ = [
     # Math
     'tanh', 'normalize_deriv', 'dual_pole_filter',
@@ -93,6 +97,9 @@ __all__ = [
     'crossover_value', 'crossunder_value', 'barssince', 'barssince_na',
     
     # History Referencing
-    'PineScriptSeries', 'PineArray', 'PineScriptData',
-    'create_series', 'lookback'
+    'PineScriptSeries', 'PineArray', 'RingHistoryBuffer', 'PineScriptData',
+    'create_series', 'lookback',
+
+    # Universe-wide indicators
+    'IndicatorPool'
 ]
\ No newline at end of file
@@ -0,0 +1,337 @@
+"""
+Batch Filter Engine
+===================
+
+Array versions of the regime, volatility and ADX filters. Each function takes
+a whole price history and returns the filter result for every bar in one
+call, instead of advancing the stateful filters one bar at a time.
+
+The recursive loops (KLMF, RMA/ATR, DMI) are compiled with numba when it is
+installed and fall back to plain Python otherwise. They replicate
+StatefulRegimeFilterV2, StatefulATR and StatefulDMI operation for operation,
+so the outputs are bit-identical to the stateful versions:
+
+    regime_filter_array(ohlc4, high, low, -0.1)  ==  [enhanced_regime_filter(...) per bar]
+"""
+import sys
+import math
+import ctypes
+import ctypes.util
+from typing import Tuple
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback decorator - run the kernels as plain Python"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+def _load_libm_pow():
+    """C pow() from libm, callable from numba-compiled code"""
+    try:
+        libm = ctypes.CDLL(ctypes.util.find_library('m'))
+        c_pow = libm.pow
+        c_pow.restype = ctypes.c_double
+        c_pow.argtypes = (ctypes.c_double, ctypes.c_double)
+        return c_pow
+    except (OSError, TypeError, AttributeError):
+        return None
+
+
+# CPython evaluates omega ** 4 with libm pow(). numba would fold pow(x, 2.0)
+# into x * x, which differs in the last bit, so the KLMF kernel calls pow() too.
+_libm_pow = _load_libm_pow()
+_pow = _libm_pow if _libm_pow is not None else math.pow
+
+# Python 3.12+ sum() of floats uses Neumaier compensated summation. StatefulRMA
+# seeds with sum(initial_values), so the kernels must do the same to stay exact.
+_COMPENSATED_SUM = sys.version_info >= (3, 12)
+
+
+def _klmf_loop(src, high, low):
+    """StatefulRegimeFilterV2.update() over a full history"""
+    n = src.shape[0]
+    out = np.zeros(n)
+
+    value1 = 0.0
+    value2 = 0.0
+    klmf = 0.0
+    prev_klmf = 0.0
+    prev_src = 0.0
+    has_prev = False
+    bars_processed = 0
+
+    # PineScriptEMA(200) of the absolute curve slope
+    ema_alpha = 2.0 / (200 + 1)
+    ema_value = 0.0
+    ema_seeded = False
+
+    for i in range(n):
+        if np.isnan(src[i]) or np.isnan(high[i]) or np.isnan(low[i]):
+            out[i] = 0.0
+            continue
+
+        bars_processed += 1
+
+        src_change = 0.0
+        if has_prev:
+            src_change = src[i] - prev_src
+
+        value1 = 0.2 * src_change + 0.8 * value1
+        value2 = 0.1 * (high[i] - low[i]) + 0.8 * value2
+
+        omega = 0.0
+        if value2 != 0:
+            omega = abs(value1 / value2)
+
+        alpha = (-omega * omega + np.sqrt(_pow(omega, 4.0) + 16 * _pow(omega, 2.0))) / 8
+
+        if bars_processed == 1:
+            klmf = alpha * src[i]
+        else:
+            klmf = alpha * src[i] + (1 - alpha) * klmf
+
+        abs_curve_slope = 0.0
+        if has_prev:
+            abs_curve_slope = abs(klmf - prev_klmf)
+
+        if not ema_seeded:
+            ema_value = abs_curve_slope
+            ema_seeded = True
+        else:
+            ema_value = ema_alpha * abs_curve_slope + (1 - ema_alpha) * ema_value
+
+        nsd = 0.0
+        if ema_value > 0:
+            nsd = (abs_curve_slope - ema_value) / ema_value
+        out[i] = nsd
+
+        prev_src = src[i]
+        prev_klmf = klmf
+        has_prev = True
+
+    return out
+
+
+# Not cached: the kernel references the ctypes pow() pointer
+if NUMBA_AVAILABLE and _libm_pow is not None:
+    _klmf_kernel = njit(_klmf_loop)
+else:
+    _klmf_kernel = _klmf_loop
+
+
+@njit(cache=True)
+def _rma_step(x, period, state, compensated):
+    """
+    One StatefulRMA.update() step.
+
+    state = [value, seeded, seed_sum, seed_comp, seed_count]
+    """
+    if state[1] == 1.0:
+        state[0] = (state[0] * (period - 1) + x) / period
+        return state[0]
+
+    # Seeding: running sum(initial_values) exactly as Python computes it
+    count = state[4]
+    if count == 0:
+        state[2] = x
+        state[3] = 0.0
+    elif compensated:
+        total = state[2]
+        t = total + x
+        if abs(total) >= abs(x):
+            state[3] += (total - t) + x
+        else:
+            state[3] += (x - t) + total
+        state[2] = t
+    else:
+        state[2] = state[2] + x
+    state[4] = count + 1
+
+    seed_total = state[2]
+    if compensated and state[3] != 0.0 and np.isfinite(state[3]):
+        seed_total = seed_total + state[3]
+    avg = seed_total / state[4]
+
+    if state[4] >= period:
+        state[0] = avg
+        state[1] = 1.0
+    return avg
+
+
+@njit(cache=True)
+def _atr_kernel(high, low, close, period, compensated):
+    """StatefulATR.update() over a full history"""
+    n = high.shape[0]
+    out = np.zeros(n)
+    state = np.zeros(5)
+    prev_close = 0.0
+    has_prev = False
+
+    for i in range(n):
+        if np.isnan(high[i]) or np.isnan(low[i]) or np.isnan(close[i]):
+            out[i] = 0.0
+            continue
+
+        if not has_prev:
+            tr = high[i] - low[i]
+        else:
+            tr = max(high[i] - low[i],
+                     abs(high[i] - prev_close),
+                     abs(low[i] - prev_close))
+
+        out[i] = _rma_step(tr, period, state, compensated)
+        prev_close = close[i]
+        has_prev = True
+
+    return out
+
+
+@njit(cache=True)
+def _dmi_kernel(high, low, close, di_length, adx_length, compensated):
+    """StatefulDMI.update() over a full history, returns (DI+, DI-, ADX)"""
+    n = high.shape[0]
+    di_plus_out = np.zeros(n)
+    di_minus_out = np.zeros(n)
+    adx_out = np.zeros(n)
+
+    tr_state = np.zeros(5)
+    plus_state = np.zeros(5)
+    minus_state = np.zeros(5)
+    adx_state = np.zeros(5)
+
+    prev_high = 0.0
+    prev_low = 0.0
+    prev_close = 0.0
+    has_prev = False
+
+    for i in range(n):
+        if np.isnan(high[i]) or np.isnan(low[i]) or np.isnan(close[i]):
+            continue
+
+        if not has_prev:
+            prev_high = high[i]
+            prev_low = low[i]
+            prev_close = close[i]
+            has_prev = True
+            continue
+
+        tr = max(high[i] - low[i],
+                 abs(high[i] - prev_close),
+                 abs(low[i] - prev_close))
+
+        high_diff = high[i] - prev_high
+        low_diff = prev_low - low[i]
+        plus_dm = max(high_diff, 0.0) if high_diff > low_diff else 0.0
+        minus_dm = max(low_diff, 0.0) if low_diff > high_diff else 0.0
+
+        smooth_tr = _rma_step(tr, di_length, tr_state, compensated)
+        smooth_plus = _rma_step(plus_dm, di_length, plus_state, compensated)
+        smooth_minus = _rma_step(minus_dm, di_length, minus_state, compensated)
+
+        di_plus = (smooth_plus / smooth_tr * 100) if smooth_tr > 0 else 0.0
+        di_minus = (smooth_minus / smooth_tr * 100) if smooth_tr > 0 else 0.0
+
+        di_sum = di_plus + di_minus
+        if di_sum == 0:
+            dx = 0.0
+        else:
+            dx = abs(di_plus - di_minus) / di_sum * 100
+
+        di_plus_out[i] = di_plus
+        di_minus_out[i] = di_minus
+        adx_out[i] = _rma_step(dx, adx_length, adx_state, compensated)
+
+        prev_high = high[i]
+        prev_low = low[i]
+        prev_close = close[i]
+
+    return di_plus_out, di_minus_out, adx_out
+
+
+def _as_array(values) -> np.ndarray:
+    """Contiguous float64 view/copy of the input"""
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def normalized_slope_decline_series(src, high, low) -> np.ndarray:
+    """
+    Raw regime filter values for a whole history
+
+    Args:
+        src: Source series (usually OHLC4), oldest first
+        high: High prices
+        low: Low prices
+
+    Returns:
+        Normalized slope decline per bar (same as StatefulRegimeFilterV2.update)
+    """
+    return _klmf_kernel(_as_array(src), _as_array(high), _as_array(low))
+
+
+def regime_filter_array(src, high, low, threshold: float,
+                        use_regime_filter: bool = True) -> np.ndarray:
+    """
+    Regime filter for a whole history
+
+    Returns:
+        Boolean array, True where the market is trending
+        (normalized slope decline >= threshold)
+    """
+    n = len(src)
+    if not use_regime_filter:
+        return np.ones(n, dtype=bool)
+    return normalized_slope_decline_series(src, high, low) >= threshold
+
+
+def atr_series(high, low, close, period: int) -> np.ndarray:
+    """ATR for every bar (same as StatefulATR.update)"""
+    return _atr_kernel(_as_array(high), _as_array(low), _as_array(close),
+                       period, _COMPENSATED_SUM)
+
+
+def volatility_filter_array(high, low, close, min_length: int = 1, max_length: int = 10,
+                            use_volatility_filter: bool = True) -> np.ndarray:
+    """
+    Volatility filter for a whole history
+
+    Returns:
+        Boolean array, True where ATR(min_length) > ATR(max_length)
+    """
+    if not use_volatility_filter:
+        return np.ones(len(close), dtype=bool)
+    recent_atr = atr_series(high, low, close, min_length)
+    historical_atr = atr_series(high, low, close, max_length)
+    return recent_atr > historical_atr
+
+
+def dmi_series(high, low, close, di_length: int,
+               adx_length: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """DI+, DI- and ADX for every bar (same as StatefulDMI.update)"""
+    return _dmi_kernel(_as_array(high), _as_array(low), _as_array(close),
+                       di_length, adx_length, _COMPENSATED_SUM)
+
+
+def adx_series(high, low, close, length: int) -> np.ndarray:
+    """ADX for every bar, as used by the ADX filter"""
+    return dmi_series(high, low, close, length, length)[2]
+
+
+def adx_filter_array(high, low, close, length: int, adx_threshold: float,
+                     use_adx_filter: bool = True) -> np.ndarray:
+    """
+    ADX filter for a whole history
+
+    Returns:
+        Boolean array, True where ADX > threshold
+    """
+    if not use_adx_filter:
+        return np.ones(len(close), dtype=bool)
+    return adx_series(high, low, close, length) > adx_threshold
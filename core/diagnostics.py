@@ -0,0 +1,190 @@
+"""
+Diagnostics Subsystem
+=====================
+
+Bounded, sampled debug recording for hot-path code (indicators, filters).
+
+- RingBuffer: fixed-size storage, the oldest record is overwritten
+- DiagnosticsChannel: per-instance channel with sampling controls and
+  lazy log formatting
+- configure_diagnostics(): global settings per channel name
+
+Hot-path usage - nothing is built or formatted unless the bar is sampled:
+
+    if self._diag.should_sample(bar):
+        self._diag.record(bar, {'value': value})
+
+A disabled channel costs one attribute check per bar and allocates nothing.
+"""
+import logging
+from dataclasses import dataclass, replace
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+from config.memory_limits import (
+    DIAGNOSTICS_BUFFER_SIZE, REGIME_DEBUG_SAMPLE_BARS, REGIME_DEBUG_SAMPLE_EVERY
+)
+
+
+class RingBuffer:
+    """
+    Fixed-capacity ring buffer.
+    Appends are O(1); once full, each append overwrites the oldest item.
+    """
+    has_rollback_state = True  # Captured along with its owner (see stateful_ta.capture_state)
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError(f"RingBuffer capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self._items: List[Any] = [None] * capacity
+        self._next = 0
+        self._count = 0
+
+    def append(self, item: Any) -> None:
+        """Add item, overwriting the oldest one when full"""
+        self._items[self._next] = item
+        self._next = (self._next + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def last(self, n: int = 1) -> List[Any]:
+        """Most recent n items (oldest first)"""
+        n = min(n, self._count)
+        return [self._items[(self._next - n + i) % self.capacity] for i in range(n)]
+
+    def to_list(self) -> List[Any]:
+        """All stored items, oldest first"""
+        return self.last(self._count)
+
+    def clear(self) -> None:
+        """Drop all items"""
+        self._items = [None] * self.capacity
+        self._next = 0
+        self._count = 0
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.to_list())
+
+    def __len__(self) -> int:
+        return self._count
+
+
+@dataclass(frozen=True)
+class DiagnosticsSettings:
+    """Settings for one diagnostics channel name"""
+    enabled: bool = False
+    capacity: int = DIAGNOSTICS_BUFFER_SIZE
+    sample_every: int = 0                       # 0 = only sample_bars
+    sample_bars: FrozenSet[int] = frozenset()   # Explicit bars to sample
+    log_level: Optional[int] = None             # None = record only, no logging
+
+
+# Global settings registry: {channel_name: DiagnosticsSettings}
+_settings: Dict[str, DiagnosticsSettings] = {}
+
+
+def configure_diagnostics(name: str, **kwargs) -> DiagnosticsSettings:
+    """
+    Configure a diagnostics channel name (affects channels created afterwards)
+
+    Args:
+        name: Channel name (e.g. 'regime_filter', 'ema')
+        **kwargs: Any DiagnosticsSettings field
+
+    Returns:
+        The new settings
+    """
+    if 'sample_bars' in kwargs:
+        kwargs['sample_bars'] = frozenset(kwargs['sample_bars'])
+    current = _settings.get(name, DiagnosticsSettings())
+    _settings[name] = replace(current, **kwargs)
+    return _settings[name]
+
+
+def get_diagnostics_settings(name: str) -> DiagnosticsSettings:
+    """Get settings for a channel name (disabled by default)"""
+    return _settings.get(name, DiagnosticsSettings())
+
+
+class _LazyRecord:
+    """Formats a record only if a log handler actually emits it"""
+    __slots__ = ('fields',)
+
+    def __init__(self, fields: Dict[str, Any]):
+        self.fields = fields
+
+    def __str__(self) -> str:
+        parts = []
+        for key, value in self.fields.items():
+            if isinstance(value, float):
+                parts.append(f"{key}={value:.6f}")
+            else:
+                parts.append(f"{key}={value}")
+        return ", ".join(parts)
+
+
+class DiagnosticsChannel:
+    """
+    Bounded debug channel owned by one indicator/filter instance.
+
+    Records are (bar, fields) tuples kept in a RingBuffer that is only
+    allocated when the channel is enabled.
+    """
+    has_rollback_state = True  # Captured along with its owner (see stateful_ta.capture_state)
+
+    def __init__(self, name: str, settings: Optional[DiagnosticsSettings] = None,
+                 logger: Optional[logging.Logger] = None):
+        self.name = name
+        self.settings = settings if settings is not None else get_diagnostics_settings(name)
+        self.enabled = self.settings.enabled
+        self.logger = logger or logging.getLogger(f"diagnostics.{name}")
+        self._sample_every = self.settings.sample_every
+        self._sample_bars = self.settings.sample_bars
+        self._buffer: Optional[RingBuffer] = (
+            RingBuffer(self.settings.capacity) if self.enabled else None
+        )
+
+    def should_sample(self, bar: int) -> bool:
+        """Check if this bar should be recorded (cheap, call before building fields)"""
+        if not self.enabled:
+            return False
+        if self._sample_every and bar % self._sample_every == 0:
+            return True
+        return bar in self._sample_bars
+
+    def record(self, bar: int, fields: Any) -> None:
+        """Store a record and log it lazily"""
+        if not self.enabled:
+            return
+        self._buffer.append((bar, fields))
+
+        level = self.settings.log_level
+        if level is not None and self.logger.isEnabledFor(level):
+            payload = _LazyRecord(fields) if isinstance(fields, dict) else fields
+            self.logger.log(level, "%s bar %d: %s", self.name, bar, payload)
+
+    def records(self) -> List[Tuple[int, Any]]:
+        """All retained (bar, fields) records, oldest first"""
+        return self._buffer.to_list() if self._buffer is not None else []
+
+    def values(self) -> List[Any]:
+        """Retained field payloads only, oldest first"""
+        return [fields for _, fields in self.records()]
+
+    def clear(self) -> None:
+        """Drop retained records"""
+        if self._buffer is not None:
+            self._buffer.clear()
+
+    def __len__(self) -> int:
+        return len(self._buffer) if self._buffer is not None else 0
+
+
+# Default channel settings (keep the regime filter's historical sampling)
+configure_diagnostics(
+    'regime_filter',
+    enabled=True,
+    sample_every=REGIME_DEBUG_SAMPLE_EVERY,
+    sample_bars=REGIME_DEBUG_SAMPLE_BARS,
+    log_level=logging.INFO,
+)
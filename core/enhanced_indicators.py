@@ -9,12 +9,14 @@ recalculating from full history.
 CRITICAL: Always use these instead of the old functions for accurate results!
 """
 from typing import Optional, Tuple
-from .indicator_state_manager import IndicatorStateManager
+from .indicator_state_manager import IndicatorStateManager, IndicatorContext
 from .normalization import rescale
 from .stateful_ta import StatefulEMA
 
 
-# Global indicator manager - shared across all indicators
+# Global indicator manager - default context when none is passed.
+# Processors own their own IndicatorContext; the global is kept for
+# scripts and backward compatibility only.
 _indicator_manager = IndicatorStateManager()
 
 
@@ -23,7 +25,13 @@ def get_indicator_manager() -> IndicatorStateManager:
     return _indicator_manager
 
 
-def enhanced_ema(value: float, period: int, symbol: str, timeframe: str) -> float:
+def _resolve(context: Optional[IndicatorStateManager]) -> IndicatorStateManager:
+    """Use the given context, or the global manager if none"""
+    return context if context is not None else _indicator_manager
+
+
+def enhanced_ema(value: float, period: int, symbol: str, timeframe: str,
+                 context: Optional[IndicatorStateManager] = None) -> float:
     """
     Enhanced Exponential Moving Average with state management
     
@@ -32,15 +40,17 @@ def enhanced_ema(value: float, period: int, symbol: str, timeframe: str) -> floa
         period: EMA period
         symbol: Trading symbol (e.g., 'RELIANCE')
         timeframe: Timeframe (e.g., '5min', 'daily')
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         Current EMA value
     """
-    ema = _indicator_manager.get_or_create_ema(symbol, timeframe, period)
+    ema = _resolve(context).get_or_create_ema(symbol, timeframe, period)
     return ema.update(value)
 
 
-def enhanced_sma(value: float, period: int, symbol: str, timeframe: str) -> float:
+def enhanced_sma(value: float, period: int, symbol: str, timeframe: str,
+                 context: Optional[IndicatorStateManager] = None) -> float:
     """
     Enhanced Simple Moving Average with state management
     
@@ -49,15 +59,17 @@ def enhanced_sma(value: float, period: int, symbol: str, timeframe: str) -> floa
         period: SMA period
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         Current SMA value
     """
-    sma = _indicator_manager.get_or_create_sma(symbol, timeframe, period)
+    sma = _resolve(context).get_or_create_sma(symbol, timeframe, period)
     return sma.update(value)
 
 
-def enhanced_rma(value: float, period: int, symbol: str, timeframe: str) -> float:
+def enhanced_rma(value: float, period: int, symbol: str, timeframe: str,
+                 context: Optional[IndicatorStateManager] = None) -> float:
     """
     Enhanced Relative Moving Average (Wilder's) with state management
     
@@ -66,15 +78,17 @@ def enhanced_rma(value: float, period: int, symbol: str, timeframe: str) -> floa
         period: RMA period
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         Current RMA value
     """
-    rma = _indicator_manager.get_or_create_rma(symbol, timeframe, period)
+    rma = _resolve(context).get_or_create_rma(symbol, timeframe, period)
     return rma.update(value)
 
 
-def enhanced_rsi(close: float, period: int, symbol: str, timeframe: str) -> float:
+def enhanced_rsi(close: float, period: int, symbol: str, timeframe: str,
+                 context: Optional[IndicatorStateManager] = None) -> float:
     """
     Enhanced RSI with state management
     
@@ -83,15 +97,17 @@ def enhanced_rsi(close: float, period: int, symbol: str, timeframe: str) -> floa
         period: RSI period
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         Current RSI value (0-100)
     """
-    rsi = _indicator_manager.get_or_create_rsi(symbol, timeframe, period)
+    rsi = _resolve(context).get_or_create_rsi(symbol, timeframe, period)
     return rsi.update(close)
 
 
-def enhanced_n_rsi(close: float, n1: int, n2: int, symbol: str, timeframe: str) -> float:
+def enhanced_n_rsi(close: float, n1: int, n2: int, symbol: str, timeframe: str,
+                   context: Optional[IndicatorStateManager] = None) -> float:
     """
     Enhanced Normalized RSI for ML (maintains state)
     Pine Script: rescale(ta.ema(ta.rsi(src, n1), n2), 0, 100, 0, 1)
@@ -102,22 +118,24 @@ def enhanced_n_rsi(close: float, n1: int, n2: int, symbol: str, timeframe: str)
         n2: EMA smoothing period
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         Normalized RSI value (0-1)
     """
     # Step 1: Get stateful RSI
-    rsi_value = enhanced_rsi(close, n1, symbol, timeframe)
+    rsi_value = enhanced_rsi(close, n1, symbol, timeframe, context)
     
     # Step 2: Apply EMA smoothing to RSI
-    smoothed_rsi = enhanced_ema(rsi_value, n2, symbol, f"{timeframe}_rsi_{n1}")
+    smoothed_rsi = enhanced_ema(rsi_value, n2, symbol, f"{timeframe}_rsi_{n1}", context)
     
     # Step 3: Rescale to [0, 1]
     return rescale(smoothed_rsi, 0, 100, 0, 1)
 
 
 def enhanced_atr(high: float, low: float, close: float, period: int, 
-                symbol: str, timeframe: str) -> float:
+                symbol: str, timeframe: str,
+                context: Optional[IndicatorStateManager] = None) -> float:
     """
     Enhanced Average True Range with state management
     
@@ -128,16 +146,18 @@ def enhanced_atr(high: float, low: float, close: float, period: int,
         period: ATR period
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         Current ATR value
     """
-    atr = _indicator_manager.get_or_create_atr(symbol, timeframe, period)
+    atr = _resolve(context).get_or_create_atr(symbol, timeframe, period)
     return atr.update(high, low, close)
 
 
 def enhanced_cci(high: float, low: float, close: float, period: int,
-                symbol: str, timeframe: str) -> float:
+                symbol: str, timeframe: str,
+                context: Optional[IndicatorStateManager] = None) -> float:
     """
     Enhanced Commodity Channel Index with state management
     
@@ -148,16 +168,18 @@ def enhanced_cci(high: float, low: float, close: float, period: int,
         period: CCI period
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         Current CCI value
     """
-    cci = _indicator_manager.get_or_create_cci(symbol, timeframe, period)
+    cci = _resolve(context).get_or_create_cci(symbol, timeframe, period)
     return cci.update(high, low, close)
 
 
 def enhanced_n_cci(high: float, low: float, close: float, n1: int, n2: int,
-                  symbol: str, timeframe: str) -> float:
+                  symbol: str, timeframe: str,
+                  context: Optional[IndicatorStateManager] = None) -> float:
     """
     Enhanced Normalized CCI for ML (maintains state)
     Pine Script: normalize(ta.ema(ta.cci(src, n1), n2), 0, 1)
@@ -170,15 +192,16 @@ def enhanced_n_cci(high: float, low: float, close: float, n1: int, n2: int,
         n2: EMA smoothing period
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         Normalized CCI value (0-1)
     """
     # Step 1: Get stateful CCI
-    cci_value = enhanced_cci(high, low, close, n1, symbol, timeframe)
+    cci_value = enhanced_cci(high, low, close, n1, symbol, timeframe, context)
     
     # Step 2: Apply EMA smoothing to CCI
-    smoothed_cci = enhanced_ema(cci_value, n2, symbol, f"{timeframe}_cci_{n1}")
+    smoothed_cci = enhanced_ema(cci_value, n2, symbol, f"{timeframe}_cci_{n1}", context)
     
     # Step 3: Normalize using dynamic range (like Pine Script)
     # For now, using a typical CCI range of -200 to +200
@@ -188,7 +211,8 @@ def enhanced_n_cci(high: float, low: float, close: float, n1: int, n2: int,
 
 
 def enhanced_wavetrend(high: float, low: float, close: float, n1: int, n2: int,
-                      symbol: str, timeframe: str) -> Tuple[float, float]:
+                      symbol: str, timeframe: str,
+                      context: Optional[IndicatorStateManager] = None) -> Tuple[float, float]:
     """
     Enhanced WaveTrend Oscillator with state management
     
@@ -200,16 +224,18 @@ def enhanced_wavetrend(high: float, low: float, close: float, n1: int, n2: int,
         n2: Second period parameter
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         Tuple of (wt1, wt2)
     """
-    wt = _indicator_manager.get_or_create_wavetrend(symbol, timeframe, n1, n2)
+    wt = _resolve(context).get_or_create_wavetrend(symbol, timeframe, n1, n2)
     return wt.update(high, low, close)
 
 
 def enhanced_n_wt(high: float, low: float, close: float, n1: int, n2: int,
-                 symbol: str, timeframe: str) -> float:
+                 symbol: str, timeframe: str,
+                 context: Optional[IndicatorStateManager] = None) -> float:
     """
     Enhanced Normalized WaveTrend for ML (maintains state)
     Pine Script: normalize(wt1 - wt2, 0, 1)
@@ -222,12 +248,13 @@ def enhanced_n_wt(high: float, low: float, close: float, n1: int, n2: int,
         n2: Second period parameter
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         Normalized WT value (0-1)
     """
     # Get stateful WaveTrend values
-    wt1, wt2 = enhanced_wavetrend(high, low, close, n1, n2, symbol, timeframe)
+    wt1, wt2 = enhanced_wavetrend(high, low, close, n1, n2, symbol, timeframe, context)
     wt_diff = wt1 - wt2
     
     # Normalize using typical WT range of -100 to +100
@@ -237,7 +264,8 @@ def enhanced_n_wt(high: float, low: float, close: float, n1: int, n2: int,
 
 
 def enhanced_dmi(high: float, low: float, close: float, di_length: int, adx_length: int,
-                symbol: str, timeframe: str) -> Tuple[float, float, float]:
+                symbol: str, timeframe: str,
+                context: Optional[IndicatorStateManager] = None) -> Tuple[float, float, float]:
     """
     Enhanced Directional Movement Index with state management
     
@@ -249,16 +277,18 @@ def enhanced_dmi(high: float, low: float, close: float, di_length: int, adx_leng
         adx_length: ADX calculation period
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         Tuple of (DI+, DI-, ADX)
     """
-    dmi = _indicator_manager.get_or_create_dmi(symbol, timeframe, di_length, adx_length)
+    dmi = _resolve(context).get_or_create_dmi(symbol, timeframe, di_length, adx_length)
     return dmi.update(high, low, close)
 
 
 def enhanced_n_adx(high: float, low: float, close: float, period: int,
-                  symbol: str, timeframe: str) -> float:
+                  symbol: str, timeframe: str,
+                  context: Optional[IndicatorStateManager] = None) -> float:
     """
     Enhanced Normalized ADX for ML (maintains state)
     Pine Script: rescale(adx, 0, 100, 0, 1)
@@ -270,18 +300,20 @@ def enhanced_n_adx(high: float, low: float, close: float, period: int,
         period: ADX period
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         Normalized ADX value (0-1)
     """
     # Get ADX from DMI calculation
-    _, _, adx = enhanced_dmi(high, low, close, period, period, symbol, timeframe)
+    _, _, adx = enhanced_dmi(high, low, close, period, period, symbol, timeframe, context)
     
     # Rescale to [0, 1]
     return rescale(adx, 0, 100, 0, 1)
 
 
-def enhanced_stdev(value: float, period: int, symbol: str, timeframe: str) -> float:
+def enhanced_stdev(value: float, period: int, symbol: str, timeframe: str,
+                   context: Optional[IndicatorStateManager] = None) -> float:
     """
     Enhanced Standard Deviation with state management
     
@@ -290,15 +322,17 @@ def enhanced_stdev(value: float, period: int, symbol: str, timeframe: str) -> fl
         period: Standard deviation period
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         Current standard deviation
     """
-    stdev = _indicator_manager.get_or_create_stdev(symbol, timeframe, period)
+    stdev = _resolve(context).get_or_create_stdev(symbol, timeframe, period)
     return stdev.update(value)
 
 
-def enhanced_change(value: float, symbol: str, timeframe: str, series_name: str = "default") -> float:
+def enhanced_change(value: float, symbol: str, timeframe: str, series_name: str = "default",
+                    context: Optional[IndicatorStateManager] = None) -> float:
     """
     Enhanced price change tracker with state management
     
@@ -307,16 +341,18 @@ def enhanced_change(value: float, symbol: str, timeframe: str, series_name: str
         symbol: Trading symbol
         timeframe: Timeframe
         series_name: Name for the series being tracked
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         Change from previous value
     """
-    change = _indicator_manager.get_or_create_change(symbol, timeframe, series_name)
+    change = _resolve(context).get_or_create_change(symbol, timeframe, series_name)
     return change.update(value)
 
 
 def enhanced_crossover(series1: float, series2: float, symbol: str, timeframe: str,
-                      series1_name: str = "s1", series2_name: str = "s2") -> bool:
+                      series1_name: str = "s1", series2_name: str = "s2",
+                       context: Optional[IndicatorStateManager] = None) -> bool:
     """
     Enhanced crossover detection with state management
     
@@ -327,16 +363,18 @@ def enhanced_crossover(series1: float, series2: float, symbol: str, timeframe: s
         timeframe: Timeframe
         series1_name: Name of first series
         series2_name: Name of second series
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         True if series1 crossed over series2
     """
-    crossover = _indicator_manager.get_or_create_crossover(symbol, timeframe, series1_name, series2_name)
+    crossover = _resolve(context).get_or_create_crossover(symbol, timeframe, series1_name, series2_name)
     return crossover.update(series1, series2)
 
 
 def enhanced_crossunder(series1: float, series2: float, symbol: str, timeframe: str,
-                       series1_name: str = "s1", series2_name: str = "s2") -> bool:
+                       series1_name: str = "s1", series2_name: str = "s2",
+                        context: Optional[IndicatorStateManager] = None) -> bool:
     """
     Enhanced crossunder detection with state management
     
@@ -347,16 +385,18 @@ def enhanced_crossunder(series1: float, series2: float, symbol: str, timeframe:
         timeframe: Timeframe
         series1_name: Name of first series
         series2_name: Name of second series
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         True if series1 crossed under series2
     """
-    crossunder = _indicator_manager.get_or_create_crossunder(symbol, timeframe, series1_name, series2_name)
+    crossunder = _resolve(context).get_or_create_crossunder(symbol, timeframe, series1_name, series2_name)
     return crossunder.update(series1, series2)
 
 
 def enhanced_barssince(condition: bool, symbol: str, timeframe: str,
-                      condition_name: str = "default") -> int:
+                      condition_name: str = "default",
+                       context: Optional[IndicatorStateManager] = None) -> int:
     """
     Enhanced bars since condition tracker with state management
     
@@ -365,16 +405,18 @@ def enhanced_barssince(condition: bool, symbol: str, timeframe: str,
         symbol: Trading symbol
         timeframe: Timeframe
         condition_name: Name of the condition being tracked
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         Number of bars since condition was true
     """
-    barssince = _indicator_manager.get_or_create_barssince(symbol, timeframe, condition_name)
+    barssince = _resolve(context).get_or_create_barssince(symbol, timeframe, condition_name)
     return barssince.update(condition)
 
 
 def enhanced_series_from(feature_string: str, close: float, high: float, low: float,
-                        param_a: int, param_b: int, symbol: str, timeframe: str) -> float:
+                        param_a: int, param_b: int, symbol: str, timeframe: str,
+                         context: Optional[IndicatorStateManager] = None) -> float:
     """
     Enhanced version of series_from that uses stateful indicators
     
@@ -387,18 +429,19 @@ def enhanced_series_from(feature_string: str, close: float, high: float, low: fl
         param_b: Second parameter (unused for ADX)
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         Current value of the specified indicator
     """
     if feature_string == "RSI":
-        return enhanced_n_rsi(close, param_a, param_b, symbol, timeframe)
+        return enhanced_n_rsi(close, param_a, param_b, symbol, timeframe, context)
     elif feature_string == "WT":
-        return enhanced_n_wt(high, low, close, param_a, param_b, symbol, timeframe)
+        return enhanced_n_wt(high, low, close, param_a, param_b, symbol, timeframe, context)
     elif feature_string == "CCI":
-        return enhanced_n_cci(high, low, close, param_a, param_b, symbol, timeframe)
+        return enhanced_n_cci(high, low, close, param_a, param_b, symbol, timeframe, context)
     elif feature_string == "ADX":
-        return enhanced_n_adx(high, low, close, param_a, symbol, timeframe)
+        return enhanced_n_adx(high, low, close, param_a, symbol, timeframe, context)
     else:
         return 0.5  # Neutral value for unknown indicator
 
@@ -11,13 +11,15 @@ from .enhanced_indicators import (
     enhanced_atr, enhanced_ema, enhanced_change,
     get_indicator_manager
 )
+from .indicator_state_manager import IndicatorStateManager
 from .enhanced_indicators import enhanced_dmi  # Using enhanced version
 from .na_handling import filter_none_values, safe_divide
 
 
 def enhanced_regime_filter(ohlc4: float, high: float, low: float,
                           threshold: float, use_regime_filter: bool,
-                          symbol: str, timeframe: str) -> bool:
+                          symbol: str, timeframe: str,
+                          context: Optional[IndicatorStateManager] = None) -> bool:
     """
     Enhanced Regime Filter using EXACT Pine Script logic
     
@@ -29,18 +31,21 @@ def enhanced_regime_filter(ohlc4: float, high: float, low: float,
         use_regime_filter: Whether to use the filter
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         True if market is trending (above threshold)
     """
     # Import the fixed implementation V2
     from .regime_filter_fix_v2 import fixed_regime_filter_v2
-    return fixed_regime_filter_v2(ohlc4, high, low, threshold, use_regime_filter, symbol, timeframe)
+    return fixed_regime_filter_v2(ohlc4, high, low, threshold, use_regime_filter,
+                                  symbol, timeframe, context)
 
 
 def enhanced_filter_adx(high: float, low: float, close: float,
                        length: int, adx_threshold: int,
-                       use_adx_filter: bool, symbol: str, timeframe: str) -> bool:
+                       use_adx_filter: bool, symbol: str, timeframe: str,
+                       context: Optional[IndicatorStateManager] = None) -> bool:
     """
     Enhanced ADX Filter using stateful ADX calculation
     
@@ -53,6 +58,7 @@ def enhanced_filter_adx(high: float, low: float, close: float,
         use_adx_filter: Whether to use the filter
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         True if ADX > threshold (trending market)
@@ -62,7 +68,7 @@ def enhanced_filter_adx(high: float, low: float, close: float,
 
     # Get ADX from stateful DMI
     from .enhanced_indicators import enhanced_dmi
-    _, _, adx = enhanced_dmi(high, low, close, length, length, symbol, timeframe)
+    _, _, adx = enhanced_dmi(high, low, close, length, length, symbol, timeframe, context)
 
     return adx > adx_threshold
 
@@ -70,7 +76,8 @@ def enhanced_filter_adx(high: float, low: float, close: float,
 def enhanced_filter_volatility(high: float, low: float, close: float,
                               min_length: int = 1, max_length: int = 10,
                               use_volatility_filter: bool = True,
-                              symbol: str = "", timeframe: str = "") -> bool:
+                              symbol: str = "", timeframe: str = "",
+                              context: Optional[IndicatorStateManager] = None) -> bool:
     """
     Enhanced Volatility Filter using stateful ATR
     
@@ -83,6 +90,7 @@ def enhanced_filter_volatility(high: float, low: float, close: float,
         use_volatility_filter: Whether to use the filter
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         True if recent ATR > historical ATR
@@ -91,8 +99,10 @@ def enhanced_filter_volatility(high: float, low: float, close: float,
         return True
 
     # Calculate recent and historical ATR using stateful indicators
-    recent_atr = enhanced_atr(high, low, close, min_length, symbol, f"{timeframe}_vol_recent")
-    historical_atr = enhanced_atr(high, low, close, max_length, symbol, f"{timeframe}_vol_hist")
+    recent_atr = enhanced_atr(high, low, close, min_length, symbol,
+                              f"{timeframe}_vol_recent", context)
+    historical_atr = enhanced_atr(high, low, close, max_length, symbol,
+                                  f"{timeframe}_vol_hist", context)
 
     return recent_atr > historical_atr
 
@@ -160,7 +170,8 @@ def enhanced_backtest(high_values: List[Optional[float]], low_values: List[Optio
 def enhanced_regime_filter_batch(ohlc4_values: List[Optional[float]], threshold: float,
                                 use_regime_filter: bool, high_values: List[Optional[float]] = None,
                                 low_values: List[Optional[float]] = None,
-                                symbol: str = "", timeframe: str = "") -> bool:
+                                symbol: str = "", timeframe: str = "",
+                                context: Optional[IndicatorStateManager] = None) -> bool:
     """
     Batch version that processes the latest value from arrays
     For compatibility with existing code
@@ -181,12 +192,14 @@ def enhanced_regime_filter_batch(ohlc4_values: List[Optional[float]], threshold:
     high = clean_high[0] if clean_high else ohlc4
     low = clean_low[0] if clean_low else ohlc4
     
-    return enhanced_regime_filter(ohlc4, high, low, threshold, use_regime_filter, symbol, timeframe)
+    return enhanced_regime_filter(ohlc4, high, low, threshold, use_regime_filter,
+                                  symbol, timeframe, context)
 
 
 def enhanced_filter_adx_batch(high_values: List[Optional[float]], low_values: List[Optional[float]],
                              close_values: List[Optional[float]], length: int, adx_threshold: int,
-                             use_adx_filter: bool, symbol: str = "", timeframe: str = "") -> bool:
+                             use_adx_filter: bool, symbol: str = "", timeframe: str = "",
+                             context: Optional[IndicatorStateManager] = None) -> bool:
     """
     Batch version for compatibility
     """
@@ -206,13 +219,15 @@ def enhanced_filter_adx_batch(high_values: List[Optional[float]], low_values: Li
     low = clean_low[0]
     close = clean_close[0]
     
-    return enhanced_filter_adx(high, low, close, length, adx_threshold, use_adx_filter, symbol, timeframe)
+    return enhanced_filter_adx(high, low, close, length, adx_threshold, use_adx_filter,
+                               symbol, timeframe, context)
 
 
 def enhanced_filter_volatility_batch(high_values: List[Optional[float]], low_values: List[Optional[float]],
                                    close_values: List[Optional[float]], min_length: int = 1,
                                    max_length: int = 10, use_volatility_filter: bool = True,
-                                   symbol: str = "", timeframe: str = "") -> bool:
+                                   symbol: str = "", timeframe: str = "",
+                                context: Optional[IndicatorStateManager] = None) -> bool:
     """
     Batch version for compatibility
     """
@@ -233,4 +248,4 @@ def enhanced_filter_volatility_batch(high_values: List[Optional[float]], low_val
     close = clean_close[0]
     
     return enhanced_filter_volatility(high, low, close, min_length, max_length, 
-                                    use_volatility_filter, symbol, timeframe)
+                                    use_volatility_filter, symbol, timeframe, context)
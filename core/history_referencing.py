@@ -108,6 +108,126 @@ class HistoryBuffer:
         return len(self._buffer) + (1 if self._current_value is not None else 0)
 
 
+class RingHistoryBuffer:
+    """
+    Fixed-width history for array values, backed by one preallocated NumPy block.
+
+    Rows are stored newest first in a (2 * capacity, width) block. Every row
+    is written twice (at i and i + capacity), so the last n rows are always
+    one contiguous slice and nothing is allocated per bar.
+
+    - buffer[i] returns a read-only zero-copy row view (0 = current, 1 = previous)
+    - buffer.history(n) returns a read-only contiguous (n, width) view, newest first
+
+    Views point into the ring: a row is overwritten once it falls out of
+    max_history, so copy it if it must outlive that.
+    """
+
+    def __init__(self, width: int, max_history: int = 500, dtype=np.float64):
+        """
+        Initialize ring buffer
+
+        Args:
+            width: Number of elements per row
+            max_history: Maximum bars to keep in history (excluding current)
+            dtype: Element type
+        """
+        # Same retention as HistoryBuffer: max_history past values + current
+        self._capacity = max_history + 1
+        self._width = width
+        self._block = np.full((2 * self._capacity, width), np.nan, dtype=dtype)
+        self._row_widths = np.zeros(2 * self._capacity, dtype=np.int64)
+        self._head = 0
+        self._count = 0
+
+    def update(self, value) -> None:
+        """
+        Add a new row (called on each new bar)
+
+        Args:
+            value: Array-like with at most `width` elements; missing
+                   trailing elements are stored as NaN
+        """
+        values = np.asarray(value)
+        n = values.shape[0] if values.ndim else 1
+        if n > self._width:
+            self._grow_width(n)
+
+        self._head = (self._head - 1) % self._capacity
+        head = self._head
+        mirror = head + self._capacity
+
+        row = self._block[head]
+        row[:n] = values
+        row[n:] = np.nan
+        self._block[mirror] = row
+        self._row_widths[head] = n
+        self._row_widths[mirror] = n
+
+        if self._count < self._capacity:
+            self._count += 1
+
+    def _grow_width(self, min_width: int) -> None:
+        """Reallocate with more columns (doubling, so rare)"""
+        width = max(min_width, 2 * self._width)
+        block = np.full((2 * self._capacity, width), np.nan, dtype=self._block.dtype)
+        block[:, :self._width] = self._block
+        self._block = block
+        self._width = width
+
+    def __getitem__(self, index: int) -> Optional[np.ndarray]:
+        """
+        Get a historical row as a zero-copy view
+
+        Args:
+            index: Bars back (0 = current, 1 = previous, etc.)
+
+        Returns:
+            Read-only row view or None if not enough history
+        """
+        if 0 <= index < self._count:
+            pos = self._head + index
+            row = self._block[pos, :self._row_widths[pos]]
+            row.flags.writeable = False
+            return row
+        return None
+
+    @property
+    def current(self) -> Optional[np.ndarray]:
+        """Get current row (same as [0])"""
+        return self[0]
+
+    def get(self, index: int, default: Any = None) -> Any:
+        """Get historical row with default"""
+        value = self[index]
+        return default if value is None else value
+
+    def history(self, length: int) -> np.ndarray:
+        """
+        Get multiple historical rows
+
+        Args:
+            length: Number of rows to retrieve
+
+        Returns:
+            Read-only contiguous (n, width) view, newest first. Rows narrower than
+            the widest row are padded with NaN.
+        """
+        n = max(0, min(length, self._count))
+        rows = self._block[self._head:self._head + n]
+        rows.flags.writeable = False
+        return rows
+
+    @property
+    def width(self) -> int:
+        """Allocated columns per row"""
+        return self._width
+
+    def __len__(self) -> int:
+        """Return available history length"""
+        return self._count
+
+
 class PineScriptSeries:
     """
     Wrapper for any series data with Pine Script style history access
@@ -139,14 +259,23 @@ class PineArray:
     """
     Pine Script style array with history referencing
     Mimics array.new<float>() with [] operator support
+
+    History is kept in a RingHistoryBuffer, so new_bar() copies the array
+    into preallocated storage instead of allocating a new array per bar.
     """
     
     def __init__(self, size: int = 1, max_history: int = 500):
         self._size = size
-        self._data = np.zeros(size)
-        self._history = HistoryBuffer(max_history)
+        # Spare capacity so push() does not reallocate every call
+        self._buffer = np.zeros(max(size, 1))
+        self._history = RingHistoryBuffer(max(size, 1), max_history)
         # Auto-update history on each bar
-        self._history.update(self._data.copy())
+        self._history.update(self._data)
+
+    @property
+    def _data(self) -> np.ndarray:
+        """Live array contents (view)"""
+        return self._buffer[:self._size]
         
     def set(self, index: int, value: float) -> None:
         """
@@ -157,7 +286,7 @@ class PineArray:
             value: Value to set
         """
         if 0 <= index < self._size:
-            self._data[index] = value
+            self._buffer[index] = value
         
     def get(self, index: int) -> float:
         """
@@ -170,26 +299,28 @@ class PineArray:
             Element value
         """
         if 0 <= index < self._size:
-            return self._data[index]
+            return self._buffer[index]
         return 0.0
     
     def push(self, value: float) -> None:
         """Add value to end (like array.push())"""
-        self._data = np.append(self._data, value)
+        if self._size == self._buffer.shape[0]:
+            grown = np.zeros(2 * self._buffer.shape[0])
+            grown[:self._size] = self._buffer[:self._size]
+            self._buffer = grown
+        self._buffer[self._size] = value
         self._size += 1
         
     def pop(self) -> float:
         """Remove and return last element (like array.pop())"""
         if self._size > 0:
-            value = self._data[-1]
-            self._data = self._data[:-1]
             self._size -= 1
-            return value
+            return self._buffer[self._size]
         return 0.0
         
     def new_bar(self) -> None:
         """Call this when new bar starts to update history"""
-        self._history.update(self._data.copy())
+        self._history.update(self._data)
         
     def __getitem__(self, bars_back: int) -> Optional[np.ndarray]:
         """
@@ -199,9 +330,18 @@ class PineArray:
             bars_back: Number of bars back (0 = current, 1 = previous bar)
             
         Returns:
-            Historical array or None
+            Historical array (read-only view into the history ring) or None
         """
         return self._history[bars_back]
+
+    def history(self, length: int) -> np.ndarray:
+        """
+        Get the last `length` array snapshots
+        
+        Returns:
+            Contiguous (n, width) view, newest first (NaN-padded)
+        """
+        return self._history.history(length)
     
     @property
     def current(self) -> np.ndarray:
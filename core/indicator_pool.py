@@ -0,0 +1,372 @@
+"""
+Cross-Sectional Indicator Pool
+==============================
+
+Advances the ML feature indicators (RSI, CCI, WaveTrend, ADX) and the ATR/ADX
+filter inputs for a whole universe of symbols in a single call.
+
+Instead of one stateful object per symbol, each indicator type keeps its state
+in NumPy arrays with one slot per symbol. A bar close then costs a fixed number
+of array operations per indicator, almost independent of how many symbols are
+being scanned.
+
+The arithmetic mirrors core/stateful_ta.py step for step (same warmup, same
+first-bar handling), so the feature vectors match what EnhancedBarProcessor
+computes symbol by symbol.
+
+Usage:
+    pool = IndicatorPool(["RELIANCE", "TCS", "INFY"])
+    features = pool.update_all(high, low, close)   # shape (3, 5)
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+from config.constants import DEFAULT_FEATURES
+
+
+class _PoolEMA:
+    """Vectorized StatefulEMA - first value seeds, then alpha smoothing"""
+
+    def __init__(self, n: int, period: int):
+        self.alpha = 2.0 / (period + 1)
+        self.value = np.full(n, np.nan)
+
+    def update(self, x: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        seeded = mask & ~np.isnan(self.value)
+        seeding = mask & np.isnan(self.value)
+        smoothed = self.alpha * x + (1 - self.alpha) * self.value
+        self.value = np.where(seeded, smoothed, np.where(seeding, x, self.value))
+        return self.value
+
+
+class _PoolSMA:
+    """Vectorized StatefulSMA - ring buffer window plus running sum"""
+
+    def __init__(self, n: int, period: int):
+        self.period = period
+        self.window = np.zeros((n, period))
+        self.count = np.zeros(n, dtype=np.int64)
+        self.sum = np.zeros(n)
+        self._rows = np.arange(n)
+
+    def update(self, x: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        rows = self._rows[mask]
+        slot = self.count[rows] % self.period
+        full = self.count[rows] >= self.period
+
+        # Same order as StatefulSMA: drop the oldest first, then add the new value
+        total = self.sum[rows]
+        total = np.where(full, total - self.window[rows, slot], total)
+        total = total + x[rows]
+
+        self.window[rows, slot] = x[rows]
+        self.sum[rows] = total
+        self.count[rows] += 1
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.sum / np.minimum(self.count, self.period)
+
+    def filled(self) -> np.ndarray:
+        """Number of valid slots per symbol"""
+        return np.minimum(self.count, self.period)
+
+
+class _PoolRMA:
+    """Vectorized StatefulRMA - SMA seed over the first `period` values"""
+
+    def __init__(self, n: int, period: int):
+        self.period = period
+        self.value = np.full(n, np.nan)
+        self.seed_sum = np.zeros(n)
+        self.seed_count = np.zeros(n, dtype=np.int64)
+
+    def update(self, x: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        seeded = mask & ~np.isnan(self.value)
+        seeding = mask & np.isnan(self.value)
+
+        smoothed = (self.value * (self.period - 1) + x) / self.period
+
+        self.seed_sum = np.where(seeding, self.seed_sum + x, self.seed_sum)
+        self.seed_count = self.seed_count + seeding
+        with np.errstate(invalid='ignore', divide='ignore'):
+            seed_avg = self.seed_sum / self.seed_count
+
+        done = seeding & (self.seed_count >= self.period)
+        self.value = np.where(seeded, smoothed, np.where(done, seed_avg, self.value))
+
+        # While seeding, StatefulRMA returns the running average
+        return np.where(seeded, smoothed, seed_avg)
+
+
+class _PoolRSI:
+    """Vectorized StatefulRSI"""
+
+    def __init__(self, n: int, period: int):
+        self.avg_gain = _PoolRMA(n, period)
+        self.avg_loss = _PoolRMA(n, period)
+        self.prev_close = np.full(n, np.nan)
+
+    def update(self, close: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        has_prev = mask & ~np.isnan(self.prev_close)
+
+        change = close - self.prev_close
+        gain = np.maximum(change, 0.0)
+        loss = np.maximum(-change, 0.0)
+
+        avg_gain = self.avg_gain.update(gain, has_prev)
+        avg_loss = self.avg_loss.update(loss, has_prev)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rsi = np.where(avg_loss == 0, 100.0,
+                           100.0 - (100.0 / (1.0 + avg_gain / avg_loss)))
+
+        self.prev_close = np.where(mask, close, self.prev_close)
+        # First bar for a symbol is neutral
+        return np.where(has_prev, rsi, 50.0)
+
+
+class _PoolATR:
+    """Vectorized StatefulATR"""
+
+    def __init__(self, n: int, period: int):
+        self.tr_rma = _PoolRMA(n, period)
+        self.prev_close = np.full(n, np.nan)
+
+    def update(self, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+               mask: np.ndarray) -> np.ndarray:
+        hl = high - low
+        tr = np.where(
+            np.isnan(self.prev_close), hl,
+            np.maximum(hl, np.maximum(np.abs(high - self.prev_close),
+                                      np.abs(low - self.prev_close)))
+        )
+        atr = self.tr_rma.update(tr, mask)
+        self.prev_close = np.where(mask, close, self.prev_close)
+        return atr
+
+
+class _PoolCCI:
+    """Vectorized StatefulCCI (SMA of hlc3 plus mean deviation)"""
+
+    def __init__(self, n: int, period: int):
+        self.sma = _PoolSMA(n, period)
+
+    def update(self, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+               mask: np.ndarray) -> np.ndarray:
+        typical = (high + low + close) / 3.0
+        sma_tp = self.sma.update(typical, mask)
+
+        filled = self.sma.filled()
+        valid_slots = np.arange(self.sma.period)[None, :] < filled[:, None]
+        deviations = np.where(valid_slots, np.abs(self.sma.window - sma_tp[:, None]), 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_dev = deviations.sum(axis=1) / filled
+            cci = (typical - sma_tp) / (0.015 * mean_dev)
+        return np.where(mean_dev == 0, 0.0, cci)
+
+
+class _PoolWaveTrend:
+    """Vectorized StatefulWaveTrend, returns (wt1, wt2)"""
+
+    def __init__(self, n: int, n1: int, n2: int):
+        self.ema1 = _PoolEMA(n, n1)
+        self.ema2 = _PoolEMA(n, n1)
+        self.tci_ema = _PoolEMA(n, n2)
+        self.wt2_sma = _PoolSMA(n, 4)
+
+    def update(self, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+               mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        hlc3 = (high + low + close) / 3.0
+        ema1 = self.ema1.update(hlc3, mask)
+        ema2 = self.ema2.update(np.abs(hlc3 - ema1), mask)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ci = np.where(ema2 == 0, 0.0, (hlc3 - ema1) / (0.015 * ema2))
+        wt1 = self.tci_ema.update(ci, mask)
+        wt2 = self.wt2_sma.update(wt1, mask)
+        return wt1, wt2
+
+
+class _PoolDMI:
+    """Vectorized StatefulDMI, returns (DI+, DI-, ADX)"""
+
+    def __init__(self, n: int, di_length: int, adx_length: int):
+        self.smooth_tr = _PoolRMA(n, di_length)
+        self.smooth_plus_dm = _PoolRMA(n, di_length)
+        self.smooth_minus_dm = _PoolRMA(n, di_length)
+        self.adx_rma = _PoolRMA(n, adx_length)
+        self.prev_high = np.full(n, np.nan)
+        self.prev_low = np.full(n, np.nan)
+        self.prev_close = np.full(n, np.nan)
+
+    def update(self, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+               mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        has_prev = mask & ~np.isnan(self.prev_high)
+
+        tr = np.maximum(high - low, np.maximum(np.abs(high - self.prev_close),
+                                               np.abs(low - self.prev_close)))
+        high_diff = high - self.prev_high
+        low_diff = self.prev_low - low
+        plus_dm = np.where(high_diff > low_diff, np.maximum(high_diff, 0.0), 0.0)
+        minus_dm = np.where(low_diff > high_diff, np.maximum(low_diff, 0.0), 0.0)
+
+        smooth_tr = self.smooth_tr.update(tr, has_prev)
+        smooth_plus = self.smooth_plus_dm.update(plus_dm, has_prev)
+        smooth_minus = self.smooth_minus_dm.update(minus_dm, has_prev)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            di_plus = np.where(smooth_tr > 0, smooth_plus / smooth_tr * 100, 0.0)
+            di_minus = np.where(smooth_tr > 0, smooth_minus / smooth_tr * 100, 0.0)
+            di_sum = di_plus + di_minus
+            dx = np.where(di_sum == 0, 0.0, np.abs(di_plus - di_minus) / di_sum * 100)
+
+        adx = self.adx_rma.update(dx, has_prev)
+
+        self.prev_high = np.where(mask, high, self.prev_high)
+        self.prev_low = np.where(mask, low, self.prev_low)
+        self.prev_close = np.where(mask, close, self.prev_close)
+
+        # First bar for a symbol reports zeros, like StatefulDMI
+        return (np.where(has_prev, di_plus, 0.0),
+                np.where(has_prev, di_minus, 0.0),
+                np.where(has_prev, adx, 0.0))
+
+
+class _PoolFeature:
+    """One ML feature (same maths as enhanced_series_from) for all symbols"""
+
+    def __init__(self, n: int, kind: str, param_a: int, param_b: int):
+        self.kind = kind
+        if kind == "RSI":
+            self.rsi = _PoolRSI(n, param_a)
+            self.smoothing = _PoolEMA(n, param_b)
+        elif kind == "CCI":
+            self.cci = _PoolCCI(n, param_a)
+            self.smoothing = _PoolEMA(n, param_b)
+        elif kind == "WT":
+            self.wt = _PoolWaveTrend(n, param_a, param_b)
+        elif kind == "ADX":
+            self.dmi = _PoolDMI(n, param_a, param_a)
+
+    def update(self, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+               mask: np.ndarray) -> np.ndarray:
+        if self.kind == "RSI":
+            smoothed = self.smoothing.update(self.rsi.update(close, mask), mask)
+            # rescale(x, 0, 100, 0, 1)
+            return smoothed / 100
+        if self.kind == "CCI":
+            smoothed = self.smoothing.update(self.cci.update(high, low, close, mask), mask)
+            return np.clip((smoothed + 200) / 400, 0, 1)
+        if self.kind == "WT":
+            wt1, wt2 = self.wt.update(high, low, close, mask)
+            return np.clip((wt1 - wt2 + 100) / 200, 0, 1)
+        if self.kind == "ADX":
+            _, _, adx = self.dmi.update(high, low, close, mask)
+            return adx / 100
+        # Neutral value for unknown indicator
+        return np.full(mask.shape, 0.5)
+
+
+class IndicatorPool:
+    """
+    Universe-wide indicator state with a single update call per bar.
+
+    Key features:
+    - One state array per indicator type, one slot per symbol
+    - update_all() advances every feature and filter input for all symbols
+    - Symbols with NaN in high/low/close are skipped for that bar and keep
+      their state untouched (like the stateful versions ignoring NaN input)
+    """
+
+    def __init__(self, symbols: Sequence[str],
+                 features: Optional[Dict[str, Tuple[str, int, int]]] = None,
+                 volatility_lengths: Tuple[int, int] = (1, 10),
+                 adx_filter_length: int = 14):
+        """
+        Initialize pool for a fixed universe
+
+        Args:
+            symbols: Symbols in the order of the input arrays
+            features: Feature config like TradingConfig.features (f1..f5)
+            volatility_lengths: (recent, historical) ATR periods for the volatility filter
+            adx_filter_length: DMI length used by the ADX filter
+        """
+        self.symbols: List[str] = list(symbols)
+        self.symbol_index: Dict[str, int] = {s: i for i, s in enumerate(self.symbols)}
+        self.features = features if features is not None else DEFAULT_FEATURES.copy()
+        self.feature_names = sorted(self.features.keys())
+
+        n = len(self.symbols)
+
+        # One pooled indicator per distinct feature spec
+        self._feature_blocks: Dict[Tuple[str, int, int], _PoolFeature] = {}
+        for name in self.feature_names:
+            spec = tuple(self.features[name])
+            if spec not in self._feature_blocks:
+                self._feature_blocks[spec] = _PoolFeature(n, *spec)
+
+        # Filter inputs
+        self._atr_recent = _PoolATR(n, volatility_lengths[0])
+        self._atr_historical = _PoolATR(n, volatility_lengths[1])
+        self._adx_filter = _PoolDMI(n, adx_filter_length, adx_filter_length)
+
+        # Latest filter inputs (refreshed by update_all)
+        self.last_volatility_pass = np.zeros(n, dtype=bool)
+        self.last_adx = np.zeros(n)
+
+        self.bars_processed = 0
+
+    @classmethod
+    def from_config(cls, config, symbols: Sequence[str]) -> 'IndicatorPool':
+        """Create pool using a TradingConfig's feature settings"""
+        return cls(symbols, features=config.features)
+
+    def update_all(self, high: Sequence[float], low: Sequence[float],
+                   close: Sequence[float]) -> np.ndarray:
+        """
+        Advance every indicator for all symbols by one bar
+
+        Args:
+            high, low, close: One value per symbol, in pool order
+
+        Returns:
+            Feature matrix of shape (n_symbols, n_features), columns in
+            f1..fN order. Rows of skipped (NaN) symbols are NaN.
+        """
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        if not (high.shape == low.shape == close.shape == (len(self.symbols),)):
+            raise ValueError(
+                f"Expected arrays of length {len(self.symbols)}, got "
+                f"{high.shape}, {low.shape}, {close.shape}"
+            )
+
+        mask = ~(np.isnan(high) | np.isnan(low) | np.isnan(close))
+
+        results = {spec: block.update(high, low, close, mask)
+                   for spec, block in self._feature_blocks.items()}
+        columns = [results[tuple(self.features[name])] for name in self.feature_names]
+        feature_matrix = np.column_stack(columns) if columns else np.empty((len(self.symbols), 0))
+        feature_matrix[~mask] = np.nan
+
+        recent_atr = self._atr_recent.update(high, low, close, mask)
+        historical_atr = self._atr_historical.update(high, low, close, mask)
+        self.last_volatility_pass = mask & (recent_atr > historical_atr)
+
+        _, _, adx = self._adx_filter.update(high, low, close, mask)
+        self.last_adx = np.where(mask, adx, np.nan)
+
+        self.bars_processed += 1
+        return feature_matrix
+
+    def adx_filter(self, adx_threshold: float) -> np.ndarray:
+        """ADX filter result for the last bar (ADX > threshold)"""
+        return self.last_adx > adx_threshold
+
+    def features_for(self, feature_matrix: np.ndarray, symbol: str) -> np.ndarray:
+        """Get one symbol's feature vector from an update_all() result"""
+        return feature_matrix[self.symbol_index[symbol]]
+
+    def __len__(self) -> int:
+        """Number of symbols in the pool"""
+        return len(self.symbols)
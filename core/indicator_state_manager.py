@@ -6,12 +6,14 @@ Manages stateful indicator instances per symbol/timeframe combination.
 This ensures each symbol maintains its own independent indicator state,
 just like Pine Script does automatically.
 """
-from typing import Dict, Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 from .stateful_ta import (
     StatefulEMA, StatefulSMA, StatefulRMA, StatefulRSI, StatefulATR,
     StatefulCCI, StatefulDMI, StatefulStdev, StatefulWaveTrend,
-    StatefulChange, StatefulCrossover, StatefulCrossunder, StatefulBarsSince
+    StatefulChange, StatefulCrossover, StatefulCrossunder, StatefulBarsSince,
+    capture_state, restore_state
 )
+from .regime_filter_fix_v2 import StatefulRegimeFilterV2
 
 
 class IndicatorStateManager:
@@ -23,11 +25,15 @@ class IndicatorStateManager:
     - Indicators maintain state across bar updates
     - Automatic instance creation on first access
     - Memory efficient - only creates indicators that are actually used
+    - Checkpoint/rollback: updates made after checkpoint() can be undone
     """
     
     def __init__(self):
         # Nested dict: {symbol: {timeframe: {indicator_key: indicator_instance}}}
         self.indicators: Dict[str, Dict[str, Dict[str, object]]] = {}
+        # Undo journal while a checkpoint is open:
+        # {(symbol, timeframe, indicator_key): captured state, or None if created since}
+        self._journal: Optional[Dict[Tuple[str, str, str], Any]] = None
         
     def _get_key(self, symbol: str, timeframe: str, indicator_type: str, *params) -> Tuple[str, str, str]:
         """Generate unique key for indicator instance"""
@@ -48,8 +54,47 @@ class IndicatorStateManager:
         # Get or create indicator
         if indicator_key not in self.indicators[symbol][timeframe]:
             self.indicators[symbol][timeframe][indicator_key] = creator_func()
+            if self._journal is not None:
+                self._journal.setdefault((symbol, timeframe, indicator_key), None)
+        elif self._journal is not None:
+            # Copy on first access: only indicators the caller touches are captured
+            journal_key = (symbol, timeframe, indicator_key)
+            if journal_key not in self._journal:
+                self._journal[journal_key] = capture_state(
+                    self.indicators[symbol][timeframe][indicator_key])
             
         return self.indicators[symbol][timeframe][indicator_key]
+
+    # Checkpoint / Rollback
+    def checkpoint(self):
+        """
+        Start recording indicator state so the next updates can be undone
+        
+        Each indicator's state is captured the first time it is accessed
+        after the checkpoint. Indicators must be accessed through the
+        get_or_create_* methods (as the enhanced_* functions do).
+        """
+        self._journal = {}
+
+    def rollback(self):
+        """Undo every indicator update since checkpoint() and close the checkpoint"""
+        journal, self._journal = self._journal, None
+        if not journal:
+            return
+        for (symbol, timeframe, indicator_key), state in journal.items():
+            if state is None:
+                # Created after the checkpoint
+                del self.indicators[symbol][timeframe][indicator_key]
+                if not self.indicators[symbol][timeframe]:
+                    del self.indicators[symbol][timeframe]
+                if not self.indicators[symbol]:
+                    del self.indicators[symbol]
+            else:
+                restore_state(self.indicators[symbol][timeframe][indicator_key], state)
+
+    def commit(self):
+        """Keep the updates made since checkpoint() and close the checkpoint"""
+        self._journal = None
         
     # EMA Management
     def get_or_create_ema(self, symbol: str, timeframe: str, period: int) -> StatefulEMA:
@@ -135,6 +180,12 @@ class IndicatorStateManager:
         sym, tf, key = self._get_key(symbol, timeframe, "barssince", condition_name)
         return self._get_or_create(sym, tf, key, lambda: StatefulBarsSince())
         
+    # Regime Filter
+    def get_or_create_regime_filter(self, symbol: str, timeframe: str) -> StatefulRegimeFilterV2:
+        """Get or create Pine Script regime filter for symbol/timeframe"""
+        key = f"regime_filter_v2_{symbol}_{timeframe}"
+        return self._get_or_create(symbol, timeframe, key, lambda: StatefulRegimeFilterV2())
+        
     # Management Methods
     def reset_symbol(self, symbol: str):
         """Reset all indicators for a specific symbol"""
@@ -178,3 +229,26 @@ class IndicatorStateManager:
                     stats['by_type'][indicator_type] += 1
                     
         return stats
+
+
+class IndicatorContext(IndicatorStateManager):
+    """
+    Indicator state owned by a single processor.
+    
+    Pass it to the enhanced_* functions via `context=` instead of relying on
+    the module-level manager in enhanced_indicators.
+    
+    Key features:
+    - No state shared between processors, so processors can run in threads
+    - Two processors with different configs can track the same symbol
+    - Discarded with its owner (no global reset/clear needed)
+    
+    A context must not be used from two threads at the same time.
+    """
+    
+    def __init__(self, name: str = ""):
+        super().__init__()
+        self.name = name
+        
+    def __repr__(self) -> str:
+        return f"IndicatorContext(name={self.name!r}, symbols={len(self.indicators)})"
@@ -7,19 +7,27 @@ The key insight is that Pine Script's ta.ema() handles initialization differentl
 and we need to match that behavior exactly.
 """
 import math
+import logging
 from typing import Optional, Dict, List
 from .stateful_ta import StatefulIndicator
+from .diagnostics import DiagnosticsChannel
+
+logger = logging.getLogger(__name__)
 
 
 class PineScriptEMA:
     """
     EMA that matches Pine Script's ta.ema() behavior exactly
     """
+    has_rollback_state = True  # Captured along with its owner (see capture_state)
+
     def __init__(self, period: int):
         self.period = period
         self.alpha = 2.0 / (period + 1)
         self.value: Optional[float] = None
-        self.values: List[float] = []  # Store all values for debugging
+        self.bars_processed = 0
+        # Bounded debug history (disabled unless the 'ema' channel is configured)
+        self._diag = DiagnosticsChannel('ema')
     
     def update(self, value: float) -> float:
         """Update EMA with new value"""
@@ -30,13 +38,21 @@ class PineScriptEMA:
             # EMA formula: alpha * value + (1 - alpha) * previous_ema
             self.value = self.alpha * value + (1 - self.alpha) * self.value
         
-        self.values.append(self.value)
+        self.bars_processed += 1
+        if self._diag.should_sample(self.bars_processed):
+            self._diag.record(self.bars_processed, self.value)
         return self.value
     
+    @property
+    def values(self) -> List[float]:
+        """Recent EMA values kept by the diagnostics channel (oldest first)"""
+        return self._diag.values()
+    
     def reset(self):
         """Reset to initial state"""
         self.value = None
-        self.values.clear()
+        self.bars_processed = 0
+        self._diag.clear()
 
 
 class StatefulRegimeFilterV2(StatefulIndicator):
@@ -58,8 +74,8 @@ class StatefulRegimeFilterV2(StatefulIndicator):
         # EMA for exponential average of slope - matches ta.ema()
         self.slope_ema = PineScriptEMA(200)
         
-        # Debug tracking
-        self.debug_values = []
+        # Debug tracking (bounded, sampled - see core/diagnostics.py)
+        self._diag = DiagnosticsChannel('regime_filter', logger=logger)
         
     def update(self, src: float, high: float, low: float) -> float:
         """
@@ -120,10 +136,9 @@ class StatefulRegimeFilterV2(StatefulIndicator):
         if exp_avg_slope > 0:
             normalized_slope_decline = (abs_curve_slope - exp_avg_slope) / exp_avg_slope
         
-        # Debug logging for specific bars
-        if self.bars_processed in [1, 10, 20, 30, 40, 50, 100, 150, 200] or self.bars_processed % 50 == 0:
-            debug_info = {
-                'bar': self.bars_processed,
+        # Debug record for sampled bars (no dict or string built otherwise)
+        if self._diag.should_sample(self.bars_processed):
+            self._diag.record(self.bars_processed, {
                 'src': src,
                 'value1': self.value1,
                 'value2': self.value2,
@@ -133,16 +148,7 @@ class StatefulRegimeFilterV2(StatefulIndicator):
                 'abs_slope': abs_curve_slope,
                 'exp_avg': exp_avg_slope,
                 'nsd': normalized_slope_decline
-            }
-            self.debug_values.append(debug_info)
-            
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"REGIME V2 Bar {self.bars_processed}: "
-                       f"v1={self.value1:.6f}, v2={self.value2:.6f}, "
-                       f"omega={omega:.6f}, alpha={alpha:.6f}, klmf={self.klmf:.2f}, "
-                       f"slope={abs_curve_slope:.6f}, avg={exp_avg_slope:.6f}, "
-                       f"NSD={normalized_slope_decline:.6f}")
+            })
         
         # Update previous values
         self.prev_src = src
@@ -159,12 +165,17 @@ class StatefulRegimeFilterV2(StatefulIndicator):
         self.prev_src = None
         self.prev_klmf = None
         self.slope_ema.reset()
-        self.debug_values.clear()
+        self._diag.clear()
+    
+    @property
+    def debug_values(self) -> List[Dict]:
+        """Sampled debug records (bounded ring buffer, oldest first)"""
+        return [dict(fields, bar=bar) for bar, fields in self._diag.records()]
 
 
 def fixed_regime_filter_v2(src: float, high: float, low: float, 
                           threshold: float, use_regime_filter: bool,
-                          symbol: str, timeframe: str) -> bool:
+                          symbol: str, timeframe: str, context=None) -> bool:
     """
     Fixed regime filter V2 that uses exact Pine Script logic
     
@@ -176,6 +187,7 @@ def fixed_regime_filter_v2(src: float, high: float, low: float,
         use_regime_filter: Whether to use the filter
         symbol: Trading symbol
         timeframe: Timeframe
+        context: Indicator context (defaults to the global manager)
         
     Returns:
         True if market is trending (normalized slope decline >= threshold)
@@ -184,18 +196,13 @@ def fixed_regime_filter_v2(src: float, high: float, low: float,
         return True
     
     # Get or create stateful regime filter
-    from .enhanced_indicators import get_indicator_manager
-    manager = get_indicator_manager()
-    key = f"regime_filter_v2_{symbol}_{timeframe}"
-    
-    indicators = manager.indicators.setdefault(symbol, {}).setdefault(timeframe, {})
-    if key not in indicators:
-        indicators[key] = StatefulRegimeFilterV2()
-    
-    regime_filter = indicators[key]
+    if context is None:
+        from .enhanced_indicators import get_indicator_manager
+        context = get_indicator_manager()
+    regime_filter = context.get_or_create_regime_filter(symbol, timeframe)
     
     # Update and get normalized slope decline
     normalized_slope_decline = regime_filter.update(src, high, low)
     
     # Return true if slope decline is above threshold
-    return normalized_slope_decline >= threshold
\ No newline at end of file
+    return normalized_slope_decline >= threshold
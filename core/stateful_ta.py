@@ -9,7 +9,7 @@ match Pine Script's behavior.
 Each indicator maintains its own state and updates incrementally, avoiding the 
 recalculation of entire history on each bar.
 """
-from typing import Optional, List, Tuple, Dict
+from typing import Any, Optional, List, Tuple, Dict
 from collections import deque
 import math
 from .pine_functions import nz  # For Pine Script compatibility
@@ -33,6 +33,59 @@ class StatefulIndicator:
         self.bars_processed = 0
 
 
+class _NestedState:
+    """Captured state of a stateful object owned by another one"""
+    __slots__ = ('owner', 'state')
+
+    def __init__(self, owner: Any, state: Dict[str, Any]):
+        self.owner = owner
+        self.state = state
+
+
+def _is_nested_stateful(value: Any) -> bool:
+    """Objects captured recursively (an RSI's RMAs, a filter's EMA or diagnostics)"""
+    return isinstance(value, StatefulIndicator) or getattr(value, 'has_rollback_state', False)
+
+
+def capture_state(indicator: Any) -> Dict[str, Any]:
+    """
+    Capture an indicator's state so a later update can be rolled back
+
+    Scalars are kept as they are, window containers (deque/list) are
+    copied and nested stateful objects are captured recursively. The cost
+    is bounded by the indicator's own window, not by the bar history.
+
+    Args:
+        indicator: Any stateful indicator instance
+
+    Returns:
+        State for restore_state()
+    """
+    state = {}
+    for name, value in vars(indicator).items():
+        if isinstance(value, (deque, list)):
+            value = value.copy()
+        elif _is_nested_stateful(value):
+            value = _NestedState(value, capture_state(value))
+        state[name] = value
+    return state
+
+
+def restore_state(indicator: Any, state: Dict[str, Any]) -> None:
+    """
+    Put an indicator back into the state returned by capture_state()
+
+    The state is consumed: its containers become the indicator's own.
+    """
+    attributes = vars(indicator)
+    attributes.clear()
+    for name, value in state.items():
+        if isinstance(value, _NestedState):
+            restore_state(value.owner, value.state)
+            value = value.owner
+        attributes[name] = value
+
+
 class StatefulEMA(StatefulIndicator):
     """
     Stateful Exponential Moving Average
@@ -2,7 +2,7 @@
 Bar data structure - Mimics Pine Script's bar access
 Provides same interface as Pine Script: close, high, low, open, hlc3, ohlc4
 """
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import numpy as np
 
 
@@ -26,6 +26,31 @@ class BarData:
         # Bar index (mimics Pine Script's bar_index)
         self._bar_index = -1
 
+    @classmethod
+    def from_arrays(cls, open_prices, high, low, close, volume=None,
+                    max_bars: int = 5000) -> 'BarData':
+        """
+        Build BarData from oldest-first arrays in one step
+        (e.g. columns loaded from the cache or the columnar store)
+
+        Only the newest max_bars bars are kept; bar_index counts all bars.
+        """
+        n = len(close)
+        keep = min(n, max_bars)
+        bars = cls(max_bars=max_bars)
+        # Newest first, like add_bar() builds them
+        newest_first = slice(n - 1, n - keep - 1 if n - keep > 0 else None, -1)
+        bars._open = np.asarray(open_prices, dtype=float)[newest_first].tolist()
+        bars._high = np.asarray(high, dtype=float)[newest_first].tolist()
+        bars._low = np.asarray(low, dtype=float)[newest_first].tolist()
+        bars._close = np.asarray(close, dtype=float)[newest_first].tolist()
+        if volume is None:
+            bars._volume = [0.0] * keep
+        else:
+            bars._volume = np.asarray(volume, dtype=float)[newest_first].tolist()
+        bars._bar_index = n - 1
+        return bars
+
     def add_bar(self, open_price: float, high: float, low: float,
                 close: float, volume: float = 0.0):
         """Add new bar data (like Pine Script getting new bar)"""
@@ -47,6 +72,30 @@ class BarData:
             self._close.pop()
             self._volume.pop()
 
+    def oldest_bar(self) -> Optional[Tuple[float, ...]]:
+        """Oldest stored bar as (open, high, low, close, volume), None if empty"""
+        if not self._close:
+            return None
+        return self._open[-1], self._high[-1], self._low[-1], self._close[-1], self._volume[-1]
+
+    def remove_bar(self, trimmed: Optional[Tuple[float, ...]] = None):
+        """
+        Undo the last add_bar()
+
+        Args:
+            trimmed: The oldest_bar() from before that add_bar(), if it was
+                     trimmed (the store was at max_bars), to put it back
+        """
+        del self._open[0], self._high[0], self._low[0], self._close[0], self._volume[0]
+        self._bar_index -= 1
+        if trimmed is not None:
+            open_price, high, low, close, volume = trimmed
+            self._open.append(open_price)
+            self._high.append(high)
+            self._low.append(low)
+            self._close.append(close)
+            self._volume.append(volume)
+
     @property
     def close(self) -> float:
         """Current close price"""
@@ -3,14 +3,262 @@ Market Data Cache Manager using SQLite
 Stores historical data locally to avoid repeated API calls
 """
 import sqlite3
+import threading
+import time
+from itertools import repeat
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List
+from typing import Callable, Optional, Dict, List, Iterable, Tuple
 import os
 import logging
 
+from .fetch_planner import MAX_DAYS_PER_REQUEST, plan_chunks
+from .read_cache import OPEN_END, ReadCache
+from .trading_calendar import NSE_CALENDAR, TradingCalendar, from_epoch, to_epoch
+
 logger = logging.getLogger(__name__)
 
+# Connection pragmas for bulk ingest (WAL is persistent, set once in _init_database)
+SQLITE_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",     # Safe with WAL, fsync only at checkpoints
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",      # 64 MB page cache
+)
+
+
+# Column layout of the NumPy read API
+OHLCV_DTYPE = np.dtype([
+    ('timestamp', np.int64),   # Epoch seconds (UTC)
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+])
+
+# unixepoch() (SQLite 3.38+) is cheaper than CAST(strftime('%s', ...))
+_EPOCH_SQL = ("unixepoch(date)" if sqlite3.sqlite_version_info >= (3, 38, 0)
+              else "CAST(strftime('%s', date) AS INTEGER)")
+
+_SYMBOL_OHLCV_DTYPE = np.dtype([('symbol', object)] + OHLCV_DTYPE.descr)
+
+# Stay well under SQLite's host parameter limit for IN (...) lists
+_MAX_SYMBOLS_PER_QUERY = 500
+
+
+class SQLiteConnectionPool:
+    """
+    Long-lived SQLite connections, one per thread
+    
+    sqlite3 connections must not be shared between threads, so each thread
+    gets its own connection on first use and keeps it. Connections of
+    threads that have exited are closed when the next one is opened.
+    """
+    
+    def __init__(self, db_path: str, pragmas: Iterable[str] = ()):
+        self.db_path = db_path
+        self.pragmas = tuple(pragmas)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: Dict[int, tuple] = {}  # {thread_id: (thread, connection)}
+        
+    def connection(self) -> sqlite3.Connection:
+        """Get this thread's connection (opened on first use)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+            
+        # check_same_thread=False only so close_all() can close it;
+        # the connection is still used by its own thread only
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        self._local.conn = conn
+        
+        with self._lock:
+            self._close_dead()
+            self._connections[threading.get_ident()] = (threading.current_thread(), conn)
+        return conn
+        
+    def _close_dead(self):
+        """Close connections owned by threads that have exited"""
+        for ident, (thread, conn) in list(self._connections.items()):
+            if not thread.is_alive():
+                conn.close()
+                del self._connections[ident]
+                
+    def close_all(self):
+        """Close every pooled connection"""
+        with self._lock:
+            for _, conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+        
+    def __len__(self) -> int:
+        return len(self._connections)
+
+
+def format_cache_dates(dates: pd.Series) -> List[str]:
+    """
+    Format dates exactly like Series.astype(str), but vectorized
+    
+    astype(str) on tz-aware datetimes formats row by row in Python. Here the
+    wall-clock part is formatted by NumPy and the UTC offset is appended per
+    distinct offset (one for IST), e.g. '2024-01-01 09:15:00+05:30'.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        return dates.astype(str).tolist()
+        
+    values = dates.dt.tz_localize(None) if dates.dt.tz is not None else dates
+    wall = values.values.astype('datetime64[ns]')
+    if (wall.astype(np.int64) % 1_000_000_000).any() or pd.isna(dates).any():
+        # Sub-second or missing timestamps: keep pandas' formatting
+        return dates.astype(str).tolist()
+        
+    if dates.dt.tz is None:
+        # Naive all-midnight dates are formatted as plain dates by pandas
+        day_ns = 86_400 * 1_000_000_000
+        unit = 'D' if not (wall.astype(np.int64) % day_ns).any() else 's'
+        return np.char.replace(np.datetime_as_string(wall, unit=unit), 'T', ' ').tolist()
+        
+    text = np.char.replace(np.datetime_as_string(wall, unit='s'), 'T', ' ')
+        
+    utc = dates.dt.tz_convert('UTC').dt.tz_localize(None).values
+    offsets = (wall - utc.astype('datetime64[ns]')).astype('timedelta64[m]').astype(np.int64)
+    suffixes = np.empty(len(offsets), dtype=object)
+    for minutes in np.unique(offsets):
+        sign = '+' if minutes >= 0 else '-'
+        hours, mins = divmod(abs(int(minutes)), 60)
+        suffixes[offsets == minutes] = f"{sign}{hours:02d}:{mins:02d}"
+    return (text.astype(object) + suffixes).tolist()
+
+
+# get_historical_data / merge_and_get_data result formats
+RETURN_FORMATS = ("records", "dataframe", "numpy")
+
+
+def empty_arrays() -> Dict[str, np.ndarray]:
+    """Zero-length arrays in the get_arrays layout"""
+    return {field: np.empty(0, dtype=OHLCV_DTYPE[field]) for field in OHLCV_DTYPE.names}
+
+
+def frame_to_arrays(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    OHLCV DataFrame to the get_arrays layout
+    
+    Naive dates are taken as IST; missing volume becomes 0.
+    """
+    if df.empty:
+        return empty_arrays()
+    dates = pd.to_datetime(df['date'])
+    if dates.dt.tz is None:
+        dates = dates.dt.tz_localize('Asia/Kolkata')
+    arrays = {'timestamp': (dates.dt.tz_convert('UTC').dt.tz_localize(None)
+                            .to_numpy(dtype='datetime64[s]').astype(np.int64))}
+    for field in ('open', 'high', 'low', 'close'):
+        arrays[field] = df[field].to_numpy(dtype=np.float64)
+    volume = df['volume'].fillna(0) if 'volume' in df else pd.Series(0.0, index=df.index)
+    arrays['volume'] = volume.to_numpy(dtype=np.float64)
+    return arrays
+
+
+def format_frame(df: pd.DataFrame, return_format: str):
+    """Convert an OHLCV DataFrame to one of RETURN_FORMATS"""
+    if return_format == "dataframe":
+        return df
+    if return_format == "records":
+        return df.to_dict('records')
+    if return_format == "numpy":
+        return frame_to_arrays(df)
+    raise ValueError(f"Unknown return_format: {return_format}")
+
+
+def stored_runs(calendar: TradingCalendar, stored: np.ndarray,
+                interval: str) -> List[Tuple[int, int]]:
+    """
+    Runs of consecutive calendar bars present in a series
+    
+    Args:
+        calendar: Exchange calendar
+        stored: Sorted epoch seconds of the stored bars
+        interval: Time interval
+        
+    Returns:
+        (first_bar, last_bar) epoch pairs, oldest first
+    """
+    if not len(stored):
+        return []
+    expected = calendar.bar_times(int(stored[0]), int(stored[-1]), interval)
+    positions = np.flatnonzero(np.isin(expected, stored))
+    if not len(positions):
+        return []
+    breaks = np.flatnonzero(np.diff(positions) > 1)
+    firsts = positions[np.r_[0, breaks + 1]]
+    lasts = positions[np.r_[breaks, len(positions) - 1]]
+    return [(int(expected[first]), int(expected[last])) for first, last in zip(firsts, lasts)]
+
+
+def merge_ranges(calendar: TradingCalendar, ranges: Iterable[Tuple[int, int]],
+                 interval: str) -> List[List[int]]:
+    """Merge (start, end) ranges that overlap or are separated only by closed sessions"""
+    ranges = sorted(ranges)
+    if not ranges:
+        return []
+    merged = [list(ranges[0])]
+    for range_start, range_end in ranges[1:]:
+        last = merged[-1]
+        if (range_start <= last[1] + 1 or
+                not len(calendar.bar_times(last[1] + 1, range_start - 1, interval))):
+            last[1] = max(last[1], range_end)
+        else:
+            merged.append([range_start, range_end])
+    return merged
+
+
+def uncovered_runs(calendar: TradingCalendar, expected: np.ndarray,
+                   coverage: List[Tuple[int, int]], interval: str) -> Tuple[List[List[int]], int]:
+    """
+    Expected bars outside the coverage, as fetchable ranges
+    
+    Neighbouring gaps that fit in one API request are merged into one range.
+    
+    Returns:
+        ([start, end] epoch pairs, number of uncovered bars)
+    """
+    if coverage:
+        starts = np.array([start for start, _ in coverage], dtype=np.int64)
+        ends = np.array([end for _, end in coverage], dtype=np.int64)
+        slot = np.searchsorted(starts, expected, side='right') - 1
+        is_covered = (slot >= 0) & (expected <= ends[np.maximum(slot, 0)])
+    else:
+        is_covered = np.zeros(len(expected), dtype=bool)
+    
+    # Runs of consecutive uncovered bars
+    positions = np.flatnonzero(~is_covered)
+    runs = []
+    if len(positions):
+        breaks = np.flatnonzero(np.diff(positions) > 1)
+        span = calendar.bar_span(interval)
+        for lo, hi in zip(np.r_[0, breaks + 1], np.r_[breaks, len(positions) - 1]):
+            runs.append([int(expected[positions[lo]]), int(expected[positions[hi]]) + span])
+    
+    # One request can cover several runs: merge while they fit in a chunk
+    max_seconds = MAX_DAYS_PER_REQUEST.get(interval, 1) * 86400 - 1
+    merged = []
+    for run in runs:
+        if merged and run[1] - merged[-1][0] <= max_seconds:
+            merged[-1][1] = run[1]
+        else:
+            merged.append(run)
+    return merged, len(positions)
+
+
+def _date_param(value) -> str:
+    """Date query parameter in the same text form the sqlite3 adapter used"""
+    return str(value)
+
 
 class MarketDataCache:
     """
@@ -19,26 +267,57 @@ class MarketDataCache:
     Features:
     - Automatic data merging when fetching overlapping periods
     - Incremental updates (only fetch missing data)
+    - Coverage index + trading calendar: gaps found at bar granularity
+    - Byte-bounded LRU read cache serving sub-ranges without SQL
     - Support for multiple timeframes
     - No external database needed (SQLite is file-based)
     """
     
-    def __init__(self, cache_dir: str = "data_cache"):
+    def __init__(self, cache_dir: str = "data_cache",
+                 calendar: Optional[TradingCalendar] = None,
+                 clock: Callable[[], float] = time.time,
+                 read_cache_bytes: int = 64 * 1024 * 1024):
         """
         Initialize cache manager
         
         Args:
             cache_dir: Directory to store the SQLite database
+            calendar: Exchange calendar for gap detection (NSE by default)
+            clock: Epoch-seconds time source (injectable for tests)
+            read_cache_bytes: Memory budget of the in-process read cache (0 = off)
         """
         self.cache_dir = cache_dir
         os.makedirs(cache_dir, exist_ok=True)
         
         self.db_path = os.path.join(cache_dir, "market_data.db")
+        self.calendar = calendar or NSE_CALENDAR
+        self._clock = clock
+        self._pool = SQLiteConnectionPool(self.db_path, SQLITE_PRAGMAS)
         self._init_database()
+        self.read_cache = ReadCache(read_cache_bytes) if read_cache_bytes > 0 else None
+        
+        # Gap detection counters (see get_gap_stats)
+        self.gap_stats = {
+            'lookups': 0,
+            'ranges': 0,
+            'missing_bars': 0,
+            'api_calls': 0,
+            'legacy_api_calls': 0,
+        }
+        
+    def _connect(self) -> sqlite3.Connection:
+        """This thread's pooled connection (pragmas already applied)"""
+        return self._pool.connection()
+        
+    def close(self):
+        """Close all pooled connections"""
+        self._pool.close_all()
         
     def _init_database(self):
         """Create database tables if they don't exist"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
+            # WAL lets readers run while a bulk write is in progress
+            conn.execute("PRAGMA journal_mode=WAL")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS market_data (
                     symbol TEXT NOT NULL,
@@ -54,11 +333,9 @@ class MarketDataCache:
                 )
             """)
             
-            # Create indexes for faster queries
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_symbol_date 
-                ON market_data(symbol, date, interval)
-            """)
+            # The primary key already indexes (symbol, date, interval); the old
+            # duplicate index only doubled the cost of every insert
+            conn.execute("DROP INDEX IF EXISTS idx_symbol_date")
             
             # Metadata table to track data ranges
             conn.execute("""
@@ -73,6 +350,18 @@ class MarketDataCache:
                 )
             """)
             
+            # Coverage index: closed [start_ts, end_ts] epoch ranges already
+            # fetched, merged and non-overlapping per (symbol, interval)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_coverage (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    start_ts INTEGER NOT NULL,
+                    end_ts INTEGER NOT NULL,
+                    PRIMARY KEY (symbol, interval, start_ts)
+                )
+            """)
+            
             conn.commit()
     
     def get_cached_data(self, symbol: str, from_date: datetime, 
@@ -89,111 +378,362 @@ class MarketDataCache:
         Returns:
             DataFrame with cached data or None if no data found
         """
-        query = """
-            SELECT date, open, high, low, close, volume
+        if self.read_cache is None:
+            df = self._query_frame(symbol, interval, from_date, to_date)
+        else:
+            df = self._get_cached_frame(symbol, interval, _date_param(from_date), _date_param(to_date))
+        
+        if df.empty:
+            return None
+            
+        logger.info(f"Loaded {len(df)} cached records for {symbol} ({interval})")
+        return df
+    
+    def _query_frame(self, symbol: str, interval: str, from_date, to_date,
+                     with_text: bool = False) -> pd.DataFrame:
+        """Range query as a DataFrame (with_text adds the raw 'date_text' column)"""
+        query = f"""
+            SELECT date, open, high, low, close, volume{", date AS date_text" if with_text else ""}
             FROM market_data
             WHERE symbol = ? AND interval = ?
                 AND date >= ? AND date <= ?
             ORDER BY date
         """
         
-        with sqlite3.connect(self.db_path) as conn:
-            df = pd.read_sql_query(
+        with self._connect() as conn:
+            return pd.read_sql_query(
                 query, 
                 conn,
                 params=(symbol, interval, from_date, to_date),
                 parse_dates=['date']
             )
+    
+    def _get_cached_frame(self, symbol: str, interval: str, from_text: str,
+                          to_text: str) -> pd.DataFrame:
+        """Serve a range from the read cache, filling it from SQLite on a miss"""
+        generation = self.read_cache.generation
+        cached = self.read_cache.get(symbol, interval, from_text, to_text)
+        if cached is not None:
+            return cached
         
-        if df.empty:
-            return None
-            
-        logger.info(f"Loaded {len(df)} cached records for {symbol} ({interval})")
+        # A request reaching the newest bar is stored open-ended, so the next
+        # "last N days up to now" request is a sub-range hit
+        fill_to = to_text
+        row = self._connect().execute("""
+            SELECT last_date FROM cache_metadata WHERE symbol = ? AND interval = ?
+        """, (symbol, interval)).fetchone()
+        if row is not None and row[0] is not None and to_text >= row[0]:
+            fill_to = OPEN_END
+        
+        df = self._query_frame(symbol, interval, from_text, fill_to, with_text=True)
+        dates = df.pop('date_text').to_numpy(dtype=str)
+        self.read_cache.put(symbol, interval, from_text, fill_to, df, dates, generation)
         return df
     
-    def save_data(self, symbol: str, data: pd.DataFrame, interval: str = "day"):
+    def get_arrays(self, symbol: str, from_date: datetime, to_date: datetime,
+                   interval: str = "day") -> Optional[Dict[str, np.ndarray]]:
+        """
+        Get cached OHLCV as contiguous NumPy arrays (no pandas)
+        
+        Args:
+            symbol: Stock symbol
+            from_date: Start date
+            to_date: End date
+            interval: Time interval
+            
+        Returns:
+            Dict with 'timestamp' (int64 epoch seconds, UTC) and float64
+            'open', 'high', 'low', 'close', 'volume' arrays, oldest first.
+            None if no data found.
+        """
+        return self.get_arrays_multi([symbol], from_date, to_date, interval).get(symbol)
+    
+    def get_arrays_multi(self, symbols: List[str], from_date: datetime, to_date: datetime,
+                         interval: str = "day") -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Get cached OHLCV arrays for many symbols in a single query
+        
+        Args:
+            symbols: Stock symbols
+            from_date: Start date
+            to_date: End date
+            interval: Time interval
+            
+        Returns:
+            {symbol: arrays} as in get_arrays(); symbols without data are omitted
+        """
+        result: Dict[str, Dict[str, np.ndarray]] = {}
+        symbols = list(dict.fromkeys(symbols))
+        
+        for start in range(0, len(symbols), _MAX_SYMBOLS_PER_QUERY):
+            batch = symbols[start:start + _MAX_SYMBOLS_PER_QUERY]
+            placeholders = ",".join("?" * len(batch))
+            # Missing volume is stored as NULL; report it as 0
+            query = f"""
+                SELECT symbol, {_EPOCH_SQL},
+                       open, high, low, close, COALESCE(volume, 0)
+                FROM market_data
+                WHERE interval = ? AND symbol IN ({placeholders})
+                    AND date >= ? AND date <= ?
+                ORDER BY symbol, date
+            """
+            params = (interval, *batch, _date_param(from_date), _date_param(to_date))
+            rows = self._connect().execute(query, params).fetchall()
+            if not rows:
+                continue
+                
+            # Rows are grouped by symbol: split at the boundaries
+            table = np.array(rows, dtype=_SYMBOL_OHLCV_DTYPE)
+            names = table['symbol']
+            splits = np.flatnonzero(names[1:] != names[:-1]) + 1
+            for lo, hi in zip(np.r_[0, splits], np.r_[splits, len(table)]):
+                block = table[lo:hi]
+                result[names[lo]] = {
+                    field: np.ascontiguousarray(block[field]) for field in OHLCV_DTYPE.names
+                }
+        
+        return result
+    
+    def save_data(self, symbol: str, data: pd.DataFrame, interval: str = "day",
+                  covered: Optional[Tuple[datetime, datetime]] = None):
         """
         Save data to cache, handling duplicates and merging
         
+        Bulk path: one executemany over column lists in a single transaction,
+        metadata updated from the batch's date range only.
+        
         Args:
             symbol: Stock symbol
             data: DataFrame with columns [date, open, high, low, close, volume]
             interval: Time interval
+            covered: (from_date, to_date) of the request that returned the data,
+                     so sessions without bars at either end count as fetched
+                     (all of them when data is empty)
         """
         if data.empty:
+            if covered is not None:
+                # The API had nothing for the range (unlisted holiday, suspension,
+                # before listing): remember that instead of asking again
+                requested = self.calendar.expected_bars(covered[0], covered[1], interval)
+                if len(requested):
+                    with self._connect() as conn:
+                        self._load_coverage(conn, symbol, interval)
+                        self._mark_covered(conn, symbol, interval,
+                                           int(requested[0]), int(requested[-1]))
             return
             
-        with sqlite3.connect(self.db_path) as conn:
-            # Prepare data for insertion
-            data_to_insert = data.copy()
-            data_to_insert['symbol'] = symbol
-            data_to_insert['interval'] = interval
-            
-            # Insert data, replacing duplicates
-            # Convert date to string format for SQLite
-            data_to_insert['date'] = data_to_insert['date'].astype(str)
+        # Convert date to string format for SQLite (same format as astype(str))
+        dates = format_cache_dates(data['date'])
+        volume = data['volume'].tolist() if 'volume' in data else [None] * len(data)
+        rows = zip(
+            repeat(symbol), dates, repeat(interval),
+            data['open'].tolist(), data['high'].tolist(),
+            data['low'].tolist(), data['close'].tolist(), volume
+        )
+        batch_first = min(dates)
+        batch_last = max(dates)
+        
+        with self._connect() as conn:  # Single transaction
+            # Seed coverage of pre-index caches before the metadata changes
+            self._load_coverage(conn, symbol, interval)
+            before = self._count_range(conn, symbol, interval, batch_first, batch_last)
             
             # Insert with REPLACE to handle duplicates
-            for _, row in data_to_insert.iterrows():
-                conn.execute("""
-                    INSERT OR REPLACE INTO market_data 
-                    (symbol, date, interval, open, high, low, close, volume)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (row['symbol'], row['date'], row['interval'], 
-                      row['open'], row['high'], row['low'], row['close'], row['volume']))
+            conn.executemany("""
+                INSERT OR REPLACE INTO market_data 
+                (symbol, date, interval, open, high, low, close, volume)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            
+            after = self._count_range(conn, symbol, interval, batch_first, batch_last)
             
             # Update metadata
-            self._update_metadata(conn, symbol, interval)
+            self._update_metadata_incremental(conn, symbol, interval,
+                                              batch_first, batch_last, after - before)
             
+            start, end = to_epoch(batch_first), to_epoch(batch_last)
+            if covered is not None:
+                requested = self.calendar.expected_bars(covered[0], covered[1], interval)
+                if len(requested):
+                    start = min(start, int(requested[0]))
+                    end = max(end, int(requested[-1]))
+            self._mark_covered(conn, symbol, interval, start, end)
+        
+        if self.read_cache is not None:
+            self.read_cache.invalidate(symbol, interval)
+        
         logger.info(f"Saved {len(data)} records for {symbol} ({interval}) to cache")
     
+    @staticmethod
+    def _count_range(conn: sqlite3.Connection, symbol: str, interval: str,
+                     first_date: str, last_date: str) -> int:
+        """Count cached rows in a date range (primary key range scan)"""
+        cursor = conn.execute("""
+            SELECT COUNT(*) FROM market_data
+            WHERE symbol = ? AND interval = ? AND date >= ? AND date <= ?
+        """, (symbol, interval, first_date, last_date))
+        return cursor.fetchone()[0]
+    
     def get_missing_date_ranges(self, symbol: str, from_date: datetime,
                                to_date: datetime, interval: str = "day") -> List[tuple]:
         """
         Identify missing date ranges in cached data
         
+        Compares the bars the calendar expects in the range with the coverage
+        index, so holes in the middle are found and weekends/holidays are
+        never requested. Neighbouring gaps that fit in one API request are
+        merged into one range.
+        
         Returns:
-            List of (start_date, end_date) tuples for missing data
+            List of (start_date, end_date) tuples for missing data, with the
+            same timezone awareness as from_date
         """
-        # Get metadata
-        metadata = self._get_metadata(symbol, interval)
+        expected = self.calendar.expected_bars(from_date, to_date, interval)
+        with self._connect() as conn:
+            coverage = self._load_coverage(conn, symbol, interval)
+        merged, missing_bars = uncovered_runs(self.calendar, expected, coverage, interval)
+        
+        aware = getattr(from_date, 'tzinfo', None) is not None
+        missing_ranges = [(from_epoch(start, aware), from_epoch(end, aware))
+                          for start, end in merged]
         
-        if not metadata:
-            # No cached data, need everything
-            return [(from_date, to_date)]
+        self.gap_stats['lookups'] += 1
+        self.gap_stats['ranges'] += len(missing_ranges)
+        self.gap_stats['missing_bars'] += missing_bars
+        self.gap_stats['api_calls'] += sum(
+            len(plan_chunks(start, end, interval)) for start, end in missing_ranges)
+        self.gap_stats['legacy_api_calls'] += self._legacy_call_count(
+            coverage, from_date, to_date, interval)
         
-        cached_first_date = metadata['first_date']
-        cached_last_date = metadata['last_date']
+        return missing_ranges
+    
+    @staticmethod
+    def _legacy_call_count(coverage: List[Tuple[int, int]], from_date: datetime,
+                           to_date: datetime, interval: str) -> int:
+        """API calls the old first/last_date +/- 1 day comparison would have made"""
+        from_date = from_epoch(to_epoch(from_date))
+        to_date = from_epoch(to_epoch(to_date))
+        if not coverage:
+            ranges = [(from_date, to_date)]
+        else:
+            first = from_epoch(coverage[0][0])
+            last = from_epoch(coverage[-1][1])
+            ranges = []
+            if from_date < first:
+                ranges.append((from_date, first - timedelta(days=1)))
+            if to_date > last:
+                ranges.append((last + timedelta(days=1), to_date))
+        return sum(len(plan_chunks(start, end, interval)) for start, end in ranges)
+    
+    def get_read_cache_stats(self) -> Dict[str, int]:
+        """Read cache hit/miss counters and size (empty if disabled)"""
+        return self.read_cache.stats() if self.read_cache is not None else {}
+    
+    def get_sync_points(self, interval: str = "day",
+                        symbols: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        Where each cached symbol's tail sync should resume, in one query
+        
+        Resumes right after the last covered bar; bars cached while their
+        candle was still open are not covered and get fetched again.
+        
+        Args:
+            interval: Time interval
+            symbols: Only these symbols (None = every cached symbol)
+            
+        Returns:
+            {symbol: epoch seconds}
+        """
+        rows = self._connect().execute("""
+            SELECT m.symbol, m.last_date, MAX(c.end_ts)
+            FROM cache_metadata m
+            LEFT JOIN cache_coverage c
+                ON c.symbol = m.symbol AND c.interval = m.interval
+            WHERE m.interval = ? AND m.last_date IS NOT NULL
+            GROUP BY m.symbol
+        """, (interval,)).fetchall()
         
-        missing_ranges = []
+        wanted = set(symbols) if symbols is not None else None
+        points = {}
+        for symbol, last_date, covered_end in rows:
+            if wanted is not None and symbol not in wanted:
+                continue
+            points[symbol] = covered_end + 1 if covered_end is not None else to_epoch(last_date)
+        return points
+    
+    def get_gap_stats(self) -> Dict[str, int]:
+        """Gap detection counters, with API calls saved versus the old method"""
+        stats = dict(self.gap_stats)
+        stats['saved_calls'] = stats['legacy_api_calls'] - stats['api_calls']
+        return stats
+    
+    def _load_coverage(self, conn: sqlite3.Connection, symbol: str,
+                       interval: str) -> List[Tuple[int, int]]:
+        """
+        Covered (start_ts, end_ts) ranges, oldest first
         
-        # Ensure both dates have the same timezone awareness for comparison
-        # If cached dates have timezone info, ensure from_date/to_date also have it
-        if cached_first_date.tzinfo is not None and from_date.tzinfo is None:
-            # Make from_date/to_date timezone-aware (assume same timezone as cached data)
-            from_date = from_date.replace(tzinfo=cached_first_date.tzinfo)
-            to_date = to_date.replace(tzinfo=cached_first_date.tzinfo)
-        elif cached_first_date.tzinfo is None and from_date.tzinfo is not None:
-            # Make from_date/to_date timezone-naive
-            from_date = from_date.replace(tzinfo=None)
-            to_date = to_date.replace(tzinfo=None)
+        Caches written before the coverage index existed are seeded once
+        from the bars they actually hold: each run of consecutive calendar
+        bars that is stored counts as covered, so holes in the middle are
+        found and fetched.
+        """
+        rows = self._coverage_rows(conn, symbol, interval)
+        if rows:
+            return rows
         
-        # Check if we need data before cached range
-        if from_date < cached_first_date:
-            missing_ranges.append((from_date, cached_first_date - timedelta(days=1)))
+        stored = np.array([timestamp for (timestamp,) in conn.execute(f"""
+            SELECT {_EPOCH_SQL} FROM market_data
+            WHERE symbol = ? AND interval = ?
+            ORDER BY date
+        """, (symbol, interval))], dtype=np.int64)
+        # Runs of stored calendar bars; the still-open candle stays uncovered
+        limit = int(self._clock()) - self.calendar.bar_span(interval) - 1
+        seeded = [(start, min(end, limit))
+                  for start, end in stored_runs(self.calendar, stored, interval)]
+        seeded = [(start, end) for start, end in seeded if end >= start]
+        conn.executemany("""
+            INSERT OR REPLACE INTO cache_coverage (symbol, interval, start_ts, end_ts)
+            VALUES (?, ?, ?, ?)
+        """, [(symbol, interval, start, end) for start, end in seeded])
+        return seeded
+    
+    @staticmethod
+    def _coverage_rows(conn: sqlite3.Connection, symbol: str,
+                       interval: str) -> List[Tuple[int, int]]:
+        """Stored coverage ranges only (no seeding)"""
+        return conn.execute("""
+            SELECT start_ts, end_ts FROM cache_coverage
+            WHERE symbol = ? AND interval = ?
+            ORDER BY start_ts
+        """, (symbol, interval)).fetchall()
+    
+    def _mark_covered(self, conn: sqlite3.Connection, symbol: str, interval: str,
+                      start: int, end: int):
+        """
+        Record [start, end] (epoch seconds) as fetched
         
-        # Check if we need data after cached range
-        if to_date > cached_last_date:
-            missing_ranges.append((cached_last_date + timedelta(days=1), to_date))
+        Bars that may still change (their candle has not closed yet) are
+        left uncovered so the next lookup fetches them again. Ranges that
+        overlap, or are separated only by closed sessions, are merged.
+        """
+        end = min(end, int(self._clock()) - self.calendar.bar_span(interval) - 1)
+        if end < start:
+            return
         
-        # For now, we assume no gaps in the middle
-        # Could be enhanced to detect and fill gaps
+        merged = merge_ranges(self.calendar,
+                              self._coverage_rows(conn, symbol, interval) + [(start, end)],
+                              interval)
         
-        return missing_ranges
+        conn.execute("DELETE FROM cache_coverage WHERE symbol = ? AND interval = ?",
+                     (symbol, interval))
+        conn.executemany("""
+            INSERT INTO cache_coverage (symbol, interval, start_ts, end_ts)
+            VALUES (?, ?, ?, ?)
+        """, [(symbol, interval, range_start, range_end) for range_start, range_end in merged])
     
     def merge_and_get_data(self, symbol: str, from_date: datetime,
                           to_date: datetime, interval: str,
-                          fetch_function) -> pd.DataFrame:
+                          fetch_function, return_format: str = "dataframe"):
         """
         Smart data fetching with caching
         
@@ -205,29 +745,59 @@ class MarketDataCache:
         Args:
             fetch_function: Function to fetch data from API
                            Should accept (symbol, from_date, to_date, interval)
+                           and return a DataFrame, or None if the fetch failed
+                           (an empty DataFrame marks the range as having no bars)
+            return_format: "dataframe", "records" (list of dicts) or "numpy"
+                           (get_arrays layout, read straight from SQLite)
         """
-        # Check cache first
-        cached_data = self.get_cached_data(symbol, from_date, to_date, interval)
+        if return_format not in RETURN_FORMATS:
+            raise ValueError(f"Unknown return_format: {return_format}")
+        
+        if return_format == "numpy":
+            # Fill the cache, then read arrays directly (no DataFrame)
+            self._fetch_missing(symbol, from_date, to_date, interval, fetch_function)
+            arrays = self.get_arrays(symbol, from_date, to_date, interval)
+            return arrays if arrays is not None else empty_arrays()
         
+        df = self._merge_frames(symbol, from_date, to_date, interval, fetch_function)
+        return df.to_dict('records') if return_format == "records" else df
+    
+    def _fetch_missing(self, symbol: str, from_date: datetime, to_date: datetime,
+                       interval: str, fetch_function) -> List[pd.DataFrame]:
+        """Fetch and save the missing ranges, returning the new frames"""
         # Identify missing ranges
         missing_ranges = self.get_missing_date_ranges(symbol, from_date, to_date, interval)
         
         if not missing_ranges:
             # All data is cached
             logger.info(f"All data for {symbol} is already cached - no API calls needed")
-            return cached_data if cached_data is not None else pd.DataFrame()
+            return []
         
         # Fetch missing data
         all_new_data = []
         for start_date, end_date in missing_ranges:
             logger.info(f"Fetching missing data for {symbol} from {start_date.date()} to {end_date.date()}")
             new_data = fetch_function(symbol, start_date, end_date, interval)
-            if not new_data.empty:
+            if new_data is None:
+                # Failed: leave the range missing so the next lookup retries it
+                logger.error(f"Fetching {symbol} {start_date.date()} to {end_date.date()} failed")
+            elif not new_data.empty:
                 logger.info(f"Received {len(new_data)} records from API")
                 all_new_data.append(new_data)
-                self.save_data(symbol, new_data, interval)
+                self.save_data(symbol, new_data, interval, covered=(start_date, end_date))
             else:
                 logger.warning(f"No data received from API for {symbol} {start_date.date()} to {end_date.date()}")
+                # Still a successful call: the empty range is covered
+                self.save_data(symbol, new_data, interval, covered=(start_date, end_date))
+        return all_new_data
+    
+    def _merge_frames(self, symbol: str, from_date: datetime, to_date: datetime,
+                      interval: str, fetch_function) -> pd.DataFrame:
+        """Cached rows merged with newly fetched ones"""
+        # Check cache first
+        cached_data = self.get_cached_data(symbol, from_date, to_date, interval)
+        
+        all_new_data = self._fetch_missing(symbol, from_date, to_date, interval, fetch_function)
         
         # Combine all data
         if all_new_data:
@@ -259,7 +829,7 @@ class MarketDataCache:
             WHERE symbol = ? AND interval = ?
         """
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.execute(query, (symbol, interval))
             row = cursor.fetchone()
             
@@ -292,6 +862,38 @@ class MarketDataCache:
         
         conn.commit()
     
+    def _update_metadata_incremental(self, conn: sqlite3.Connection, symbol: str, interval: str,
+                                     batch_first: str, batch_last: str, added: int):
+        """
+        Update cache metadata from an inserted batch
+        
+        Args:
+            batch_first: Earliest date string in the batch
+            batch_last: Latest date string in the batch
+            added: Net number of new rows (replaced rows excluded)
+        """
+        cursor = conn.execute("""
+            SELECT first_date, last_date, total_records
+            FROM cache_metadata
+            WHERE symbol = ? AND interval = ?
+        """, (symbol, interval))
+        row = cursor.fetchone()
+        
+        if row is None or row[0] is None:
+            # No metadata yet - full recompute (also covers caches from older versions)
+            self._update_metadata(conn, symbol, interval)
+            return
+            
+        first_date = min(row[0], batch_first)
+        last_date = max(row[1], batch_last)
+        total = (row[2] or 0) + added
+        
+        conn.execute("""
+            INSERT OR REPLACE INTO cache_metadata 
+            (symbol, interval, first_date, last_date, total_records, last_updated)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (symbol, interval, first_date, last_date, total))
+    
     def get_cache_info(self) -> pd.DataFrame:
         """Get information about cached data"""
         query = """
@@ -301,7 +903,7 @@ class MarketDataCache:
             ORDER BY symbol, interval
         """
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             return pd.read_sql_query(query, conn, parse_dates=['first_date', 'last_date', 'last_updated'])
     
     def clear_cache(self, symbol: Optional[str] = None, interval: Optional[str] = None):
@@ -312,19 +914,26 @@ class MarketDataCache:
             symbol: Clear only this symbol (None = all symbols)
             interval: Clear only this interval (None = all intervals)
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             if symbol and interval:
                 conn.execute("DELETE FROM market_data WHERE symbol = ? AND interval = ?", 
                            (symbol, interval))
                 conn.execute("DELETE FROM cache_metadata WHERE symbol = ? AND interval = ?",
                            (symbol, interval))
+                conn.execute("DELETE FROM cache_coverage WHERE symbol = ? AND interval = ?",
+                           (symbol, interval))
             elif symbol:
                 conn.execute("DELETE FROM market_data WHERE symbol = ?", (symbol,))
                 conn.execute("DELETE FROM cache_metadata WHERE symbol = ?", (symbol,))
+                conn.execute("DELETE FROM cache_coverage WHERE symbol = ?", (symbol,))
             else:
                 conn.execute("DELETE FROM market_data")
                 conn.execute("DELETE FROM cache_metadata")
+                conn.execute("DELETE FROM cache_coverage")
             
             conn.commit()
             
+        if self.read_cache is not None:
+            self.read_cache.invalidate(symbol, interval if symbol else None)
+            
         logger.info(f"Cleared cache for symbol={symbol}, interval={interval}")
\ No newline at end of file
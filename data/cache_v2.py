@@ -0,0 +1,416 @@
+"""
+Compact Market Data Schema (v2)
+SQLite bar table without rowid, keyed by small integers instead of strings
+
+v1 (market_data) stores every bar as
+
+    (symbol TEXT, date TEXT, interval TEXT, open..close REAL, volume, created_at)
+
+in a rowid table: the symbol, interval and a 25-byte date string are
+repeated on every row, and the primary key is a second B-tree next to the
+table. v2 stores
+
+    bars(instrument_id, interval_id, ts, open, high, low, close, volume)
+    PRIMARY KEY (instrument_id, interval_id, ts) WITHOUT ROWID
+
+so each row is a handful of varints in a single clustered B-tree, and a
+range read is one contiguous key scan. Symbols and intervals live in
+dictionary tables; prices can optionally be stored as scaled integers
+(e.g. price_scale=100 stores paise, exact for NSE's 0.05 tick).
+
+Same read API as MarketDataCache (get_arrays / get_arrays_multi /
+get_cached_data). migrate_to_v2 copies a v1 cache while it stays in use.
+"""
+import os
+import sqlite3
+import threading
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .cache_manager import (
+    MarketDataCache, OHLCV_DTYPE, SQLITE_PRAGMAS, SQLiteConnectionPool, _EPOCH_SQL,
+    _MAX_SYMBOLS_PER_QUERY,
+)
+from .trading_calendar import EXCHANGE_TZ, DateLike, to_epoch
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 2
+
+# Epoch bounds used when a range end is None
+_MIN_TS = -(2 ** 62)
+_MAX_TS = 2 ** 62
+
+_ID_OHLCV_DTYPE = np.dtype([('instrument_id', np.int64)] + OHLCV_DTYPE.descr)
+
+
+class CompactBarStore:
+    """
+    SQLite bar store using the v2 schema
+
+    Key features:
+    - WITHOUT ROWID table clustered on (instrument_id, interval_id, ts)
+    - Symbol and interval dictionary tables (ids cached in memory)
+    - Epoch-second INTEGER timestamps (no date parsing on read)
+    - Optional integer-scaled prices, fixed per database
+    """
+
+    def __init__(self, cache_dir: str = "data_cache", price_scale: Optional[int] = None,
+                 filename: str = "market_data_v2.db"):
+        """
+        Args:
+            cache_dir: Directory for the database
+            price_scale: Store prices as round(price * price_scale) integers
+                         (None = REAL). Must match an existing database.
+            filename: Database file name
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, filename)
+        self._pool = SQLiteConnectionPool(self.db_path, SQLITE_PRAGMAS)
+        self._lock = threading.Lock()
+        self._symbol_ids: Dict[str, int] = {}
+        self._interval_ids: Dict[str, int] = {}
+        self.price_scale = self._init_database(price_scale)
+
+    def _connect(self) -> sqlite3.Connection:
+        """This thread's pooled connection"""
+        return self._pool.connection()
+
+    def close(self):
+        """Close all pooled connections"""
+        self._pool.close_all()
+
+    def _init_database(self, price_scale: Optional[int]) -> Optional[int]:
+        """Create tables if they don't exist; returns the database's price scale"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_info (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS symbols (
+                    instrument_id INTEGER PRIMARY KEY,
+                    symbol TEXT NOT NULL UNIQUE
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS intervals (
+                    interval_id INTEGER PRIMARY KEY,
+                    interval TEXT NOT NULL UNIQUE
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bars (
+                    instrument_id INTEGER NOT NULL,
+                    interval_id INTEGER NOT NULL,
+                    ts INTEGER NOT NULL,
+                    open NUMERIC NOT NULL,
+                    high NUMERIC NOT NULL,
+                    low NUMERIC NOT NULL,
+                    close NUMERIC NOT NULL,
+                    volume INTEGER,
+                    PRIMARY KEY (instrument_id, interval_id, ts)
+                ) WITHOUT ROWID
+            """)
+            # Per-series resume points of migrate_to_v2
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS migration_progress (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    last_date TEXT NOT NULL,
+                    rows INTEGER NOT NULL,
+                    PRIMARY KEY (symbol, interval)
+                )
+            """)
+
+            stored = dict(conn.execute("SELECT key, value FROM schema_info").fetchall())
+            if not stored:
+                conn.executemany("INSERT INTO schema_info (key, value) VALUES (?, ?)", [
+                    ('version', str(SCHEMA_VERSION)),
+                    ('price_scale', str(price_scale or 0)),
+                ])
+                return price_scale or None
+
+        if int(stored['version']) != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported schema version: {stored['version']}")
+        stored_scale = int(stored['price_scale']) or None
+        if price_scale is not None and price_scale != stored_scale:
+            raise ValueError(f"Database uses price_scale={stored_scale}, not {price_scale}")
+        return stored_scale
+
+    # Dictionary tables
+    def _lookup_id(self, conn: sqlite3.Connection, table: str, column: str,
+                   name: str, cache: Dict[str, int], create: bool) -> Optional[int]:
+        """Id of a symbol/interval name, inserting it if create is set"""
+        value = cache.get(name)
+        if value is not None:
+            return value
+        id_column = 'instrument_id' if table == 'symbols' else 'interval_id'
+        row = conn.execute(f"SELECT {id_column} FROM {table} WHERE {column} = ?", (name,)).fetchone()
+        if row is None:
+            if not create:
+                return None
+            # Not cached until committed: the caller's transaction may roll back
+            return conn.execute(f"INSERT INTO {table} ({column}) VALUES (?)", (name,)).lastrowid
+        with self._lock:
+            cache[name] = row[0]
+        return row[0]
+
+    def instrument_id(self, symbol: str, create: bool = False) -> Optional[int]:
+        """Dictionary id of a symbol (None if unknown and not created)"""
+        with self._connect() as conn:
+            return self._lookup_id(conn, 'symbols', 'symbol', symbol, self._symbol_ids, create)
+
+    def interval_id(self, interval: str, create: bool = False) -> Optional[int]:
+        """Dictionary id of an interval (None if unknown and not created)"""
+        with self._connect() as conn:
+            return self._lookup_id(conn, 'intervals', 'interval', interval,
+                                   self._interval_ids, create)
+
+    # Writes
+    def _price_column(self, values) -> list:
+        """Prices as stored: floats, or scaled integers"""
+        values = np.asarray(values, dtype=np.float64)
+        if self.price_scale is None:
+            return values.tolist()
+        return np.rint(values * self.price_scale).astype(np.int64).tolist()
+
+    def _insert(self, conn: sqlite3.Connection, symbol: str, interval: str,
+                arrays: Dict[str, np.ndarray]) -> int:
+        """INSERT OR REPLACE bars inside the caller's transaction"""
+        instrument_id = self._lookup_id(conn, 'symbols', 'symbol', symbol, self._symbol_ids, True)
+        interval_id = self._lookup_id(conn, 'intervals', 'interval', interval,
+                                      self._interval_ids, True)
+        timestamps = np.asarray(arrays['timestamp'], dtype=np.int64)
+        volume = arrays.get('volume')
+        if volume is None:
+            volume = [None] * len(timestamps)
+        else:
+            # Missing volume (NaN) is stored as NULL, like v1
+            volume = np.asarray(volume, dtype=np.float64)
+            missing = np.isnan(volume)
+            volume = np.where(missing, 0, volume).astype(np.int64).astype(object)
+            volume[missing] = None
+            volume = volume.tolist()
+        rows = zip(
+            [instrument_id] * len(timestamps), [interval_id] * len(timestamps),
+            timestamps.tolist(),
+            self._price_column(arrays['open']), self._price_column(arrays['high']),
+            self._price_column(arrays['low']), self._price_column(arrays['close']),
+            volume,
+        )
+        conn.executemany("""
+            INSERT OR REPLACE INTO bars
+            (instrument_id, interval_id, ts, open, high, low, close, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        return len(timestamps)
+
+    def save_arrays(self, symbol: str, interval: str, arrays: Dict[str, np.ndarray]) -> int:
+        """
+        Store bars (existing timestamps are replaced)
+
+        Args:
+            symbol: Stock symbol
+            interval: Time interval
+            arrays: 'timestamp' (epoch seconds) plus OHLCV arrays
+
+        Returns:
+            Number of bars written
+        """
+        if len(arrays['timestamp']) == 0:
+            return 0
+        with self._connect() as conn:  # Single transaction
+            return self._insert(conn, symbol, interval, arrays)
+
+    def save_data(self, symbol: str, data: pd.DataFrame, interval: str = "day") -> int:
+        """Store a [date, open, high, low, close, volume] DataFrame (MarketDataCache compatible)"""
+        if data.empty:
+            return 0
+        dates = pd.to_datetime(data['date'])
+        if dates.dt.tz is None:
+            dates = dates.dt.tz_localize(EXCHANGE_TZ)
+        arrays = {name: data[name].to_numpy(dtype=np.float64)
+                  for name in ('open', 'high', 'low', 'close', 'volume') if name in data}
+        arrays['timestamp'] = (dates.dt.tz_convert('UTC').dt.tz_localize(None)
+                               .to_numpy(dtype='datetime64[s]').astype(np.int64))
+        return self.save_arrays(symbol, interval, arrays)
+
+    # Reads
+    def _to_arrays(self, table: np.ndarray) -> Dict[str, np.ndarray]:
+        arrays = {field: np.ascontiguousarray(table[field]) for field in OHLCV_DTYPE.names}
+        if self.price_scale is not None:
+            for name in ('open', 'high', 'low', 'close'):
+                arrays[name] /= self.price_scale
+        return arrays
+
+    def get_arrays(self, symbol: str, from_date: DateLike = None, to_date: DateLike = None,
+                   interval: str = "day") -> Optional[Dict[str, np.ndarray]]:
+        """
+        Bars in [from_date, to_date] as NumPy arrays (same layout as MarketDataCache)
+
+        Args:
+            symbol: Stock symbol
+            from_date: Start (datetime, naive = IST, or epoch seconds); None = first bar
+            to_date: End (inclusive); None = last bar
+            interval: Time interval
+
+        Returns:
+            Dict of 'timestamp' and float64 OHLCV arrays, or None if no bars
+        """
+        return self.get_arrays_multi([symbol], from_date, to_date, interval).get(symbol)
+
+    def get_arrays_multi(self, symbols: List[str], from_date: DateLike = None,
+                         to_date: DateLike = None,
+                         interval: str = "day") -> Dict[str, Dict[str, np.ndarray]]:
+        """Bars for many symbols in one query per batch; symbols without data are omitted"""
+        interval_id = self.interval_id(interval)
+        if interval_id is None:
+            return {}
+        names = {}
+        for symbol in dict.fromkeys(symbols):
+            instrument_id = self.instrument_id(symbol)
+            if instrument_id is not None:
+                names[instrument_id] = symbol
+        lo = _MIN_TS if from_date is None else to_epoch(from_date)
+        hi = _MAX_TS if to_date is None else to_epoch(to_date)
+
+        result: Dict[str, Dict[str, np.ndarray]] = {}
+        ids = sorted(names)
+        for start in range(0, len(ids), _MAX_SYMBOLS_PER_QUERY):
+            batch = ids[start:start + _MAX_SYMBOLS_PER_QUERY]
+            placeholders = ",".join("?" * len(batch))
+            # Every (instrument_id, interval_id) pair is one contiguous key range
+            rows = self._connect().execute(f"""
+                SELECT instrument_id, ts, open, high, low, close, COALESCE(volume, 0)
+                FROM bars
+                WHERE instrument_id IN ({placeholders}) AND interval_id = ?
+                    AND ts >= ? AND ts <= ?
+                ORDER BY instrument_id, ts
+            """, (*batch, interval_id, lo, hi)).fetchall()
+            if not rows:
+                continue
+
+            table = np.array(rows, dtype=_ID_OHLCV_DTYPE)
+            owners = table['instrument_id']
+            splits = np.flatnonzero(owners[1:] != owners[:-1]) + 1
+            for a, b in zip(np.r_[0, splits], np.r_[splits, len(table)]):
+                result[names[int(owners[a])]] = self._to_arrays(table[a:b])
+        return result
+
+    def get_cached_data(self, symbol: str, from_date: DateLike = None, to_date: DateLike = None,
+                        interval: str = "day") -> Optional[pd.DataFrame]:
+        """
+        Bars as a [date, open, high, low, close, volume] DataFrame (IST-aware dates)
+
+        Returns:
+            DataFrame, or None if no bars fall in the range
+        """
+        arrays = self.get_arrays(symbol, from_date, to_date, interval)
+        if arrays is None:
+            return None
+        df = pd.DataFrame({name: arrays[name] for name in OHLCV_DTYPE.names[1:]})
+        df.insert(0, 'date', pd.to_datetime(arrays['timestamp'], unit='s', utc=True)
+                  .tz_convert(EXCHANGE_TZ))
+        return df
+
+    def count(self, symbol: Optional[str] = None, interval: Optional[str] = None) -> int:
+        """Number of stored bars (optionally for one symbol/interval)"""
+        query, params = "SELECT COUNT(*) FROM bars", []
+        conditions = []
+        if symbol is not None:
+            conditions.append("instrument_id = ?")
+            params.append(self.instrument_id(symbol))
+        if interval is not None:
+            conditions.append("interval_id = ?")
+            params.append(self.interval_id(interval))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return self._connect().execute(query, params).fetchone()[0]
+
+
+def migrate_to_v2(cache: MarketDataCache, store: CompactBarStore,
+                  batch_rows: int = 50_000,
+                  symbols: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Online, resumable copy of a v1 cache into the v2 schema
+
+    The v1 cache stays in use throughout: each batch is a short keyset read
+    (WAL lets writers continue) followed by one v2 transaction that also
+    records the series' resume point. Re-running the migration resumes where
+    it stopped and picks up bars appended since; run it once more after the
+    last writer has switched over to catch the final tail. Bars rewritten in
+    place behind the resume point are not copied again.
+
+    Args:
+        cache: Source v1 cache
+        store: Destination v2 store
+        batch_rows: Rows per batch (bounds memory and lock time)
+        symbols: Only these symbols (None = all cached)
+
+    Returns:
+        {"interval/symbol": bars copied in this run}
+    """
+    series = cache._connect().execute(
+        "SELECT symbol, interval FROM cache_metadata ORDER BY symbol, interval").fetchall()
+    if symbols is not None:
+        wanted = set(symbols)
+        series = [(symbol, interval) for symbol, interval in series if symbol in wanted]
+
+    migrated = {}
+    for symbol, interval in series:
+        row = store._connect().execute("""
+            SELECT last_date FROM migration_progress WHERE symbol = ? AND interval = ?
+        """, (symbol, interval)).fetchone()
+        last_date = row[0] if row else ""
+        copied = 0
+
+        while True:
+            rows = cache._connect().execute(f"""
+                SELECT date, {_EPOCH_SQL}, open, high, low, close, volume
+                FROM market_data
+                WHERE symbol = ? AND interval = ? AND date > ?
+                ORDER BY date
+                LIMIT ?
+            """, (symbol, interval, last_date, batch_rows)).fetchall()
+            if not rows:
+                break
+
+            _, ts, opens, highs, lows, closes, volume = zip(*rows)
+            arrays = {
+                'timestamp': np.array(ts, dtype=np.int64),
+                'open': np.array(opens, dtype=np.float64),
+                'high': np.array(highs, dtype=np.float64),
+                'low': np.array(lows, dtype=np.float64),
+                'close': np.array(closes, dtype=np.float64),
+                'volume': np.array(volume, dtype=np.float64),  # NULL -> NaN -> NULL
+            }
+            last_date = rows[-1][0]
+            with store._connect() as conn:  # Bars and resume point commit together
+                copied += store._insert(conn, symbol, interval, arrays)
+                conn.execute("""
+                    INSERT INTO migration_progress (symbol, interval, last_date, rows)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(symbol, interval)
+                    DO UPDATE SET last_date = excluded.last_date, rows = rows + excluded.rows
+                """, (symbol, interval, last_date, len(rows)))
+
+        migrated[f"{interval}/{symbol}"] = copied
+        if copied:
+            logger.info(f"Migrated {copied} bars for {symbol} ({interval}) to v2")
+    return migrated
+
+
+def database_size(db_path: str) -> int:
+    """Bytes of used pages in a SQLite database (as after a checkpoint and VACUUM)"""
+    with sqlite3.connect(db_path) as conn:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return (pages - free) * page_size
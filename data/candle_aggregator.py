@@ -0,0 +1,331 @@
+"""
+Streaming Tick-to-Candle Aggregator
+Builds minute-based OHLCV bars for many instruments at once from KiteTicker
+tick batches
+
+State is array-backed: one slot per instrument in NumPy arrays of shape
+(intervals, instruments), so a batch of ticks updates every interval for
+every instrument in a few vectorized operations (O(1) work per tick).
+Bars are aligned to the exchange session (09:15, 09:20, ... for 5 minutes;
+09:15, 10:15, ..., 15:15 for 60 minutes, the last one cut at 15:30) and
+stamped with their open time in epoch seconds, like historical candles.
+
+Closed bars are delivered to subscribers as structured arrays (CANDLE_DTYPE),
+one call per interval per batch.
+"""
+import calendar as _calendar
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .trading_calendar import INTERVAL_MINUTES, IST_OFFSET_SECONDS, NSE_CALENDAR, TradingCalendar
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVALS = ("minute", "3minute", "5minute", "15minute", "60minute")
+
+# Closed bar layout delivered to subscribers
+CANDLE_DTYPE = np.dtype([
+    ('instrument_token', np.int64),
+    ('timestamp', np.int64),   # Bar open, epoch seconds
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+    ('received', np.float64),  # Arrival of the bar's last tick, epoch seconds (latency tracing)
+])
+
+# Bar start of an empty slot
+_NO_BAR = -1
+
+CandleCallback = Callable[[str, np.ndarray], None]
+
+
+def tick_epoch(value) -> int:
+    """Tick timestamp (naive IST datetime, aware datetime or epoch) to epoch seconds"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return _calendar.timegm(value.timetuple()) - IST_OFFSET_SECONDS
+        return int(value.timestamp())
+    return int(value)
+
+
+class CandleAggregator:
+    """
+    Multi-interval, multi-instrument candle builder
+
+    Key features:
+    - Vectorized batch updates over (interval, instrument) state arrays
+    - Session-aligned bar boundaries; ticks outside the session are ignored
+    - Volume from the cumulative day volume in ticks (volume_traded)
+    - Late ticks for an already closed bar are dropped
+    - close_due(now) closes bars of instruments that stopped ticking
+    """
+
+    def __init__(self, intervals: Sequence[str] = DEFAULT_INTERVALS,
+                 calendar: Optional[TradingCalendar] = None,
+                 capacity: int = 1024, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            intervals: Minute intervals to build (Kite names, e.g. "5minute")
+            calendar: Exchange session (NSE by default)
+            capacity: Initial instrument slots (grows as needed)
+            clock: Epoch-seconds time source (tick arrival, ticks without a timestamp)
+        """
+        unknown = [name for name in intervals if name not in INTERVAL_MINUTES]
+        if unknown:
+            raise ValueError(f"Unsupported intervals: {unknown}")
+        self.intervals = tuple(intervals)
+        self.calendar = calendar or NSE_CALENDAR
+        self._clock = clock
+        self._steps = np.array([INTERVAL_MINUTES[name] * 60 for name in self.intervals],
+                               dtype=np.int64)[:, None]
+        self._lock = threading.Lock()
+        self._subscribers: List[tuple] = []
+
+        self._slots: Dict[int, int] = {}
+        self._tokens = np.zeros(capacity, dtype=np.int64)
+        shape = (len(self.intervals), capacity)
+        self._start = np.full(shape, _NO_BAR, dtype=np.int64)
+        self._done = np.zeros(shape, dtype=bool)  # Closed by close_due, not yet replaced
+        self._open = np.zeros(shape)
+        self._high = np.zeros(shape)
+        self._low = np.zeros(shape)
+        self._close = np.zeros(shape)
+        self._volume_start = np.zeros(shape)  # Cumulative day volume when the bar started
+        self._last_volume = np.full(capacity, np.nan)  # Latest cumulative day volume
+        self._last_day = np.full(capacity, _NO_BAR, dtype=np.int64)
+        self._last_received = np.zeros(capacity)  # Arrival of the latest tick
+
+        self.stats = {'ticks': 0, 'ignored': 0, 'late': 0, 'bars': 0}
+
+    # Subscribers
+    def subscribe(self, callback: CandleCallback, intervals: Optional[Iterable[str]] = None):
+        """
+        Register a closed-bar callback
+
+        Args:
+            callback: Called as callback(interval, bars) with a CANDLE_DTYPE array
+            intervals: Only these intervals (None = all)
+        """
+        wanted = None if intervals is None else frozenset(intervals)
+        self._subscribers.append((callback, wanted))
+
+    def _emit(self, closed: Dict[int, List[np.ndarray]]):
+        for k, blocks in closed.items():
+            bars = blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+            interval = self.intervals[k]
+            self.stats['bars'] += len(bars)
+            for callback, wanted in self._subscribers:
+                if wanted is None or interval in wanted:
+                    try:
+                        callback(interval, bars)
+                    except Exception as e:
+                        logger.error(f"Candle subscriber failed: {e}")
+
+    # Slots
+    def _slot_array(self, tokens: np.ndarray) -> np.ndarray:
+        """Slot index of every token, allocating slots for new ones"""
+        slots = self._slots
+        result = np.empty(len(tokens), dtype=np.int64)
+        for i, token in enumerate(tokens.tolist()):
+            slot = slots.get(token)
+            if slot is None:
+                slot = slots[token] = len(slots)
+                if slot >= len(self._tokens):
+                    self._grow(2 * len(self._tokens))
+                self._tokens[slot] = token
+            result[i] = slot
+        return result
+
+    def _grow(self, capacity: int):
+        extra = capacity - len(self._tokens)
+        self._tokens = np.concatenate([self._tokens, np.zeros(extra, dtype=np.int64)])
+        self._last_volume = np.concatenate([self._last_volume, np.full(extra, np.nan)])
+        self._last_day = np.concatenate([self._last_day, np.full(extra, _NO_BAR, dtype=np.int64)])
+        self._last_received = np.concatenate([self._last_received, np.zeros(extra)])
+        for name in ('_start', '_done', '_open', '_high', '_low', '_close', '_volume_start'):
+            old = getattr(self, name)
+            fill = _NO_BAR if name == '_start' else 0
+            new = np.full((old.shape[0], capacity), fill, dtype=old.dtype)
+            new[:, :old.shape[1]] = old
+            setattr(self, name, new)
+
+    # Ingest
+    def on_kite_ticks(self, ws, ticks: List[Dict]):
+        """KiteTicker on_ticks callback: ZerodhaClient.start_websocket(aggregator.on_kite_ticks)"""
+        self.on_ticks(ticks)
+
+    def on_ticks(self, ticks: List[Dict]):
+        """
+        Aggregate a batch of KiteTicker tick dicts
+
+        Uses instrument_token, last_price, volume_traded (or volume) and
+        exchange_timestamp (or last_trade_time); ticks without a timestamp
+        (ltp mode) are stamped with the clock.
+        """
+        if not ticks:
+            return
+        now = None
+        tokens, prices, volumes, stamps = [], [], [], []
+        for tick in ticks:
+            stamp = tick.get('exchange_timestamp') or tick.get('last_trade_time')
+            if stamp is None:
+                if now is None:
+                    now = int(self._clock())
+                stamp = now
+            volume = tick.get('volume_traded', tick.get('volume'))
+            tokens.append(tick['instrument_token'])
+            prices.append(tick['last_price'])
+            volumes.append(np.nan if volume is None else volume)
+            stamps.append(tick_epoch(stamp))
+        self.on_arrays(np.array(tokens, dtype=np.int64), np.array(prices, dtype=np.float64),
+                       np.array(volumes, dtype=np.float64), np.array(stamps, dtype=np.int64))
+
+    def on_arrays(self, tokens: np.ndarray, prices: np.ndarray, volumes: np.ndarray,
+                  timestamps: np.ndarray):
+        """
+        Aggregate ticks given as parallel arrays (in arrival order)
+
+        Args:
+            tokens: Instrument tokens
+            prices: Last traded prices
+            volumes: Cumulative day volumes (NaN if unknown)
+            timestamps: Epoch seconds
+        """
+        received = self._clock()
+        with self._lock:
+            self.stats['ticks'] += len(tokens)
+            seconds = (timestamps + IST_OFFSET_SECONDS) % 86400
+            session = (seconds >= self.calendar.open_seconds) & (seconds < self.calendar.close_seconds)
+            if not session.all():
+                self.stats['ignored'] += int((~session).sum())
+                tokens, prices, volumes, timestamps, seconds = (
+                    tokens[session], prices[session], volumes[session],
+                    timestamps[session], seconds[session])
+            if not len(tokens):
+                return
+
+            slots = self._slot_array(tokens)
+            closed: Dict[int, List[np.ndarray]] = {}
+            for round_index in self._rounds(slots):
+                self._apply(slots[round_index], prices[round_index], volumes[round_index],
+                            timestamps[round_index], seconds[round_index], closed)
+                self._last_received[slots[round_index]] = received
+        self._emit(closed)
+
+    @staticmethod
+    def _rounds(slots: np.ndarray) -> List[np.ndarray]:
+        """Split a batch so no slot repeats within a round (keeps per-slot order)"""
+        if len(np.unique(slots)) == len(slots):
+            return [np.arange(len(slots))]
+        order = np.argsort(slots, kind='stable')
+        sorted_slots = slots[order]
+        group_start = np.r_[0, np.flatnonzero(sorted_slots[1:] != sorted_slots[:-1]) + 1]
+        starts = np.repeat(group_start, np.diff(np.r_[group_start, len(slots)]))
+        rank = np.empty(len(slots), dtype=np.int64)
+        rank[order] = np.arange(len(slots)) - starts
+        return [np.flatnonzero(rank == r) for r in range(int(rank.max()) + 1)]
+
+    def _bars(self, k: int, cols: np.ndarray, last_volume: np.ndarray) -> np.ndarray:
+        """Bars of interval k in slots cols as a CANDLE_DTYPE array"""
+        bars = np.empty(len(cols), dtype=CANDLE_DTYPE)
+        bars['instrument_token'] = self._tokens[cols]
+        bars['timestamp'] = self._start[k, cols]
+        bars['open'] = self._open[k, cols]
+        bars['high'] = self._high[k, cols]
+        bars['low'] = self._low[k, cols]
+        bars['close'] = self._close[k, cols]
+        bars['volume'] = np.nan_to_num(last_volume - self._volume_start[k, cols])
+        bars['received'] = self._last_received[cols]
+        return bars
+
+    def _apply(self, slots, prices, volumes, timestamps, seconds, closed):
+        """Update all intervals for ticks of distinct slots"""
+        open_seconds = self.calendar.open_seconds
+        bucket = timestamps[None, :] - (seconds[None, :] - open_seconds) % self._steps
+        current = self._start[:, slots]
+        done = self._done[:, slots]
+
+        # Ticks for a bar that was already emitted are dropped
+        late = (bucket < current) | ((bucket == current) & done)
+        if late.any():
+            self.stats['late'] += int(late.any(axis=0).sum())
+        rolled = bucket > current
+        ending = rolled & (current != _NO_BAR) & ~done
+
+        if ending.any():
+            last_volume = self._last_volume[slots]
+            for k in np.flatnonzero(ending.any(axis=1)):
+                idx = np.flatnonzero(ending[k])
+                closed.setdefault(int(k), []).append(self._bars(k, slots[idx], last_volume[idx]))
+
+        # A new bar's volume counts from the previous tick's cumulative day
+        # volume; from zero on a new day (or the session's first bar), and
+        # from this tick for an instrument first seen mid-session
+        day = (timestamps - seconds) // 86400
+        previous = self._last_volume[slots]
+        first_seen = np.isnan(previous)
+        base = np.where(day != self._last_day[slots], 0.0, previous)
+        if rolled.any():
+            rows, idx = np.nonzero(rolled)
+            cols = slots[idx]
+            first_bar = bucket[rows, idx] - (timestamps[idx] - seconds[idx]) == open_seconds
+            self._start[rows, cols] = bucket[rows, idx]
+            self._done[rows, cols] = False
+            self._open[rows, cols] = prices[idx]
+            self._high[rows, cols] = prices[idx]
+            self._low[rows, cols] = prices[idx]
+            self._close[rows, cols] = prices[idx]
+            self._volume_start[rows, cols] = np.where(first_seen[idx] & ~first_bar,
+                                                      volumes[idx], base[idx])
+
+        same = (bucket == current) & ~done
+        if same.any():
+            rows, idx = np.nonzero(same)
+            cols = slots[idx]
+            self._high[rows, cols] = np.maximum(self._high[rows, cols], prices[idx])
+            self._low[rows, cols] = np.minimum(self._low[rows, cols], prices[idx])
+            self._close[rows, cols] = prices[idx]
+
+        fresh = ~late.all(axis=0)
+        known = fresh & ~np.isnan(volumes)
+        self._last_volume[slots[known]] = volumes[known]
+        self._last_day[slots[fresh]] = day[fresh]
+
+    def close_due(self, now: Optional[float] = None):
+        """
+        Close every open bar whose period has ended by now
+
+        Call periodically (e.g. once a second) so instruments that stop
+        ticking still emit their last bar of each period and the session.
+        """
+        now = int(self._clock() if now is None else now)
+        closed: Dict[int, List[np.ndarray]] = {}
+        with self._lock:
+            n = len(self._slots)
+            if n == 0:
+                return
+            starts = self._start[:, :n]
+            seconds = (starts + IST_OFFSET_SECONDS) % 86400
+            session_end = starts - seconds + self.calendar.close_seconds
+            ends = np.minimum(starts + self._steps, session_end)
+            due = (starts != _NO_BAR) & ~self._done[:, :n] & (ends <= now)
+            for k in np.flatnonzero(due.any(axis=1)):
+                cols = np.flatnonzero(due[k])
+                closed[int(k)] = [self._bars(k, cols, self._last_volume[cols])]
+                self._done[k, cols] = True
+        self._emit(closed)
+
+    def current_bars(self, interval: str) -> np.ndarray:
+        """Forming bars of an interval (CANDLE_DTYPE), for intrabar previews"""
+        k = self.intervals.index(interval)
+        with self._lock:
+            n = len(self._slots)
+            cols = np.flatnonzero((self._start[k, :n] != _NO_BAR) & ~self._done[k, :n])
+            return self._bars(k, cols, self._last_volume[cols])
@@ -0,0 +1,454 @@
+"""
+Memory-Mapped Columnar Bar Store
+Alternative cache backend for immutable history replays
+
+Each (symbol, interval) is a directory of append-only column files:
+
+    <root>/<interval>/<symbol>/timestamp.i8   int64 epoch seconds (UTC)
+    <root>/<interval>/<symbol>/open.f8        float64
+    ...                        high/low/close/volume.f8
+
+and <root>/index.json records the committed row count, time range, column
+generation and fetched (covered) ranges of every series. Appends extend the current generation in
+place; a merge (backfill) writes every column into a new generation
+directory <symbol>/gen-<n>/ and the index rename switches to it in one
+step, so a crash never mixes merged and unmerged columns. Loads are
+read-only np.memmap views - no parsing, no copies - so the arrays can go
+straight into the batch indicators or IndicatorPool.
+
+Drop-in for MarketDataCache: same read API (get_arrays / get_arrays_multi /
+get_cached_data) and the same fetch-through API (get_missing_date_ranges /
+merge_and_get_data).
+"""
+import os
+import glob
+import json
+import shutil
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .cache_manager import (MarketDataCache, OHLCV_DTYPE, RETURN_FORMATS, empty_arrays,
+                            format_frame, merge_ranges, stored_runs, uncovered_runs)
+# Naive datetimes are taken as exchange local time (same as the SQLite cache)
+from .trading_calendar import (EXCHANGE_TZ, NSE_CALENDAR, DateLike, TradingCalendar,
+                               from_epoch, to_epoch)
+
+logger = logging.getLogger(__name__)
+
+# Column files: name -> dtype
+COLUMNS = {name: OHLCV_DTYPE[name] for name in OHLCV_DTYPE.names}
+
+
+class ColumnarBarStore:
+    """
+    Append-only, memory-mapped OHLCV store
+
+    Key features:
+    - One file per column, appended in place (no rewrite for new bars)
+    - index.json is the commit point: rows beyond it (torn appends) are ignored
+    - Zero-copy, read-only np.memmap loads
+    - Out-of-order saves (backfills) rewrite the series once, into a new
+      generation committed by the index
+    - Coverage ranges + trading calendar: merge_and_get_data fetches only
+      the bars never fetched before (same gap rules as MarketDataCache)
+    """
+
+    def __init__(self, root_dir: str = os.path.join("data_cache", "columnar"),
+                 calendar: Optional[TradingCalendar] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            root_dir: Directory holding the column files and index.json
+            calendar: Exchange calendar for gap detection (NSE by default)
+            clock: Epoch-seconds time source (injectable for tests)
+        """
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+        self.index_path = os.path.join(root_dir, "index.json")
+        self.calendar = calendar or NSE_CALENDAR
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._index: Dict[str, dict] = self._read_index()
+
+    # Index
+    @staticmethod
+    def _key(symbol: str, interval: str) -> str:
+        return f"{interval}/{symbol}"
+
+    def _read_index(self) -> Dict[str, dict]:
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, 'r') as f:
+            return json.load(f)
+
+    def _write_index(self, index: Dict[str, dict]) -> None:
+        """Atomically replace index.json, then adopt it in memory"""
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+        # Only a committed index becomes visible (a failed write keeps the old one)
+        self._index = index
+
+    def _series_dir(self, symbol: str, interval: str) -> str:
+        # Symbols like 'M&M' and 'BAJAJ-AUTO' are valid file names; '/' is not
+        return os.path.join(self.root_dir, interval, symbol.replace('/', '_'))
+
+    @staticmethod
+    def _column_dir(series_dir: str, generation: int) -> str:
+        """Column files of a generation (0 = the series directory itself)"""
+        return series_dir if generation == 0 else os.path.join(series_dir, f"gen-{generation}")
+
+    def _remove_stale_generations(self, series_dir: str, current: int) -> None:
+        """Delete column files of every other generation (open memmaps stay valid)"""
+        if current != 0:
+            for name, dtype in COLUMNS.items():
+                path = os.path.join(series_dir, f"{name}.{dtype.kind}{dtype.itemsize}")
+                if os.path.exists(path):
+                    os.remove(path)
+        for path in glob.glob(os.path.join(series_dir, "gen-*")):
+            if path != self._column_dir(series_dir, current):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def series(self) -> List[Tuple[str, str, int]]:
+        """All stored series as (symbol, interval, rows)"""
+        result = []
+        for key, entry in sorted(self._index.items()):
+            interval, symbol = key.split('/', 1)
+            result.append((symbol, interval, entry['rows']))
+        return result
+
+    def rows(self, symbol: str, interval: str = "day") -> int:
+        """Committed row count for a series"""
+        entry = self._index.get(self._key(symbol, interval))
+        return entry['rows'] if entry else 0
+
+    # Coverage
+    def _closed_limit(self, interval: str) -> int:
+        """Last epoch second whose candle has closed (later bars may still change)"""
+        return int(self._clock()) - self.calendar.bar_span(interval) - 1
+
+    def _coverage(self, symbol: str, interval: str, entry: Optional[dict]) -> List[List[int]]:
+        """
+        Covered [start, end] ranges of a series, oldest first
+
+        Series stored before coverage was tracked (or migrated) count each
+        run of consecutive calendar bars they hold as covered.
+        """
+        if entry is None:
+            return []
+        if 'covered' in entry:
+            return entry['covered']
+        if entry['rows'] == 0:
+            return []
+        directory = self._column_dir(self._series_dir(symbol, interval), entry.get('gen', 0))
+        stored = self._open_columns(directory, entry['rows'])['timestamp']
+        limit = self._closed_limit(interval)
+        return [[start, min(end, limit)]
+                for start, end in stored_runs(self.calendar, stored, interval)
+                if min(end, limit) >= start]
+
+    def _add_coverage(self, coverage: List[List[int]], start: int, end: int,
+                      interval: str) -> List[List[int]]:
+        """Coverage with [start, end] added (the still-open candle left out)"""
+        end = min(end, self._closed_limit(interval))
+        if end < start:
+            return coverage
+        return merge_ranges(self.calendar, coverage + [[start, end]], interval)
+
+    # Writes
+    def save_arrays(self, symbol: str, interval: str, arrays: Dict[str, np.ndarray],
+                    covered: Optional[Tuple[int, int]] = None) -> int:
+        """
+        Store bars for a series
+
+        Bars newer than the stored history are appended in place. Anything
+        else (backfill or overlap) merges and rewrites the series once.
+
+        Args:
+            symbol: Stock symbol
+            interval: Time interval
+            arrays: 'timestamp' (epoch seconds) plus OHLCV arrays, any order
+            covered: (first_bar, last_bar) epoch seconds of the request that
+                     returned the bars, so sessions without bars at either
+                     end count as fetched (all of them when arrays is empty)
+
+        Returns:
+            Number of new bars stored
+        """
+        timestamps = np.asarray(arrays['timestamp'], dtype=np.int64)
+        if len(timestamps) == 0 and covered is None:
+            return 0
+        order = np.argsort(timestamps, kind='stable')
+        new = {name: np.asarray(arrays[name], dtype=dtype)[order] for name, dtype in COLUMNS.items()}
+
+        # Duplicate timestamps in the batch: keep the last one
+        ts = new['timestamp']
+        keep = np.r_[ts[1:] != ts[:-1], True][:len(ts)]
+        new = {name: column[keep] for name, column in new.items()}
+        ts = new['timestamp']
+
+        with self._lock:
+            key = self._key(symbol, interval)
+            entry = self._index.get(key)
+            directory = self._series_dir(symbol, interval)
+            os.makedirs(directory, exist_ok=True)
+
+            committed = entry['rows'] if entry else 0
+            generation = entry.get('gen', 0) if entry else 0
+            # Seed coverage of pre-coverage series before the new bars land
+            coverage = self._coverage(symbol, interval, entry)
+            rows = committed
+            first = entry['first'] if entry else None
+            last = entry['last'] if entry else None
+            added, merged = 0, False
+            if len(ts) and (committed == 0 or ts[0] > entry['last']):
+                added = self._append(self._column_dir(directory, generation), committed, new)
+                rows = committed + added
+                first = entry['first'] if committed else int(ts[0])
+                last = int(ts[-1])
+            elif len(ts):
+                added, rows, first = self._merge_rewrite(directory, generation, committed, new)
+                last = max(entry['last'], int(ts[-1]))
+                generation += 1
+                merged = True
+
+            span = [int(ts[0]), int(ts[-1])] if len(ts) else list(covered)
+            if covered is not None:
+                span = [min(span[0], covered[0]), max(span[1], covered[1])]
+            coverage = self._add_coverage(coverage, span[0], span[1], interval)
+
+            index = dict(self._index)
+            index[key] = {'rows': rows, 'first': first, 'last': last, 'gen': generation,
+                          'covered': coverage}
+            self._write_index(index)  # Commit point (switches generation after a merge)
+            if merged:
+                self._remove_stale_generations(directory, generation)
+        return added
+
+    def _append(self, directory: str, committed_rows: int, new: Dict[str, np.ndarray]) -> int:
+        """Append columns after the committed rows (drops any torn tail first)"""
+        for name, dtype in COLUMNS.items():
+            path = os.path.join(directory, f"{name}.{dtype.kind}{dtype.itemsize}")
+            with open(path, 'ab') as f:
+                f.truncate(committed_rows * dtype.itemsize)
+                f.write(np.ascontiguousarray(new[name]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        return len(new['timestamp'])
+
+    def _merge_rewrite(self, directory: str, generation: int, committed_rows: int,
+                       new: Dict[str, np.ndarray]) -> Tuple[int, int, int]:
+        """
+        Merge new bars into the series (new values win), written as the next
+        generation; the caller commits it by updating the index
+        """
+        old = self._open_columns(self._column_dir(directory, generation), committed_rows)
+        target = self._column_dir(directory, generation + 1)
+        if os.path.exists(target):
+            shutil.rmtree(target)  # Left by a merge that crashed before its commit
+        os.makedirs(target)
+        merged_ts = np.concatenate([old['timestamp'], new['timestamp']])
+        # Stable sort + keep-last puts the new value after the old one for equal timestamps
+        order = np.argsort(merged_ts, kind='stable')
+        merged_ts = merged_ts[order]
+        keep = np.r_[merged_ts[1:] != merged_ts[:-1], True]
+
+        for name, dtype in COLUMNS.items():
+            column = np.concatenate([old[name], new[name]])[order][keep]
+            path = os.path.join(target, f"{name}.{dtype.kind}{dtype.itemsize}")
+            with open(path, 'wb') as f:
+                f.write(np.ascontiguousarray(column).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        rows = int(keep.sum())
+        return rows - committed_rows, rows, int(merged_ts[keep][0])
+
+    def save_data(self, symbol: str, data: pd.DataFrame, interval: str = "day",
+                  covered: Optional[Tuple[DateLike, DateLike]] = None) -> int:
+        """
+        Store a [date, open, high, low, close, volume] DataFrame (MarketDataCache compatible)
+
+        Args:
+            covered: (from_date, to_date) of the request that returned the data
+        """
+        if covered is not None:
+            requested = self.calendar.expected_bars(covered[0], covered[1], interval)
+            covered = (int(requested[0]), int(requested[-1])) if len(requested) else None
+        if data.empty:
+            if covered is None:
+                return 0
+            return self.save_arrays(symbol, interval, empty_arrays(), covered)
+        dates = pd.to_datetime(data['date'])
+        if dates.dt.tz is None:
+            dates = dates.dt.tz_localize(EXCHANGE_TZ)
+        arrays = {name: data[name].to_numpy(dtype=np.float64)
+                  for name in ('open', 'high', 'low', 'close', 'volume')}
+        arrays['timestamp'] = (dates.dt.tz_convert('UTC').dt.tz_localize(None)
+                               .to_numpy(dtype='datetime64[s]').astype(np.int64))
+        return self.save_arrays(symbol, interval, arrays, covered)
+
+    # Reads
+    @staticmethod
+    def _open_columns(directory: str, rows: int) -> Dict[str, np.ndarray]:
+        """Read-only memmaps of the first `rows` rows of every column"""
+        columns = {}
+        for name, dtype in COLUMNS.items():
+            if rows == 0:
+                columns[name] = np.empty(0, dtype=dtype)
+                continue
+            path = os.path.join(directory, f"{name}.{dtype.kind}{dtype.itemsize}")
+            columns[name] = np.memmap(path, dtype=dtype, mode='r', shape=(rows,))
+        return columns
+
+    def load(self, symbol: str, interval: str = "day") -> Optional[Dict[str, np.ndarray]]:
+        """
+        Zero-copy load of a whole series
+
+        Returns:
+            Dict of read-only memmapped columns (oldest first), or None
+        """
+        entry = self._index.get(self._key(symbol, interval))
+        if not entry or entry['rows'] == 0:
+            return None
+        directory = self._column_dir(self._series_dir(symbol, interval), entry.get('gen', 0))
+        return self._open_columns(directory, entry['rows'])
+
+    def get_arrays(self, symbol: str, from_date: DateLike = None, to_date: DateLike = None,
+                   interval: str = "day") -> Optional[Dict[str, np.ndarray]]:
+        """
+        Bars in [from_date, to_date] as zero-copy slices (same layout as MarketDataCache)
+
+        Args:
+            symbol: Stock symbol
+            from_date: Start (datetime, naive = IST, or epoch seconds); None = first bar
+            to_date: End (inclusive); None = last bar
+            interval: Time interval
+
+        Returns:
+            Dict of column views, or None if no bars fall in the range
+        """
+        columns = self.load(symbol, interval)
+        if columns is None:
+            return None
+        ts = columns['timestamp']
+        lo = 0 if from_date is None else int(np.searchsorted(ts, to_epoch(from_date), 'left'))
+        hi = len(ts) if to_date is None else int(np.searchsorted(ts, to_epoch(to_date), 'right'))
+        if hi <= lo:
+            return None
+        return {name: column[lo:hi] for name, column in columns.items()}
+
+    def get_arrays_multi(self, symbols: List[str], from_date: DateLike = None,
+                         to_date: DateLike = None,
+                         interval: str = "day") -> Dict[str, Dict[str, np.ndarray]]:
+        """Bars for many symbols; symbols without data are omitted"""
+        result = {}
+        for symbol in symbols:
+            arrays = self.get_arrays(symbol, from_date, to_date, interval)
+            if arrays is not None:
+                result[symbol] = arrays
+        return result
+
+    def get_cached_data(self, symbol: str, from_date: DateLike = None, to_date: DateLike = None,
+                        interval: str = "day") -> Optional[pd.DataFrame]:
+        """
+        Bars as a [date, open, high, low, close, volume] DataFrame (IST-aware dates)
+
+        Returns:
+            DataFrame, or None if no bars fall in the range
+        """
+        arrays = self.get_arrays(symbol, from_date, to_date, interval)
+        if arrays is None:
+            return None
+        df = pd.DataFrame({name: arrays[name] for name in OHLCV_DTYPE.names[1:]})
+        df.insert(0, 'date', pd.to_datetime(arrays['timestamp'], unit='s', utc=True)
+                  .tz_convert(EXCHANGE_TZ))
+        return df
+
+    # Fetch-through
+    def get_missing_date_ranges(self, symbol: str, from_date: datetime,
+                                to_date: datetime, interval: str = "day") -> List[tuple]:
+        """
+        Ranges in [from_date, to_date] with bars that were never fetched
+
+        Returns:
+            List of (start_date, end_date) tuples, with the same timezone
+            awareness as from_date
+        """
+        expected = self.calendar.expected_bars(from_date, to_date, interval)
+        coverage = self._coverage(symbol, interval, self._index.get(self._key(symbol, interval)))
+        runs, _ = uncovered_runs(self.calendar, expected, coverage, interval)
+        aware = getattr(from_date, 'tzinfo', None) is not None
+        return [(from_epoch(start, aware), from_epoch(end, aware)) for start, end in runs]
+
+    def merge_and_get_data(self, symbol: str, from_date: datetime, to_date: datetime,
+                           interval: str, fetch_function, return_format: str = "dataframe"):
+        """
+        Fetch the missing ranges, then return everything stored in the range
+
+        Args:
+            fetch_function: Accepts (symbol, from_date, to_date, interval) and
+                            returns a DataFrame, or None if the fetch failed
+                            (the range stays missing and is retried next time)
+            return_format: "dataframe", "records" (list of dicts) or "numpy"
+                           (get_arrays layout, zero-copy)
+        """
+        if return_format not in RETURN_FORMATS:
+            raise ValueError(f"Unknown return_format: {return_format}")
+
+        for start_date, end_date in self.get_missing_date_ranges(symbol, from_date, to_date, interval):
+            logger.info(f"Fetching missing data for {symbol} from {start_date.date()} to {end_date.date()}")
+            new_data = fetch_function(symbol, start_date, end_date, interval)
+            if new_data is None:
+                logger.error(f"Fetching {symbol} {start_date.date()} to {end_date.date()} failed")
+                continue
+            self.save_data(symbol, new_data, interval, covered=(start_date, end_date))
+
+        if return_format == "numpy":
+            arrays = self.get_arrays(symbol, from_date, to_date, interval)
+            return arrays if arrays is not None else empty_arrays()
+        df = self.get_cached_data(symbol, from_date, to_date, interval)
+        return format_frame(df if df is not None else pd.DataFrame(), return_format)
+
+
+def migrate_from_sqlite(cache: MarketDataCache, store: ColumnarBarStore,
+                        symbols: Optional[List[str]] = None,
+                        intervals: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    One-shot copy of the SQLite market_data table into a columnar store
+
+    Args:
+        cache: Source SQLite cache
+        store: Destination columnar store
+        symbols: Only these symbols (None = all cached)
+        intervals: Only these intervals (None = all cached)
+
+    Returns:
+        {"interval/symbol": bars stored}
+    """
+    info = cache.get_cache_info()
+    if info.empty:
+        return {}
+    if symbols is not None:
+        info = info[info['symbol'].isin(symbols)]
+    if intervals is not None:
+        info = info[info['interval'].isin(intervals)]
+
+    migrated = {}
+    for interval, group in info.groupby('interval'):
+        names = list(group['symbol'])
+        # One query per interval for all symbols
+        arrays = cache.get_arrays_multi(names, datetime(1900, 1, 1), datetime(2200, 1, 1), interval)
+        for symbol, columns in arrays.items():
+            migrated[f"{interval}/{symbol}"] = store.save_arrays(symbol, interval, columns)
+            logger.info(f"Migrated {len(columns['timestamp'])} bars for {symbol} ({interval})")
+    return migrated
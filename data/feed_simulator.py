@@ -0,0 +1,354 @@
+"""
+Simulated Market Feed
+Replays cached bars as KiteTicker-style tick streams, locally and without
+credentials, for load-testing the live pipeline
+
+    MarketDataCache bars -> synthetic ticks -> on_ticks(ws, ticks)
+                                               (or on_tick_arrays for the array path)
+
+Each bar becomes ticks_per_bar ticks that walk open -> low -> high -> close
+(open -> high -> low -> close for a down bar), spread evenly over the bar's
+period, with the cumulative day volume (volume_traded) rising to the bar's
+volume, so a CandleAggregator rebuilds the cached bars exactly.
+
+SimulatedTicker has the KiteTicker surface the live code uses: the callback
+attributes (on_ticks, on_connect, on_close, on_error, on_reconnect),
+connect(threaded=...), subscribe/unsubscribe/set_mode, is_connected and
+close. It can be passed wherever a KiteTicker is expected. Load knobs live
+in FeedConfig:
+
+    instruments      - replicate the cached series to any instrument count
+    ticks_per_bar    - tick rate (per instrument per bar)
+    burst_every      - every Nth bar carries burst_factor times the ticks
+    disconnect_every - drop the connection every N bars, losing outage_seconds
+                       of ticks, then reconnect (on_close, on_reconnect, on_connect)
+    speed            - time compression: simulated seconds per wall second
+                       (0 = as fast as the callbacks allow)
+
+When the callbacks are slower than the schedule the feed falls behind;
+stats['max_lag'] reports by how much, which is what a throughput harness
+(benchmark_feed.py) watches.
+"""
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .trading_calendar import INTERVAL_MINUTES, IST_OFFSET_SECONDS, from_epoch
+
+logger = logging.getLogger(__name__)
+
+# First synthetic instrument token (cached symbols have no real token)
+SYNTHETIC_TOKEN_BASE = 10_000_000
+
+
+@dataclass
+class FeedConfig:
+    """Load profile of a simulated feed"""
+    instruments: Optional[int] = None  # None = one per cached series; more = replicas
+    ticks_per_bar: int = 4             # At least 4 (open, both extremes, close)
+    burst_every: int = 0               # Every Nth bar is a burst (0 = never)
+    burst_factor: int = 10             # Tick multiplier of a burst bar
+    disconnect_every: int = 0          # Disconnect every N bars (0 = never)
+    outage_seconds: float = 30.0       # Simulated seconds of ticks lost per disconnect
+    reconnect_delay: float = 0.0       # Wall seconds before reconnecting
+    speed: float = 0.0                 # Simulated seconds per wall second (0 = unpaced)
+    batch_size: int = 0                # Most ticks per on_ticks call (0 = one time step)
+
+
+class SimulatedTicker:
+    """
+    KiteTicker stand-in that replays bars as ticks
+
+    Key features:
+    - KiteTicker callbacks and subscription API (full, quote and ltp modes)
+    - Exact OHLCV round trip through a CandleAggregator
+    - Any number of instruments from a few cached series
+    - Bursts, disconnects with tick loss, and time compression
+    - on_tick_arrays: the same ticks as arrays, skipping dict building
+    """
+
+    MODE_FULL = "full"
+    MODE_QUOTE = "quote"
+    MODE_LTP = "ltp"
+
+    def __init__(self, series: Dict[str, Dict[str, np.ndarray]], interval: str = "minute",
+                 config: Optional[FeedConfig] = None, tokens: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            series: {symbol: arrays} as returned by MarketDataCache.get_arrays_multi
+            interval: Bar interval of the series (Kite name, e.g. "5minute")
+            config: Load profile (defaults: one instrument per series, 4 ticks per bar)
+            tokens: Instrument token of each symbol (synthetic tokens otherwise)
+        """
+        if interval not in INTERVAL_MINUTES:
+            raise ValueError(f"Unsupported interval: {interval}")
+        if not series:
+            raise ValueError("No series to replay")
+        self.config = config or FeedConfig()
+        if self.config.ticks_per_bar < 4:
+            raise ValueError("ticks_per_bar must be at least 4")
+        self.interval = interval
+        self.interval_seconds = INTERVAL_MINUTES[interval] * 60
+
+        # KiteTicker callbacks
+        self.on_ticks: Optional[Callable] = None
+        self.on_connect: Optional[Callable] = None
+        self.on_close: Optional[Callable] = None
+        self.on_error: Optional[Callable] = None
+        self.on_reconnect: Optional[Callable] = None
+        self.on_noreconnect: Optional[Callable] = None
+        # Simulator extension: on_tick_arrays(ws, tokens, prices, volumes, timestamps)
+        self.on_tick_arrays: Optional[Callable] = None
+
+        self._build(series, tokens or {})
+
+        self._modes = np.full(len(self.instrument_tokens), '', dtype=object)  # '' = unsubscribed
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._finished = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._connected = False
+        self.sim_time: Optional[int] = None  # Exchange time of the latest tick
+        self.stats = {'ticks': 0, 'batches': 0, 'bars': 0, 'dropped': 0, 'disconnects': 0,
+                      'errors': 0, 'max_lag': 0.0, 'elapsed': 0.0}
+
+    @classmethod
+    def from_cache(cls, cache, symbols: Sequence[str], from_date: datetime, to_date: datetime,
+                   interval: str = "minute", config: Optional[FeedConfig] = None,
+                   tokens: Optional[Dict[str, int]] = None) -> 'SimulatedTicker':
+        """
+        Feed replaying a MarketDataCache range
+
+        Args:
+            cache: MarketDataCache holding the bars
+            symbols: Symbols to replay (those without cached bars are skipped)
+            from_date, to_date: Range to replay
+            interval: Cached interval
+            config: Load profile
+            tokens: Instrument token of each symbol
+        """
+        series = cache.get_arrays_multi(list(symbols), from_date, to_date, interval)
+        missing = [symbol for symbol in symbols if symbol not in series]
+        if missing:
+            logger.warning(f"Feed simulator: no cached {interval} bars for {missing}")
+        return cls(series, interval, config, tokens)
+
+    def _build(self, series: Dict[str, Dict[str, np.ndarray]], tokens: Dict[str, int]):
+        """Align the series on one timeline and lay out the instruments"""
+        sources = list(series)
+        self.timeline = np.unique(np.concatenate([series[s]['timestamp'] for s in sources]))
+        shape = (len(self.timeline), len(sources))
+        self._bars = {field: np.full(shape, np.nan)
+                      for field in ('open', 'high', 'low', 'close', 'volume')}
+        for col, symbol in enumerate(sources):
+            arrays = series[symbol]
+            rows = np.searchsorted(self.timeline, arrays['timestamp'])
+            for field, values in self._bars.items():
+                values[rows, col] = arrays[field]
+
+        # Cumulative day volume at the end of each bar (reset every session)
+        day = (self.timeline + IST_OFFSET_SECONDS) // 86400
+        volume = np.nan_to_num(self._bars['volume'])
+        cumulative = np.cumsum(volume, axis=0)
+        day_start = np.r_[0, np.flatnonzero(np.diff(day)) + 1]
+        offset = np.zeros_like(cumulative)
+        offset[day_start[1:]] = cumulative[day_start[1:] - 1]
+        offset = np.maximum.accumulate(offset, axis=0)
+        self._day_volume = cumulative - offset
+
+        count = self.config.instruments or len(sources)
+        self._source = np.arange(count) % len(sources)
+        names, token_list = [], []
+        for i in range(count):
+            symbol = sources[self._source[i]]
+            copy = i // len(sources)
+            names.append(symbol if copy == 0 else f"{symbol}#{copy}")
+            token = tokens.get(symbol) if copy == 0 else None
+            token_list.append(token if token is not None else SYNTHETIC_TOKEN_BASE + i)
+        self.instrument_tokens = np.array(token_list, dtype=np.int64)
+        self.symbols: Dict[int, str] = dict(zip(token_list, names))
+        self._index = {token: i for i, token in enumerate(token_list)}
+
+    # KiteTicker API
+    def subscribe(self, instrument_tokens: Iterable[int]):
+        """Start sending ticks for these tokens (quote mode until set_mode)"""
+        self._set(instrument_tokens, lambda mode: mode or self.MODE_QUOTE)
+
+    def unsubscribe(self, instrument_tokens: Iterable[int]):
+        """Stop sending ticks for these tokens"""
+        self._set(instrument_tokens, lambda mode: '')
+
+    def set_mode(self, mode: str, instrument_tokens: Iterable[int]):
+        """Tick mode (MODE_FULL, MODE_QUOTE or MODE_LTP) of subscribed tokens"""
+        if mode not in (self.MODE_FULL, self.MODE_QUOTE, self.MODE_LTP):
+            raise ValueError(f"Unknown mode: {mode}")
+        self._set(instrument_tokens, lambda current: mode if current else '')
+
+    def _set(self, instrument_tokens: Iterable[int], update: Callable[[str], str]):
+        with self._lock:
+            for token in instrument_tokens:
+                i = self._index.get(int(token))
+                if i is None:
+                    logger.warning(f"Feed simulator: unknown instrument token {token}")
+                    continue
+                self._modes[i] = update(self._modes[i])
+
+    def connect(self, threaded: bool = False):
+        """Start the replay (in a background thread if threaded, else until it ends)"""
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError("Feed simulator is already running")
+        self._stop.clear()
+        self._finished.clear()
+        if threaded:
+            self._thread = threading.Thread(target=self._run, name="feed-simulator", daemon=True)
+            self._thread.start()
+        else:
+            self._run()
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    def close(self, code: Optional[int] = None, reason: Optional[str] = None):
+        """Stop the replay (on_close is called by the replay loop)"""
+        self._stop.set()
+
+    def stop(self):
+        self.close()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the replay ends; False on timeout"""
+        return self._finished.wait(timeout)
+
+    # Replay
+    def _call(self, name: str, *args):
+        callback = getattr(self, name)
+        if callback is None:
+            return
+        try:
+            callback(self, *args)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"Feed simulator: {name} callback failed: {e}")
+
+    def _bar_ticks(self, row: int, n: int):
+        """Prices (n, instruments) and cumulative volumes (n, instruments) of one bar"""
+        src = self._source
+        o, h, l, c = (self._bars[field][row, src] for field in ('open', 'high', 'low', 'close'))
+        up = c >= o
+        anchors = np.stack([o, np.where(up, l, h), np.where(up, h, l), c])
+        # Ticks 0, a, b, n-1 sit exactly on the anchors; the rest interpolate
+        xp = np.array([0, round((n - 1) / 3), round(2 * (n - 1) / 3), n - 1], dtype=float)
+        k = np.arange(n, dtype=float)
+        segment = np.clip(np.searchsorted(xp, k, side='right') - 1, 0, 2)
+        weight = ((k - xp[segment]) / (xp[segment + 1] - xp[segment]))[:, None]
+        prices = anchors[segment] + weight * (anchors[segment + 1] - anchors[segment])
+
+        volume = np.nan_to_num(self._bars['volume'][row, src])
+        end = self._day_volume[row, src]
+        fraction = ((k + 1) / n)[:, None]
+        volumes = end - volume + fraction * volume
+        return prices, volumes
+
+    def _pace(self, sim_time: float, sim_start: float, wall_start: float):
+        """Sleep until sim_time is due; record how far behind schedule the feed is"""
+        if self.config.speed <= 0:
+            return
+        due = wall_start + (sim_time - sim_start) / self.config.speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            self._stop.wait(delay)
+        elif -delay > self.stats['max_lag']:
+            self.stats['max_lag'] = -delay
+
+    def _run(self):
+        config = self.config
+        started = wall_start = time.monotonic()
+        sim_start = float(self.timeline[0]) if len(self.timeline) else 0.0
+        outage_until = None
+        attempts = 0
+        self._connected = True
+        self._call('on_connect', {'simulated': True})
+        try:
+            for row, bar_start in enumerate(self.timeline.tolist()):
+                if self._stop.is_set():
+                    break
+                if config.disconnect_every and row and row % config.disconnect_every == 0:
+                    self._connected = False
+                    self.stats['disconnects'] += 1
+                    outage_until = bar_start + config.outage_seconds
+                    self._call('on_close', 1006, "Simulated disconnect")
+                    if config.reconnect_delay:
+                        self._stop.wait(config.reconnect_delay)
+                        wall_start += config.reconnect_delay
+
+                burst = config.burst_every and (row + 1) % config.burst_every == 0
+                n = config.ticks_per_bar * (config.burst_factor if burst else 1)
+                prices, volumes = self._bar_ticks(row, n)
+                present = ~np.isnan(prices[0])
+                self.stats['bars'] += int(present.sum())
+                offsets = (np.arange(n) * self.interval_seconds) // n
+
+                for k in range(n):
+                    if self._stop.is_set():
+                        break
+                    sim_time = bar_start + int(offsets[k])
+                    self._pace(sim_time, sim_start, wall_start)
+                    self.sim_time = sim_time
+                    if outage_until is not None:
+                        if sim_time < outage_until:
+                            self.stats['dropped'] += int(present.sum())
+                            continue
+                        outage_until = None
+                        attempts += 1
+                        self._connected = True
+                        self._call('on_reconnect', attempts)
+                        self._call('on_connect', {'simulated': True, 'reconnect': attempts})
+                    self._deliver(prices[k], volumes[k], sim_time, present)
+        finally:
+            self.stats['elapsed'] = time.monotonic() - started
+            self._connected = False
+            self._call('on_close', 1000, "Replay finished")
+            self._finished.set()
+
+    def _deliver(self, prices: np.ndarray, volumes: np.ndarray, sim_time: int,
+                 present: np.ndarray):
+        """Send one time step's ticks to the subscribed instruments"""
+        with self._lock:
+            modes = self._modes.copy()
+        idx = np.flatnonzero(present & (modes != ''))
+        if not len(idx):
+            return
+        self.stats['ticks'] += len(idx)
+        if self.on_tick_arrays is not None:
+            self.stats['batches'] += 1
+            self._call('on_tick_arrays', self.instrument_tokens[idx], prices[idx],
+                       volumes[idx], np.full(len(idx), sim_time, dtype=np.int64))
+        if self.on_ticks is None:
+            return
+        ticks = self._tick_dicts(idx, prices, volumes, from_epoch(sim_time), modes)
+        size = self.config.batch_size or len(ticks)
+        for start in range(0, len(ticks), size):
+            self.stats['batches'] += 1
+            self._call('on_ticks', ticks[start:start + size])
+
+    def _tick_dicts(self, idx: np.ndarray, prices: np.ndarray, volumes: np.ndarray,
+                    stamp: datetime, modes: np.ndarray) -> List[Dict]:
+        """Kite-style tick dicts (quote mode has no timestamps, ltp only the price)"""
+        ticks = []
+        for i, token, price, volume in zip(idx.tolist(), self.instrument_tokens[idx].tolist(),
+                                           prices[idx].tolist(), volumes[idx].tolist()):
+            mode = modes[i]
+            tick = {'tradable': True, 'mode': mode, 'instrument_token': token,
+                    'last_price': price}
+            if mode != self.MODE_LTP:
+                tick['volume_traded'] = round(volume)
+            if mode == self.MODE_FULL:
+                tick['last_trade_time'] = stamp
+                tick['exchange_timestamp'] = stamp
+            ticks.append(tick)
+        return ticks
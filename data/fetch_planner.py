@@ -0,0 +1,240 @@
+"""
+Historical Fetch Planner
+Splits historical requests into the fewest API-sized chunks and runs them
+concurrently under a shared rate limiter
+"""
+import math
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Maximum days per historical_data call, per interval (Kite Connect limits)
+MAX_DAYS_PER_REQUEST = {
+    "minute": 60,
+    "3minute": 100,
+    "5minute": 100,
+    "10minute": 100,
+    "15minute": 200,
+    "30minute": 200,
+    "60minute": 400,
+    "day": 2000,
+}
+
+# Kite historical API rate limit
+HISTORICAL_REQUESTS_PER_SECOND = 3.0
+
+# Refill rounding tolerance (otherwise 0.9999999999999998 tokens spins forever)
+_TOKEN_EPSILON = 1e-9
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter
+
+    acquire() blocks until a token is available. One bucket is shared by
+    every worker so the combined request rate stays under the limit.
+    """
+
+    def __init__(self, rate: float = HISTORICAL_REQUESTS_PER_SECOND, capacity: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size (1 = evenly spaced requests)
+            clock: Monotonic time source (injectable for tests)
+            sleep: Sleep function (injectable for tests)
+        """
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take one token, waiting if the bucket is empty"""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0 - _TOKEN_EPSILON:
+                    self._tokens = max(0.0, self._tokens - 1.0)
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+@dataclass(frozen=True)
+class FetchRequest:
+    """One symbol/range to fetch"""
+    key: Hashable                # Caller's identifier (usually the symbol)
+    instrument_token: int
+    from_date: datetime
+    to_date: datetime
+    interval: str
+
+
+def plan_chunks(from_date: datetime, to_date: datetime,
+                interval: str) -> List[Tuple[datetime, datetime]]:
+    """
+    Split a date range into the minimum number of maximum-width chunks
+
+    Args:
+        from_date: Range start (inclusive)
+        to_date: Range end (inclusive)
+        interval: Candle interval
+
+    Returns:
+        List of (chunk_from, chunk_to) tuples, oldest first, non-overlapping
+    """
+    if to_date < from_date:
+        return []
+
+    max_days = MAX_DAYS_PER_REQUEST.get(interval)
+    if max_days is None:
+        raise ValueError(f"Unknown interval: {interval}")
+
+    # Chunks are inclusive on both ends, so they are 1 second short of max_days
+    width = timedelta(days=max_days)
+    n_chunks = max(1, math.ceil((to_date - from_date) / width))
+
+    chunks = []
+    chunk_start = from_date
+    for _ in range(n_chunks):
+        chunk_end = min(to_date, chunk_start + width - timedelta(seconds=1))
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + timedelta(seconds=1)
+        if chunk_start > to_date:
+            break
+    return chunks
+
+
+class HistoricalFetcher:
+    """
+    Concurrent, rate-limited historical data fetcher
+
+    Key features:
+    - Minimal number of API calls (max-width chunks per interval)
+    - Chunks of all requests run in one thread pool
+    - Shared TokenBucket keeps the total rate under the API limit
+    - Works with any object exposing KiteConnect.historical_data()
+    """
+
+    def __init__(self, kite, limiter: Optional[TokenBucket] = None,
+                 max_workers: int = 4, max_retries: int = 2):
+        """
+        Args:
+            kite: KiteConnect instance (or a stub with historical_data)
+            limiter: Rate limiter shared by all workers (3 req/s by default)
+            max_workers: Concurrent requests in flight
+            max_retries: Retries per chunk on API errors
+        """
+        self.kite = kite
+        self.limiter = limiter or TokenBucket()
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.api_calls = 0
+        self._calls_lock = threading.Lock()
+
+    def _fetch_chunk(self, request: FetchRequest, chunk_from: datetime,
+                     chunk_to: datetime) -> List[Dict]:
+        """Fetch a single chunk, retrying on API errors"""
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            with self._calls_lock:
+                self.api_calls += 1
+            try:
+                return self.kite.historical_data(
+                    instrument_token=request.instrument_token,
+                    from_date=chunk_from,
+                    to_date=chunk_to,
+                    interval=request.interval
+                ) or []
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    logger.error(f"Chunk {chunk_from} - {chunk_to} for {request.key} failed: {e}")
+                    raise
+                logger.warning(f"Retrying chunk for {request.key} ({attempt}/{self.max_retries}): {e}")
+
+    def iter_fetch(self, requests: List[FetchRequest]
+                   ) -> Iterator[Tuple[FetchRequest, Optional[List[Dict]]]]:
+        """
+        Fetch many requests concurrently
+
+        Yields each request with its candles (sorted by date, de-duplicated)
+        as soon as all of its chunks are done. Results are yielded in the
+        calling thread, so it is safe to write them to the cache there.
+        A request whose chunk fails is yielded with None (an empty list means
+        the API had no bars for the range).
+        """
+        remaining: Dict[int, int] = {}
+        parts: Dict[int, List[List[Dict]]] = {}
+        failed: Dict[int, bool] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {}
+            for idx, request in enumerate(requests):
+                chunks = plan_chunks(request.from_date, request.to_date, request.interval)
+                if not chunks:
+                    yield request, []
+                    continue
+                remaining[idx] = len(chunks)
+                parts[idx] = []
+                failed[idx] = False
+                for chunk_from, chunk_to in chunks:
+                    future = pool.submit(self._fetch_chunk, request, chunk_from, chunk_to)
+                    futures[future] = idx
+
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    parts[idx].append(future.result())
+                except Exception:
+                    failed[idx] = True
+                remaining[idx] -= 1
+                if remaining[idx] == 0:
+                    candles = None if failed[idx] else _merge_candles(parts.pop(idx))
+                    yield requests[idx], candles
+
+    def fetch_many(self, requests: List[FetchRequest]) -> Dict[Hashable, Optional[List[Dict]]]:
+        """Fetch many requests concurrently, keyed by request.key (None = failed)"""
+        return {request.key: candles for request, candles in self.iter_fetch(requests)}
+
+    def fetch(self, instrument_token: int, from_date: datetime, to_date: datetime,
+              interval: str) -> Optional[List[Dict]]:
+        """Fetch one instrument/range (chunks run concurrently); None if it failed"""
+        request = FetchRequest(instrument_token, instrument_token, from_date, to_date, interval)
+        return self.fetch_many([request])[instrument_token]
+
+
+def _merge_candles(chunks: List[List[Dict]]) -> List[Dict]:
+    """Concatenate chunk results, sort by date and drop duplicate dates"""
+    by_date = {}
+    for chunk in chunks:
+        for candle in chunk:
+            by_date[candle['date']] = candle
+    return [by_date[date] for date in sorted(by_date)]
+
+
+def candles_to_frame(candles: List[Dict]) -> pd.DataFrame:
+    """Convert Kite candles to a DataFrame with IST-aware dates (as cached)"""
+    df = pd.DataFrame(candles)
+    df['date'] = pd.to_datetime(df['date'])
+    if df['date'].dt.tz is None:
+        df['date'] = df['date'].dt.tz_localize('Asia/Kolkata')
+    return df
@@ -0,0 +1,181 @@
+"""
+Instrument Master Cache
+Keeps the Kite instrument dump on disk (SQLite) with a daily TTL, so token
+lookups do not download the full exchange dump on every process start
+"""
+import os
+import time
+import sqlite3
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .trading_calendar import from_epoch, to_epoch
+
+logger = logging.getLogger(__name__)
+
+# Columns kept from the Kite instrument dump
+INSTRUMENT_COLUMNS = (
+    'tradingsymbol', 'instrument_token', 'exchange_token', 'name', 'segment',
+    'instrument_type', 'lot_size', 'tick_size', 'expiry', 'strike',
+)
+
+# Kite regenerates the instrument dump once a day, before the market opens
+DUMP_REFRESH_TIME = "08:30"
+
+
+class InstrumentCache:
+    """
+    On-disk instrument master with in-memory lookup maps
+
+    Key features:
+    - Compact SQLite table keyed by (exchange, tradingsymbol), indexed by token
+    - Daily TTL: stale once Kite publishes the next dump
+    - O(1) symbol -> token and token -> symbol dicts, built once per exchange
+    """
+
+    def __init__(self, cache_dir: str = "data_cache", refresh_time: str = DUMP_REFRESH_TIME,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            cache_dir: Directory for instruments.db
+            refresh_time: Daily dump publication time, HH:MM IST
+            clock: Epoch-seconds time source (injectable for tests)
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, "instruments.db")
+        hours, minutes = refresh_time.split(':')
+        self.refresh_offset = timedelta(hours=int(hours), minutes=int(minutes))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._maps: Dict[str, Tuple[Dict[str, int], Dict[int, str]]] = {}
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def _init_database(self):
+        """Create tables if they don't exist"""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS instruments (
+                    exchange TEXT NOT NULL,
+                    tradingsymbol TEXT NOT NULL,
+                    instrument_token INTEGER NOT NULL,
+                    exchange_token INTEGER,
+                    name TEXT,
+                    segment TEXT,
+                    instrument_type TEXT,
+                    lot_size INTEGER,
+                    tick_size REAL,
+                    expiry TEXT,
+                    strike REAL,
+                    PRIMARY KEY (exchange, tradingsymbol)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_instrument_token
+                ON instruments(instrument_token)
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS instrument_downloads (
+                    exchange TEXT PRIMARY KEY,
+                    downloaded_at INTEGER NOT NULL,
+                    total_instruments INTEGER NOT NULL
+                )
+            """)
+            conn.commit()
+
+    def _last_refresh(self) -> int:
+        """Epoch seconds of the most recent dump publication"""
+        now = from_epoch(int(self._clock()))
+        refresh = datetime(now.year, now.month, now.day) + self.refresh_offset
+        if now < refresh:
+            refresh -= timedelta(days=1)
+        return to_epoch(refresh)
+
+    def is_fresh(self, exchange: str = "NSE") -> bool:
+        """True if the stored dump is from the current daily publication"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT downloaded_at FROM instrument_downloads WHERE exchange = ?",
+                (exchange,)).fetchone()
+        return row is not None and row[0] >= self._last_refresh()
+
+    def store(self, exchange: str, instruments: List[Dict]) -> int:
+        """
+        Replace the stored dump for an exchange
+
+        Args:
+            exchange: Exchange name (NSE, BSE, NFO, ...)
+            instruments: Rows as returned by KiteConnect.instruments()
+
+        Returns:
+            Number of instruments stored
+        """
+        rows = [
+            (exchange, *(_sql_value(inst.get(column)) for column in INSTRUMENT_COLUMNS))
+            for inst in instruments
+        ]
+        placeholders = ",".join("?" * (len(INSTRUMENT_COLUMNS) + 1))
+        with self._connect() as conn:  # Single transaction
+            conn.execute("DELETE FROM instruments WHERE exchange = ?", (exchange,))
+            conn.executemany(f"""
+                INSERT OR REPLACE INTO instruments (exchange, {", ".join(INSTRUMENT_COLUMNS)})
+                VALUES ({placeholders})
+            """, rows)
+            conn.execute("""
+                INSERT OR REPLACE INTO instrument_downloads
+                (exchange, downloaded_at, total_instruments) VALUES (?, ?, ?)
+            """, (exchange, int(self._clock()), len(rows)))
+
+        with self._lock:
+            self._maps.pop(exchange, None)
+        logger.info(f"Stored {len(rows)} {exchange} instruments")
+        return len(rows)
+
+    def maps(self, exchange: str = "NSE") -> Tuple[Dict[str, int], Dict[int, str]]:
+        """
+        Symbol -> token and token -> symbol dicts (loaded once, then in memory)
+
+        Returns:
+            (symbol_to_token, token_to_symbol); empty if nothing is stored
+        """
+        with self._lock:
+            maps = self._maps.get(exchange)
+            if maps is None:
+                with self._connect() as conn:
+                    rows = conn.execute("""
+                        SELECT tradingsymbol, instrument_token FROM instruments
+                        WHERE exchange = ?
+                    """, (exchange,)).fetchall()
+                maps = (dict(rows), {token: symbol for symbol, token in rows})
+                self._maps[exchange] = maps
+            return maps
+
+    def instruments(self, exchange: str = "NSE") -> List[Dict]:
+        """All stored instruments for an exchange as dicts"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("SELECT * FROM instruments WHERE exchange = ?",
+                                (exchange,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_instrument(self, symbol: str, exchange: str = "NSE") -> Optional[Dict]:
+        """One instrument by tradingsymbol (primary key lookup)"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("""
+                SELECT * FROM instruments WHERE exchange = ? AND tradingsymbol = ?
+            """, (exchange, symbol)).fetchone()
+        return dict(row) if row else None
+
+
+def _sql_value(value):
+    """Dates (expiry) as ISO text, empty strings as NULL"""
+    if value is None or value == "":
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
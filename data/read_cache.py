@@ -0,0 +1,126 @@
+"""
+In-Process Read Cache
+Byte-bounded LRU of query results in front of MarketDataCache
+
+Entries are keyed by (symbol, interval, from, to). A request inside a cached
+range is served as a slice of that superset instead of a new SQLite query.
+Ranges are compared as the date strings SQLite compares, so a slice returns
+exactly the rows the query would have returned.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Upper bound that sorts after every stored date string
+OPEN_END = "9999-12-31"
+
+EntryKey = Tuple[str, str, str, str]
+
+
+class _Entry:
+    __slots__ = ('frame', 'dates', 'nbytes')
+
+    def __init__(self, frame: pd.DataFrame, dates: np.ndarray):
+        self.frame = frame
+        self.dates = dates
+        self.nbytes = int(frame.memory_usage(deep=True).sum()) + dates.nbytes
+
+
+class ReadCache:
+    """
+    LRU cache of DataFrames, bounded by memory
+
+    Key features:
+    - Sub-range hits sliced from a cached superset (binary search, no SQL)
+    - Eviction of least recently used entries beyond max_bytes
+    - Per-symbol invalidation after writes
+    - Hit/miss/eviction counters
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            max_bytes: Memory budget for cached frames
+        """
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0  # Bumped by invalidate()
+        self._entries: "OrderedDict[EntryKey, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, symbol: str, interval: str, from_text: str,
+            to_text: str) -> Optional[pd.DataFrame]:
+        """
+        Rows with from_text <= date <= to_text, if a cached range contains it
+
+        Returns:
+            A copy of the matching rows (possibly empty), or None on a miss
+        """
+        with self._lock:
+            for key, entry in reversed(self._entries.items()):
+                if (key[0] == symbol and key[1] == interval and
+                        key[2] <= from_text and to_text <= key[3]):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    lo = np.searchsorted(entry.dates, from_text, side='left')
+                    hi = np.searchsorted(entry.dates, to_text, side='right')
+                    return entry.frame.iloc[lo:hi].reset_index(drop=True).copy()
+            self.misses += 1
+            return None
+
+    def put(self, symbol: str, interval: str, from_text: str, to_text: str,
+            frame: pd.DataFrame, dates: np.ndarray, generation: Optional[int] = None):
+        """
+        Cache the result of a range query
+
+        Args:
+            frame: Query result, ordered by date
+            dates: The raw date strings of frame's rows (as stored in SQLite)
+            generation: self.generation read before the query; the result is
+                        dropped if a write invalidated the cache meanwhile
+        """
+        entry = _Entry(frame.copy(), np.asarray(dates, dtype=str))
+        if entry.nbytes > self.max_bytes:
+            return
+        key = (symbol, interval, from_text, to_text)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old.nbytes
+            self._entries[key] = entry
+            self.bytes += entry.nbytes
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def invalidate(self, symbol: Optional[str] = None, interval: Optional[str] = None):
+        """Drop entries for a symbol/interval (None = all)"""
+        with self._lock:
+            self.generation += 1
+            for key in list(self._entries):
+                if (symbol is None or key[0] == symbol) and (interval is None or key[1] == interval):
+                    self.bytes -= self._entries.pop(key).nbytes
+
+    def stats(self) -> Dict[str, int]:
+        """Counters and current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,91 @@
+"""
+Incremental Tail Sync
+Brings every cached symbol up to date by fetching only the bars after its
+last cached bar, in one concurrent rate-limited batch
+
+Cost is proportional to the new bars: one metadata query for all symbols,
+one API call per symbol with pending bars (none outside market hours), and
+bulk appends. Cached history is never read back.
+"""
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from .cache_manager import MarketDataCache
+from .fetch_planner import FetchRequest, HistoricalFetcher, candles_to_frame
+from .trading_calendar import from_epoch
+
+logger = logging.getLogger(__name__)
+
+
+def sync_tail(cache: MarketDataCache, fetcher: HistoricalFetcher,
+              symbol_tokens: Dict[str, int], interval: str = "day",
+              symbols: Optional[List[str]] = None,
+              now: Optional[float] = None) -> Dict[str, int]:
+    """
+    Append new bars for cached symbols
+
+    Args:
+        cache: SQLite market data cache
+        fetcher: Concurrent historical fetcher
+        symbol_tokens: Symbol -> instrument token
+        interval: Candle interval to sync
+        symbols: Only these symbols (None = every cached symbol)
+        now: Epoch seconds to sync up to (defaults to the cache clock)
+
+    Returns:
+        Dict of symbol -> bars fetched (0 = up to date, failed or no token)
+    """
+    now = int(cache._clock() if now is None else now)
+    resume_points = cache.get_sync_points(interval, symbols)
+
+    requests = []
+    synced = {}
+    for symbol, resume in resume_points.items():
+        synced[symbol] = 0
+        pending = cache.calendar.bars_since(resume, now, interval)
+        if not len(pending):
+            continue
+        instrument_token = symbol_tokens.get(symbol)
+        if not instrument_token:
+            logger.error(f"Instrument token not found for {symbol}")
+            continue
+        requests.append(FetchRequest(symbol, instrument_token,
+                                     from_epoch(pending[0]), from_epoch(now), interval))
+
+    for request, candles in fetcher.iter_fetch(requests):
+        if not candles:
+            continue
+        cache.save_data(request.key, candles_to_frame(candles), interval,
+                        covered=(request.from_date, request.to_date))
+        synced[request.key] = len(candles)
+
+    logger.info(f"Tail sync ({interval}): {sum(synced.values())} new bars for "
+                f"{len(requests)}/{len(resume_points)} symbols")
+    return synced
+
+
+def run_every(job: Callable[[], object], every_seconds: float,
+              stop_event: Optional[threading.Event] = None,
+              clock: Callable[[], float] = time.time):
+    """
+    Run a job on a fixed wall-clock grid (e.g. every 5 minutes at :00, :05, ...)
+
+    Errors are logged and the schedule continues. Runs until stop_event is set.
+
+    Args:
+        job: Callable to run
+        every_seconds: Period in seconds
+        stop_event: Set to stop the loop (None = run forever)
+        clock: Epoch-seconds time source
+    """
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        try:
+            job()
+        except Exception as e:
+            logger.error(f"Scheduled job failed: {e}")
+        now = clock()
+        wait = every_seconds - (now % every_seconds)
+        stop_event.wait(wait)
@@ -0,0 +1,241 @@
+"""
+Exchange Trading Calendar
+NSE sessions, weekends and holidays, and the bar timestamps they produce
+
+Used by the cache to tell which bars *should* exist in a date range, so
+gap detection works at bar granularity and never asks the API for
+weekends or holidays.
+"""
+import logging
+from datetime import date, datetime
+from typing import Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Exchange time zone (IST has no DST, so a fixed offset is exact)
+EXCHANGE_TZ = 'Asia/Kolkata'
+IST_OFFSET_SECONDS = 5 * 3600 + 30 * 60
+
+# Bar length in minutes for each intraday interval
+INTERVAL_MINUTES = {
+    "minute": 1,
+    "3minute": 3,
+    "5minute": 5,
+    "10minute": 10,
+    "15minute": 15,
+    "30minute": 30,
+    "60minute": 60,
+}
+
+# NSE trading holidays (weekday closures only; weekends are always closed),
+# from the exchange's yearly holiday circulars. Diwali Laxmi Pujan counts as
+# closed (only the muhurat session trades). Years not listed here are treated
+# as having no holidays and TradingCalendar warns when asked about them: an
+# unknown holiday costs one empty API call (the cache then records it as
+# covered), a wrong entry would hide real bars. Add a newly published year
+# here, or at runtime with TradingCalendar.add_holidays().
+NSE_HOLIDAYS = [
+    # 2018
+    "2018-01-26", "2018-02-13", "2018-03-02", "2018-03-29", "2018-03-30",
+    "2018-05-01", "2018-08-15", "2018-08-22", "2018-09-13", "2018-09-20",
+    "2018-10-02", "2018-10-18", "2018-11-07", "2018-11-08", "2018-11-23",
+    "2018-12-25",
+    # 2019
+    "2019-03-04", "2019-03-21", "2019-04-17", "2019-04-19", "2019-04-29",
+    "2019-05-01", "2019-06-05", "2019-08-12", "2019-08-15", "2019-09-02",
+    "2019-09-10", "2019-10-02", "2019-10-08", "2019-10-21", "2019-10-28",
+    "2019-11-12", "2019-12-25",
+    # 2020
+    "2020-02-21", "2020-03-10", "2020-04-02", "2020-04-06", "2020-04-10",
+    "2020-04-14", "2020-05-01", "2020-05-25", "2020-10-02", "2020-11-16",
+    "2020-11-30", "2020-12-25",
+    # 2021
+    "2021-01-26", "2021-03-11", "2021-03-29", "2021-04-02", "2021-04-14",
+    "2021-04-21", "2021-05-13", "2021-07-21", "2021-08-19", "2021-09-10",
+    "2021-10-15", "2021-11-04", "2021-11-05", "2021-11-19",
+    # 2022
+    "2022-01-26", "2022-03-01", "2022-03-18", "2022-04-14", "2022-04-15",
+    "2022-05-03", "2022-08-09", "2022-08-15", "2022-08-31", "2022-10-05",
+    "2022-10-24", "2022-10-26", "2022-11-08",
+    # 2023
+    "2023-01-26", "2023-03-07", "2023-03-30", "2023-04-04", "2023-04-07",
+    "2023-04-14", "2023-05-01", "2023-06-29", "2023-08-15", "2023-09-19",
+    "2023-10-02", "2023-10-24", "2023-11-14", "2023-11-27", "2023-12-25",
+    # 2024
+    "2024-01-22", "2024-01-26", "2024-03-08", "2024-03-25", "2024-03-29",
+    "2024-04-11", "2024-04-17", "2024-05-01", "2024-05-20", "2024-06-17",
+    "2024-07-17", "2024-08-15", "2024-10-02", "2024-11-01", "2024-11-15",
+    "2024-11-20", "2024-12-25",
+    # 2025
+    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10", "2025-04-14",
+    "2025-04-18", "2025-05-01", "2025-08-15", "2025-08-27", "2025-10-02",
+    "2025-10-21", "2025-10-22", "2025-11-05", "2025-12-25",
+    # 2026
+    "2026-01-15", "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31",
+    "2026-04-03", "2026-04-14", "2026-05-01", "2026-05-28", "2026-06-26",
+    "2026-09-14", "2026-10-02", "2026-10-20", "2026-11-10", "2026-11-24",
+    "2026-12-25",
+]
+
+DateLike = Union[datetime, pd.Timestamp, int, None]
+
+
+def to_epoch(value: DateLike) -> Optional[int]:
+    """Convert a datetime (naive = IST), Timestamp or epoch int to epoch seconds"""
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize(EXCHANGE_TZ)
+    return int(ts.timestamp())
+
+
+def from_epoch(seconds: int, aware: bool = False) -> datetime:
+    """Epoch seconds to an IST datetime (naive unless aware=True)"""
+    ts = pd.Timestamp(int(seconds), unit='s', tz='UTC').tz_convert(EXCHANGE_TZ)
+    return ts.to_pydatetime() if aware else ts.tz_localize(None).to_pydatetime()
+
+
+class TradingCalendar:
+    """
+    Session calendar for one exchange
+
+    Key features:
+    - Weekday + holiday trading days (np.busday, vectorized)
+    - Intraday bar open times from the session open/close
+    - Day bars stamped at local midnight (as Kite returns them)
+    - Warns once per year whose holidays are not listed
+    """
+
+    def __init__(self, holidays: Iterable[Union[str, date]] = NSE_HOLIDAYS,
+                 session_open: str = "09:15", session_close: str = "15:30",
+                 years: Optional[Iterable[int]] = None):
+        """
+        Args:
+            holidays: Weekday closures (ISO strings or dates)
+            session_open: Local session open, HH:MM
+            session_close: Local session close, HH:MM
+            years: Years the holiday list is complete for (default: every
+                   year with a listed holiday)
+        """
+        self.holidays = np.array(sorted(str(day) for day in holidays), dtype='datetime64[D]')
+        self.years = set(self._years_of(self.holidays) if years is None else years)
+        self._warned_years = set()
+        self.open_seconds = self._parse_time(session_open)
+        self.close_seconds = self._parse_time(session_close)
+        if self.close_seconds <= self.open_seconds:
+            raise ValueError("session_close must be after session_open")
+
+    @staticmethod
+    def _parse_time(text: str) -> int:
+        hours, minutes = text.split(':')
+        return int(hours) * 3600 + int(minutes) * 60
+
+    def add_holidays(self, holidays: Iterable[Union[str, date]]):
+        """Register extra closures (e.g. a newly published year)"""
+        days = np.array([str(day) for day in holidays], dtype='datetime64[D]')
+        self.holidays = np.unique(np.concatenate([self.holidays, days]))
+        self.years.update(self._years_of(days))
+
+    @staticmethod
+    def _years_of(days: np.ndarray) -> Iterable[int]:
+        return (days.astype('datetime64[Y]').astype(int) + 1970).tolist()
+
+    def _check_years(self, first: np.datetime64, last: np.datetime64):
+        """Warn (once per year) about years without a holiday list"""
+        first_year = int(first.astype('datetime64[Y]').astype(int)) + 1970
+        last_year = int(last.astype('datetime64[Y]').astype(int)) + 1970
+        unknown = [year for year in range(first_year, last_year + 1)
+                   if year not in self.years and year not in self._warned_years]
+        if unknown:
+            self._warned_years.update(unknown)
+            logger.warning(f"No exchange holidays listed for {unknown}: every weekday "
+                           f"counts as a trading day (see add_holidays())")
+
+    def is_trading_day(self, day: Union[str, date]) -> bool:
+        """True if the exchange is open on this date"""
+        day = np.datetime64(str(day), 'D')
+        self._check_years(day, day)
+        return bool(np.is_busday(day, holidays=self.holidays))
+
+    def trading_days(self, start: Union[str, date], end: Union[str, date]) -> np.ndarray:
+        """Trading dates in [start, end] as datetime64[D]"""
+        first, last = np.datetime64(str(start), 'D'), np.datetime64(str(end), 'D')
+        if last >= first:
+            self._check_years(first, last)
+        days = np.arange(first, last + 1)
+        return days[np.is_busday(days, holidays=self.holidays)]
+
+    def bar_offsets(self, interval: str) -> np.ndarray:
+        """Bar open times within a day, in seconds after local midnight"""
+        if interval == "day":
+            return np.zeros(1, dtype=np.int64)
+        minutes = INTERVAL_MINUTES.get(interval)
+        if minutes is None:
+            raise ValueError(f"Unknown interval: {interval}")
+        return np.arange(self.open_seconds, self.close_seconds, minutes * 60, dtype=np.int64)
+
+    def bar_span(self, interval: str) -> int:
+        """Seconds from a bar's timestamp to the last second it covers"""
+        if interval == "day":
+            return self.close_seconds
+        return INTERVAL_MINUTES[interval] * 60 - 1
+
+    def bar_times(self, start: DateLike, end: DateLike, interval: str) -> np.ndarray:
+        """
+        Timestamps of all bars stamped within [start, end]
+
+        Args:
+            start: Range start (datetime, naive = IST, or epoch seconds)
+            end: Range end (inclusive)
+            interval: Candle interval
+
+        Returns:
+            Sorted int64 epoch seconds
+        """
+        lo, hi = to_epoch(start), to_epoch(end)
+        offsets = self.bar_offsets(interval)
+        if hi < lo:
+            return np.empty(0, dtype=np.int64)
+
+        # Local calendar dates spanning the range
+        first_day = np.datetime64((lo + IST_OFFSET_SECONDS) // 86400, 'D')
+        last_day = np.datetime64((hi + IST_OFFSET_SECONDS) // 86400, 'D')
+        days = self.trading_days(first_day, last_day)
+        midnights = days.astype('datetime64[s]').astype(np.int64) - IST_OFFSET_SECONDS
+
+        times = (midnights[:, None] + offsets[None, :]).ravel()
+        return times[(times >= lo) & (times <= hi)]
+
+    def expected_bars(self, start: DateLike, end: DateLike, interval: str) -> np.ndarray:
+        """
+        Bars a historical request for [start, end] should return
+
+        Intraday bars are included when they open inside the range; a day
+        bar when its session overlaps the range.
+        """
+        lo, hi = to_epoch(start), to_epoch(end)
+        if interval == "day":
+            # Session [midnight + open, midnight + close] overlaps [lo, hi]
+            return self.bar_times(lo - self.close_seconds, hi - self.open_seconds, interval)
+        return self.bar_times(lo, hi, interval)
+
+    def bars_since(self, start: DateLike, now: DateLike, interval: str) -> np.ndarray:
+        """
+        Bars stamped at or after start whose session has opened by now
+
+        A day bar (stamped at midnight) only counts once the market opens.
+        """
+        hi = to_epoch(now)
+        if interval == "day":
+            hi -= self.open_seconds
+        return self.bar_times(start, hi, interval)
+
+
+# Default calendar
+NSE_CALENDAR = TradingCalendar()
@@ -3,16 +3,17 @@ Zerodha Kite API Client Wrapper
 Handles authentication, data fetching, and streaming
 """
 import os
-import time
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Callable
 from dotenv import load_dotenv
 import pandas as pd
-import pytz
 
 # Import our cache manager
-from .cache_manager import MarketDataCache
+from .cache_manager import MarketDataCache, RETURN_FORMATS, format_frame
+from .fetch_planner import HistoricalFetcher, FetchRequest, candles_to_frame
+from .instrument_cache import InstrumentCache
+from .tail_sync import sync_tail
 
 # Load environment variables
 load_dotenv()
@@ -67,6 +68,9 @@ class ZerodhaClient:
         # Initialize KiteConnect
         self.kite = KiteConnect(api_key=self.api_key)
 
+        # Concurrent, rate-limited historical fetcher (3 req/s shared)
+        self.fetcher = HistoricalFetcher(self.kite)
+
         # Set access token if available
         if self.access_token:
             self.kite.set_access_token(self.access_token)
@@ -76,8 +80,11 @@ class ZerodhaClient:
         self.kws = None
         self.subscribed_tokens = []
 
-        # Symbol to token mapping
+        # Symbol <-> token mappings (filled from the on-disk instrument cache)
+        self.instrument_cache = InstrumentCache(cache_dir)
         self.symbol_token_map = {}
+        self.token_symbol_map = {}
+        self._loaded_exchanges = set()
 
     def generate_login_url(self) -> str:
         """
@@ -118,24 +125,26 @@ class ZerodhaClient:
             logger.error(f"Login failed: {str(e)}")
             raise
 
-    def get_instruments(self, exchange: str = "NSE") -> List[Dict]:
+    def get_instruments(self, exchange: str = "NSE", force_refresh: bool = False) -> List[Dict]:
         """
         Get all instruments for an exchange
 
+        Served from the on-disk instrument cache while today's dump is stored;
+        downloads the full dump only when it is stale.
+
         Args:
             exchange: Exchange name (NSE, BSE, etc.)
+            force_refresh: Download even if the cached dump is fresh
 
         Returns:
             List of instrument dictionaries
         """
         try:
-            instruments = self.kite.instruments(exchange)
-
-            # Build symbol to token mapping
-            for inst in instruments:
-                symbol = inst['tradingsymbol']
-                self.symbol_token_map[symbol] = inst['instrument_token']
+            if force_refresh or not self.instrument_cache.is_fresh(exchange):
+                self.instrument_cache.store(exchange, self.kite.instruments(exchange))
+            self._load_instrument_maps(exchange)
 
+            instruments = self.instrument_cache.instruments(exchange)
             logger.info(f"Loaded {len(instruments)} instruments from {exchange}")
             return instruments
 
@@ -143,6 +152,42 @@ class ZerodhaClient:
             logger.error(f"Failed to get instruments: {str(e)}")
             return []
 
+    def _load_instrument_maps(self, exchange: str = "NSE"):
+        """Merge the cached symbol <-> token maps into the client's maps"""
+        symbol_to_token, token_to_symbol = self.instrument_cache.maps(exchange)
+        self.symbol_token_map.update(symbol_to_token)
+        self.token_symbol_map.update(token_to_symbol)
+        self._loaded_exchanges.add(exchange)
+
+    def _ensure_instruments(self, exchange: str = "NSE"):
+        """Load the symbol <-> token maps once (downloading only a stale dump)"""
+        if exchange in self._loaded_exchanges:
+            return
+        try:
+            if not self.instrument_cache.is_fresh(exchange):
+                self.instrument_cache.store(exchange, self.kite.instruments(exchange))
+            self._load_instrument_maps(exchange)
+        except Exception as e:
+            logger.error(f"Failed to load instruments: {str(e)}")
+
+    def resolve_token(self, symbol: str, exchange: str = "NSE") -> Optional[int]:
+        """
+        Instrument token for a symbol (O(1) dict lookup)
+
+        The first lookup loads the maps from the instrument cache. Unknown
+        symbols do not trigger another download.
+        """
+        token = self.symbol_token_map.get(symbol)
+        if token is None and exchange not in self._loaded_exchanges:
+            self._ensure_instruments(exchange)
+            token = self.symbol_token_map.get(symbol)
+        return token
+
+    def resolve_symbol(self, instrument_token: int, exchange: str = "NSE") -> Optional[str]:
+        """Trading symbol for an instrument token (O(1), for tick handlers)"""
+        self._ensure_instruments(exchange)
+        return self.token_symbol_map.get(instrument_token)
+
     def get_quote(self, symbols: List[str]) -> Dict:
         """
         Get current market quotes for symbols
@@ -180,7 +225,8 @@ class ZerodhaClient:
             logger.error(f"Failed to get quotes: {str(e)}")
             return {}
 
-    def get_historical_data(self, symbol: str, interval: str, days: int = 30) -> List[Dict]:
+    def get_historical_data(self, symbol: str, interval: str, days: int = 30,
+                            return_format: str = "records"):
         """
         Get historical data for a symbol with caching support
 
@@ -188,10 +234,16 @@ class ZerodhaClient:
             symbol: Trading symbol
             interval: Candle interval (minute, 3minute, 5minute, 15minute, 30minute, 60minute, day)
             days: Number of days of history
+            return_format: "records" (list of candle dicts), "dataframe", or
+                           "numpy" (dict of 'timestamp' + OHLCV arrays, as
+                           MarketDataCache.get_arrays; no per-bar objects)
 
         Returns:
-            List of candle dictionaries
+            Candles in the requested format
         """
+        if return_format not in RETURN_FORMATS:
+            raise ValueError(f"Unknown return_format: {return_format}")
+
         # Calculate date range
         to_date = datetime.now()
         from_date = to_date - timedelta(days=days)
@@ -201,117 +253,136 @@ class ZerodhaClient:
             logger.info(f"Using cache for {symbol} data")
             
             # Define fetch function for cache manager
-            def fetch_missing_data(sym: str, start: datetime, end: datetime, intv: str) -> pd.DataFrame:
-                """Fetch data from Zerodha API and convert to DataFrame"""
+            def fetch_missing_data(sym: str, start: datetime, end: datetime,
+                                   intv: str) -> Optional[pd.DataFrame]:
+                """Fetch data from Zerodha API as a DataFrame (None if the fetch failed)"""
                 try:
                     # Get instrument token
-                    if sym not in self.symbol_token_map:
-                        self.get_instruments()
-                    
-                    instrument_token = self.symbol_token_map.get(sym)
+                    instrument_token = self.resolve_token(sym)
                     if not instrument_token:
                         logger.error(f"Instrument token not found for {sym}")
-                        return pd.DataFrame()
-                    
-                    # Fetch data in chunks (Zerodha has 2000 bar limit)
-                    all_data = []
-                    current_end = end
+                        return None
                     
-                    while current_end > start:
-                        # Calculate chunk start (max 2000 bars back)
-                        if intv == "day":
-                            chunk_start = max(start, current_end - timedelta(days=2000))
-                        elif intv == "minute":
-                            chunk_start = max(start, current_end - timedelta(minutes=2000))
-                        elif intv == "3minute":
-                            chunk_start = max(start, current_end - timedelta(minutes=6000))
-                        elif intv == "5minute":
-                            chunk_start = max(start, current_end - timedelta(minutes=10000))
-                        elif intv == "15minute":
-                            chunk_start = max(start, current_end - timedelta(minutes=30000))
-                        elif intv == "30minute":
-                            chunk_start = max(start, current_end - timedelta(minutes=60000))
-                        elif intv == "60minute":
-                            chunk_start = max(start, current_end - timedelta(hours=2000))
-                        else:
-                            chunk_start = max(start, current_end - timedelta(days=100))
-                        
-                        # Fetch chunk
-                        logger.info(f"Fetching chunk from {chunk_start} to {current_end}")
-                        
-                        # Convert datetime to string format expected by Zerodha API
-                        chunk_data = self.kite.historical_data(
-                            instrument_token=instrument_token,
-                            from_date=chunk_start.strftime("%Y-%m-%d"),
-                            to_date=current_end.strftime("%Y-%m-%d"),
-                            interval=intv
-                        )
-                        
-                        if chunk_data:
-                            all_data.extend(chunk_data)
-                            # Move to next chunk
-                            current_end = chunk_start - timedelta(seconds=1)
-                        else:
-                            break
-                        
-                        # Add small delay to respect rate limits
-                        time.sleep(0.3)
+                    # Fetch max-width chunks concurrently under the shared rate limit
+                    all_data = self.fetcher.fetch(instrument_token, start, end, intv)
+                    if all_data is None:
+                        return None
                     
-                    # Convert to DataFrame
+                    # Convert to DataFrame (empty: the API has no bars in the range)
                     if all_data:
-                        df = pd.DataFrame(all_data)
-                        df['date'] = pd.to_datetime(df['date'])
-                        # Make dates timezone-aware to match cached data (IST)
-                        if df['date'].dt.tz is None:
-                            ist = pytz.timezone('Asia/Kolkata')
-                            df['date'] = df['date'].dt.tz_localize(ist)
-                        return df
+                        return self._candles_to_frame(all_data)
                     
                     return pd.DataFrame()
                     
                 except Exception as e:
                     logger.error(f"Failed to fetch data: {str(e)}")
-                    return pd.DataFrame()
+                    return None
             
             # Get data from cache (will fetch missing data automatically)
-            df = self.cache.merge_and_get_data(
+            return self.cache.merge_and_get_data(
                 symbol=symbol,
                 from_date=from_date,
                 to_date=to_date,
                 interval=interval,
-                fetch_function=fetch_missing_data
+                fetch_function=fetch_missing_data,
+                return_format=return_format
             )
-            
-            # Convert DataFrame back to list of dicts for compatibility
-            if not df.empty:
-                return df.to_dict('records')
-            return []
         
         # Original implementation without cache
         try:
             # Get instrument token
-            if symbol not in self.symbol_token_map:
-                self.get_instruments()
-
-            instrument_token = self.symbol_token_map.get(symbol)
+            instrument_token = self.resolve_token(symbol)
             if not instrument_token:
                 logger.error(f"Instrument token not found for {symbol}")
-                return []
+                return format_frame(pd.DataFrame(), return_format)
 
-            # Fetch historical data
-            data = self.kite.historical_data(
-                instrument_token=instrument_token,
-                from_date=from_date,
-                to_date=to_date,
-                interval=interval
-            )
+            # Fetch historical data (chunked to the API's per-request limit)
+            data = self.fetcher.fetch(instrument_token, from_date, to_date, interval)
+            if data is None:
+                logger.error(f"Failed to fetch historical data for {symbol}")
+                return format_frame(pd.DataFrame(), return_format)
 
             logger.info(f"Fetched {len(data)} candles for {symbol}")
-            return data
+            if return_format == "records":
+                return data
+            return format_frame(self._candles_to_frame(data) if data else pd.DataFrame(),
+                                return_format)
 
         except Exception as e:
             logger.error(f"Failed to get historical data for {symbol}: {str(e)}")
-            return []
+            return format_frame(pd.DataFrame(), return_format)
+
+    def prefetch_historical_data(self, symbols: List[str], interval: str,
+                                 days: int = 30) -> Dict[str, int]:
+        """
+        Fetch history for many symbols concurrently and store it in the cache
+
+        All chunks of all symbols share one rate limiter, so there is no
+        need to sleep between symbols.
+
+        Args:
+            symbols: Trading symbols
+            interval: Candle interval
+            days: Number of days of history
+
+        Returns:
+            Dict of symbol -> number of candles fetched (0 = up to date or failed)
+        """
+        to_date = datetime.now()
+        from_date = to_date - timedelta(days=days)
+
+        requests = []
+        fetched = {}
+        for symbol in symbols:
+            fetched[symbol] = 0
+            instrument_token = self.resolve_token(symbol)
+            if not instrument_token:
+                logger.error(f"Instrument token not found for {symbol}")
+                continue
+
+            if self.use_cache and self.cache:
+                ranges = self.cache.get_missing_date_ranges(symbol, from_date, to_date, interval)
+            else:
+                ranges = [(from_date, to_date)]
+
+            for start, end in ranges:
+                requests.append(FetchRequest(symbol, instrument_token, start, end, interval))
+
+        for request, candles in self.fetcher.iter_fetch(requests):
+            if not candles:
+                continue
+            fetched[request.key] += len(candles)
+            if self.use_cache and self.cache:
+                self.cache.save_data(request.key, self._candles_to_frame(candles), interval,
+                                     covered=(request.from_date, request.to_date))
+
+        logger.info(f"Prefetched {sum(fetched.values())} candles for {len(symbols)} symbols "
+                    f"in {self.fetcher.api_calls} API calls")
+        return fetched
+
+    def sync_tail(self, interval: str = "day", symbols: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        Fetch only the bars after each cached symbol's last bar and append them
+
+        Cheap enough to run on a schedule (e.g. every 5 minutes intraday):
+        symbols without pending bars cost no API call.
+
+        Args:
+            interval: Candle interval to sync
+            symbols: Only these symbols (None = every cached symbol)
+
+        Returns:
+            Dict of symbol -> bars fetched
+        """
+        if not (self.use_cache and self.cache):
+            raise ValueError("Tail sync requires the cache")
+        self._ensure_instruments()
+        return sync_tail(self.cache, self.fetcher, self.symbol_token_map, interval, symbols)
+
+    @staticmethod
+    def _candles_to_frame(candles: List[Dict]) -> pd.DataFrame:
+        """Convert Kite candles to a DataFrame with IST-aware dates"""
+        return candles_to_frame(candles)
 
     def start_websocket(self, on_tick: Callable, on_connect: Callable = None,
                         on_close: Callable = None, on_error: Callable = None):
@@ -319,7 +390,8 @@ class ZerodhaClient:
         Start WebSocket for real-time data streaming
 
         Args:
-            on_tick: Callback for tick data
+            on_tick: Callback for tick data (e.g. CandleAggregator.on_kite_ticks
+                     to build closed bars)
             on_connect: Callback for connection established
             on_close: Callback for connection closed
             on_error: Callback for errors
@@ -357,8 +429,9 @@ class ZerodhaClient:
         # Get tokens for symbols
         tokens = []
         for symbol in symbols:
-            if symbol in self.symbol_token_map:
-                tokens.append(self.symbol_token_map[symbol])
+            token = self.resolve_token(symbol)
+            if token:
+                tokens.append(token)
             else:
                 logger.warning(f"Token not found for {symbol}")
 
@@ -24,6 +24,9 @@ from typing import Dict, List, Tuple
 # Import our modules
 from config.settings import TradingConfig
 from scanner.enhanced_bar_processor import EnhancedBarProcessor
+from core.batch_filters import (
+    normalized_slope_decline_series, volatility_filter_array, adx_series
+)
 from data.zerodha_client import ZerodhaClient
 import json
 
@@ -202,6 +205,22 @@ class SignalMismatchInvestigator:
             'python_only_dates': python_only_dates
         }
     
+    def compute_filter_series(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Compute regime/volatility/ADX filter values for every bar in one pass"""
+        ohlc4 = (df['open'] + df['high'] + df['low'] + df['close']).to_numpy() / 4.0
+        high = df['high'].to_numpy()
+        low = df['low'].to_numpy()
+        close = df['close'].to_numpy()
+
+        nsd = normalized_slope_decline_series(ohlc4, high, low)
+        return pd.DataFrame({
+            'date': df['date'],
+            'regime_nsd': nsd,
+            'regime': nsd >= self.config.regime_threshold,
+            'volatility': volatility_filter_array(high, low, close, 1, 10),
+            'adx': adx_series(high, low, close, 14)
+        })
+
     def trace_specific_signal(self, symbol: str, date_str: str, df: pd.DataFrame):
         """Trace why a signal was or wasn't generated on a specific date"""
         print(f"\n" + "="*70)
@@ -219,6 +238,15 @@ class SignalMismatchInvestigator:
             print(f"❌ Date {date_str} not found in data")
             return
             
+        # Filter context for the bars around the target date (one batch pass)
+        filters = self.compute_filter_series(df.iloc[:bar_idx + 1])
+        print(f"\n📊 Filter values leading up to {date_str}:")
+        for idx in range(max(0, bar_idx - 4), bar_idx + 1):
+            row = filters.iloc[idx]
+            print(f"  {row['date'].strftime('%Y-%m-%d')}: regime NSD={row['regime_nsd']:.4f} "
+                  f"({'✓' if row['regime'] else '❌'}), volatility={'✓' if row['volatility'] else '❌'}, "
+                  f"ADX={row['adx']:.2f}")
+
         # Process bars up to and including this date
         processor = EnhancedBarProcessor(self.config, symbol, "day")
         
@@ -242,6 +242,26 @@ class LorentzianKNNFixedCorrected:
 
         return min(normalized, 1.0)
     
+    def checkpoint(self) -> Tuple:
+        """
+        Capture the state one bar changes, for rollback()
+
+        Training labels are only appended (or the list replaced by a trimmed
+        copy), so the list and its length are enough; the neighbor window is
+        small (neighbors_count) and is copied.
+        """
+        return (self.y_train_array, len(self.y_train_array),
+                self.predictions.copy(), self.distances.copy(),
+                self.prediction, self.signal, self.last_valid_prediction,
+                self.max_neighbors_seen)
+
+    def rollback(self, state: Tuple) -> None:
+        """Undo everything since checkpoint() returned state"""
+        (self.y_train_array, train_size, self.predictions, self.distances,
+         self.prediction, self.signal, self.last_valid_prediction,
+         self.max_neighbors_seen) = state
+        del self.y_train_array[train_size:]
+
     def get_neighbor_count(self) -> int:
         """Get current number of neighbors in sliding window"""
         return len(self.predictions)
@@ -25,8 +25,7 @@ except ImportError as e:
 try:
     # Phase 2 imports
     from data.zerodha_client import ZerodhaClient
-    from data.data_manager import DataManager
-    from scanner.live_scanner import LiveScanner
+    from scanner.sharded_engine import ShardedScanEngine
     from utils.notifications import NotificationManager
 
     print("✅ Phase 2 components imported successfully")
@@ -146,7 +145,7 @@ else:
 print("\n✨ System test complete!")
 print("\nNext steps:")
 print("1. Run 'python auth_helper.py' if not authenticated")
-print("2. Run 'python scanner/live_scanner.py' to start scanning")
+print("2. Feed closed bars to scanner.sharded_engine.ShardedScanEngine to start scanning")
 print("3. Or run 'python main.py' for demo mode")
 
 # Test sound if on Mac
@@ -0,0 +1,230 @@
+"""
+Bar-Close Scheduler
+Orders the bars that arrive together at a candle close so the symbols
+that matter most are processed first
+
+    priority 0 - open position: an entry within the last HOLD_BARS bars,
+                 so this bar can produce its exit
+    priority 1 - near a signal flip: the ML prediction is small or points
+                 against the current signal
+    priority 2 - everything else (including symbols still warming up)
+
+Within a priority, the earliest deadline goes first, then arrival order.
+A symbol's bars are always processed oldest first; its priority is
+re-evaluated after each one. Every bar can carry a deadline (epoch
+seconds); finishing after it is counted as a miss per priority.
+
+With a BarJournal, every bar is journaled before it is processed and the
+journal is synced once per run() (see data/bar_journal.py).
+"""
+import time
+import heapq
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from data.bar_journal import BarJournal
+from utils.latency import LatencyTracer
+from .enhanced_bar_processor import BarResult, EnhancedBarProcessor
+
+logger = logging.getLogger(__name__)
+
+# Pine Script's fixed exit: a position is closed 4 bars after its entry
+HOLD_BARS = 4
+
+PRIORITY_POSITION = 0
+PRIORITY_NEAR_FLIP = 1
+PRIORITY_IDLE = 2
+PRIORITY_NAMES = ('position', 'near_flip', 'idle')
+
+
+@dataclass
+class ScheduledBar:
+    """A closed bar waiting to be processed"""
+    symbol: str
+    timestamp: int  # Bar open, epoch seconds
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float = 0.0
+    deadline: Optional[float] = None  # Epoch seconds (None = no deadline)
+    received: Optional[float] = None  # Arrival of the bar's last tick (latency tracing)
+    closed_at: Optional[float] = None  # When the candle was closed (latency tracing)
+
+
+def position_bars_held(processor: EnhancedBarProcessor) -> Optional[int]:
+    """
+    Bars since the symbol's most recent entry, None if it has no entry
+
+    Uses the same bars_held calculation as the processor's exit logic.
+    """
+    history = processor.entry_history
+    if not history:
+        return None
+    bars_held = processor.signal_generator.calculate_bars_held(history)
+    start_long, start_short = history[bars_held]
+    return bars_held if start_long or start_short else None
+
+
+def bar_priority(processor: EnhancedBarProcessor, flip_margin: float = 2.0) -> int:
+    """
+    Priority of a symbol's next bar (lower goes first)
+
+    Args:
+        processor: The symbol's processor (committed state)
+        flip_margin: |prediction| at or below which a flip counts as near
+
+    Returns:
+        PRIORITY_POSITION, PRIORITY_NEAR_FLIP or PRIORITY_IDLE
+    """
+    bars_held = position_bars_held(processor)
+    if bars_held is not None and bars_held < HOLD_BARS:
+        return PRIORITY_POSITION
+
+    # No signals until the next bar index reaches max_bars_back
+    if processor.bars.bar_index + 1 < processor.settings.max_bars_back:
+        return PRIORITY_IDLE
+
+    prediction = processor.ml_model.prediction
+    signal = processor.ml_model.signal
+    if abs(prediction) <= flip_margin or prediction * signal < 0:
+        return PRIORITY_NEAR_FLIP
+    return PRIORITY_IDLE
+
+
+class BarScheduler:
+    """
+    Priority scheduler for bars that close at the same time
+
+    Key features:
+    - Open positions first, then symbols near a signal flip, then the rest
+    - Earliest deadline first within a priority
+    - Per-symbol order preserved; priority re-evaluated after every bar
+    - Deadline misses and lateness reported per priority
+    """
+
+    def __init__(self, processor_for: Callable[[str], EnhancedBarProcessor],
+                 flip_margin: float = 2.0, clock: Callable[[], float] = time.time,
+                 recent_misses: int = 100, tracer: Optional[LatencyTracer] = None,
+                 journal: Optional[BarJournal] = None):
+        """
+        Args:
+            processor_for: Returns (or creates) the processor of a symbol
+            flip_margin: |prediction| at or below which a flip counts as near
+            clock: Epoch-seconds clock the deadlines are compared against
+            recent_misses: Misses kept for reporting (oldest dropped first)
+            tracer: Marks tick/candle_close (if the bar has them), dequeue,
+                    process_start and process_end
+            journal: Write-ahead journal for crash recovery (synced at the end of run())
+        """
+        self.processor_for = processor_for
+        self.flip_margin = flip_margin
+        self.clock = clock
+        self.tracer = tracer
+        self.journal = journal
+
+        self._queues: Dict[str, Deque[ScheduledBar]] = {}
+        self._heap: List[Tuple[int, float, int, str]] = []
+        self._sequence = 0
+
+        self.processed = [0] * len(PRIORITY_NAMES)
+        self.missed = [0] * len(PRIORITY_NAMES)
+        self.max_lateness = [0.0] * len(PRIORITY_NAMES)
+        self.errors = 0
+        # (symbol, timestamp, priority name, seconds late)
+        self.recent_misses: Deque[Tuple[str, int, str, float]] = deque(maxlen=recent_misses)
+
+    def submit(self, bar: ScheduledBar):
+        """Queue a closed bar (bars of one symbol must arrive oldest first)"""
+        if self.tracer is not None:
+            if bar.received is not None:
+                self.tracer.mark(bar.symbol, bar.timestamp, 'tick', bar.received)
+            if bar.closed_at is not None:
+                self.tracer.mark(bar.symbol, bar.timestamp, 'candle_close', bar.closed_at)
+        queue = self._queues.get(bar.symbol)
+        if queue:
+            # The symbol is already scheduled by its oldest bar
+            queue.append(bar)
+            return
+        self._queues[bar.symbol] = deque((bar,))
+        self._schedule(bar)
+
+    def _schedule(self, bar: ScheduledBar):
+        """Push a symbol onto the heap, keyed by its next bar"""
+        priority = bar_priority(self.processor_for(bar.symbol), self.flip_margin)
+        deadline = bar.deadline if bar.deadline is not None else float('inf')
+        self._sequence += 1
+        heapq.heappush(self._heap, (priority, deadline, self._sequence, bar.symbol))
+
+    def pending(self) -> int:
+        """Bars queued and not yet processed"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def run(self) -> List[Tuple[ScheduledBar, Optional[BarResult]]]:
+        """
+        Process every queued bar in priority order
+
+        A bar whose processing raised is logged, counted in errors and left
+        out of the returned list.
+
+        Returns:
+            (bar, result) pairs in the order they were processed
+        """
+        done = []
+        while self._heap:
+            priority, _, _, symbol = heapq.heappop(self._heap)
+            queue = self._queues[symbol]
+            bar = queue.popleft()
+            tracer = self.tracer
+            if tracer is not None:
+                tracer.mark(symbol, bar.timestamp, 'dequeue')
+            try:
+                processor = self.processor_for(symbol)
+                if self.journal is not None:
+                    self.journal.append(symbol, processor.timeframe, bar.timestamp, bar.open,
+                                        bar.high, bar.low, bar.close, bar.volume)
+                if tracer is not None:
+                    tracer.mark(symbol, bar.timestamp, 'process_start')
+                result = processor.process_bar(bar.open, bar.high, bar.low, bar.close, bar.volume)
+                if tracer is not None:
+                    tracer.mark(symbol, bar.timestamp, 'process_end')
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Scheduler: {symbol} bar {bar.timestamp} failed: {e}")
+            else:
+                done.append((bar, result))
+                self._account(bar, priority)
+
+            if queue:
+                self._schedule(queue[0])
+            else:
+                del self._queues[symbol]
+        if self.journal is not None:
+            self.journal.sync()
+        return done
+
+    def _account(self, bar: ScheduledBar, priority: int):
+        """Count a processed bar and check its deadline"""
+        self.processed[priority] += 1
+        if bar.deadline is None:
+            return
+        lateness = self.clock() - bar.deadline
+        if lateness > 0:
+            self.missed[priority] += 1
+            self.max_lateness[priority] = max(self.max_lateness[priority], lateness)
+            self.recent_misses.append((bar.symbol, bar.timestamp, PRIORITY_NAMES[priority], lateness))
+            logger.debug(f"Scheduler: {bar.symbol} bar {bar.timestamp} "
+                         f"({PRIORITY_NAMES[priority]}) {lateness:.3f}s past deadline")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Processed bars, deadline misses and worst lateness per priority"""
+        return {
+            name: {
+                'processed': self.processed[priority],
+                'missed': self.missed[priority],
+                'max_lateness': self.max_lateness[priority],
+            }
+            for priority, name in enumerate(PRIORITY_NAMES)
+        }
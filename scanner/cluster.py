@@ -0,0 +1,578 @@
+"""
+Multi-Node Scanning Cluster
+Spreads symbols over scan nodes (processes on one or many machines) with
+consistent hashing, and moves processor state when nodes join or leave
+
+    coordinator                                  scan nodes
+    submit_many(bars) --- bars per owner ------> ScanNode: processors[symbol]
+    get_signals() <------ signals (one stream) --'
+    add_node / remove_node: export state -> import on new owner -> drop on old
+
+Transport is multiprocessing.connection (TCP, authenticated with a shared
+key, pickled messages), so a cluster runs entirely on localhost in tests
+and across machines in production. Only use it on a trusted network.
+
+Each symbol hashes to a point on a ring of virtual nodes; adding or removing
+a node only moves the symbols whose arc changes owner (about 1/N of them).
+A moved symbol's processor is pickled on its old node and restored on the
+new one, so no history has to be replayed. The old node keeps its copy
+until the import has succeeded, so a failed migration loses nothing. The
+coordinator waits for every node's reply to a batch, so no bars are in
+flight while state migrates, and signals from all nodes are merged into one
+stream ordered by bar time. If a node fails or dies, the request raises
+ClusterError once every other node has replied (their signals are kept), so
+the connections stay in step.
+
+Start a node on another machine with:
+
+    python -m scanner.cluster --name node1 --host 0.0.0.0 --port 6001 --authkey <key>
+"""
+import pickle
+import bisect
+import hashlib
+import logging
+import threading
+import multiprocessing
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config.settings import TradingConfig
+from .bar_scheduler import BarScheduler, ScheduledBar
+from .enhanced_bar_processor import EnhancedBarProcessor
+from .sharded_engine import ClosedBar, _signal_from_result
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VNODES = 64
+
+# Message kinds
+_BARS = 'bars'
+_PRIME = 'prime'
+_EXPORT = 'export'
+_IMPORT = 'import'
+_DROP = 'drop'
+_STATS = 'stats'
+_STOP = 'stop'
+_OK = 'ok'
+_ERROR = 'error'
+
+Address = Tuple[str, int]
+
+
+class ClusterError(RuntimeError):
+    """A request failed on some nodes; replies holds the other nodes' answers"""
+
+    def __init__(self, failures: List[str], replies: Dict[str, object]):
+        super().__init__(f"Scan node request failed ({'; '.join(failures)})")
+        self.failures = failures
+        self.replies = replies
+
+
+def _ring_hash(key: str) -> int:
+    # CRC32 clusters similar names (SYM1, SYM2, ...); MD5 spreads them evenly
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """
+    Consistent hash ring with virtual nodes
+
+    Key features:
+    - Stable symbol -> node mapping across processes and runs (MD5)
+    - vnodes points per node for an even spread
+    - Adding/removing a node only remaps the symbols on its arcs
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = DEFAULT_VNODES):
+        """
+        Args:
+            nodes: Initial node names
+            vnodes: Ring points per node
+        """
+        self.vnodes = vnodes
+        self._points: List[Tuple[int, str]] = []
+        self._hashes: List[int] = []
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted({node for _, node in self._points})
+
+    def add(self, node: str):
+        if node in self.nodes:
+            raise ValueError(f"Node {node!r} is already on the ring")
+        for i in range(self.vnodes):
+            bisect.insort(self._points, (_ring_hash(f"{node}#{i}"), node))
+        self._hashes = [point for point, _ in self._points]
+
+    def remove(self, node: str):
+        self._points = [(point, owner) for point, owner in self._points if owner != node]
+        self._hashes = [point for point, _ in self._points]
+
+    def node_for(self, symbol: str) -> str:
+        """Owner of a symbol: the first ring point at or after its hash"""
+        if not self._points:
+            raise RuntimeError("Hash ring has no nodes")
+        i = bisect.bisect_left(self._hashes, _ring_hash(symbol)) % len(self._points)
+        return self._points[i][1]
+
+
+class ScanNode:
+    """
+    Scan node: owns the processors of the symbols routed to it
+
+    Key features:
+    - Serves one coordinator connection at a time (reconnects allowed)
+    - Bars processed through a BarScheduler (open positions first)
+    - Stale bars (at or before a symbol's last bar) dropped
+    - Processor state exported/imported as pickles for migration
+    """
+
+    def __init__(self, name: str, config: Optional[TradingConfig] = None,
+                 timeframe: str = "5minute", address: Address = ('127.0.0.1', 0),
+                 authkey: bytes = b'scanner'):
+        """
+        Args:
+            name: Node name (its position on the ring)
+            config: Trading configuration for every processor
+            timeframe: Timeframe passed to the processors
+            address: (host, port) to listen on (port 0 = any free port)
+            authkey: Shared key the coordinator must present
+        """
+        self.name = name
+        self.config = config or TradingConfig()
+        self.timeframe = timeframe
+        self.processors: Dict[str, EnhancedBarProcessor] = {}
+        self.last_timestamp: Dict[str, int] = {}
+        self.scheduler = BarScheduler(self._processor_for)
+        self.stats = {'bars': 0, 'primed': 0, 'stale': 0, 'errors': 0, 'signals': 0,
+                      'exported': 0, 'imported': 0, 'dropped': 0}
+        self._listener = Listener(address, authkey=authkey)
+        self.address: Address = self._listener.address
+
+    def _processor_for(self, symbol: str) -> EnhancedBarProcessor:
+        processor = self.processors.get(symbol)
+        if processor is None:
+            processor = self.processors[symbol] = EnhancedBarProcessor(
+                self.config, symbol, self.timeframe)
+        return processor
+
+    def serve_forever(self):
+        """Handle coordinator connections until a stop message"""
+        logger.info(f"Scan node {self.name} listening on {self.address}")
+        try:
+            while True:
+                with self._listener.accept() as conn:
+                    if not self._serve(conn):
+                        return
+        finally:
+            self._listener.close()
+
+    def _serve(self, conn: Connection) -> bool:
+        """One connection; False once stopped"""
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                return True  # Coordinator went away; wait for the next one
+            try:
+                reply = (_OK, self.handle(message))
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Scan node {self.name}: {message[0]} failed: {e}")
+                reply = (_ERROR, f"{type(e).__name__}: {e}")
+            conn.send(reply)
+            if message[0] == _STOP:
+                return False
+
+    def handle(self, message: tuple):
+        """Apply one coordinator message; returns the reply payload"""
+        kind = message[0]
+        if kind == _BARS:
+            return self._process(message[1])
+        if kind == _PRIME:
+            _, symbol, timestamps, columns = message
+            self._processor_for(symbol).process_bars(*columns)
+            self.last_timestamp[symbol] = int(timestamps[-1])
+            self.stats['primed'] += len(timestamps)
+            return None
+        if kind == _EXPORT:
+            # A copy: the processors stay here until the coordinator drops them
+            states = {}
+            for symbol in message[1]:
+                processor = self.processors.get(symbol)
+                if processor is not None:
+                    states[symbol] = pickle.dumps(
+                        (processor, self.last_timestamp.get(symbol)),
+                        protocol=pickle.HIGHEST_PROTOCOL)
+            self.stats['exported'] += len(states)
+            return states
+        if kind == _IMPORT:
+            for symbol, state in message[1].items():
+                processor, last_timestamp = pickle.loads(state)
+                self.processors[symbol] = processor
+                if last_timestamp is not None:
+                    self.last_timestamp[symbol] = last_timestamp
+            self.stats['imported'] += len(message[1])
+            return None
+        if kind == _DROP:
+            dropped = 0
+            for symbol in message[1]:
+                self.last_timestamp.pop(symbol, None)
+                if self.processors.pop(symbol, None) is not None:
+                    dropped += 1
+            self.stats['dropped'] += dropped
+            return dropped
+        if kind in (_STATS, _STOP):
+            return dict(self.stats, symbols=len(self.processors),
+                        scheduler_errors=self.scheduler.errors)
+        raise ValueError(f"Unknown message {kind!r}")
+
+    def _process(self, bars: List[tuple]) -> List[Dict]:
+        """Process a batch of bar tuples; returns the entry signals"""
+        for symbol, timestamp, open_, high, low, close, volume in bars:
+            if timestamp <= self.last_timestamp.get(symbol, -1):
+                self.stats['stale'] += 1
+                continue
+            self.scheduler.submit(ScheduledBar(symbol, timestamp, open_, high, low, close, volume))
+
+        signals = []
+        for bar, result in self.scheduler.run():
+            self.last_timestamp[bar.symbol] = bar.timestamp
+            self.stats['bars'] += 1
+            if result is not None and (result.start_long_trade or result.start_short_trade):
+                signals.append(_signal_from_result(bar.symbol, bar.timestamp, result, self.name))
+        self.stats['signals'] += len(signals)
+        return signals
+
+
+def _node_main(name: str, config: TradingConfig, timeframe: str, authkey: bytes, ready):
+    """Process entry point for start_local_node"""
+    node = ScanNode(name, config, timeframe, ('127.0.0.1', 0), authkey)
+    ready.send(node.address)
+    ready.close()
+    node.serve_forever()
+
+
+def start_local_node(name: str, config: Optional[TradingConfig] = None,
+                     timeframe: str = "5minute", authkey: bytes = b'scanner',
+                     start_method: Optional[str] = None) -> Tuple[multiprocessing.Process, Address]:
+    """
+    Run a ScanNode in a local process on a free localhost port
+
+    Returns:
+        (process, address) - stop it with the coordinator (close or remove_node)
+    """
+    context = multiprocessing.get_context(start_method)
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_node_main,
+                              args=(name, config or TradingConfig(), timeframe, authkey, sender),
+                              name=f"scan-node-{name}", daemon=True)
+    process.start()
+    sender.close()
+    address = receiver.recv()
+    receiver.close()
+    return process, address
+
+
+class ClusterCoordinator:
+    """
+    Routes bars to scan nodes by consistent hashing and merges their signals
+
+    Key features:
+    - Symbol -> node by HashRing (only ~1/N of symbols move on a change)
+    - One batch per node per submit, sent to all nodes before waiting
+    - add_node/remove_node migrate the moved symbols' processor state
+    - Signals from every node merged into one stream ordered by bar time
+    """
+
+    def __init__(self, nodes: Dict[str, Address], authkey: bytes = b'scanner',
+                 vnodes: int = DEFAULT_VNODES):
+        """
+        Args:
+            nodes: {node name: (host, port)} of running ScanNodes
+            authkey: Shared key of the nodes
+            vnodes: Ring points per node
+        """
+        self.authkey = authkey
+        self.ring = HashRing(vnodes=vnodes)
+        self._connections: Dict[str, Connection] = {}
+        self._owners: Dict[str, str] = {}  # Symbols seen -> node holding their state
+        self._signals: List[Dict] = []
+        self._lock = threading.RLock()
+        self.stats = {'submitted': 0, 'batches': 0, 'migrated': 0, 'rebalances': 0, 'lost': 0}
+        self.lost_symbols: Set[str] = set()  # State lost with a dead node (cold until primed)
+        for name, address in nodes.items():
+            self._connections[name] = Client(address, authkey=authkey)
+            self.ring.add(name)
+
+    # Transport
+    def _exchange(self, messages: Dict[str, tuple]) -> Dict[str, object]:
+        """
+        Send one message to each node, then collect every reply
+
+        Every sent message's reply is read even if another node fails, so no
+        reply is left queued for the next request. A node whose connection
+        broke is closed (later requests to it fail at once). Any failure
+        raises ClusterError carrying the replies of the other nodes.
+        """
+        sent, failures = [], []
+        for name, message in messages.items():
+            try:
+                self._connections[name].send(message)
+            except (EOFError, OSError) as e:
+                failures.append(self._connection_lost(name, e))
+            except Exception as e:  # Not sent (e.g. unpicklable): connection intact
+                failures.append(f"{name}: {type(e).__name__}: {e}")
+            else:
+                sent.append(name)
+        replies = {}
+        for name in sent:
+            try:
+                status, payload = self._connections[name].recv()
+            except (EOFError, OSError) as e:
+                failures.append(self._connection_lost(name, e))
+                continue
+            if status == _ERROR:
+                failures.append(f"{name}: {payload}")
+            else:
+                replies[name] = payload
+        if failures:
+            raise ClusterError(failures, replies)
+        return replies
+
+    def _connection_lost(self, name: str, error: Exception) -> str:
+        self._connections[name].close()
+        logger.error(f"Lost connection to scan node {name}: {error!r}")
+        return f"{name}: connection lost ({type(error).__name__})"
+
+    # Routing
+    def node_for(self, symbol: str) -> str:
+        """Node that owns a symbol"""
+        return self.ring.node_for(symbol)
+
+    def prime(self, symbol: str, timestamps, open_prices, highs, lows, closes, volumes=None):
+        """Warm a symbol's processor up with history on its node (no signals)"""
+        columns = tuple(np.asarray(column, dtype=np.float64)
+                        for column in (open_prices, highs, lows, closes))
+        volumes = None if volumes is None else np.asarray(volumes, dtype=np.float64)
+        with self._lock:
+            node = self._owners.setdefault(symbol, self.node_for(symbol))
+            self._exchange({node: (_PRIME, symbol, np.asarray(timestamps, dtype=np.int64),
+                                   columns + (volumes,))})
+            self.lost_symbols.discard(symbol)
+
+    def submit_many(self, bars: Iterable[ClosedBar]) -> List[Dict]:
+        """
+        Process closed bars on their nodes and wait for them
+
+        Returns:
+            This batch's signals (also queued for get_signals)
+        """
+        batches: Dict[str, List[tuple]] = {}
+        with self._lock:
+            for bar in bars:
+                node = self._owners.setdefault(bar.symbol, self.node_for(bar.symbol))
+                batches.setdefault(node, []).append(
+                    (bar.symbol, int(bar.timestamp), float(bar.open), float(bar.high),
+                     float(bar.low), float(bar.close), float(bar.volume)))
+                self.stats['submitted'] += 1
+            if not batches:
+                return []
+            self.stats['batches'] += len(batches)
+            try:
+                replies = self._exchange({node: (_BARS, sorted(batch, key=lambda b: b[1]))
+                                          for node, batch in batches.items()})
+            except ClusterError as e:
+                # The healthy nodes did process their bars: keep those signals
+                self._signals.extend(self._merge_signals(e.replies.values()))
+                raise
+            signals = self._merge_signals(replies.values())
+            self._signals.extend(signals)
+            return signals
+
+    @staticmethod
+    def _merge_signals(replies: Iterable[List[Dict]]) -> List[Dict]:
+        """Signals of several nodes as one stream ordered by bar time"""
+        return sorted((signal for reply in replies for signal in reply),
+                      key=lambda signal: (signal['timestamp'], signal['symbol']))
+
+    def get_signals(self) -> List[Dict]:
+        """Signals produced since the last call, ordered by bar time per batch"""
+        with self._lock:
+            signals, self._signals = self._signals, []
+            return signals
+
+    # Membership
+    def add_node(self, name: str, address: Address) -> int:
+        """
+        Join a running ScanNode and move the symbols it now owns onto it
+
+        Returns:
+            Symbols migrated
+        """
+        with self._lock:
+            self._connections[name] = Client(address, authkey=self.authkey)
+            self.ring.add(name)
+            try:
+                return self._rebalance()
+            except ClusterError:
+                # Nothing moved: the old owners still hold every processor
+                self.ring.remove(name)
+                self._disconnect(name, stop=False)
+                raise
+
+    def remove_node(self, name: str, stop: bool = True, force: bool = False) -> int:
+        """
+        Move a node's symbols to their new owners, then disconnect it
+
+        A node that cannot be reached (its connection was lost, e.g. it
+        crashed) or is removed with force=True is evicted: its symbols go to
+        their new owners without state, start cold there and are listed in
+        lost_symbols until primed again.
+
+        Args:
+            name: Node to remove
+            stop: Also stop the node process
+            force: Evict without exporting state
+
+        Returns:
+            Symbols migrated (including evicted ones)
+        """
+        with self._lock:
+            if name not in self._connections:
+                raise KeyError(f"Unknown node {name!r}")
+            conn = self._connections[name]
+            self.ring.remove(name)
+            try:
+                moved = self._rebalance(lost=name if force or conn.closed else None)
+            except ClusterError:
+                if not conn.closed:
+                    self.ring.add(name)  # Still the owner of its symbols
+                    raise
+                # The node died during the export: nothing moved yet, evict it
+                moved = self._rebalance(lost=name)
+            self._disconnect(name, stop and not conn.closed)
+            return moved
+
+    def _rebalance(self, lost: Optional[str] = None) -> int:
+        """
+        Move every symbol whose owner changed: copy its state from the old
+        owner, import it on the new one, switch ownership, then drop the old
+        copy. If the export or import fails, ownership stays as it was.
+
+        Args:
+            lost: Unreachable node; its symbols are reassigned without state
+        """
+        moves: Dict[str, Dict[str, str]] = {}  # old node -> {symbol: new node}
+        for symbol, owner in self._owners.items():
+            target = self.node_for(symbol)
+            if target != owner:
+                moves.setdefault(owner, {})[symbol] = target
+        evicted = moves.pop(lost, {}) if lost is not None else {}
+        if not moves and not evicted:
+            return 0
+
+        imports: Dict[str, Dict[str, bytes]] = {}
+        if moves:
+            exported = self._exchange({node: (_EXPORT, list(symbols))
+                                       for node, symbols in moves.items()})
+            for old, states in exported.items():
+                for symbol, state in states.items():
+                    imports.setdefault(moves[old][symbol], {})[symbol] = state
+        if imports:
+            try:
+                self._exchange({node: (_IMPORT, states) for node, states in imports.items()})
+            except ClusterError:
+                # Some targets may have imported: remove those unused copies
+                self._drop({node: list(states) for node, states in imports.items()})
+                raise
+        for symbols in moves.values():
+            for symbol, target in symbols.items():
+                self._owners[symbol] = target
+        if moves:
+            self._drop({old: list(symbols) for old, symbols in moves.items()})
+
+        if evicted:
+            # Their processors died with the node: the new owners start cold
+            for symbol, target in evicted.items():
+                self._owners[symbol] = target
+            self.lost_symbols.update(evicted)
+            self.stats['lost'] += len(evicted)
+            logger.warning(f"Scan node {lost} evicted: state of {len(evicted)} symbols lost, "
+                           f"they restart cold (prime them again): {sorted(evicted)}")
+
+        moved = sum(len(symbols) for symbols in moves.values())
+        state_bytes = sum(len(s) for states in imports.values() for s in states.values())
+        self.stats['migrated'] += moved
+        self.stats['rebalances'] += 1
+        logger.info(f"Cluster rebalance: {moved} symbols moved ({state_bytes:,} bytes of state)"
+                    + (f", {len(evicted)} reassigned cold" if evicted else ""))
+        return moved + len(evicted)
+
+    def _drop(self, symbols_by_node: Dict[str, List[str]]):
+        """Delete processors a node no longer owns (best effort: a leftover is never routed to)"""
+        try:
+            self._exchange({node: (_DROP, symbols) for node, symbols in symbols_by_node.items()
+                            if node in self._connections})
+        except ClusterError as e:
+            logger.warning(f"Could not drop migrated processors: {e}")
+
+    def _disconnect(self, name: str, stop: bool):
+        conn = self._connections.pop(name)
+        try:
+            if stop:
+                conn.send((_STOP,))
+                conn.recv()
+        except (EOFError, OSError) as e:
+            logger.warning(f"Scan node {name} did not stop cleanly: {e}")
+        finally:
+            conn.close()
+
+    # Status
+    def symbols_by_node(self) -> Dict[str, List[str]]:
+        with self._lock:
+            result: Dict[str, List[str]] = {name: [] for name in self._connections}
+            for symbol, node in self._owners.items():
+                result[node].append(symbol)
+            return result
+
+    def node_stats(self) -> Dict[str, Dict[str, int]]:
+        """Counters of every node"""
+        with self._lock:
+            return self._exchange({name: (_STATS,) for name in self._connections})
+
+    def close(self, stop_nodes: bool = True):
+        """Disconnect from (and by default stop) every node"""
+        with self._lock:
+            for name in list(self._connections):
+                self._disconnect(name, stop_nodes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a scan node")
+    parser.add_argument("--name", required=True, help="Node name (ring position)")
+    parser.add_argument("--host", default="127.0.0.1", help="Listen address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=6001, help="Listen port (default: 6001)")
+    parser.add_argument("--authkey", required=True, help="Key shared with the coordinator")
+    parser.add_argument("--timeframe", default="5minute", help="Processor timeframe (default: 5minute)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    ScanNode(args.name, TradingConfig(), args.timeframe, (args.host, args.port),
+             args.authkey.encode('utf-8')).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,8 @@ to maintain state across bars, just like Pine Script.
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 
+import numpy as np
+
 from data.data_types import (
     Settings, Label, FeatureArrays, FeatureSeries,
     Filter, FilterSettings
@@ -19,8 +21,9 @@ from config.settings import TradingConfig
 from core.enhanced_indicators import (
     enhanced_series_from, enhanced_ema, enhanced_sma, enhanced_atr,
     enhanced_change, enhanced_crossover, enhanced_crossunder,
-    enhanced_barssince, get_indicator_manager, reset_symbol_indicators
+    enhanced_barssince
 )
+from core.indicator_state_manager import IndicatorContext
 from core.enhanced_ml_extensions import enhanced_regime_filter, enhanced_filter_adx, enhanced_filter_volatility
 from core.kernel_functions import is_kernel_bullish, is_kernel_bearish, get_kernel_crossovers
 from ml.lorentzian_knn_fixed_corrected import LorentzianKNNFixedCorrected
@@ -77,7 +80,8 @@ class EnhancedBarProcessor:
     - More efficient and accurate (matches Pine Script behavior)
     """
 
-    def __init__(self, config: TradingConfig, symbol: str, timeframe: str = "5min", debug_mode: bool = False):
+    def __init__(self, config: TradingConfig, symbol: str, timeframe: str = "5min", debug_mode: bool = False,
+                 indicator_context: Optional[IndicatorContext] = None):
         """
         Initialize with configuration and symbol info
 
@@ -86,6 +90,7 @@ class EnhancedBarProcessor:
             symbol: Trading symbol (e.g., 'RELIANCE')
             timeframe: Timeframe for indicators (e.g., '5min', 'daily')
             debug_mode: Enable comprehensive debug logging
+            indicator_context: Indicator state to use (a fresh one is created if None)
         """
         self.config = config
         self.symbol = symbol
@@ -94,8 +99,8 @@ class EnhancedBarProcessor:
         self.settings = config.get_settings()
         self.filter_settings = config.get_filter_settings()
 
-        # Reset indicators for this symbol to ensure clean state
-        reset_symbol_indicators(symbol)
+        # Indicator state owned by this processor (not shared with other processors)
+        self.indicator_context = indicator_context or IndicatorContext(f"{symbol}:{timeframe}")
 
         # Initialize components
         self.label = Label()
@@ -140,6 +145,64 @@ class EnhancedBarProcessor:
         Returns:
             BarResult with all calculated values, or None if invalid data
         """
+        return self._process_bar(open_price, high, low, close, volume)
+
+    def preview_bar(self, open_price: float, high: float, low: float,
+                    close: float, volume: float = 0.0) -> Optional[BarResult]:
+        """
+        Result the forming bar would give if it closed now, without committing it
+
+        Runs the same calculation as process_bar() on top of the committed
+        state and then undoes it, so it can be called on every tick of the
+        current candle. Only what the bar changes is saved: the indicators
+        it touches (captured on first access), the appended history entries
+        and the ML neighbor window. Debug output and counters are skipped.
+
+        Args:
+            open_price, high, low, close, volume: OHLCV of the forming bar so far
+
+        Returns:
+            The BarResult process_bar() would return for this bar, or None if invalid data
+        """
+        bars_processed = self.bars_processed
+        bar_index = self.bars.bar_index
+        trimmed = self.bars.oldest_bar() if len(self.bars) >= self.bars.max_bars else None
+        ema_value, sma_value = self.current_ema_value, self.current_sma_value
+        # History lists are only prepended to (or replaced by a truncated copy)
+        signal_history, entry_history = self.signal_history, self.entry_history
+        history_size = len(signal_history), len(entry_history)
+        feature_lists = self._feature_lists()
+        feature_size = len(feature_lists[0])
+        ml_state = self.ml_model.checkpoint()
+        self.indicator_context.checkpoint()
+        try:
+            return self._process_bar(open_price, high, low, close, volume, preview=True)
+        finally:
+            self.indicator_context.rollback()
+            self.ml_model.rollback(ml_state)
+            if self.bars.bar_index != bar_index:
+                self.bars.remove_bar(trimmed)
+            if len(signal_history) > history_size[0]:
+                del signal_history[0]
+            if len(entry_history) > history_size[1]:
+                del entry_history[0]
+            (self.feature_arrays.f1, self.feature_arrays.f2, self.feature_arrays.f3,
+             self.feature_arrays.f4, self.feature_arrays.f5) = feature_lists
+            for values in feature_lists:
+                del values[feature_size:]
+            self.signal_history, self.entry_history = signal_history, entry_history
+            self.current_ema_value, self.current_sma_value = ema_value, sma_value
+            self.bars_processed = bars_processed
+
+    def _feature_lists(self) -> Tuple[List[float], ...]:
+        """The five feature arrays as a tuple"""
+        arrays = self.feature_arrays
+        return arrays.f1, arrays.f2, arrays.f3, arrays.f4, arrays.f5
+
+    def _process_bar(self, open_price: float, high: float, low: float,
+                     close: float, volume: float = 0.0,
+                     preview: bool = False) -> Optional[BarResult]:
+        """Shared body of process_bar() and preview_bar() (no debug output if preview)"""
         # Validate input data
         is_valid, error_msg = validate_ohlcv(open_price, high, low, close, volume)
         if not is_valid:
@@ -175,7 +238,7 @@ class EnhancedBarProcessor:
         # For streaming data, we don't know last_bar_index, so we check if we have enough bars
         # ML predictions only start after we have maxBarsBack worth of data
         if bar_index >= self.settings.max_bars_back:
-            if self.debug_mode:
+            if self.debug_mode and not preview:
                 # Use debug version of predict if available
                 if hasattr(self.ml_model, 'predict_with_debug'):
                     self.ml_model.predict_with_debug(
@@ -194,7 +257,7 @@ class EnhancedBarProcessor:
             self.ml_model.prediction = 0.0
             
             # Log warmup progress periodically
-            if bar_index % 500 == 0 and bar_index > 0:
+            if bar_index % 500 == 0 and bar_index > 0 and not preview:
                 remaining = self.settings.max_bars_back - bar_index
                 print(f"   📊 ML Warmup: {bar_index}/{self.settings.max_bars_back} bars "
                       f"({remaining} bars until ML predictions begin)")
@@ -209,25 +272,8 @@ class EnhancedBarProcessor:
         # Update signal based on prediction AND filters
         signal = self.ml_model.update_signal(filter_all)
         
-        # Update debug counters if enabled
-        if self.debug_mode:
-            if filter_states['volatility']:
-                self.volatility_pass_count += 1
-            if filter_states['regime']:
-                self.regime_pass_count += 1
-            if filter_states['adx']:
-                self.adx_pass_count += 1
-            self.total_bars_for_filters += 1
-        
-        # Debug output
-        if self.debug_mode and (self.bars_processed % 10 == 0 or signal != (self.signal_history[0] if self.signal_history else 0)):
-            self._log_debug_info(bar_index, ml_prediction, signal, filter_states, filter_all)
-        elif self.bars_processed % 100 == 0 or (self.bars_processed > 50 and abs(ml_prediction) < 0.1):
-            print(f"\n📊 Enhanced DEBUG Bar {bar_index} [{self.symbol}]:")
-            print(f"  ML Prediction (raw): {ml_prediction:.2f}")
-            print(f"  Signal (after filters): {signal}")
-            print(f"  Filters: {filter_states}")
-            print(f"  Training data: {len(self.ml_model.y_train_array)} bars")
+        if not preview:
+            self._debug_bar(bar_index, ml_prediction, signal, filter_states, filter_all)
 
         # Calculate trend filters using stateful indicators
         is_ema_uptrend, is_ema_downtrend = self._calculate_ema_trend_stateful(close)
@@ -321,6 +367,55 @@ class EnhancedBarProcessor:
             take_profit=take_profit
         )
 
+    def _debug_bar(self, bar_index: int, ml_prediction: float, signal: int,
+                   filter_states: Dict[str, bool], filter_all: bool):
+        """Debug counters and output for a committed bar"""
+        # Update debug counters if enabled
+        if self.debug_mode:
+            if filter_states['volatility']:
+                self.volatility_pass_count += 1
+            if filter_states['regime']:
+                self.regime_pass_count += 1
+            if filter_states['adx']:
+                self.adx_pass_count += 1
+            self.total_bars_for_filters += 1
+        
+        # Debug output
+        if self.debug_mode and (self.bars_processed % 10 == 0 or signal != (self.signal_history[0] if self.signal_history else 0)):
+            self._log_debug_info(bar_index, ml_prediction, signal, filter_states, filter_all)
+        elif self.bars_processed % 100 == 0 or (self.bars_processed > 50 and abs(ml_prediction) < 0.1):
+            print(f"\n📊 Enhanced DEBUG Bar {bar_index} [{self.symbol}]:")
+            print(f"  ML Prediction (raw): {ml_prediction:.2f}")
+            print(f"  Signal (after filters): {signal}")
+            print(f"  Filters: {filter_states}")
+            print(f"  Training data: {len(self.ml_model.y_train_array)} bars")
+
+    def process_bars(self, open_prices, highs, lows, closes,
+                     volumes=None) -> List[Optional[BarResult]]:
+        """
+        Process a batch of bars from arrays, oldest first
+
+        Same results as calling process_bar() per bar, without building a
+        dict or pandas row per bar. Takes the arrays from
+        get_historical_data(..., return_format="numpy") or get_arrays()
+        directly.
+
+        Args:
+            open_prices, highs, lows, closes: Price arrays (any sequence)
+            volumes: Volume array (None = 0 for every bar)
+
+        Returns:
+            One BarResult (or None for an invalid bar) per input bar
+        """
+        n = len(closes)
+        if volumes is None:
+            volumes = np.zeros(n)
+        columns = [np.asarray(values, dtype=np.float64).tolist()
+                   for values in (open_prices, highs, lows, closes, volumes)]
+        if any(len(column) != n for column in columns):
+            raise ValueError("All OHLCV arrays must have the same length")
+        return [self.process_bar(o, h, l, c, v) for o, h, l, c, v in zip(*columns)]
+
     def _calculate_features_stateful(self, high: float, low: float, close: float) -> FeatureSeries:
         """Calculate all features using stateful indicators"""
         features = self.config.features
@@ -329,31 +424,31 @@ class EnhancedBarProcessor:
         f1 = enhanced_series_from(
             features["f1"][0], close, high, low,
             features["f1"][1], features["f1"][2],
-            self.symbol, self.timeframe
+            self.symbol, self.timeframe, self.indicator_context
         )
 
         f2 = enhanced_series_from(
             features["f2"][0], close, high, low,
             features["f2"][1], features["f2"][2],
-            self.symbol, self.timeframe
+            self.symbol, self.timeframe, self.indicator_context
         )
 
         f3 = enhanced_series_from(
             features["f3"][0], close, high, low,
             features["f3"][1], features["f3"][2],
-            self.symbol, self.timeframe
+            self.symbol, self.timeframe, self.indicator_context
         )
 
         f4 = enhanced_series_from(
             features["f4"][0], close, high, low,
             features["f4"][1], features["f4"][2],
-            self.symbol, self.timeframe
+            self.symbol, self.timeframe, self.indicator_context
         )
 
         f5 = enhanced_series_from(
             features["f5"][0], close, high, low,
             features["f5"][1], features["f5"][2],
-            self.symbol, self.timeframe
+            self.symbol, self.timeframe, self.indicator_context
         )
 
         return FeatureSeries(f1=f1, f2=f2, f3=f3, f4=f4, f5=f5)
@@ -392,21 +487,21 @@ class EnhancedBarProcessor:
             high, low, close,
             1, 10,  # min_length, max_length
             self.filter_settings.use_volatility_filter,
-            self.symbol, self.timeframe
+            self.symbol, self.timeframe, self.indicator_context
         )
 
         regime = enhanced_regime_filter(
             current_ohlc4, high, low,
             self.filter_settings.regime_threshold,
             self.filter_settings.use_regime_filter,
-            self.symbol, self.timeframe
+            self.symbol, self.timeframe, self.indicator_context
         )
 
         adx = enhanced_filter_adx(
             high, low, close,
             14, self.filter_settings.adx_threshold,
             self.filter_settings.use_adx_filter,
-            self.symbol, self.timeframe
+            self.symbol, self.timeframe, self.indicator_context
         )
 
         return {
@@ -424,7 +519,7 @@ class EnhancedBarProcessor:
         # Update EMA with current close
         self.current_ema_value = enhanced_ema(
             close, self.config.ema_period, 
-            self.symbol, f"{self.timeframe}_trend"
+            self.symbol, f"{self.timeframe}_trend", self.indicator_context
         )
 
         # Check if we have enough bars
@@ -444,7 +539,7 @@ class EnhancedBarProcessor:
         # Update SMA with current close
         self.current_sma_value = enhanced_sma(
             close, self.config.sma_period,
-            self.symbol, f"{self.timeframe}_trend"
+            self.symbol, f"{self.timeframe}_trend", self.indicator_context
         )
 
         # Check if we have enough bars
@@ -526,7 +621,7 @@ class EnhancedBarProcessor:
 
     def get_indicator_stats(self) -> dict:
         """Get statistics about stateful indicators being used"""
-        return get_indicator_manager().get_stats()
+        return self.indicator_context.get_stats()
     
     def _log_configuration(self):
         """Log configuration at startup (debug mode)"""
@@ -0,0 +1,673 @@
+"""
+Sharded Live Scanning Engine
+Spreads symbols over a pool of worker processes, each owning the
+EnhancedBarProcessor instances of its shard
+
+    router (caller thread)            worker processes
+    submit(bar) -> outbox[shard] ---> bounded inbox -> processors[symbol]
+    get_signals() <------------------ shared result queue <--------'
+
+Every symbol always maps to the same worker (stable hash), so its bars are
+processed in order by a single processor. Within a batch, a worker processes
+open positions first (see bar_scheduler). Closed bars are batched per worker;
+when a worker falls behind, its inbox fills up and new bars wait in the
+router's outbox, where a revised bar replaces the pending one for the same
+timestamp. A router flusher thread pushes such outboxes as soon as the inbox
+has room again, so nothing waits for the next submit. Past max_pending the
+caller blocks until the worker catches up.
+
+With journal_dir set, each worker journals every bar it accepts (primed or
+live) to <journal_dir>/worker-<id>, checkpoints its processors every
+checkpoint_every bars and on stop, and on start recovers from its
+checkpoint plus the journal tail (see data/bar_journal.py).
+
+With a tracer, each worker traces its bars from the tick and candle close
+times carried by ClosedBar through dequeue and processing, and returns its
+histograms with its stats on stop; they are merged into the tracer.
+
+Symbols can be added while running (add_symbols): their history is loaded
+from the cache and replayed with process_bars in a separate warm-up
+process pool, so no scan worker stalls. Live bars for a warming symbol are
+held by the router and replayed in catch-up rounds; once at most a few are
+left, the warmed processor is handed to its scan worker together with them,
+and from then on the symbol is routed like any other.
+"""
+import os
+import zlib
+import queue
+import pickle
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import TradingConfig
+from data.bar_journal import BarJournal
+from data.trading_calendar import INTERVAL_MINUTES, from_epoch
+from utils.latency import LatencyTracer
+from .bar_scheduler import PRIORITY_NAMES, BarScheduler, ScheduledBar
+from .enhanced_bar_processor import EnhancedBarProcessor
+
+logger = logging.getLogger(__name__)
+
+# Message kinds
+_BARS = 'bars'
+_PRIME = 'prime'
+_INSTALL = 'install'
+_STOP = 'stop'
+_SIGNAL = 'signal'
+_STATS = 'stats'
+
+# How often the router flusher retries outboxes whose worker inbox is full (s)
+_FLUSH_RETRY = 0.005
+
+
+@dataclass
+class ClosedBar:
+    """A completed candle for one symbol"""
+    symbol: str
+    timestamp: int  # Bar open, epoch seconds
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float = 0.0
+    received: Optional[float] = None  # Arrival of the bar's last tick (latency tracing)
+    closed_at: Optional[float] = None  # When the candle was closed (latency tracing)
+
+
+def shard_of(symbol: str, workers: int) -> int:
+    """Worker index for a symbol (stable across processes and runs)"""
+    return zlib.crc32(symbol.encode('utf-8')) % workers
+
+
+def _signal_from_result(symbol: str, timestamp: int, result, worker_id: int) -> Dict:
+    """Signal dict (same fields as the old DataManager callback, plus bar info)"""
+    return {
+        'symbol': symbol,
+        'type': 'BUY' if result.start_long_trade else 'SELL',
+        'price': result.close,
+        'prediction': result.prediction,
+        'strength': result.prediction_strength,
+        'filters': result.filter_states,
+        'timestamp': from_epoch(timestamp),
+        'bar_index': result.bar_index,
+        'worker': worker_id,
+    }
+
+
+def _warm_up(config: TradingConfig, timeframe: str, symbol: str, state: Optional[bytes],
+             timestamps: np.ndarray, columns: Tuple[np.ndarray, ...], live_from: int,
+             worker_id: int) -> Tuple[bytes, List[Dict]]:
+    """
+    Warm-up pool task: replay bars into a symbol's processor
+
+    Args:
+        state: Pickled processor from the previous round (None = new processor)
+        timestamps, columns: Bars to replay (open, high, low, close, volume arrays)
+        live_from: Index of the first live bar (its signals are reported)
+        worker_id: Scan worker that will own the symbol (for the signals)
+
+    Returns:
+        (pickled processor, entry signals of the live bars)
+    """
+    processor = (pickle.loads(state) if state is not None
+                 else EnhancedBarProcessor(config, symbol, timeframe))
+    results = processor.process_bars(*columns)
+    signals = [
+        _signal_from_result(symbol, int(timestamps[i]), result, worker_id)
+        for i, result in enumerate(results[live_from:], start=live_from)
+        if result is not None and (result.start_long_trade or result.start_short_trade)
+    ]
+    return pickle.dumps(processor, protocol=pickle.HIGHEST_PROTOCOL), signals
+
+
+def _worker_main(worker_id: int, config: TradingConfig, timeframe: str,
+                 deadline: Optional[float], journal_dir: Optional[str], checkpoint_every: int,
+                 trace_layout: Optional[Dict], inbox, results):
+    """Worker process loop: process batches until the stop message"""
+    processors: Dict[str, EnhancedBarProcessor] = {}
+    last_timestamp: Dict[str, int] = {}
+    stats = {'bars': 0, 'primed': 0, 'stale': 0, 'errors': 0, 'batches': 0, 'signals': 0,
+             'recovered': 0, 'installed': 0}
+
+    def processor_for(symbol: str) -> EnhancedBarProcessor:
+        processor = processors.get(symbol)
+        if processor is None:
+            processor = processors[symbol] = EnhancedBarProcessor(config, symbol, timeframe)
+        return processor
+
+    journal = None
+    if journal_dir is not None:
+        journal = BarJournal(os.path.join(journal_dir, f"worker-{worker_id}"))
+        recovered = journal.recover(lambda symbol, tf: EnhancedBarProcessor(config, symbol, tf))
+        for (symbol, tf), processor in recovered.processors.items():
+            if tf == timeframe:
+                processors[symbol] = processor
+                last_timestamp[symbol] = recovered.last_timestamps[(symbol, tf)]
+        stats['recovered'] = recovered.replayed
+        stats['errors'] += recovered.errors
+
+    def checkpoint():
+        journal.checkpoint(processors.values(),
+                           {(symbol, timeframe): ts for symbol, ts in last_timestamp.items()})
+
+    journaled = 0  # Bars since the last checkpoint
+    tracer = LatencyTracer(**trace_layout) if trace_layout is not None else None
+    scheduler = BarScheduler(processor_for, tracer=tracer, journal=journal)
+    # Deadline = bar close + allowance (only for intraday intervals)
+    interval_minutes = INTERVAL_MINUTES.get(timeframe)
+    deadline_offset = (interval_minutes * 60 + deadline
+                       if interval_minutes and deadline is not None else None)
+
+    while True:
+        message = inbox.get()
+        kind = message[0]
+        if kind == _STOP:
+            break
+
+        if kind == _PRIME:
+            # History warm-up: no signals
+            _, symbol, timestamps, columns = message
+            try:
+                if journal is not None:
+                    journal.append_many(symbol, timeframe, timestamps, *columns)
+                    journal.sync()
+                    journaled += len(timestamps)
+                processor_for(symbol).process_bars(*columns)
+                last_timestamp[symbol] = int(timestamps[-1])
+                stats['primed'] += len(timestamps)
+            except Exception as e:
+                stats['errors'] += 1
+                logger.error(f"Worker {worker_id}: priming {symbol} failed: {e}")
+            if journal is not None and journaled >= checkpoint_every:
+                checkpoint()
+                journaled = 0
+            continue
+
+        if kind == _INSTALL:
+            # Warmed-up processor from add_symbols, plus the live bars it still lacks
+            _, symbol, state, installed_timestamp, batch = message
+            processors[symbol] = pickle.loads(state)
+            if installed_timestamp is not None:
+                last_timestamp[symbol] = installed_timestamp
+            stats['installed'] += 1
+            if journal is not None:
+                # The warm-up history is not journaled: checkpoint the new state
+                checkpoint()
+                journaled = 0
+            if not batch:
+                continue
+        else:
+            batch = message[1]
+
+        stats['batches'] += 1
+        for symbol, timestamp, open_, high, low, close, volume, received, closed_at in batch:
+            if timestamp <= last_timestamp.get(symbol, -1):
+                # Revision of a bar that was already processed
+                stats['stale'] += 1
+                continue
+            scheduler.submit(ScheduledBar(
+                symbol, timestamp, open_, high, low, close, volume,
+                timestamp + deadline_offset if deadline_offset is not None else None,
+                received, closed_at))
+
+        for bar, result in scheduler.run():
+            last_timestamp[bar.symbol] = bar.timestamp
+            stats['bars'] += 1
+            if result is not None and (result.start_long_trade or result.start_short_trade):
+                stats['signals'] += 1
+                results.put((_SIGNAL, _signal_from_result(bar.symbol, bar.timestamp,
+                                                          result, worker_id)))
+            journaled += 1
+        if journal is not None and journaled >= checkpoint_every:
+            checkpoint()
+            journaled = 0
+
+    if journal is not None:
+        checkpoint()
+        journal.close()
+
+    stats['symbols'] = len(processors)
+    stats['errors'] += scheduler.errors
+    for priority, name in enumerate(PRIORITY_NAMES):
+        stats[f'missed_{name}'] = scheduler.missed[priority]
+    results.put((_STATS, worker_id, stats, tracer.histograms() if tracer is not None else None))
+
+
+class ShardedScanEngine:
+    """
+    Multi-process live scanner
+
+    Key features:
+    - Symbols sharded over worker processes by a stable hash
+    - One EnhancedBarProcessor per symbol, owned by its worker
+    - Bounded per-worker queues; batched sends
+    - Pending revisions of the same bar coalesced while a worker is behind
+    - Backpressure: submit() blocks once max_pending bars wait for a worker
+    - Open positions processed first in each batch; deadline misses counted
+    - Signals returned on a shared result queue
+    - Optional per-worker write-ahead journal and checkpoints for crash recovery
+    - Symbols added at runtime, warmed up off the scan workers
+    - Optional latency tracing in the workers, merged into one tracer
+    """
+
+    def __init__(self, config: Optional[TradingConfig] = None, timeframe: str = "5minute",
+                 workers: Optional[int] = None, queue_size: int = 64,
+                 max_pending: int = 10_000, start_method: Optional[str] = None,
+                 deadline: Optional[float] = 5.0, journal_dir: Optional[str] = None,
+                 checkpoint_every: int = 10_000, warmup_workers: int = 1,
+                 tracer: Optional[LatencyTracer] = None):
+        """
+        Args:
+            config: Trading configuration for every processor
+            timeframe: Timeframe passed to the processors
+            workers: Worker processes (default: one per core, leaving one for the router)
+            queue_size: Batches each worker inbox holds before the router buffers
+            max_pending: Buffered bars per worker before submit() blocks
+            start_method: multiprocessing start method (None = platform default)
+            deadline: Seconds after a bar's close by which it should be processed
+                      (misses reported as missed_<priority>; None = not tracked)
+            journal_dir: Write-ahead journal + checkpoints per worker for crash
+                         recovery (None = off); restart with the same worker count
+            checkpoint_every: Journaled bars between a worker's checkpoints
+            warmup_workers: Processes replaying history for add_symbols()
+            tracer: Each worker traces tick/candle_close (if the bar has them),
+                    dequeue, process_start and process_end with a tracer of the
+                    same layout; their histograms are merged into this one on stop
+        """
+        self.config = config or TradingConfig()
+        self.timeframe = timeframe
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.queue_size = queue_size
+        self.max_pending = max_pending
+        self.deadline = deadline
+        self.journal_dir = journal_dir
+        self.checkpoint_every = checkpoint_every
+        self.warmup_workers = warmup_workers
+        self.tracer = tracer
+        self._context = multiprocessing.get_context(start_method)
+
+        self._inboxes = []
+        self._processes = []
+        self._results = None
+        self._outboxes: List[Dict[tuple, tuple]] = [{} for _ in range(self.workers)]
+        self._signals: List[Dict] = []
+        self._lock = threading.Lock()
+        self.worker_stats: Dict[int, Dict[str, int]] = {}
+        self.router_stats = {'submitted': 0, 'coalesced': 0, 'batches': 0, 'blocked': 0,
+                             'warmed': 0, 'backfilled': 0}
+        # Router flusher: sends outboxes left behind by full inboxes
+        self._flush_wanted = threading.Condition(self._lock)
+        self._flusher: Optional[threading.Thread] = None
+        self._flushing = False
+
+        self._known = set()  # Symbols submitted or primed (add_symbols skips them)
+        # Hot-added symbols: live bars held while warming ({timestamp: bar tuple})
+        self._warming: Dict[str, Dict[int, tuple]] = {}
+        self._warm_done = threading.Condition(self._lock)
+        self._warmup_pool: Optional[ProcessPoolExecutor] = None
+        self._warmup_threads: List[threading.Thread] = []
+        self._warmup_stop = threading.Event()
+
+    # Lifecycle
+    @property
+    def running(self) -> bool:
+        return bool(self._processes)
+
+    def start(self):
+        """Start the worker processes"""
+        if self.running:
+            return
+        self._results = self._context.Queue()
+        trace_layout = self.tracer.layout() if self.tracer is not None else None
+        for worker_id in range(self.workers):
+            inbox = self._context.Queue(maxsize=self.queue_size)
+            process = self._context.Process(
+                target=_worker_main,
+                args=(worker_id, self.config, self.timeframe, self.deadline,
+                      self.journal_dir, self.checkpoint_every, trace_layout, inbox,
+                      self._results),
+                name=f"scan-worker-{worker_id}", daemon=True)
+            process.start()
+            self._inboxes.append(inbox)
+            self._processes.append(process)
+        self._flushing = True
+        self._flusher = threading.Thread(target=self._flush_loop, name="router-flusher",
+                                         daemon=True)
+        self._flusher.start()
+        logger.info(f"Started {self.workers} scan workers")
+
+    def stop(self, timeout: float = 30.0) -> Dict[int, Dict[str, int]]:
+        """
+        Deliver pending bars, stop the workers and collect their stats
+
+        Returns:
+            {worker_id: stats}
+        """
+        if not self.running:
+            return self.worker_stats
+        self._stop_warmup(timeout)
+        with self._lock:
+            self._flushing = False
+            self._flush_wanted.notify()
+        self._flusher.join(timeout)
+        self._flusher = None
+        self.flush()
+        for inbox in self._inboxes:
+            inbox.put((_STOP,))
+
+        # Keep draining results: a worker cannot exit with unread items queued
+        remaining = set(range(self.workers))
+        while remaining:
+            try:
+                message = self._results.get(timeout=timeout)
+            except queue.Empty:
+                logger.error(f"Workers {sorted(remaining)} did not stop in {timeout}s")
+                break
+            if message[0] == _STATS:
+                self._worker_stopped(message)
+                remaining.discard(message[1])
+            else:
+                self._signals.append(message[1])
+
+        for process in self._processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._inboxes = []
+        logger.info(f"Scan workers stopped: {self.stats()}")
+        return self.worker_stats
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    # Routing
+    def shard_of(self, symbol: str) -> int:
+        """Worker index that owns a symbol"""
+        return shard_of(symbol, self.workers)
+
+    def prime(self, symbol: str, timestamps, open_prices, highs, lows, closes,
+              volumes=None):
+        """
+        Warm a symbol's processor up with history (no signals emitted)
+
+        Bars at or before the last primed timestamp are ignored afterwards.
+        """
+        if not self.running:
+            raise RuntimeError("Engine not started")
+        columns = tuple(np.asarray(column, dtype=np.float64)
+                        for column in (open_prices, highs, lows, closes))
+        volumes = None if volumes is None else np.asarray(volumes, dtype=np.float64)
+        worker_id = self.shard_of(symbol)
+        with self._lock:
+            self._known.add(symbol)
+            # Anything already routed to the symbol must go first
+            self._flush_worker(worker_id, block=True)
+            self._inboxes[worker_id].put(
+                (_PRIME, symbol, np.asarray(timestamps, dtype=np.int64), columns + (volumes,)))
+
+    # Hot-add
+    def add_symbols(self, symbols: Sequence[str], cache, from_date, to_date,
+                    max_backfill: int = 2, max_rounds: int = 10) -> List[str]:
+        """
+        Add symbols to the running scanner without stalling the scan workers
+
+        History comes from cache.get_arrays(symbol, from_date, to_date, timeframe)
+        (MarketDataCache or ColumnarBarStore) and is replayed with process_bars
+        in the warm-up pool. Bars submitted for the symbols meanwhile are held
+        and replayed in catch-up rounds (their signals are reported); once at
+        most max_backfill are left, the processor is installed on its scan
+        worker, which replays those itself. Returns immediately.
+
+        Args:
+            symbols: Symbols to add (ones already submitted, primed or warming are skipped)
+            cache: Bar source with get_arrays()
+            from_date, to_date: History range
+            max_backfill: Held bars the scan worker may replay at install
+            max_rounds: Catch-up rounds before installing regardless
+
+        Returns:
+            Symbols that started warming up
+        """
+        if not self.running:
+            raise RuntimeError("Engine not started")
+        with self._lock:
+            added = [symbol for symbol in dict.fromkeys(symbols)
+                     if symbol not in self._known and symbol not in self._warming]
+            for symbol in added:
+                self._warming[symbol] = {}
+            if added and self._warmup_pool is None:
+                self._warmup_pool = ProcessPoolExecutor(self.warmup_workers,
+                                                        mp_context=self._context)
+        if added:
+            thread = threading.Thread(
+                target=self._warm_symbols,
+                args=(added, cache, from_date, to_date, max_backfill, max_rounds),
+                name="symbol-warmup", daemon=True)
+            self._warmup_threads.append(thread)
+            thread.start()
+        return added
+
+    def warming(self) -> List[str]:
+        """Symbols still warming up"""
+        with self._lock:
+            return sorted(self._warming)
+
+    def wait_warm(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every added symbol is live; False on timeout"""
+        with self._warm_done:
+            return self._warm_done.wait_for(lambda: not self._warming, timeout)
+
+    def _warm_symbols(self, symbols: List[str], cache, from_date, to_date,
+                      max_backfill: int, max_rounds: int):
+        """Warm-up thread: history round, catch-up rounds, then install"""
+        pool = self._warmup_pool
+        futures = {}
+        last: Dict[str, Optional[int]] = {}  # Last replayed bar per symbol
+        rounds: Dict[str, int] = {}
+
+        def replay(symbol, state, timestamps, columns, live_from):
+            future = pool.submit(_warm_up, self.config, self.timeframe, symbol, state,
+                                 timestamps, columns, live_from, self.shard_of(symbol))
+            futures[future] = symbol
+            last[symbol] = int(timestamps[-1]) if len(timestamps) else last.get(symbol)
+            rounds[symbol] = rounds.get(symbol, -1) + 1
+
+        for symbol in symbols:
+            try:
+                arrays = cache.get_arrays(symbol, from_date, to_date, self.timeframe)
+            except Exception as e:
+                logger.error(f"Loading history of {symbol} failed: {e}")
+                arrays = None
+            if arrays is None or not len(arrays['timestamp']):
+                logger.warning(f"No cached {self.timeframe} history for {symbol}; starting it cold")
+                arrays = {name: np.zeros(0) for name in ('open', 'high', 'low', 'close', 'volume')}
+                arrays['timestamp'] = np.zeros(0, dtype=np.int64)
+            replay(symbol, None, arrays['timestamp'],
+                   tuple(arrays[name] for name in ('open', 'high', 'low', 'close', 'volume')),
+                   len(arrays['timestamp']))
+
+        while futures and not self._warmup_stop.is_set():
+            done, _ = wait(futures, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                symbol = futures.pop(future)
+                try:
+                    state, signals = future.result()
+                except Exception as e:
+                    logger.error(f"Warm-up of {symbol} failed: {e}; its held bars are dropped")
+                    with self._lock:
+                        del self._warming[symbol]
+                        self._warm_done.notify_all()
+                    continue
+
+                with self._lock:
+                    self._signals.extend(signals)
+                    held = self._warming[symbol]
+                    after = last[symbol]
+                    fresh = sorted((row for timestamp, row in held.items()
+                                    if after is None or timestamp > after), key=itemgetter(1))
+                    held.clear()
+                    if len(fresh) <= max_backfill or rounds[symbol] >= max_rounds:
+                        # Caught up: the worker gets the processor, then the rest
+                        worker_id = self.shard_of(symbol)
+                        self._flush_worker(worker_id, block=True)
+                        self._inboxes[worker_id].put((_INSTALL, symbol, state, after, fresh))
+                        del self._warming[symbol]
+                        self._known.add(symbol)
+                        self.router_stats['warmed'] += 1
+                        self.router_stats['backfilled'] += len(fresh)
+                        self._warm_done.notify_all()
+                        continue
+                replay(symbol, state, np.array([row[1] for row in fresh], dtype=np.int64),
+                       tuple(np.array([row[k] for row in fresh]) for k in range(2, 7)), 0)
+
+    def _stop_warmup(self, timeout: float):
+        """Abandon warm-ups in progress (their symbols are not added)"""
+        self._warmup_stop.set()
+        for thread in self._warmup_threads:
+            thread.join(timeout)
+        self._warmup_threads = []
+        if self._warmup_pool is not None:
+            self._warmup_pool.shutdown(wait=True, cancel_futures=True)
+            self._warmup_pool = None
+        with self._lock:
+            if self._warming:
+                logger.warning(f"Stopped while warming up {sorted(self._warming)}; "
+                               f"they were not added")
+                self._warming.clear()
+                self._warm_done.notify_all()
+        self._warmup_stop.clear()
+
+    def submit(self, bar: ClosedBar):
+        """Route a closed bar to its worker (blocks only under backpressure)"""
+        self.submit_many((bar,))
+
+    def submit_many(self, bars: Iterable[ClosedBar]):
+        """Route many closed bars, one batch per worker"""
+        if not self.running:
+            raise RuntimeError("Engine not started")
+        touched = set()
+        with self._lock:
+            for bar in bars:
+                row = (bar.symbol, int(bar.timestamp), float(bar.open), float(bar.high),
+                       float(bar.low), float(bar.close), float(bar.volume),
+                       bar.received, bar.closed_at)
+                self.router_stats['submitted'] += 1
+                held = self._warming.get(bar.symbol)
+                if held is not None:
+                    # Warming up: kept for the catch-up (a revision replaces the bar)
+                    if row[1] in held:
+                        self.router_stats['coalesced'] += 1
+                    held[row[1]] = row
+                    continue
+                self._known.add(bar.symbol)
+                worker_id = self.shard_of(bar.symbol)
+                outbox = self._outboxes[worker_id]
+                key = (bar.symbol, row[1])
+                if key in outbox:
+                    # Still waiting to be sent: the newer revision replaces it
+                    self.router_stats['coalesced'] += 1
+                outbox[key] = row
+                touched.add(worker_id)
+
+            left_behind = False
+            for worker_id in touched:
+                if not self._flush_worker(worker_id, block=False):
+                    left_behind = True
+                if len(self._outboxes[worker_id]) >= self.max_pending:
+                    self.router_stats['blocked'] += 1
+                    self._flush_worker(worker_id, block=True)
+            if left_behind:
+                self._flush_wanted.notify()
+
+    def flush(self):
+        """Send every pending bar (blocking while inboxes are full)"""
+        with self._lock:
+            for worker_id in range(self.workers):
+                self._flush_worker(worker_id, block=True)
+
+    def _flush_loop(self):
+        """Router flusher thread: retry left-behind outboxes until their inboxes take them"""
+        with self._lock:
+            while self._flushing:
+                if not any(self._outboxes):
+                    self._flush_wanted.wait()
+                    continue
+                for worker_id in range(self.workers):
+                    self._flush_worker(worker_id, block=False)
+                if any(self._outboxes):
+                    # Lets submit() in while the workers make room
+                    self._flush_wanted.wait(_FLUSH_RETRY)
+
+    def _flush_worker(self, worker_id: int, block: bool) -> bool:
+        """Send a worker's pending bars as one batch; False if its inbox is full"""
+        outbox = self._outboxes[worker_id]
+        if not outbox:
+            return True
+        batch = sorted(outbox.values(), key=itemgetter(1))
+        try:
+            self._inboxes[worker_id].put((_BARS, batch), block=block)
+        except queue.Full:
+            return False
+        outbox.clear()
+        self.router_stats['batches'] += 1
+        return True
+
+    # Results
+    def get_signals(self, timeout: float = 0.0) -> List[Dict]:
+        """
+        Signals produced since the last call
+
+        Args:
+            timeout: Seconds to wait for the first signal if none is ready
+
+        Returns:
+            Signal dicts in arrival order
+        """
+        with self._lock:
+            signals, self._signals = self._signals, []
+        if self._results is None:
+            return signals
+        block = timeout > 0 and not signals
+        while True:
+            try:
+                message = self._results.get(block=block, timeout=timeout if block else None)
+            except queue.Empty:
+                break
+            block = False
+            if message[0] == _STATS:
+                self._worker_stopped(message)
+            else:
+                signals.append(message[1])
+        return signals
+
+    def _worker_stopped(self, message: tuple):
+        """Keep a stopped worker's stats and merge its latency histograms"""
+        _, worker_id, stats, histograms = message
+        self.worker_stats[worker_id] = stats
+        if histograms is not None and self.tracer is not None:
+            self.tracer.merge(histograms)
+
+    def pending(self) -> int:
+        """Bars buffered in the router (not yet handed to a worker)"""
+        with self._lock:
+            return sum(len(outbox) for outbox in self._outboxes)
+
+    def stats(self) -> Dict[str, int]:
+        """Router counters plus the summed worker counters (after stop)"""
+        totals = dict(self.router_stats)
+        for stats in self.worker_stats.values():
+            for name, value in stats.items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
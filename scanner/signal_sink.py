@@ -0,0 +1,377 @@
+"""
+Asynchronous Signal Sink
+Non-blocking output of signals and BarResults to JSONL, CSV or SQLite
+
+    process_bar() -> sink.emit_result()   (append to a bounded buffer)
+                          |
+                  writer thread: batch -> every output -> group commit
+
+emit() never touches a file: it only appends to an in-memory buffer under a
+lock. A background thread drains the buffer in batches and writes each batch
+with one write/flush (files) or one transaction (SQLite). When the buffer is
+full, the overflow policy decides what happens:
+
+    drop_oldest  - evict the oldest waiting record (default, keeps the latest)
+    drop_newest  - reject the new record
+    block        - wait for the writer (the only policy that can stall the caller)
+
+close() (or leaving the context manager) writes everything still buffered.
+"""
+import os
+import csv
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from data.trading_calendar import from_epoch
+from utils.latency import LatencyTracer
+from .enhanced_bar_processor import BarResult
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+
+def record_from_result(symbol: str, result: BarResult,
+                       timestamp: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Flat dict of a BarResult for the sink outputs
+
+    Args:
+        symbol: Trading symbol
+        result: Processed bar
+        timestamp: Bar open, epoch seconds (None = not recorded)
+    """
+    return {
+        'timestamp': from_epoch(timestamp).isoformat() if timestamp is not None else None,
+        'symbol': symbol,
+        'bar_index': result.bar_index,
+        'open': result.open,
+        'high': result.high,
+        'low': result.low,
+        'close': result.close,
+        'prediction': result.prediction,
+        'signal': result.signal,
+        'strength': result.prediction_strength,
+        'start_long': result.start_long_trade,
+        'start_short': result.start_short_trade,
+        'end_long': result.end_long_trade,
+        'end_short': result.end_short_trade,
+        'early_flip': result.is_early_signal_flip,
+        'stop_loss': result.stop_loss,
+        'take_profit': result.take_profit,
+        'filters': dict(result.filter_states),
+    }
+
+
+def _to_json(record: Dict[str, Any]) -> str:
+    """One record as a JSON line (datetimes and other objects as strings)"""
+    return json.dumps(record, default=str)
+
+
+class SinkOutput:
+    """Destination for record batches; only called from the writer thread"""
+
+    def write_batch(self, records: List[Dict[str, Any]]):
+        """Write and commit one batch"""
+        raise NotImplementedError("Subclasses must implement write_batch()")
+
+    def close(self):
+        """Release the destination"""
+
+
+class JSONLOutput(SinkOutput):
+    """Append records as JSON lines"""
+
+    def __init__(self, path: str, fsync: bool = False):
+        """
+        Args:
+            path: File to append to
+            fsync: fsync after every batch (durable, slower)
+        """
+        self.path = path
+        self.fsync = fsync
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write_batch(self, records: List[Dict[str, Any]]):
+        self._file.write(''.join(_to_json(record) + '\n' for record in records))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class CSVOutput(SinkOutput):
+    """Append records as CSV rows (nested values JSON-encoded)"""
+
+    def __init__(self, path: str, fields: Optional[Sequence[str]] = None, fsync: bool = False):
+        """
+        Args:
+            path: File to append to (a header is written if it is empty)
+            fields: Columns (None = the keys of the first record); other keys are ignored
+            fsync: fsync after every batch (durable, slower)
+        """
+        self.path = path
+        self.fields = list(fields) if fields is not None else None
+        self.fsync = fsync
+        self._file = open(path, 'a', encoding='utf-8', newline='')
+        self._writer = None
+
+    def write_batch(self, records: List[Dict[str, Any]]):
+        if self._writer is None:
+            if self.fields is None:
+                self.fields = list(records[0])
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fields,
+                                          extrasaction='ignore')
+            if self._file.tell() == 0:
+                self._writer.writeheader()
+        self._writer.writerows(
+            {key: json.dumps(value) if isinstance(value, (dict, list)) else value
+             for key, value in record.items()}
+            for record in records)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class SQLiteOutput(SinkOutput):
+    """Insert records into a SQLite table, one transaction per batch"""
+
+    def __init__(self, db_path: str, table: str = "signals"):
+        """
+        Args:
+            db_path: Database file (created if missing)
+            table: Table name; rows are (timestamp, symbol, record JSON)
+        """
+        self.db_path = db_path
+        self.table = table
+        # Used only by the writer thread after construction
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY,
+                timestamp TEXT,
+                symbol TEXT,
+                record TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def write_batch(self, records: List[Dict[str, Any]]):
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT INTO {self.table} (timestamp, symbol, record) VALUES (?, ?, ?)",
+                [(None if record.get('timestamp') is None else str(record['timestamp']),
+                  record.get('symbol'), _to_json(record)) for record in records])
+
+    def close(self):
+        self._conn.close()
+
+
+class AsyncSignalSink:
+    """
+    Bounded, batched, background writer for signal records
+
+    Key features:
+    - emit() only appends to memory; outputs are written by one thread
+    - Group commit: a batch is one write/flush or one transaction per output
+    - Bounded buffer with an explicit overflow policy
+    - flush() waits for everything emitted so far; close() flushes and stops
+    - A failing output is logged and counted, the others still get the batch
+    """
+
+    def __init__(self, outputs: Iterable[SinkOutput], max_buffer: int = 10_000,
+                 batch_size: int = 500, flush_interval: float = 0.5,
+                 overflow: str = 'drop_oldest', tracer: Optional[LatencyTracer] = None):
+        """
+        Args:
+            outputs: Where every record is written
+            max_buffer: Records waiting to be written before the overflow policy applies
+            batch_size: Most records per batch
+            flush_interval: Longest a record waits for a fuller batch (seconds)
+            overflow: 'drop_oldest', 'drop_newest' or 'block'
+            tracer: Marks 'sink_write' for records emitted with a trace key
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.outputs = list(outputs)
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.tracer = tracer
+        # A full buffer is written right away, even if below batch_size
+        self._full_batch = min(batch_size, max_buffer)
+
+        # (record, trace key or None)
+        self._buffer: Deque[Tuple[Dict[str, Any], Optional[Tuple[Hashable, int]]]] = deque()
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)    # Writer: records to write
+        self._drained = threading.Condition(self._lock)  # Callers: buffer space / written
+        self._emitted = 0
+        self._done = 0  # Emitted records written or dropped
+        self._flushing = False  # Write partial batches right away
+        self._closed = False
+        self.stats = {'emitted': 0, 'written': 0, 'dropped': 0, 'batches': 0, 'errors': 0}
+
+        self._thread = threading.Thread(target=self._run, name="signal-sink", daemon=True)
+        self._thread.start()
+
+    # Producer side
+    def emit(self, record: Dict[str, Any],
+             trace_key: Optional[Tuple[Hashable, int]] = None) -> bool:
+        """
+        Queue one record for writing
+
+        Args:
+            record: JSON-serializable dict
+            trace_key: (symbol, bar timestamp) to mark 'sink_write' for once written
+
+        Returns:
+            False if the record was rejected (sink closed, or drop_newest on a full buffer)
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            if len(self._buffer) >= self.max_buffer:
+                if self.overflow == 'drop_newest':
+                    self.stats['dropped'] += 1
+                    return False
+                if self.overflow == 'drop_oldest':
+                    self._buffer.popleft()
+                    self.stats['dropped'] += 1
+                    self._done += 1
+                else:
+                    while len(self._buffer) >= self.max_buffer and not self._closed:
+                        self._drained.wait()
+                    if self._closed:
+                        return False
+            self._buffer.append((record, trace_key))
+            self._emitted += 1
+            self.stats['emitted'] += 1
+            if len(self._buffer) == 1 or len(self._buffer) >= self._full_batch:
+                self._ready.notify()
+            return True
+
+    def emit_result(self, symbol: str, result: Optional[BarResult],
+                    timestamp: Optional[int] = None, only_signals: bool = True) -> bool:
+        """
+        Queue a BarResult (see record_from_result)
+
+        Args:
+            only_signals: Skip results without an entry or exit
+
+        Returns:
+            True if a record was queued
+        """
+        if result is None:
+            return False
+        if only_signals and not (result.start_long_trade or result.start_short_trade or
+                                 result.end_long_trade or result.end_short_trade):
+            return False
+        trace_key = (symbol, timestamp) if timestamp is not None else None
+        return self.emit(record_from_result(symbol, result, timestamp), trace_key)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every record emitted so far is written (or dropped)
+
+        Returns:
+            False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            target = self._emitted
+            self._flushing = True
+            self._ready.notify()
+            while self._done < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._drained.wait(remaining)
+            return True
+
+    def close(self, timeout: Optional[float] = None):
+        """Write what is buffered, stop the writer and close the outputs"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._ready.notify()
+            self._drained.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error("Signal sink writer did not finish in time; outputs left open")
+            return
+        for output in self.outputs:
+            try:
+                output.close()
+            except Exception as e:
+                logger.error(f"Signal sink: closing {type(output).__name__} failed: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def pending(self) -> int:
+        """Records waiting in the buffer"""
+        with self._lock:
+            return len(self._buffer)
+
+    # Writer thread
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._buffer and not self._closed:
+                    self._ready.wait()
+                if not self._buffer:
+                    return  # Closed and drained
+                # Give a partial batch flush_interval to fill up
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._buffer) < self._full_batch and not (self._closed or self._flushing):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._ready.wait(remaining)
+                batch = [self._buffer.popleft()
+                         for _ in range(min(self.batch_size, len(self._buffer)))]
+                if not self._buffer:
+                    self._flushing = False
+                # Room for blocked producers
+                self._drained.notify_all()
+
+            self._write([record for record, _ in batch])
+            if self.tracer is not None:
+                for _, trace_key in batch:
+                    if trace_key is not None:
+                        self.tracer.mark(trace_key[0], trace_key[1], 'sink_write')
+
+            with self._lock:
+                self._done += len(batch)
+                self.stats['written'] += len(batch)
+                self.stats['batches'] += 1
+                self._drained.notify_all()
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        """One batch to every output"""
+        for output in self.outputs:
+            try:
+                output.write_batch(batch)
+            except Exception as e:
+                with self._lock:
+                    self.stats['errors'] += 1
+                logger.error(f"Signal sink: {type(output).__name__} failed on "
+                             f"{len(batch)} records: {e}")
@@ -25,7 +25,6 @@ from typing import Dict, List, Optional
 # Core imports
 from config.settings import TradingConfig
 from scanner.enhanced_bar_processor import EnhancedBarProcessor
-from core.pine_functions import nz
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -185,16 +184,17 @@ class LorentzianSystemTest:
         # Process bars
         print(f"Processing {len(df)} bars...")
         
-        for idx, row in df.iterrows():
-            # Process bar
-            result = processor.process_bar(
-                nz(row['open'], row['close']),
-                nz(row['high'], row['close']),
-                nz(row['low'], row['close']),
-                nz(row['close'], 0.0),
-                nz(row['volume'], 0.0)
-            )
-            
+        # Column-wise nz(): open/high/low default to close, close/volume to 0
+        closes = df['close'].fillna(0.0).to_numpy(dtype=float)
+        bar_results = processor.process_bars(
+            df['open'].fillna(df['close']).to_numpy(dtype=float),
+            df['high'].fillna(df['close']).to_numpy(dtype=float),
+            df['low'].fillna(df['close']).to_numpy(dtype=float),
+            closes,
+            df['volume'].fillna(0.0).to_numpy(dtype=float)
+        )
+        
+        for date, close, result in zip(df['date'].tolist(), closes.tolist(), bar_results):
             if result:
                 results['bars_processed'] += 1
                 
@@ -206,7 +206,7 @@ class LorentzianSystemTest:
                 if result.prediction != 0:
                     results['ml_predictions'].append({
                         'bar': result.bar_index,
-                        'date': row['date'],
+                        'date': date,
                         'prediction': result.prediction,
                         'signal': result.signal
                     })
@@ -219,32 +219,32 @@ class LorentzianSystemTest:
                 if result.start_long_trade:
                     results['entries'].append({
                         'bar': result.bar_index,
-                        'date': row['date'],
+                        'date': date,
                         'type': 'LONG',
-                        'price': row['close']
+                        'price': close
                     })
                 elif result.start_short_trade:
                     results['entries'].append({
                         'bar': result.bar_index,
-                        'date': row['date'],
+                        'date': date,
                         'type': 'SHORT',
-                        'price': row['close']
+                        'price': close
                     })
                 
                 # Track exits
                 if result.end_long_trade:
                     results['exits'].append({
                         'bar': result.bar_index,
-                        'date': row['date'],
+                        'date': date,
                         'type': 'EXIT_LONG',
-                        'price': row['close']
+                        'price': close
                     })
                 elif result.end_short_trade:
                     results['exits'].append({
                         'bar': result.bar_index,
-                        'date': row['date'],
+                        'date': date,
                         'type': 'EXIT_SHORT',
-                        'price': row['close']
+                        'price': close
                     })
                 
                 # Track filters (post-warmup)
@@ -0,0 +1,145 @@
+"""
+Test the bar-close scheduler
+Open positions first, then near flips, then the rest; deadline misses counted
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from config.settings import TradingConfig
+from scanner.enhanced_bar_processor import EnhancedBarProcessor
+from scanner.bar_scheduler import (
+    BarScheduler, ScheduledBar, bar_priority, position_bars_held,
+    PRIORITY_POSITION, PRIORITY_NEAR_FLIP, PRIORITY_IDLE
+)
+
+# Short ML warm-up so primed processors are past it
+CONFIG = TradingConfig(max_bars_back=100)
+
+
+def create_bars(symbol: str, n_bars: int, seed: int, start: int = 1_700_000_000):
+    """Random-walk scheduled bars, one per 5 minutes"""
+    rng = np.random.default_rng(seed)
+    close = 500 + np.cumsum(rng.normal(0, 3, n_bars))
+    open_ = close + rng.normal(0, 1, n_bars)
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 2, n_bars))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 2, n_bars))
+    return [ScheduledBar(symbol, start + 300 * i, open_[i], high[i], low[i], close[i], 1000.0)
+            for i in range(n_bars)]
+
+
+def primed_processor(symbol: str, bars) -> EnhancedBarProcessor:
+    """Processor that has processed the given bars"""
+    processor = EnhancedBarProcessor(CONFIG, symbol, "5minute")
+    for bar in bars:
+        processor.process_bar(bar.open, bar.high, bar.low, bar.close, bar.volume)
+    return processor
+
+
+def test_priority_order():
+    """Position, then near flip, then idle - regardless of arrival order"""
+    print("Testing priority order...")
+
+    history = {symbol: create_bars(symbol, 121, seed)
+               for seed, symbol in enumerate(("IDLE", "FLIP", "POS", "WARM"))}
+    processors = {symbol: primed_processor(symbol, bars[:120])
+                  for symbol, bars in history.items() if symbol != "WARM"}
+    processors["WARM"] = primed_processor("WARM", history["WARM"][:10])
+
+    # Force each state on the committed processors
+    processors["POS"].entry_history[2] = (True, False)
+    processors["POS"].entry_history[0:2] = [(False, False)] * 2
+    for symbol, prediction in (("FLIP", 1.0), ("IDLE", 6.0)):
+        processors[symbol].entry_history = [(False, False)] * 10
+        processors[symbol].ml_model.prediction = prediction
+        processors[symbol].ml_model.signal = 1
+
+    assert position_bars_held(processors["POS"]) == 2
+    assert position_bars_held(processors["IDLE"]) is None
+    assert bar_priority(processors["POS"]) == PRIORITY_POSITION
+    assert bar_priority(processors["FLIP"]) == PRIORITY_NEAR_FLIP
+    assert bar_priority(processors["IDLE"]) == PRIORITY_IDLE
+    assert bar_priority(processors["WARM"]) == PRIORITY_IDLE  # Still warming up
+
+    scheduler = BarScheduler(processors.__getitem__)
+    for symbol in ("IDLE", "WARM", "FLIP", "POS"):
+        scheduler.submit(history[symbol][120 if symbol != "WARM" else 10])
+    order = [bar.symbol for bar, _ in scheduler.run()]
+
+    assert order == ["POS", "FLIP", "IDLE", "WARM"]
+    assert scheduler.stats()['position']['processed'] == 1
+    assert scheduler.pending() == 0
+
+    print(f"✓ Order: {order}")
+
+
+def test_results_match_sequential():
+    """Reordering across symbols keeps every symbol's results unchanged"""
+    print("\nTesting results against sequential processing...")
+
+    symbols = [f"SYM{i}" for i in range(4)]
+    bars = {symbol: create_bars(symbol, 250, seed=i) for i, symbol in enumerate(symbols)}
+    expected = {}
+    for symbol in symbols:
+        sequential = EnhancedBarProcessor(CONFIG, symbol, "5minute")
+        expected[symbol] = [sequential.process_bar(b.open, b.high, b.low, b.close, b.volume)
+                            for b in bars[symbol]]
+
+    processors = {}
+    scheduler = BarScheduler(
+        lambda symbol: processors.setdefault(symbol, EnhancedBarProcessor(CONFIG, symbol, "5minute")))
+    results = {symbol: [] for symbol in symbols}
+    # Bar closes of 50 bars each; several bars per symbol queued at once
+    for start in range(0, 250, 50):
+        for i in range(start, start + 50):
+            for symbol in symbols:
+                scheduler.submit(bars[symbol][i])
+        for bar, result in scheduler.run():
+            results[bar.symbol].append((bar.timestamp, result))
+
+    for symbol in symbols:
+        timestamps = [timestamp for timestamp, _ in results[symbol]]
+        assert timestamps == [b.timestamp for b in bars[symbol]]
+        assert [result for _, result in results[symbol]] == expected[symbol]
+
+    print("✓ Per-symbol results identical")
+
+
+def test_deadline_misses():
+    """Bars finished after their deadline are counted per priority"""
+    print("\nTesting deadline misses...")
+
+    now = [1000.0]
+
+    def clock():
+        now[0] += 1.0  # Each bar takes one second
+        return now[0]
+
+    processors = {}
+    scheduler = BarScheduler(
+        lambda symbol: processors.setdefault(symbol, EnhancedBarProcessor(CONFIG, symbol, "5minute")),
+        clock=clock)
+    for i, symbol in enumerate(("A", "B", "C", "D")):
+        bar = create_bars(symbol, 1, seed=i)[0]
+        bar.deadline = 1002.5  # A and B make it, C and D do not
+        scheduler.submit(bar)
+    no_deadline = create_bars("E", 1, seed=9)[0]
+    scheduler.submit(no_deadline)
+    scheduler.run()
+
+    stats = scheduler.stats()
+    assert stats['idle']['processed'] == 5
+    assert stats['idle']['missed'] == 2
+    assert abs(stats['idle']['max_lateness'] - 1.5) < 1e-9
+    assert [miss[0] for miss in scheduler.recent_misses] == ["C", "D"]
+
+    print(f"✓ Misses: {stats['idle']}")
+
+
+if __name__ == "__main__":
+    test_priority_order()
+    test_results_match_sequential()
+    test_deadline_misses()
+    print("\n✅ All bar scheduler tests passed!")
@@ -0,0 +1,106 @@
+"""
+Test the batch filter engine against the stateful filters
+Array results must match bar-by-bar results exactly (not approximately)
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from core.batch_filters import (
+    normalized_slope_decline_series, regime_filter_array,
+    atr_series, volatility_filter_array, dmi_series, adx_filter_array
+)
+from core.regime_filter_fix_v2 import StatefulRegimeFilterV2
+from core.stateful_ta import StatefulATR, StatefulDMI
+
+
+def create_history(n_bars: int = 1500, seed: int = 11):
+    """Random-walk OHLC history"""
+    rng = np.random.default_rng(seed)
+    close = 1000 + np.cumsum(rng.normal(0, 5, n_bars))
+    open_ = close + rng.normal(0, 2, n_bars)
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 3, n_bars))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 3, n_bars))
+    ohlc4 = (open_ + high + low + close) / 4.0
+    return ohlc4, high, low, close
+
+
+def test_regime_filter_matches_stateful():
+    """KLMF kernel reproduces StatefulRegimeFilterV2 bit for bit"""
+    print("Testing batch regime filter...")
+
+    ohlc4, high, low, _ = create_history()
+    stateful = StatefulRegimeFilterV2()
+    expected = np.array([stateful.update(s, h, l) for s, h, l in zip(ohlc4, high, low)])
+
+    nsd = normalized_slope_decline_series(ohlc4, high, low)
+    assert np.array_equal(nsd, expected), "Normalized slope decline differs"
+    assert np.array_equal(regime_filter_array(ohlc4, high, low, -0.1), expected >= -0.1)
+    assert regime_filter_array(ohlc4, high, low, -0.1, use_regime_filter=False).all()
+
+    print("✓ Regime filter matches exactly")
+
+
+def test_volatility_filter_matches_stateful():
+    """ATR kernel reproduces StatefulATR bit for bit"""
+    print("\nTesting batch volatility filter...")
+
+    _, high, low, close = create_history()
+    for period in (1, 10, 14):
+        stateful = StatefulATR(period)
+        expected = np.array([stateful.update(h, l, c) for h, l, c in zip(high, low, close)])
+        assert np.array_equal(atr_series(high, low, close, period), expected), f"ATR({period}) differs"
+
+    recent = StatefulATR(1)
+    historical = StatefulATR(10)
+    expected = np.array([recent.update(h, l, c) > historical.update(h, l, c)
+                         for h, l, c in zip(high, low, close)])
+    assert np.array_equal(volatility_filter_array(high, low, close), expected)
+
+    print("✓ Volatility filter matches exactly")
+
+
+def test_adx_filter_matches_stateful():
+    """DMI kernel reproduces StatefulDMI bit for bit"""
+    print("\nTesting batch ADX filter...")
+
+    _, high, low, close = create_history()
+    stateful = StatefulDMI(14, 14)
+    expected = np.array([stateful.update(h, l, c) for h, l, c in zip(high, low, close)])
+
+    di_plus, di_minus, adx = dmi_series(high, low, close, 14, 14)
+    assert np.array_equal(di_plus, expected[:, 0])
+    assert np.array_equal(di_minus, expected[:, 1])
+    assert np.array_equal(adx, expected[:, 2])
+    assert np.array_equal(adx_filter_array(high, low, close, 14, 20), expected[:, 2] > 20)
+
+    print("✓ ADX filter matches exactly")
+
+
+def test_nan_bars_are_skipped():
+    """NaN bars return neutral values and do not advance state"""
+    print("\nTesting NaN handling...")
+
+    ohlc4, high, low, close = create_history(n_bars=300)
+    ohlc4[100] = np.nan
+    high[150] = np.nan
+
+    stateful = StatefulRegimeFilterV2()
+    expected = np.array([stateful.update(s, h, l) for s, h, l in zip(ohlc4, high, low)])
+    assert np.array_equal(normalized_slope_decline_series(ohlc4, high, low), expected)
+
+    stateful_atr = StatefulATR(10)
+    expected_atr = np.array([stateful_atr.update(h, l, c) for h, l, c in zip(high, low, close)])
+    assert np.array_equal(atr_series(high, low, close, 10), expected_atr)
+
+    print("✓ NaN bars handled like the stateful filters")
+
+
+if __name__ == "__main__":
+    test_regime_filter_matches_stateful()
+    test_volatility_filter_matches_stateful()
+    test_adx_filter_matches_stateful()
+    test_nan_bars_are_skipped()
+    print("\n✅ All batch filter tests passed!")
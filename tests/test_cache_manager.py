@@ -0,0 +1,295 @@
+"""
+Test the MarketDataCache bulk write path
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data.cache_manager import MarketDataCache, format_cache_dates
+from data.trading_calendar import NSE_CALENDAR, to_epoch
+
+
+def create_frame(start: str, periods: int, seed: int = 0) -> pd.DataFrame:
+    """Daily OHLCV frame with IST-aware dates"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, periods))
+    return pd.DataFrame({
+        'date': pd.date_range(start, periods=periods, freq='D', tz='Asia/Kolkata'),
+        'open': close + 0.1,
+        'high': close + 1.0,
+        'low': close - 1.0,
+        'close': close,
+        'volume': rng.integers(1000, 5000, periods),
+    })
+
+
+def session_frame(start: datetime, end: datetime, interval: str = "day") -> pd.DataFrame:
+    """OHLCV frame with one bar per calendar session bar in [start, end]"""
+    times = NSE_CALENDAR.bar_times(start, end, interval)
+    close = np.linspace(100, 110, len(times))
+    return pd.DataFrame({
+        'date': pd.to_datetime(times, unit='s', utc=True).tz_convert('Asia/Kolkata'),
+        'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+        'volume': np.full(len(times), 1000),
+    })
+
+
+def full_metadata(db_path: str, symbol: str, interval: str):
+    """MIN/MAX/COUNT over the whole symbol (what metadata must equal)"""
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("""
+            SELECT MIN(date), MAX(date), COUNT(*) FROM market_data
+            WHERE symbol = ? AND interval = ?
+        """, (symbol, interval)).fetchone()
+
+
+def test_bulk_save_round_trip():
+    """Saved rows read back unchanged"""
+    print("Testing bulk save round trip...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(tmp)
+        frame = create_frame("2020-01-01", 500)
+        cache.save_data("TEST", frame, "day")
+
+        loaded = cache.get_cached_data("TEST", datetime(2019, 1, 1),
+                                       datetime(2030, 1, 1), "day")
+        assert len(loaded) == 500
+        np.testing.assert_allclose(loaded['close'].values, frame['close'].values)
+        assert (loaded['volume'].values == frame['volume'].values).all()
+
+        with sqlite3.connect(cache.db_path) as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    print("✓ Round trip OK")
+
+
+def test_incremental_metadata_matches_full_scan():
+    """Metadata after overlapping batches equals a full MIN/MAX/COUNT"""
+    print("\nTesting incremental metadata...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(tmp)
+        cache.save_data("TEST", create_frame("2021-01-01", 300), "day")
+        # Overlaps the end and extends it
+        cache.save_data("TEST", create_frame("2021-09-01", 200, seed=1), "day")
+        # Entirely before the cached range
+        cache.save_data("TEST", create_frame("2020-01-01", 100, seed=2), "day")
+        # Re-save of existing rows must not change the count
+        cache.save_data("TEST", create_frame("2021-03-01", 50, seed=3), "day")
+        # Another symbol does not affect TEST
+        cache.save_data("OTHER", create_frame("2021-01-01", 10), "day")
+
+        metadata = cache._get_metadata("TEST", "day")
+        first, last, count = full_metadata(cache.db_path, "TEST", "day")
+        assert metadata['total_records'] == count
+        assert metadata['first_date'] == pd.to_datetime(first)
+        assert metadata['last_date'] == pd.to_datetime(last)
+
+    print(f"✓ Metadata matches full scan ({count} records)")
+
+
+def test_date_format_matches_astype_str():
+    """Vectorized date formatting is identical to astype(str)"""
+    print("\nTesting date formatting...")
+
+    cases = [
+        pd.Series(pd.date_range("2016-01-01 09:15", periods=2000, freq="min", tz="Asia/Kolkata")),
+        pd.Series(pd.date_range("2016-03-01", periods=2000, freq="h", tz="America/New_York")),
+        pd.Series(pd.date_range("2016-01-01", periods=200, freq="D")),
+        pd.Series(pd.date_range("2016-01-01", periods=200, freq="7h")),
+        pd.Series(pd.date_range("2016-01-01", periods=20, freq="1500ms", tz="Asia/Kolkata")),
+    ]
+    for dates in cases:
+        assert format_cache_dates(dates) == dates.astype(str).tolist()
+
+    print("✓ Same strings as astype(str)")
+
+
+def test_numpy_read_matches_dataframe():
+    """get_arrays/get_arrays_multi return the same bars as get_cached_data"""
+    print("\nTesting NumPy read path...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(tmp)
+        symbols = ["AAA", "BBB", "CCC"]
+        for seed, symbol in enumerate(symbols):
+            cache.save_data(symbol, create_frame("2020-01-01", 120 + seed * 10, seed=seed), "day")
+
+        start, end = datetime(2020, 2, 1), datetime(2020, 4, 1)
+        multi = cache.get_arrays_multi(symbols + ["MISSING"], start, end, "day")
+        assert sorted(multi) == symbols
+
+        for symbol in symbols:
+            frame = cache.get_cached_data(symbol, start, end, "day")
+            arrays = cache.get_arrays(symbol, start, end, "day")
+            expected_epoch = (frame['date'].dt.tz_convert('UTC').dt.tz_localize(None)
+                              .astype('datetime64[s]').astype('int64').values)
+
+            for field in ('open', 'high', 'low', 'close', 'volume'):
+                assert np.array_equal(arrays[field], frame[field].values.astype(float))
+                assert np.array_equal(multi[symbol][field], arrays[field])
+                assert arrays[field].flags['C_CONTIGUOUS']
+            assert np.array_equal(arrays['timestamp'], expected_epoch)
+
+        assert cache.get_arrays("MISSING", start, end, "day") is None
+
+    print("✓ Arrays match the DataFrame path")
+
+
+def test_connection_pool_per_thread():
+    """Each thread reuses one connection; threads do not share"""
+    print("\nTesting connection pool...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(tmp)
+        assert cache._connect() is cache._connect()
+
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(cache._connect()))
+        thread.start()
+        thread.join()
+        assert seen[0] is not cache._connect()
+
+        cache.close()
+        assert len(cache._pool) == 0
+
+    print("✓ One connection per thread")
+
+
+def test_missing_ranges_use_coverage_and_calendar():
+    """Holes in the middle are found; weekends and holidays are never requested"""
+    print("\nTesting coverage-based gap detection...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(tmp, clock=lambda: to_epoch(datetime(2025, 1, 1)))
+        # Cached: Jan 1 - Mar 8 and Apr 1 - Jun 28 2024; hole in March
+        first = (datetime(2024, 1, 1), datetime(2024, 3, 8))
+        second = (datetime(2024, 4, 1), datetime(2024, 6, 28))
+        cache.save_data("TEST", session_frame(*first), "day", covered=first)
+        cache.save_data("TEST", session_frame(*second), "day", covered=second)
+
+        missing = cache.get_missing_date_ranges("TEST", datetime(2024, 1, 1),
+                                                datetime(2024, 6, 30), "day")
+        # Mar 8 is a holiday, Mar 9-10 a weekend: the hole is Mar 11 - Mar 28
+        # (Mar 29 Good Friday, Mar 30-31 weekend)
+        assert missing == [(datetime(2024, 3, 11), datetime(2024, 3, 28, 15, 30))]
+
+        # Range ending on a weekend after the cached data: nothing to fetch
+        assert cache.get_missing_date_ranges("TEST", datetime(2024, 4, 1),
+                                             datetime(2024, 6, 30), "day") == []
+
+        # Fill the hole: coverage merges into one range
+        hole = missing[0]
+        cache.save_data("TEST", session_frame(*hole), "day", covered=hole)
+        with cache._connect() as conn:
+            assert len(cache._load_coverage(conn, "TEST", "day")) == 1
+        assert cache.get_missing_date_ranges("TEST", datetime(2024, 1, 1),
+                                             datetime(2024, 6, 30), "day") == []
+
+        stats = cache.get_gap_stats()
+        assert stats['lookups'] == 3
+        assert stats['api_calls'] == 1
+        # The old first/last comparison requested the weekend after Jun 28
+        # on every lookup (and never saw the hole)
+        assert stats['legacy_api_calls'] == 3 and stats['saved_calls'] == 2
+
+    print(f"✓ Exact gaps ({stats})")
+
+
+def test_open_bar_is_not_covered():
+    """The in-progress candle is refetched; closed ones are not"""
+    print("\nTesting intraday coverage...")
+
+    now = datetime(2024, 6, 3, 11, 2)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(tmp, clock=lambda: to_epoch(now))
+        request = (datetime(2024, 5, 31), now)
+        cache.save_data("TEST", session_frame(*request, interval="5minute"), "5minute",
+                        covered=request)
+
+        missing = cache.get_missing_date_ranges("TEST", datetime(2024, 5, 31), now, "5minute")
+        assert missing == [(datetime(2024, 6, 3, 11, 0), datetime(2024, 6, 3, 11, 4, 59))]
+
+        # Legacy caches without a coverage index are seeded from their stored
+        # bars: a hole in the middle is found, the open candle stays missing
+        # (coverage ends at the last closed second, as _mark_covered does)
+        with cache._connect() as conn:
+            conn.execute("DELETE FROM cache_coverage")
+            conn.execute("""
+                DELETE FROM market_data WHERE date >= '2024-05-31 10:00:00+05:30'
+                    AND date < '2024-05-31 10:15:00+05:30'
+            """)
+        # (both gaps fit in one request, so they are fetched together)
+        assert cache.get_missing_date_ranges("TEST", datetime(2024, 5, 31), now, "5minute") == [
+            (datetime(2024, 5, 31, 10, 0), datetime(2024, 6, 3, 11, 4, 59))]
+        with cache._connect() as conn:
+            assert cache._load_coverage(conn, "TEST", "5minute") == [
+                (to_epoch(datetime(2024, 5, 31, 9, 15)), to_epoch(datetime(2024, 5, 31, 9, 55))),
+                (to_epoch(datetime(2024, 5, 31, 10, 15)), to_epoch(datetime(2024, 6, 3, 10, 57)))]
+
+    print("✓ Open candle refetched")
+
+
+def test_empty_fetch_is_covered():
+    """A successful fetch with no bars is not repeated; a failed one is"""
+    print("\nTesting empty fetch coverage...")
+
+    calls = []
+
+    def fetch_nothing(symbol, from_date, to_date, interval):
+        calls.append((from_date, to_date))
+        return pd.DataFrame(columns=['date', 'open', 'high', 'low', 'close', 'volume'])
+
+    def fetch_failing(symbol, from_date, to_date, interval):
+        calls.append((from_date, to_date))
+        raise ConnectionError("API down")
+
+    def fetch_failed(symbol, from_date, to_date, interval):
+        # ZerodhaClient's fetch function reports errors and unknown tokens as None
+        calls.append((from_date, to_date))
+        return None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(tmp, clock=lambda: to_epoch(datetime(2025, 1, 1)))
+        request = ("SUSPENDED", datetime(2024, 3, 1), datetime(2024, 3, 28), "day")
+
+        for fetch in (fetch_failing, fetch_failing):
+            try:
+                cache.merge_and_get_data(*request, fetch)
+            except ConnectionError:
+                pass
+        assert len(calls) == 2  # Errors are not remembered
+        assert cache.merge_and_get_data(*request, fetch_failed).empty
+        assert cache.merge_and_get_data(*request, fetch_failed).empty
+        assert len(calls) == 4
+        assert cache.get_missing_date_ranges(*request) != []
+
+        assert cache.merge_and_get_data(*request, fetch_nothing).empty
+        assert len(calls) == 5
+        assert cache.merge_and_get_data(*request, fetch_nothing).empty
+        assert len(cache.merge_and_get_data(*request, fetch_nothing, return_format="numpy")['close']) == 0
+        assert len(calls) == 5
+        assert cache.get_missing_date_ranges(*request) == []
+
+    print("✓ Empty range fetched once")
+
+
+if __name__ == "__main__":
+    test_bulk_save_round_trip()
+    test_incremental_metadata_matches_full_scan()
+    test_date_format_matches_astype_str()
+    test_numpy_read_matches_dataframe()
+    test_connection_pool_per_thread()
+    test_missing_ranges_use_coverage_and_calendar()
+    test_open_bar_is_not_covered()
+    test_empty_fetch_is_covered()
+    print("\n✅ All cache manager tests passed!")
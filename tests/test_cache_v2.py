@@ -0,0 +1,158 @@
+"""
+Test the compact v2 SQLite schema and the v1 -> v2 migration
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlite3
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data.cache_manager import MarketDataCache, OHLCV_DTYPE
+from data.cache_v2 import CompactBarStore, migrate_to_v2, database_size
+
+
+def create_frame(start: str, periods: int, seed: int = 0) -> pd.DataFrame:
+    """Daily OHLCV frame with IST-aware dates, prices on a 0.05 tick"""
+    rng = np.random.default_rng(seed)
+    close = np.round((100 + np.cumsum(rng.normal(0, 1, periods))) * 20) / 20
+    return pd.DataFrame({
+        'date': pd.date_range(start, periods=periods, freq='D', tz='Asia/Kolkata'),
+        'open': close + 0.1,
+        'high': close + 1.05,
+        'low': close - 0.95,
+        'close': close,
+        'volume': rng.integers(1000, 5000, periods).astype(float),
+    })
+
+
+def assert_same(actual, expected):
+    for name in OHLCV_DTYPE.names:
+        assert np.allclose(actual[name], expected[name], rtol=0, atol=1e-9), name
+
+
+def test_schema_is_without_rowid():
+    """bars is a WITHOUT ROWID table with the integer composite key"""
+    print("Testing v2 schema...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CompactBarStore(tmp)
+        sql = sqlite3.connect(store.db_path).execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'bars'").fetchone()[0]
+        assert "WITHOUT ROWID" in sql
+        assert "PRIMARY KEY (instrument_id, interval_id, ts)" in sql
+
+        store.save_data("AAA", create_frame("2020-01-01", 10), "day")
+        store.save_data("BBB", create_frame("2020-01-01", 10), "5minute")
+        assert store.instrument_id("AAA") != store.instrument_id("BBB")
+        assert store.interval_id("day") is not None
+        assert store.instrument_id("ZZZ") is None
+        store.close()
+
+    print("✓ Schema created")
+
+
+def test_round_trip_and_ranges():
+    """Saved bars read back by epoch range, replacing on duplicate timestamps"""
+    print("\nTesting save and range reads...")
+
+    frame = create_frame("2020-01-01", 100)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CompactBarStore(tmp)
+        assert store.save_data("AAA", frame, "day") == 100
+
+        arrays = store.get_arrays("AAA", datetime(2020, 1, 11), datetime(2020, 1, 20))
+        assert len(arrays['timestamp']) == 10
+        assert np.allclose(arrays['close'], frame['close'].values[10:20])
+
+        # Overwrite one bar
+        update = frame.iloc[[5]].copy()
+        update['close'] = 1.0
+        store.save_data("AAA", update, "day")
+        assert store.count("AAA", "day") == 100
+        df = store.get_cached_data("AAA")
+        assert df['close'].iloc[5] == 1.0
+        assert df['date'].iloc[0] == frame['date'].iloc[0]
+
+        assert store.get_arrays("AAA", interval="5minute") is None
+        assert store.get_arrays("AAA", datetime(2021, 1, 1)) is None
+        store.close()
+
+    print("✓ Ranges and replacement work")
+
+
+def test_integer_scaled_prices():
+    """price_scale stores integers and is fixed per database"""
+    print("\nTesting integer-scaled prices...")
+
+    frame = create_frame("2020-01-01", 50)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CompactBarStore(tmp, price_scale=100)
+        store.save_data("AAA", frame, "day")
+        stored = sqlite3.connect(store.db_path).execute(
+            "SELECT typeof(close), close FROM bars LIMIT 1").fetchone()
+        assert stored[0] == 'integer'
+        assert stored[1] == round(frame['close'].iloc[0] * 100)
+        assert np.allclose(store.get_arrays("AAA")['close'], frame['close'].values)
+        store.close()
+
+        # Reopening reads the scale from the database
+        assert CompactBarStore(tmp).price_scale == 100
+        try:
+            CompactBarStore(tmp, price_scale=1000)
+            assert False, "Mismatched price_scale accepted"
+        except ValueError:
+            pass
+
+    print("✓ Scaled prices round-trip")
+
+
+def test_online_migration():
+    """Migration matches v1 reads and resumes with bars added meanwhile"""
+    print("\nTesting v1 -> v2 migration...")
+
+    symbols = ["AAA", "M&M", "BAJAJ-AUTO"]
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(os.path.join(tmp, "v1"))
+        for seed, symbol in enumerate(symbols):
+            cache.save_data(symbol, create_frame("2019-01-01", 300, seed=seed), "day")
+        # Missing volume survives as NULL -> 0 on read, like v1
+        sparse = create_frame("2019-01-01", 20, seed=9)
+        sparse.loc[3, 'volume'] = np.nan
+        cache.save_data("SPARSE", sparse, "day")
+
+        store = CompactBarStore(os.path.join(tmp, "v2"), price_scale=100)
+        migrated = migrate_to_v2(cache, store, batch_rows=64)
+        assert migrated == {"day/AAA": 300, "day/BAJAJ-AUTO": 300,
+                            "day/M&M": 300, "day/SPARSE": 20}
+
+        # v1 keeps taking writes; the next run copies only the new tail
+        cache.save_data("AAA", create_frame("2019-10-28", 10, seed=5), "day")
+        assert migrate_to_v2(cache, store, batch_rows=64)["day/AAA"] == 10
+        assert migrate_to_v2(cache, store)["day/AAA"] == 0
+
+        start, end = datetime(2019, 3, 1, 12), datetime(2019, 12, 1, 12)
+        expected = cache.get_arrays_multi(symbols + ["SPARSE"], start, end, "day")
+        actual = store.get_arrays_multi(symbols + ["SPARSE"], start, end, "day")
+        assert set(actual) == set(expected)
+        for symbol in expected:
+            assert_same(actual[symbol], expected[symbol])
+
+        # Compact rows: the v2 file is smaller than v1
+        assert database_size(store.db_path) < database_size(cache.db_path)
+        cache.close()
+        store.close()
+
+    print("✓ Migration matches v1")
+
+
+if __name__ == "__main__":
+    test_schema_is_without_rowid()
+    test_round_trip_and_ranges()
+    test_integer_scaled_prices()
+    test_online_migration()
+    print("\n✅ All v2 schema tests passed!")
@@ -0,0 +1,165 @@
+"""
+Test the streaming tick-to-candle aggregator
+Bars must match a pandas resample of the same ticks, aligned to 09:15 IST
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data.candle_aggregator import CandleAggregator, tick_epoch
+from data.trading_calendar import to_epoch
+
+SESSION_OPEN = to_epoch(datetime(2024, 1, 2, 9, 15))
+
+
+def create_ticks(tokens, seconds: int, seed: int = 0) -> pd.DataFrame:
+    """Random ticks (about one per instrument per second), cumulative volume"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i, token in enumerate(tokens):
+        times = np.sort(rng.choice(seconds, size=seconds // 2, replace=False)) + SESSION_OPEN
+        frames.append(pd.DataFrame({
+            'token': token,
+            'ts': times,
+            'price': 100 * (i + 1) + np.cumsum(rng.normal(0, 0.5, len(times))),
+            'volume': np.cumsum(rng.integers(1, 100, len(times))).astype(float),
+        }))
+    return pd.concat(frames).sort_values('ts', kind='stable').reset_index(drop=True)
+
+
+def collect(aggregator):
+    """Subscribe and gather closed bars per interval as DataFrames"""
+    bars = {}
+    aggregator.subscribe(lambda interval, block: bars.setdefault(interval, []).append(block))
+    return lambda interval: pd.DataFrame(np.concatenate(bars[interval])).sort_values(
+        ['instrument_token', 'timestamp']).reset_index(drop=True)
+
+
+def expected_bars(ticks: pd.DataFrame, minutes: int) -> pd.DataFrame:
+    """Reference OHLCV by pandas groupby on session-aligned buckets"""
+    bucket = SESSION_OPEN + (ticks['ts'] - SESSION_OPEN) // (minutes * 60) * (minutes * 60)
+    grouped = ticks.groupby([ticks['token'], bucket])
+    result = grouped['price'].agg(['first', 'max', 'min', 'last'])
+    # Cumulative volume: a bar's volume is its last value minus the previous bar's last
+    last_volume = grouped['volume'].last()
+    result['volume'] = last_volume - last_volume.groupby(level=0).shift(1).fillna(0)
+    result.index.names = ['instrument_token', 'timestamp']
+    return result.reset_index()
+
+
+def test_bars_match_resample():
+    """Every interval's bars equal the pandas reference"""
+    print("Testing multi-interval bars...")
+
+    ticks = create_ticks([256265, 738561, 2953217], seconds=3600)
+    aggregator = CandleAggregator(("minute", "5minute", "15minute"))
+    bars = collect(aggregator)
+
+    # Batches of ~50 ticks, like KiteTicker delivers them
+    for lo in range(0, len(ticks), 50):
+        batch = ticks.iloc[lo:lo + 50]
+        aggregator.on_arrays(batch['token'].values, batch['price'].values,
+                             batch['volume'].values, batch['ts'].values)
+    aggregator.close_due(SESSION_OPEN + 3600)
+
+    for interval, minutes in (("minute", 1), ("5minute", 5), ("15minute", 15)):
+        actual, expected = bars(interval), expected_bars(ticks, minutes)
+        assert len(actual) == len(expected) == 3 * 60 // minutes, interval
+        assert np.array_equal(actual['timestamp'], expected['timestamp'])
+        for column, reference in (('open', 'first'), ('high', 'max'), ('low', 'min'),
+                                  ('close', 'last'), ('volume', 'volume')):
+            assert np.allclose(actual[column], expected[reference]), f"{interval} {column}"
+
+    print("✓ Bars match")
+
+
+def test_session_alignment():
+    """60-minute bars start at 09:15 and the last one ends at 15:30"""
+    print("\nTesting session alignment...")
+
+    aggregator = CandleAggregator(("60minute",))
+    bars = collect(aggregator)
+    day = to_epoch(datetime(2024, 1, 2))
+    times = [day + 9 * 3600, day + 9 * 3600 + 20 * 60, day + 10 * 3600, day + 10 * 3600 + 20 * 60,
+             day + 15 * 3600 + 29 * 60, day + 15 * 3600 + 45 * 60]
+    for i, ts in enumerate(times):
+        aggregator.on_arrays(np.array([1]), np.array([100.0 + i]), np.array([np.nan]), np.array([ts]))
+
+    # Pre-open and post-close ticks are ignored
+    assert aggregator.stats['ignored'] == 2
+    aggregator.close_due(day + 15 * 3600 + 30 * 60)
+    result = bars("60minute")
+    starts = [datetime.utcfromtimestamp(ts + 19800).strftime("%H:%M") for ts in result['timestamp']]
+    assert starts == ["09:15", "10:15", "15:15"]
+    assert list(result['open']) == [101.0, 103.0, 104.0]
+    assert list(result['volume']) == [0.0, 0.0, 0.0]
+
+    print("✓ Aligned to the session")
+
+
+def test_late_and_repeated_ticks():
+    """Same-instrument ticks in one batch apply in order; late ticks are dropped"""
+    print("\nTesting late and repeated ticks...")
+
+    aggregator = CandleAggregator(("minute",))
+    bars = collect(aggregator)
+    t = SESSION_OPEN
+    aggregator.on_arrays(np.array([7, 7, 7, 8]), np.array([10.0, 12.0, 9.0, 50.0]),
+                         np.array([100.0, 150.0, 175.0, 10.0]), np.array([t, t + 10, t + 20, t]))
+    aggregator.on_arrays(np.array([7]), np.array([11.0]), np.array([200.0]), np.array([t + 60]))
+    # Late tick for the closed 09:15 bar
+    aggregator.on_arrays(np.array([7]), np.array([99.0]), np.array([210.0]), np.array([t + 30]))
+    assert aggregator.stats['late'] == 1
+
+    first = bars("minute").iloc[0]
+    assert (first['open'], first['high'], first['low'], first['close']) == (10.0, 12.0, 9.0, 9.0)
+    assert first['volume'] == 175.0  # First bar of the session counts from zero
+
+    forming = aggregator.current_bars("minute")
+    assert sorted(forming['instrument_token']) == [7, 8]
+
+    # After close_due the bar is final: a tick for it is late, not a reopen
+    aggregator.close_due(t + 120)
+    aggregator.on_arrays(np.array([7]), np.array([1.0]), np.array([220.0]), np.array([t + 90]))
+    assert aggregator.stats['late'] == 2
+    assert len(aggregator.current_bars("minute")) == 0
+    assert aggregator.stats['bars'] == 3
+
+    print("✓ Late ticks dropped")
+
+
+def test_kite_tick_dicts():
+    """KiteTicker dicts (naive IST exchange_timestamp, volume_traded) are parsed"""
+    print("\nTesting KiteTicker dicts...")
+
+    aggregator = CandleAggregator(("minute",), clock=lambda: SESSION_OPEN + 5)
+    bars = collect(aggregator)
+    ticks = [
+        {'instrument_token': 1, 'last_price': 10.0, 'volume_traded': 5,
+         'exchange_timestamp': datetime(2024, 1, 2, 9, 15, 1)},
+        {'instrument_token': 2, 'last_price': 20.0},  # ltp mode: clock time
+    ]
+    aggregator.on_kite_ticks(None, ticks)
+    aggregator.on_ticks([{'instrument_token': 1, 'last_price': 11.0, 'volume_traded': 9,
+                          'exchange_timestamp': datetime(2024, 1, 2, 9, 16)}])
+
+    assert tick_epoch(datetime(2024, 1, 2, 9, 15)) == SESSION_OPEN
+    result = bars("minute")
+    assert list(result['instrument_token']) == [1]
+    assert result['timestamp'][0] == SESSION_OPEN and result['volume'][0] == 5.0
+    assert sorted(aggregator.current_bars("minute")['instrument_token']) == [1, 2]
+
+    print("✓ Tick dicts parsed")
+
+
+if __name__ == "__main__":
+    test_bars_match_resample()
+    test_session_alignment()
+    test_late_and_repeated_ticks()
+    test_kite_tick_dicts()
+    print("\n✅ All candle aggregator tests passed!")
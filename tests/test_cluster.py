@@ -0,0 +1,263 @@
+"""
+Test the multi-node scanning cluster
+Consistent hashing, localhost nodes, and state migration on rebalance
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+from collections import Counter
+
+import numpy as np
+
+from config.settings import TradingConfig
+from scanner.cluster import (ClusterCoordinator, ClusterError, HashRing, ScanNode,
+                             start_local_node)
+from scanner.enhanced_bar_processor import EnhancedBarProcessor
+from scanner.sharded_engine import ClosedBar
+
+CONFIG = TradingConfig(max_bars_back=100)
+
+
+def create_bars(symbol: str, n_bars: int, seed: int, start: int = 1_700_000_000):
+    """Random-walk closed bars, one per 5 minutes"""
+    rng = np.random.default_rng(seed)
+    close = 500 + np.cumsum(rng.normal(0, 3, n_bars))
+    open_ = close + rng.normal(0, 1, n_bars)
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 2, n_bars))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 2, n_bars))
+    return [ClosedBar(symbol, start + 300 * i, open_[i], high[i], low[i], close[i], 1000.0)
+            for i in range(n_bars)]
+
+
+def expected_signals(bars):
+    """(symbol, bar_index, type) of every entry signal, processed in-process"""
+    processors = {}
+    signals = set()
+    for bar in bars:
+        processor = processors.setdefault(
+            bar.symbol, EnhancedBarProcessor(CONFIG, bar.symbol, "5minute"))
+        result = processor.process_bar(bar.open, bar.high, bar.low, bar.close, bar.volume)
+        if result.start_long_trade or result.start_short_trade:
+            signals.add((bar.symbol, result.bar_index, 'BUY' if result.start_long_trade else 'SELL'))
+    return signals
+
+
+def test_hash_ring_moves_few_symbols():
+    """Even spread; adding a node only moves symbols onto it, removing it undoes that"""
+    print("Testing consistent hashing...")
+
+    symbols = [f"SYM{i}" for i in range(4000)]
+    ring = HashRing(["a", "b", "c", "d"], vnodes=128)
+    before = {symbol: ring.node_for(symbol) for symbol in symbols}
+    counts = Counter(before.values())
+    assert set(counts) == {"a", "b", "c", "d"}
+    assert max(counts.values()) < 1.5 * len(symbols) / 4
+
+    ring.add("e")
+    after = {symbol: ring.node_for(symbol) for symbol in symbols}
+    moved = [symbol for symbol in symbols if after[symbol] != before[symbol]]
+    assert all(after[symbol] == "e" for symbol in moved)
+    assert 0.1 < len(moved) / len(symbols) < 0.3  # About 1/5
+
+    ring.remove("e")
+    assert {symbol: ring.node_for(symbol) for symbol in symbols} == before
+
+    print(f"✓ Adding a 5th node moved {len(moved)} of {len(symbols)} symbols")
+
+
+def test_cluster_signals_survive_rebalance():
+    """Signals across join/leave migrations equal in-process processing"""
+    print("\nTesting cluster with state migration...")
+
+    symbols = [f"SYM{i}" for i in range(8)]
+    per_symbol = [create_bars(symbol, 250, seed=i) for i, symbol in enumerate(symbols)]
+    bars = [bar for group in zip(*per_symbol) for bar in group]
+
+    expected = expected_signals(bars)
+    assert expected, "Test data produced no signals"
+
+    processes = {}
+    nodes = {}
+    for name in ("node-a", "node-b"):
+        processes[name], nodes[name] = start_local_node(name, CONFIG, authkey=b'test')
+
+    signals = []
+    chunk = len(symbols) * 10
+    with ClusterCoordinator(nodes, authkey=b'test') as cluster:
+        for start in range(0, len(bars), chunk):
+            batch = cluster.submit_many(bars[start:start + chunk])
+            times = [signal['timestamp'] for signal in batch]
+            assert times == sorted(times)  # One merged stream
+            if start == 100 * len(symbols):
+                processes["node-c"], address = start_local_node("node-c", CONFIG, authkey=b'test')
+                joined = cluster.add_node("node-c", address)
+                assert joined == len(cluster.symbols_by_node()["node-c"]) > 0
+            if start == 180 * len(symbols):
+                busiest = max(cluster.symbols_by_node().items(), key=lambda item: len(item[1]))
+                left = cluster.remove_node(busiest[0])
+                assert left == len(busiest[1]) > 0
+        signals = cluster.get_signals()
+        node_stats = cluster.node_stats()
+        migrated = cluster.stats['migrated']
+
+    for process in processes.values():
+        process.join(10)
+        assert not process.is_alive()
+
+    assert {(s['symbol'], s['bar_index'], s['type']) for s in signals} == expected
+    assert len(node_stats) == 2
+    assert sum(stats['imported'] for stats in node_stats.values()) == migrated
+    assert sum(stats['symbols'] for stats in node_stats.values()) == len(symbols)  # No copies left
+    assert all(stats['errors'] == 0 and stats['stale'] == 0 for stats in node_stats.values())
+
+    print(f"✓ {len(signals)} signals match after migrating {migrated} symbols")
+
+
+def test_dead_node_leaves_other_replies_in_sync():
+    """A node dying mid-request does not shift the other nodes' replies"""
+    print("\nTesting node failure...")
+
+    symbols = [f"SYM{i}" for i in range(8)]
+    per_symbol = {symbol: create_bars(symbol, 250, seed=i) for i, symbol in enumerate(symbols)}
+
+    processes = {}
+    nodes = {}
+    for name in ("node-a", "node-b"):
+        processes[name], nodes[name] = start_local_node(name, CONFIG, authkey=b'test')
+
+    with ClusterCoordinator(nodes, authkey=b'test') as cluster:
+        owned = {name: [s for s in symbols if cluster.node_for(s) == name] for name in nodes}
+        assert owned["node-a"] and owned["node-b"]
+        survivors = owned["node-a"]
+        expected = expected_signals([per_symbol[s][i] for i in range(250) for s in survivors])
+
+        for i in range(150):
+            cluster.submit_many([per_symbol[s][i] for s in symbols])
+        processes["node-b"].terminate()
+        processes["node-b"].join(10)
+
+        # node-b's bars come first: its failure must not strand node-a's reply
+        try:
+            cluster.submit_many([per_symbol[s][150] for s in owned["node-b"] + survivors])
+            raise AssertionError("Dead node not reported")
+        except ClusterError as e:
+            assert [failure.split(':')[0] for failure in e.failures] == ["node-b"]
+            assert list(e.replies) == ["node-a"]
+        try:
+            cluster.node_stats()
+            raise AssertionError("Dead node not reported")
+        except ClusterError as e:
+            assert e.replies["node-a"]['bars'] == 151 * len(survivors)
+
+        for i in range(151, 250):
+            batch = cluster.submit_many([per_symbol[s][i] for s in survivors])
+            assert all(signal['bar_index'] == i for signal in batch)
+        signals = cluster.get_signals()
+
+    processes["node-a"].join(10)
+    signals = [signal for signal in signals if signal['symbol'] in survivors]
+    assert {(s['symbol'], s['bar_index'], s['type']) for s in signals} == expected
+
+    print(f"✓ node-a kept in sync after node-b died; {len(signals)} signals match")
+
+
+def test_dead_node_is_evicted():
+    """Removing a crashed node reassigns its symbols cold; priming restores them"""
+    print("\nTesting dead node eviction...")
+
+    symbols = [f"SYM{i}" for i in range(8)]
+    per_symbol = {symbol: create_bars(symbol, 250, seed=i) for i, symbol in enumerate(symbols)}
+    expected = {signal for signal in expected_signals(
+        [per_symbol[s][i] for i in range(250) for s in symbols]) if signal[1] > 150}
+
+    processes = {}
+    nodes = {}
+    for name in ("node-a", "node-b"):
+        processes[name], nodes[name] = start_local_node(name, CONFIG, authkey=b'test')
+
+    with ClusterCoordinator(nodes, authkey=b'test') as cluster:
+        for i in range(150):
+            cluster.submit_many([per_symbol[s][i] for s in symbols])
+        evicted = cluster.symbols_by_node()["node-b"]
+        assert evicted
+        processes["node-b"].kill()
+        processes["node-b"].join(10)
+
+        # The coordinator only finds out during the export
+        assert cluster.remove_node("node-b") == len(evicted)
+        assert cluster.ring.nodes == ["node-a"]
+        assert cluster.symbols_by_node() == {"node-a": symbols}
+        assert cluster.lost_symbols == set(evicted) and cluster.stats['lost'] == len(evicted)
+
+        for symbol in evicted:
+            history = per_symbol[symbol][:151]
+            cluster.prime(symbol, [b.timestamp for b in history], [b.open for b in history],
+                          [b.high for b in history], [b.low for b in history],
+                          [b.close for b in history], [b.volume for b in history])
+        assert not cluster.lost_symbols
+        cluster.get_signals()
+        for i in range(150, 250):
+            cluster.submit_many([per_symbol[s][i] for s in symbols])
+        signals = cluster.get_signals()
+
+    processes["node-a"].join(10)
+    assert {(s['symbol'], s['bar_index'], s['type'])
+            for s in signals if s['bar_index'] > 150} == expected
+
+    print(f"✓ {len(evicted)} symbols evicted cold and re-primed; {len(signals)} signals match")
+
+
+class RefusingNode(ScanNode):
+    """Scan node whose imports fail"""
+
+    def handle(self, message):
+        if message[0] == 'import':
+            raise OSError("No space left on device")
+        return super().handle(message)
+
+
+def test_failed_import_keeps_state_on_old_node():
+    """A node join whose import fails leaves every processor with its old owner"""
+    print("\nTesting failed migration...")
+
+    symbols = [f"SYM{i}" for i in range(8)]
+    per_symbol = [create_bars(symbol, 250, seed=i) for i, symbol in enumerate(symbols)]
+    bars = [bar for group in zip(*per_symbol) for bar in group]
+    expected = expected_signals(bars)
+
+    node_a = ScanNode("node-a", CONFIG, authkey=b'test')
+    node_b = RefusingNode("node-b", CONFIG, authkey=b'test')
+    for node in (node_a, node_b):
+        threading.Thread(target=node.serve_forever, daemon=True).start()
+
+    split = 100 * len(symbols)
+    with ClusterCoordinator({"node-a": node_a.address}, authkey=b'test') as cluster:
+        cluster.submit_many(bars[:split])
+        try:
+            cluster.add_node("node-b", node_b.address)
+            raise AssertionError("Failed import not reported")
+        except ClusterError as e:
+            assert "node-b" in str(e)
+        assert cluster.ring.nodes == ["node-a"]
+        assert cluster.symbols_by_node() == {"node-a": symbols}
+        assert sorted(node_a.processors) == symbols
+        assert not node_b.processors  # Partial imports are dropped
+
+        cluster.submit_many(bars[split:])
+        signals = cluster.get_signals()
+
+    assert {(s['symbol'], s['bar_index'], s['type']) for s in signals} == expected
+    assert node_a.stats['stale'] == 0 and node_a.stats['bars'] == len(bars)
+
+    print(f"✓ Migration rolled back; {len(signals)} signals match")
+
+
+if __name__ == "__main__":
+    test_hash_ring_moves_few_symbols()
+    test_cluster_signals_survive_rebalance()
+    test_dead_node_leaves_other_replies_in_sync()
+    test_dead_node_is_evicted()
+    test_failed_import_keeps_state_on_old_node()
+    print("\n✅ All cluster tests passed!")
@@ -0,0 +1,239 @@
+"""
+Test the memory-mapped columnar bar store
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data.cache_manager import MarketDataCache
+from data.columnar_store import ColumnarBarStore, migrate_from_sqlite, COLUMNS
+from data.bar_data import BarData
+from data.trading_calendar import NSE_CALENDAR, to_epoch
+from core.batch_filters import atr_series
+
+
+def create_frame(start: str, periods: int, seed: int = 0) -> pd.DataFrame:
+    """Daily OHLCV frame with IST-aware dates"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, periods))
+    return pd.DataFrame({
+        'date': pd.date_range(start, periods=periods, freq='D', tz='Asia/Kolkata'),
+        'open': close + 0.1,
+        'high': close + 1.0,
+        'low': close - 1.0,
+        'close': close,
+        'volume': rng.integers(1000, 5000, periods).astype(float),
+    })
+
+
+def session_frame(start: datetime, end: datetime) -> pd.DataFrame:
+    """Daily OHLCV frame with one bar per NSE session in [start, end]"""
+    times = NSE_CALENDAR.bar_times(start, end, "day")
+    close = np.linspace(100, 110, len(times))
+    return pd.DataFrame({
+        'date': pd.to_datetime(times, unit='s', utc=True).tz_convert('Asia/Kolkata'),
+        'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+        'volume': np.full(len(times), 1000.0),
+    })
+
+
+def test_migration_matches_sqlite():
+    """Migrated series read back exactly as the SQLite NumPy path returns them"""
+    print("Testing SQLite migration...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(os.path.join(tmp, "sqlite"))
+        for seed, symbol in enumerate(["AAA", "M&M", "BAJAJ-AUTO"]):
+            cache.save_data(symbol, create_frame("2019-01-01", 400, seed=seed), "day")
+
+        store = ColumnarBarStore(os.path.join(tmp, "columnar"))
+        migrated = migrate_from_sqlite(cache, store)
+        assert migrated == {"day/AAA": 400, "day/M&M": 400, "day/BAJAJ-AUTO": 400}
+
+        # Mid-day bounds: the SQLite path compares date strings, so an exact
+        # midnight to_date excludes that day's bar there but not here
+        start, end = datetime(2019, 3, 1, 12), datetime(2019, 9, 1, 12)
+        expected = cache.get_arrays_multi(["AAA", "M&M", "BAJAJ-AUTO"], start, end, "day")
+        # A fresh store reads the index from disk
+        loaded = ColumnarBarStore(os.path.join(tmp, "columnar")).get_arrays_multi(
+            ["AAA", "M&M", "BAJAJ-AUTO"], start, end, "day")
+        for symbol, columns in expected.items():
+            for name in COLUMNS:
+                assert np.array_equal(loaded[symbol][name], columns[name]), f"{symbol} {name}"
+        cache.close()
+
+    print("✓ Migrated series match")
+
+
+def test_append_backfill_and_zero_copy():
+    """Appends extend in place, backfills merge, loads are memmaps"""
+    print("\nTesting append and backfill...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ColumnarBarStore(tmp)
+        full = create_frame("2020-01-01", 300)
+
+        assert store.save_data("TEST", full.iloc[100:200], "day") == 100
+        assert store.save_data("TEST", full.iloc[200:], "day") == 100      # append
+        assert store.save_data("TEST", full.iloc[:150], "day") == 100      # backfill + overlap
+        assert store.rows("TEST", "day") == 300
+
+        columns = store.load("TEST", "day")
+        assert isinstance(columns['close'], np.memmap)
+        assert not columns['close'].flags.writeable
+        assert np.array_equal(columns['close'], full['close'].values)
+        assert np.all(np.diff(columns['timestamp']) > 0)
+
+        # Arrays go straight into the batch indicators and BarData
+        atr = atr_series(columns['high'], columns['low'], columns['close'], 14)
+        assert len(atr) == 300
+        bars = BarData.from_arrays(columns['open'], columns['high'], columns['low'],
+                                   columns['close'], columns['volume'], max_bars=50)
+        assert bars.close == full['close'].iloc[-1] and bars.bar_index == 299
+
+    print("✓ Append, backfill and zero-copy loads OK")
+
+
+def test_torn_append_is_ignored():
+    """Bytes written past the committed row count are not visible and get overwritten"""
+    print("\nTesting torn append recovery...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ColumnarBarStore(tmp)
+        frame = create_frame("2021-01-01", 20)
+        store.save_data("TEST", frame.iloc[:10], "day")
+
+        # Simulate a crash after writing part of a column
+        with open(os.path.join(tmp, "day", "TEST", "close.f8"), 'ab') as f:
+            f.write(b"\x00" * 12)
+
+        reopened = ColumnarBarStore(tmp)
+        assert len(reopened.load("TEST", "day")['close']) == 10
+        reopened.save_data("TEST", frame.iloc[10:], "day")
+        assert np.array_equal(reopened.load("TEST", "day")['close'], frame['close'].values)
+
+    print("✓ Torn tail ignored")
+
+
+def test_crashed_merge_keeps_old_series():
+    """A backfill that dies mid-rewrite leaves the committed series intact"""
+    print("\nTesting crash during a merge...")
+
+    def crash_on_fsync(after):
+        calls = []
+        real_fsync = os.fsync
+
+        def fsync(fd):
+            calls.append(fd)
+            if len(calls) > after:
+                raise OSError("Simulated crash")
+            real_fsync(fd)
+        return fsync
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ColumnarBarStore(tmp)
+        full = create_frame("2020-01-01", 300)
+        store.save_data("TEST", full.iloc[100:200], "day")
+
+        # Die after 3 of the 6 merged columns, then before the index commit
+        for after in (3, len(COLUMNS)):
+            real_fsync = os.fsync
+            os.fsync = crash_on_fsync(after)
+            try:
+                store.save_data("TEST", full.iloc[:150], "day")
+                raise AssertionError("Crash not simulated")
+            except OSError:
+                pass
+            finally:
+                os.fsync = real_fsync
+
+            # Neither the running store nor a reopened one sees the failed merge
+            reopened = ColumnarBarStore(tmp)
+            for view in (store, reopened):
+                columns = view.load("TEST", "day")
+                for name in ('close', 'volume'):
+                    assert np.array_equal(columns[name], full[name].values[100:200])
+                assert columns['timestamp'][0] == view._index["day/TEST"]['first']
+
+        # The retried backfill commits a new generation and removes the old one
+        assert reopened.save_data("TEST", full.iloc[:150], "day") == 100
+        assert reopened.save_data("TEST", full.iloc[250:], "day") == 50      # append
+        assert reopened.save_data("TEST", full.iloc[190:260], "day") == 50   # merge again
+        assert np.array_equal(ColumnarBarStore(tmp).load("TEST", "day")['close'],
+                              full['close'].values)
+        series_dir = os.path.join(tmp, "day", "TEST")
+        assert sorted(os.listdir(series_dir)) == ["gen-2"]
+
+    print("✓ Old columns survive a crashed merge; generations switch atomically")
+
+
+def test_fetch_through_like_sqlite_cache():
+    """merge_and_get_data fetches only what was never fetched, as MarketDataCache does"""
+    print("Testing fetch-through API...")
+
+    calls = []
+    answers = {}
+
+    def fetch(symbol, from_date, to_date, interval):
+        calls.append((from_date, to_date))
+        return answers.get(symbol, session_frame)(from_date, to_date)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = lambda: to_epoch(datetime(2025, 1, 1))
+        store = ColumnarBarStore(tmp, clock=clock)
+        sqlite_cache = MarketDataCache(os.path.join(tmp, "sqlite"), clock=clock)
+        request = ("AAA", datetime(2024, 1, 1), datetime(2024, 3, 31), "day")
+
+        df = store.merge_and_get_data(*request, fetch)
+        assert len(calls) == 1
+        assert len(df) == len(NSE_CALENDAR.expected_bars(*request[1:]))
+        assert np.array_equal(df['close'].values,
+                              sqlite_cache.merge_and_get_data(*request, fetch)['close'].values)
+        assert store.get_missing_date_ranges(*request) == []
+        assert len(store.merge_and_get_data(*request, fetch, return_format="records")) == len(df)
+        assert len(calls) == 2  # Only the SQLite cache fetched again
+
+        # Extending the range fetches just the new sessions
+        arrays = store.merge_and_get_data("AAA", datetime(2024, 1, 1), datetime(2024, 4, 30),
+                                          "day", fetch, return_format="numpy")
+        assert calls[-1][0] > datetime(2024, 3, 31)
+        assert len(arrays['close']) == len(store.get_cached_data("AAA", interval="day"))
+
+        # Failures are retried, empty answers are remembered
+        answers["GONE"] = lambda from_date, to_date: None
+        assert store.merge_and_get_data("GONE", *request[1:], fetch).empty
+        assert store.get_missing_date_ranges("GONE", *request[1:]) != []
+        answers["GONE"] = lambda from_date, to_date: session_frame(from_date, from_date).iloc[:0]
+        assert store.merge_and_get_data("GONE", *request[1:], fetch).empty
+        fetched = len(calls)
+        assert store.merge_and_get_data("GONE", *request[1:], fetch).empty
+        assert len(calls) == fetched
+        assert ColumnarBarStore(tmp, clock=clock).get_missing_date_ranges("GONE", *request[1:]) == []
+
+        # Series stored before coverage was tracked: the bars held count as covered
+        frame = session_frame(datetime(2024, 1, 1), datetime(2024, 3, 31))
+        store.save_data("OLD", frame.drop(index=range(20, 30)), "day")
+        index = json.load(open(store.index_path))
+        del index["day/OLD"]['covered']
+        json.dump(index, open(store.index_path, 'w'))
+        missing = ColumnarBarStore(tmp, clock=clock).get_missing_date_ranges("OLD", *request[1:])
+        assert len(missing) == 1
+        assert missing[0][0] == frame['date'].iloc[20].tz_localize(None).to_pydatetime()
+
+    print("✓ Same fetch-through behaviour as the SQLite cache")
+
+
+if __name__ == "__main__":
+    test_migration_matches_sqlite()
+    test_append_backfill_and_zero_copy()
+    test_torn_append_is_ignored()
+    test_crashed_merge_keeps_old_series()
+    test_fetch_through_like_sqlite_cache()
+    print("\n✅ All columnar store tests passed!")
@@ -0,0 +1,68 @@
+"""
+Test bounded diagnostics buffers used by the regime filter and PineScriptEMA
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.diagnostics import RingBuffer, DiagnosticsChannel, DiagnosticsSettings
+from core.regime_filter_fix_v2 import StatefulRegimeFilterV2, PineScriptEMA
+from config.memory_limits import DIAGNOSTICS_BUFFER_SIZE
+
+
+def test_ring_buffer_overwrites_oldest():
+    """Ring buffer keeps only the newest `capacity` items"""
+    print("Testing RingBuffer...")
+
+    ring = RingBuffer(3)
+    for i in range(5):
+        ring.append(i)
+
+    assert len(ring) == 3
+    assert ring.to_list() == [2, 3, 4], f"Unexpected contents {ring.to_list()}"
+    assert ring.last(2) == [3, 4]
+
+    print("✓ RingBuffer tests passed!")
+
+
+def test_disabled_channel_records_nothing():
+    """Disabled channel never samples and allocates no buffer"""
+    print("\nTesting disabled channel...")
+
+    channel = DiagnosticsChannel('test_disabled', DiagnosticsSettings(enabled=False))
+    assert not channel.should_sample(50)
+    channel.record(50, {'x': 1.0})
+    assert channel.records() == []
+
+    sampled = DiagnosticsChannel('test_sampled',
+                                 DiagnosticsSettings(enabled=True, sample_every=10,
+                                                     sample_bars=frozenset({3})))
+    assert [bar for bar in range(1, 31) if sampled.should_sample(bar)] == [3, 10, 20, 30]
+
+    print("✓ Channel sampling tests passed!")
+
+
+def test_regime_filter_debug_is_bounded():
+    """Long runs keep a bounded number of debug records"""
+    print("\nTesting regime filter memory bound...")
+
+    regime = StatefulRegimeFilterV2()
+    ema = PineScriptEMA(200)
+    for i in range(30000):
+        price = 100 + (i % 17) * 0.5
+        regime.update(price, price + 1, price - 1)
+        ema.update(price)
+
+    assert len(regime.debug_values) <= DIAGNOSTICS_BUFFER_SIZE
+    assert regime.debug_values[-1]['bar'] == 30000
+    # EMA diagnostics are off by default
+    assert ema.values == []
+
+    print(f"✓ {len(regime.debug_values)} debug records retained after 30000 bars")
+
+
+if __name__ == "__main__":
+    test_ring_buffer_overwrites_oldest()
+    test_disabled_channel_records_nothing()
+    test_regime_filter_debug_is_bounded()
+    print("\n✅ All diagnostics tests passed!")
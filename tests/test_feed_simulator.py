@@ -0,0 +1,183 @@
+"""
+Test the simulated market feed
+Exact bar round trip through the candle aggregator, load knobs,
+KiteTicker callbacks and replay from the cache
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data.cache_manager import MarketDataCache
+from data.candle_aggregator import CandleAggregator
+from data.feed_simulator import FeedConfig, SimulatedTicker, SYNTHETIC_TOKEN_BASE
+from data.trading_calendar import to_epoch
+
+SESSION_OPEN = to_epoch(datetime(2024, 1, 2, 9, 15))
+
+
+def create_series(symbols, n_bars: int, start: int = SESSION_OPEN, seed: int = 0):
+    """Random-walk minute bars {symbol: arrays} like MarketDataCache.get_arrays_multi"""
+    rng = np.random.default_rng(seed)
+    series = {}
+    for symbol in symbols:
+        close = 100 + np.cumsum(rng.normal(0, 0.5, n_bars))
+        open_ = close + rng.normal(0, 0.3, n_bars)
+        series[symbol] = {
+            'timestamp': start + 60 * np.arange(n_bars, dtype=np.int64),
+            'open': open_,
+            'high': np.maximum(open_, close) + rng.uniform(0, 0.5, n_bars),
+            'low': np.minimum(open_, close) - rng.uniform(0, 0.5, n_bars),
+            'close': close,
+            'volume': rng.integers(100, 5000, n_bars).astype(float),
+        }
+    return series
+
+
+def collect_bars(ticker: SimulatedTicker, arrays: bool = False):
+    """Replay through a minute CandleAggregator; {token: [bar tuples]}"""
+    aggregator = CandleAggregator(("minute",))
+    bars = {}
+    aggregator.subscribe(lambda interval, closed: [
+        bars.setdefault(int(bar['instrument_token']), []).append(
+            (int(bar['timestamp']), bar['open'], bar['high'], bar['low'], bar['close'],
+             bar['volume']))
+        for bar in closed])
+    if arrays:
+        ticker.on_tick_arrays = lambda ws, *batch: aggregator.on_arrays(*batch)
+    else:
+        ticker.on_ticks = aggregator.on_kite_ticks
+    ticker.on_connect = lambda ws, response: (
+        ws.subscribe(ws.instrument_tokens), ws.set_mode(ws.MODE_FULL, ws.instrument_tokens))
+    ticker.connect()
+    aggregator.close_due(int(ticker.timeline[-1]) + ticker.interval_seconds)
+    return bars
+
+
+def test_bars_round_trip():
+    """Ticks rebuild the cached bars exactly, through dicts and arrays"""
+    print("Testing bar round trip...")
+
+    series = create_series(["AAA"], 40)
+    # BBB has no bar at 09:25
+    series["BBB"] = {field: np.delete(values, 10) for field, values in
+                     create_series(["BBB"], 40, seed=1)["BBB"].items()}
+
+    for arrays in (False, True):
+        ticker = SimulatedTicker(series, config=FeedConfig(ticks_per_bar=7),
+                                 tokens={"AAA": 256265})
+        bars = collect_bars(ticker, arrays)
+        assert set(bars) == {256265, SYNTHETIC_TOKEN_BASE + 1}
+        for token, symbol in ticker.symbols.items():
+            source = series[symbol]
+            expected = list(zip(source['timestamp'].tolist(), source['open'], source['high'],
+                                source['low'], source['close'], source['volume']))
+            got = bars[token]
+            assert len(got) == len(expected), (symbol, len(got))
+            assert np.allclose(np.array(got), np.array(expected)), symbol
+        assert ticker.stats['bars'] == 79 and ticker.stats['ticks'] == 79 * 7
+
+    print("✓ 79 bars rebuilt exactly (dict and array paths)")
+
+
+def test_load_knobs_and_modes():
+    """Replicated instruments, bursts and per-mode tick contents"""
+    print("\nTesting instruments, bursts and modes...")
+
+    ticker = SimulatedTicker(create_series(["AAA", "BBB"], 10),
+                             config=FeedConfig(instruments=5, ticks_per_bar=4,
+                                               burst_every=5, burst_factor=3, batch_size=2))
+    assert list(ticker.symbols.values()) == ["AAA", "BBB", "AAA#1", "BBB#1", "AAA#2"]
+    tokens = ticker.instrument_tokens.tolist()
+    batches = []
+    ticker.on_ticks = lambda ws, ticks: batches.append(ticks)
+    ticker.subscribe(tokens[:4])
+    ticker.set_mode(ticker.MODE_FULL, tokens[:1])
+    ticker.set_mode(ticker.MODE_LTP, tokens[1:2])
+    ticker.unsubscribe(tokens[3:4])
+    ticker.connect()
+
+    # 8 normal bars x 4 ticks + 2 burst bars x 12 ticks, for 3 instruments
+    ticks = [tick for batch in batches for tick in batch]
+    assert len(ticks) == 3 * (8 * 4 + 2 * 12) == ticker.stats['ticks']
+    assert max(len(batch) for batch in batches) == 2
+    by_token = {token: [t for t in ticks if t['instrument_token'] == token] for token in tokens}
+    assert not by_token[tokens[3]] and not by_token[tokens[4]]
+    full, ltp, quote = by_token[tokens[0]][0], by_token[tokens[1]][0], by_token[tokens[2]][0]
+    assert full['mode'] == 'full' and full['exchange_timestamp'] == datetime(2024, 1, 2, 9, 15)
+    assert set(ltp) == {'tradable', 'mode', 'instrument_token', 'last_price'}
+    assert 'volume_traded' in quote and 'exchange_timestamp' not in quote
+    # AAA#1 carries AAA's prices
+    assert [t['last_price'] for t in by_token[tokens[2]]] == \
+        [t['last_price'] for t in by_token[tokens[0]]]
+
+    print(f"✓ {len(ticks)} ticks across modes, bursts included")
+
+
+def test_disconnects_and_pacing():
+    """Threaded replay: on_close/on_reconnect/on_connect, lost ticks, time compression"""
+    print("\nTesting disconnects and pacing...")
+
+    events = []
+    ticker = SimulatedTicker(create_series(["AAA"], 12),
+                             config=FeedConfig(ticks_per_bar=6, disconnect_every=4,
+                                               outage_seconds=30, speed=3000.0))
+    ticker.on_connect = lambda ws, response: (events.append('connect'),
+                                              ws.subscribe(ws.instrument_tokens))
+    ticker.on_close = lambda ws, code, reason: events.append(('close', code))
+    ticker.on_reconnect = lambda ws, attempts: events.append(('reconnect', attempts))
+    ticker.on_ticks = lambda ws, ticks: None
+
+    start = time.perf_counter()
+    ticker.connect(threaded=True)
+    assert ticker.wait(10)
+    elapsed = time.perf_counter() - start
+
+    assert events == ['connect', ('close', 1006), ('reconnect', 1), 'connect',
+                      ('close', 1006), ('reconnect', 2), 'connect', ('close', 1000)]
+    # Each outage loses the first half of a bar (3 of its 6 ticks)
+    assert ticker.stats['dropped'] == 6 and ticker.stats['ticks'] == 12 * 6 - 6
+    assert not ticker.is_connected()
+    # 12 simulated minutes at 3000x take about 0.24 s
+    assert 0.2 < elapsed < 5.0
+
+    print(f"✓ 2 disconnects, 720 simulated seconds in {elapsed:.2f} s")
+
+
+def test_replay_from_cache():
+    """from_cache replays the cached minute bars"""
+    print("\nTesting replay from MarketDataCache...")
+
+    series = create_series(["AAA"], 30)["AAA"]
+    frame = pd.DataFrame({
+        'date': pd.to_datetime(series['timestamp'], unit='s', utc=True).tz_convert('Asia/Kolkata'),
+        **{field: series[field] for field in ('open', 'high', 'low', 'close', 'volume')},
+    })
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(tmp)
+        cache.save_data("AAA", frame, "minute")
+        ticker = SimulatedTicker.from_cache(cache, ["AAA", "NONE"], datetime(2024, 1, 2),
+                                            datetime(2024, 1, 3), "minute",
+                                            tokens={"AAA": 408065})
+        cache.close()
+
+    bars = collect_bars(ticker)
+    assert list(ticker.symbols.values()) == ["AAA"]
+    got = np.array(bars[408065])
+    assert len(got) == 30 and np.allclose(got[:, 4], series['close'])
+
+    print("✓ 30 cached bars replayed")
+
+
+if __name__ == "__main__":
+    test_bars_round_trip()
+    test_load_knobs_and_modes()
+    test_disconnects_and_pacing()
+    test_replay_from_cache()
+    print("\n✅ All feed simulator tests passed!")
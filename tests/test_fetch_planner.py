@@ -0,0 +1,147 @@
+"""
+Test the historical fetch planner against a local stub of KiteConnect.historical_data
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+from data.fetch_planner import (
+    MAX_DAYS_PER_REQUEST, TokenBucket, FetchRequest, HistoricalFetcher, plan_chunks
+)
+
+
+class StubKite:
+    """Stub of KiteConnect.historical_data returning one candle per day"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def historical_data(self, instrument_token, from_date, to_date, interval,
+                        continuous=False, oi=False):
+        span = (to_date - from_date).total_seconds() / 86400
+        if span > MAX_DAYS_PER_REQUEST[interval]:
+            raise ValueError(f"interval exceeds max limit: {MAX_DAYS_PER_REQUEST[interval]} days")
+        with self._lock:
+            self.calls.append((time.monotonic(), instrument_token, from_date, to_date))
+        if self.delay:
+            time.sleep(self.delay)
+
+        candles = []
+        day = datetime(from_date.year, from_date.month, from_date.day)
+        if day < from_date:
+            day += timedelta(days=1)
+        while day <= to_date:
+            price = float(instrument_token) + day.toordinal() % 97
+            candles.append({'date': day, 'open': price, 'high': price + 1,
+                            'low': price - 1, 'close': price, 'volume': 100})
+            day += timedelta(days=1)
+        return candles
+
+
+def test_plan_chunks_is_minimal():
+    """Chunks cover the range exactly, with the fewest API calls"""
+    print("Testing chunk planning...")
+
+    start = datetime(2016, 1, 1)
+    end = datetime(2024, 3, 15, 15, 30)
+    for interval, max_days in MAX_DAYS_PER_REQUEST.items():
+        chunks = plan_chunks(start, end, interval)
+        expected = -(-(end - start).days // max_days)  # ceil
+        assert len(chunks) in (expected, expected + 1), f"{interval}: {len(chunks)} chunks"
+        assert chunks[0][0] == start and chunks[-1][1] == end
+        for (a_from, a_to), (b_from, _) in zip(chunks, chunks[1:]):
+            assert b_from == a_to + timedelta(seconds=1)
+        assert all((to - frm) < timedelta(days=max_days) for frm, to in chunks)
+
+    # 3000 days of daily data: 2 calls instead of one per 2000-bar window
+    assert len(plan_chunks(datetime(2016, 1, 1), datetime(2024, 3, 18), "day")) == 2
+    assert plan_chunks(end, start, "day") == []
+
+    print("✓ Chunk plans are minimal and contiguous")
+
+
+def test_token_bucket_rate():
+    """TokenBucket spaces requests at the configured rate"""
+    print("\nTesting token bucket...")
+
+    now = [0.0]
+    bucket = TokenBucket(rate=3.0, capacity=1.0,
+                         clock=lambda: now[0],
+                         sleep=lambda s: now.__setitem__(0, now[0] + s))
+    times = []
+    for _ in range(10):
+        bucket.acquire()
+        times.append(now[0])
+
+    assert abs(times[-1] - 9 / 3.0) < 1e-9
+    assert all(b - a >= 1 / 3.0 - 1e-9 for a, b in zip(times, times[1:]))
+
+    print("✓ 10 requests took 3.0s of simulated time")
+
+
+def test_fetch_many_concurrent_and_limited():
+    """Fetch many symbols concurrently under a shared rate limit"""
+    print("\nTesting concurrent fetch...")
+
+    kite = StubKite(delay=0.05)
+    fetcher = HistoricalFetcher(kite, limiter=TokenBucket(rate=40.0), max_workers=8)
+
+    start = datetime(2015, 1, 1)
+    end = datetime(2024, 1, 1)
+    requests = [FetchRequest(f"SYM{i}", 1000 + i, start, end, "day") for i in range(6)]
+    results = fetcher.fetch_many(requests)
+
+    expected_days = (end - start).days + 1
+    for request in requests:
+        candles = results[request.key]
+        assert len(candles) == expected_days, f"{request.key}: {len(candles)} candles"
+        dates = [c['date'] for c in candles]
+        assert dates == sorted(dates) and len(set(dates)) == len(dates)
+
+    per_symbol = len(plan_chunks(start, end, "day"))
+    assert fetcher.api_calls == len(kite.calls) == per_symbol * len(requests)
+
+    # No 1-second window exceeds the limiter's rate (+1 for the window edge)
+    call_times = sorted(t for t, *_ in kite.calls)
+    for i, t in enumerate(call_times):
+        in_window = sum(1 for u in call_times[i:] if u - t < 1.0)
+        assert in_window <= 41
+
+    print(f"✓ {len(requests)} symbols in {fetcher.api_calls} calls")
+
+
+def test_failed_request_is_none():
+    """A request whose chunk keeps failing yields None; one without bars yields []"""
+    print("\nTesting failed fetch...")
+
+    class FailingKite(StubKite):
+        def historical_data(self, instrument_token, from_date, to_date, interval, **kwargs):
+            if instrument_token == 666:
+                raise ConnectionError("Too many requests")
+            return super().historical_data(instrument_token, from_date, to_date, interval)
+
+    fetcher = HistoricalFetcher(FailingKite(), limiter=TokenBucket(rate=1000.0), max_retries=1)
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 10)
+    results = fetcher.fetch_many([FetchRequest("BAD", 666, start, end, "day"),
+                                  FetchRequest("GOOD", 1, start, end, "day"),
+                                  FetchRequest("EMPTY", 2, end, start, "day")])
+    assert results["BAD"] is None
+    assert len(results["GOOD"]) == 10
+    assert results["EMPTY"] == []
+    assert fetcher.fetch(666, start, end, "day") is None
+
+    print("✓ Failure reported as None")
+
+
+if __name__ == "__main__":
+    test_plan_chunks_is_minimal()
+    test_token_bucket_rate()
+    test_fetch_many_concurrent_and_limited()
+    test_failed_request_is_none()
+    print("\n✅ All fetch planner tests passed!")
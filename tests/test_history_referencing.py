@@ -0,0 +1,85 @@
+"""
+Test the NumPy ring-buffered history used by PineArray
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from core.history_referencing import RingHistoryBuffer, HistoryBuffer, PineArray
+
+
+def test_ring_matches_history_buffer():
+    """Ring buffer returns the same rows as HistoryBuffer, across wrap-around"""
+    print("Testing RingHistoryBuffer vs HistoryBuffer...")
+
+    ring = RingHistoryBuffer(3, max_history=5)
+    reference = HistoryBuffer(max_history=5)
+
+    for bar in range(20):
+        row = np.array([bar, bar * 2.0, bar * 3.0])
+        ring.update(row)
+        reference.update(row)
+
+        assert len(ring) == len(reference)
+        for i in range(8):
+            expected = reference[i]
+            if expected is None:
+                assert ring[i] is None
+            else:
+                assert np.array_equal(ring[i], expected)
+
+    print("✓ Same values as HistoryBuffer")
+
+
+def test_views_are_zero_copy():
+    """Rows and history slices share memory with the ring block"""
+    print("\nTesting zero-copy access...")
+
+    ring = RingHistoryBuffer(4, max_history=10)
+    for bar in range(25):
+        ring.update(np.full(4, float(bar)))
+
+    history = ring.history(6)
+    assert history.shape == (6, 4)
+    assert history.flags['C_CONTIGUOUS']
+    assert np.array_equal(history[:, 0], [24, 23, 22, 21, 20, 19])
+    assert np.shares_memory(history, ring[0])
+    assert not history.flags.writeable
+
+    print("✓ history() is a contiguous newest-first view")
+
+
+def test_pine_array_history_with_push_pop():
+    """PineArray snapshots survive push/pop width changes"""
+    print("\nTesting PineArray history...")
+
+    arr = PineArray(2, max_history=50)
+    arr.set(0, 1.0)
+    arr.new_bar()
+    arr.push(5.0)
+    arr.push(6.0)
+    arr.new_bar()
+    arr.pop()
+    arr.new_bar()
+
+    assert np.array_equal(arr[0], [1.0, 0.0, 5.0])
+    assert np.array_equal(arr[1], [1.0, 0.0, 5.0, 6.0])
+    assert np.array_equal(arr[2], [1.0, 0.0])
+    assert np.array_equal(arr[3], [0.0, 0.0])
+    assert arr[4] is None
+
+    # Mutating the live array does not change history
+    arr.set(0, 99.0)
+    assert arr[0][0] == 1.0
+    assert len(arr) == 3
+
+    print("✓ PineArray history matches snapshots")
+
+
+if __name__ == "__main__":
+    test_ring_matches_history_buffer()
+    test_views_are_zero_copy()
+    test_pine_array_history_with_push_pop()
+    print("\n✅ All history referencing tests passed!")
@@ -0,0 +1,97 @@
+"""
+Test per-processor indicator contexts
+Processors must not share indicator state, so running them side by side
+or across a thread pool gives the same results as running them alone
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config.settings import TradingConfig
+from core.enhanced_indicators import enhanced_rsi, get_indicator_manager
+from core.indicator_state_manager import IndicatorContext
+from scanner.enhanced_bar_processor import EnhancedBarProcessor
+
+
+def create_bars(n_bars: int = 250, seed: int = 3):
+    """Random-walk OHLC bars"""
+    rng = np.random.default_rng(seed)
+    close = 500 + np.cumsum(rng.normal(0, 3, n_bars))
+    open_ = close + rng.normal(0, 1, n_bars)
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 2, n_bars))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 2, n_bars))
+    return list(zip(open_, high, low, close))
+
+
+def run_processor(symbol: str, bars) -> list:
+    """Process bars and collect (prediction, signal, filters) per bar"""
+    processor = EnhancedBarProcessor(TradingConfig(), symbol, "day")
+    results = []
+    for o, h, l, c in bars:
+        result = processor.process_bar(o, h, l, c, 1000.0)
+        results.append((result.prediction, result.signal, tuple(sorted(result.filter_states.items()))))
+    return results
+
+
+def test_contexts_are_isolated():
+    """Same symbol/timeframe in two contexts keeps two independent states"""
+    print("Testing context isolation...")
+
+    ctx_a = IndicatorContext("a")
+    ctx_b = IndicatorContext("b")
+    for price in (100.0, 101.0, 102.0, 101.5):
+        enhanced_rsi(price, 2, "CTX", "day", context=ctx_a)
+    enhanced_rsi(50.0, 2, "CTX", "day", context=ctx_b)
+
+    rsi_a = ctx_a.get_or_create_rsi("CTX", "day", 2)
+    rsi_b = ctx_b.get_or_create_rsi("CTX", "day", 2)
+    assert rsi_a is not rsi_b
+    assert "CTX" not in get_indicator_manager().indicators, "Global manager must stay untouched"
+
+    print("✓ Contexts do not share state")
+
+
+def test_interleaved_processors_same_symbol():
+    """Two processors on the same symbol do not corrupt each other"""
+    print("\nTesting interleaved processors...")
+
+    bars = create_bars()
+    expected = run_processor("SAME", bars)
+
+    first = EnhancedBarProcessor(TradingConfig(), "SAME", "day")
+    second = EnhancedBarProcessor(TradingConfig(), "SAME", "day")
+    for i, (o, h, l, c) in enumerate(bars):
+        for processor in (first, second):
+            result = processor.process_bar(o, h, l, c, 1000.0)
+            assert result.prediction == expected[i][0]
+            assert result.signal == expected[i][1]
+
+    print(f"✓ {len(bars)} interleaved bars match a single processor")
+
+
+def test_thread_pool_matches_sequential():
+    """Processing symbols in a thread pool gives the sequential results"""
+    print("\nTesting thread pool processing...")
+
+    universe = {f"SYM{i}": create_bars(seed=i) for i in range(6)}
+    sequential = {symbol: run_processor(symbol, bars) for symbol, bars in universe.items()}
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = {symbol: pool.submit(run_processor, symbol, bars)
+                   for symbol, bars in universe.items()}
+        threaded = {symbol: future.result() for symbol, future in futures.items()}
+
+    assert threaded == sequential
+
+    print(f"✓ {len(universe)} symbols match across threads")
+
+
+if __name__ == "__main__":
+    test_contexts_are_isolated()
+    test_interleaved_processors_same_symbol()
+    test_thread_pool_matches_sequential()
+    print("\n✅ All indicator context tests passed!")
@@ -0,0 +1,92 @@
+"""
+Test the cross-sectional IndicatorPool against the per-symbol stateful indicators
+The pool must produce the same feature vectors as enhanced_series_from
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from config.constants import DEFAULT_FEATURES
+from core.indicator_pool import IndicatorPool
+from core.enhanced_indicators import enhanced_series_from, enhanced_atr, enhanced_dmi
+from core.indicator_state_manager import IndicatorStateManager
+import core.enhanced_indicators as enhanced_indicators
+
+
+def create_universe(n_symbols: int = 4, n_bars: int = 300, seed: int = 7):
+    """Random-walk OHLC data for a small universe"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, size=(n_bars, n_symbols)), axis=0)
+    spread = np.abs(rng.normal(0, 0.8, size=(n_bars, n_symbols)))
+    high = close + spread
+    low = close - spread
+    return high, low, close
+
+
+def test_pool_matches_stateful_features():
+    """Pool features match per-symbol enhanced_series_from for every bar"""
+    print("Testing IndicatorPool vs stateful features...")
+
+    high, low, close = create_universe()
+    symbols = [f"POOL_{i}" for i in range(high.shape[1])]
+    pool = IndicatorPool(symbols)
+
+    # Fresh manager so earlier tests cannot leak state
+    enhanced_indicators._indicator_manager = IndicatorStateManager()
+
+    names = sorted(DEFAULT_FEATURES.keys())
+    for bar in range(high.shape[0]):
+        pooled = pool.update_all(high[bar], low[bar], close[bar])
+
+        for j, symbol in enumerate(symbols):
+            expected = [
+                enhanced_series_from(DEFAULT_FEATURES[name][0], close[bar, j],
+                                     high[bar, j], low[bar, j],
+                                     DEFAULT_FEATURES[name][1], DEFAULT_FEATURES[name][2],
+                                     symbol, "5minute")
+                for name in names
+            ]
+            np.testing.assert_allclose(pooled[j], expected, rtol=1e-9, atol=1e-12)
+
+            # Filter inputs
+            recent = enhanced_atr(high[bar, j], low[bar, j], close[bar, j], 1, symbol, "vol_recent")
+            hist = enhanced_atr(high[bar, j], low[bar, j], close[bar, j], 10, symbol, "vol_hist")
+            assert pool.last_volatility_pass[j] == (recent > hist)
+
+            _, _, adx = enhanced_dmi(high[bar, j], low[bar, j], close[bar, j], 14, 14, symbol, "adx")
+            assert abs(pool.last_adx[j] - adx) < 1e-9
+
+    print(f"✓ {high.shape[0]} bars x {len(symbols)} symbols match")
+
+
+def test_pool_skips_nan_symbols():
+    """A NaN bar leaves that symbol's state untouched"""
+    print("\nTesting NaN handling...")
+
+    high, low, close = create_universe(n_symbols=2, n_bars=60)
+    pool_a = IndicatorPool(["A", "B"])
+    pool_b = IndicatorPool(["A", "B"])
+
+    for bar in range(high.shape[0]):
+        pool_a.update_all(high[bar], low[bar], close[bar])
+        if bar == 30:
+            # Symbol B has no bar here
+            skipped = pool_b.update_all([high[bar, 0], np.nan], [low[bar, 0], np.nan],
+                                        [close[bar, 0], np.nan])
+            assert np.isnan(skipped[1]).all()
+        pool_b.update_all(high[bar], low[bar], close[bar])
+
+    features_a = pool_a.update_all(high[-1], low[-1], close[-1])
+    features_b = pool_b.update_all(high[-1], low[-1], close[-1])
+    # Symbol B saw the same bars in both pools
+    np.testing.assert_allclose(features_a[1], features_b[1], rtol=1e-12)
+
+    print("✓ NaN bars are skipped per symbol")
+
+
+if __name__ == "__main__":
+    test_pool_matches_stateful_features()
+    test_pool_skips_nan_symbols()
+    print("\n✅ All IndicatorPool tests passed!")
@@ -0,0 +1,78 @@
+"""
+Test the on-disk instrument master cache
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tempfile
+import time
+from datetime import date, datetime
+
+from data.instrument_cache import InstrumentCache
+from data.trading_calendar import to_epoch
+
+
+def create_dump(n: int = 5000):
+    """Instrument rows shaped like KiteConnect.instruments()"""
+    return [{
+        'instrument_token': 100000 + i, 'exchange_token': 400 + i,
+        'tradingsymbol': f"SYM{i}", 'name': f"Company {i}", 'last_price': 0.0,
+        'expiry': date(2024, 6, 27) if i % 2 else '', 'strike': 0.0, 'tick_size': 0.05,
+        'lot_size': 1, 'instrument_type': 'EQ', 'segment': 'NSE', 'exchange': 'NSE',
+    } for i in range(n)]
+
+
+def test_daily_ttl():
+    """Fresh until the next dump publication (08:30 IST)"""
+    print("Testing daily TTL...")
+
+    clock = {'now': to_epoch(datetime(2024, 6, 3, 9, 0))}
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = InstrumentCache(tmp, clock=lambda: clock['now'])
+        assert not cache.is_fresh("NSE")
+        cache.store("NSE", create_dump(10))
+        assert cache.is_fresh("NSE")
+
+        clock['now'] = to_epoch(datetime(2024, 6, 4, 8, 0))   # Before next dump
+        assert cache.is_fresh("NSE")
+        clock['now'] = to_epoch(datetime(2024, 6, 4, 8, 31))  # After it
+        assert not cache.is_fresh("NSE")
+        assert not cache.is_fresh("NFO")
+
+    print("✓ TTL OK")
+
+
+def test_lookups_survive_restart():
+    """A new process gets both maps from disk without downloading"""
+    print("\nTesting token lookups...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        InstrumentCache(tmp).store("NSE", create_dump())
+
+        reopened = InstrumentCache(tmp)
+        assert reopened.is_fresh("NSE")
+        start = time.perf_counter()
+        symbol_to_token, token_to_symbol = reopened.maps("NSE")
+        load_ms = (time.perf_counter() - start) * 1000
+        assert symbol_to_token["SYM42"] == 100042
+        assert token_to_symbol[100042] == "SYM42"
+        assert len(symbol_to_token) == len(token_to_symbol) == 5000
+        assert reopened.maps("NSE")[0] is symbol_to_token  # Built once
+
+        row = reopened.get_instrument("SYM1")
+        assert row['instrument_token'] == 100001 and row['expiry'] == "2024-06-27"
+        assert reopened.get_instrument("SYM2")['expiry'] is None
+        assert len(reopened.instruments("NSE")) == 5000
+
+        # Re-storing replaces the dump and invalidates the maps
+        reopened.store("NSE", create_dump(3))
+        assert len(reopened.maps("NSE")[0]) == 3
+
+    print(f"✓ Maps loaded from disk in {load_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    test_daily_ttl()
+    test_lookups_survive_restart()
+    print("\n✅ All instrument cache tests passed!")
@@ -0,0 +1,114 @@
+"""
+Test intrabar previews of the forming candle
+preview_bar() must give process_bar()'s result and leave no trace in the state
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from config.settings import TradingConfig
+from core.enhanced_indicators import enhanced_rsi, enhanced_cci, enhanced_dmi, enhanced_ema
+from core.enhanced_ml_extensions import enhanced_regime_filter
+from core.indicator_state_manager import IndicatorContext
+from scanner.enhanced_bar_processor import EnhancedBarProcessor
+
+# Short ML warm-up (and bar/feature history trimming) within a few hundred bars
+CONFIG = TradingConfig(max_bars_back=100)
+
+
+def create_bars(n_bars: int, seed: int = 2):
+    """Random-walk OHLCV rows"""
+    rng = np.random.default_rng(seed)
+    close = 500 + np.cumsum(rng.normal(0, 3, n_bars))
+    open_ = close + rng.normal(0, 1, n_bars)
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 2, n_bars))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 2, n_bars))
+    return [(open_[i], high[i], low[i], close[i], 1000.0) for i in range(n_bars)]
+
+
+def feed(context: IndicatorContext, bar):
+    """Update a mix of indicators, returning their outputs"""
+    open_, high, low, close, _ = bar
+    return (enhanced_rsi(close, 14, "AAA", "5minute", context),
+            enhanced_cci(high, low, close, 20, "AAA", "5minute", context),
+            enhanced_dmi(high, low, close, 14, 14, "AAA", "5minute", context),
+            enhanced_regime_filter((open_ + high + low + close) / 4, high, low, -0.1,
+                                   True, "AAA", "5minute", context))
+
+
+def test_context_rollback():
+    """Updates after a checkpoint are undone, indicators created since are dropped"""
+    print("Testing indicator context rollback...")
+
+    bars = create_bars(120)
+    context, reference = IndicatorContext(), IndicatorContext()
+    for bar in bars[:60]:
+        feed(context, bar)
+        feed(reference, bar)
+    before = reference.get_stats()
+
+    context.checkpoint()
+    for bar in bars[60:80]:
+        feed(context, bar)
+    enhanced_ema(1.0, 5, "AAA", "other", context)
+    context.rollback()
+
+    assert context.get_stats() == before
+    for bar in bars[60:]:
+        assert feed(context, bar) == feed(reference, bar)
+
+    print("✓ Rolled back")
+
+
+def test_previews_leave_no_trace():
+    """Processing with previews in between gives the same results as without"""
+    print("\nTesting previews between closed bars...")
+
+    bars = create_bars(400)
+    plain = EnhancedBarProcessor(CONFIG, "AAA", "5minute")
+    previewed = EnhancedBarProcessor(CONFIG, "AAA", "5minute")
+    signals = 0
+
+    for open_, high, low, close, volume in bars:
+        expected = plain.process_bar(open_, high, low, close, volume)
+        # Ticks of the forming candle, ending with its final values
+        for step in (0.25, 0.5, 0.75):
+            tick = open_ + (close - open_) * step
+            previewed.preview_bar(open_, max(open_, tick), min(open_, tick), tick, volume * step)
+        preview = previewed.preview_bar(open_, high, low, close, volume)
+        result = previewed.process_bar(open_, high, low, close, volume)
+
+        assert preview == expected
+        assert result == expected
+        signals += expected.start_long_trade or expected.start_short_trade
+
+    assert signals > 0
+    assert previewed.bars_processed == plain.bars_processed
+    assert previewed.ml_model.y_train_array == plain.ml_model.y_train_array
+    assert previewed.signal_history == plain.signal_history
+
+    print(f"✓ Identical over {len(bars)} bars ({signals} signals)")
+
+
+def test_invalid_preview():
+    """An invalid forming bar returns None without touching the state"""
+    print("\nTesting invalid preview...")
+
+    processor = EnhancedBarProcessor(CONFIG, "AAA", "5minute")
+    for bar in create_bars(10):
+        processor.process_bar(*bar)
+
+    assert processor.preview_bar(100.0, 90.0, 95.0, 100.0) is None  # high < low
+    assert processor.bars_processed == 10
+    assert processor.bars.bar_index == 9
+
+    print("✓ Invalid preview ignored")
+
+
+if __name__ == "__main__":
+    test_context_rollback()
+    test_previews_leave_no_trace()
+    test_invalid_preview()
+    print("\n✅ All preview tests passed!")
@@ -0,0 +1,125 @@
+"""
+Test the in-process LRU read cache in front of MarketDataCache
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data.cache_manager import MarketDataCache
+from data.read_cache import ReadCache
+
+
+def create_frame(start: str, periods: int, seed: int = 0) -> pd.DataFrame:
+    """Daily OHLCV frame with IST-aware dates"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, periods))
+    return pd.DataFrame({
+        'date': pd.date_range(start, periods=periods, freq='D', tz='Asia/Kolkata'),
+        'open': close + 0.1,
+        'high': close + 1.0,
+        'low': close - 1.0,
+        'close': close,
+        'volume': rng.integers(1000, 5000, periods),
+    })
+
+
+def test_sub_ranges_match_sqlite():
+    """Slices of a cached superset equal the SQLite query result"""
+    print("Testing sub-range hits...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(tmp)
+        uncached = MarketDataCache(tmp, read_cache_bytes=0)
+        cache.save_data("TEST", create_frame("2020-01-01", 400), "day")
+
+        cache.get_cached_data("TEST", datetime(2020, 1, 1), datetime(2021, 12, 31), "day")
+        ranges = [
+            (datetime(2020, 3, 1), datetime(2020, 6, 1)),       # Midnight boundaries
+            (datetime(2020, 3, 1, 12), datetime(2020, 6, 1, 12)),
+            (datetime(2020, 1, 1), datetime(2021, 12, 31)),
+            (datetime(2021, 3, 1), datetime(2021, 12, 31)),     # After the last bar
+        ]
+        for start, end in ranges:
+            hit = cache.get_cached_data("TEST", start, end, "day")
+            expected = uncached.get_cached_data("TEST", start, end, "day")
+            if expected is None:
+                assert hit is None
+            else:
+                pd.testing.assert_frame_equal(hit, expected)
+
+        stats = cache.get_read_cache_stats()
+        assert stats['misses'] == 1 and stats['hits'] == len(ranges)
+
+        # Callers may modify the result without corrupting the cache
+        hit = cache.get_cached_data("TEST", datetime(2020, 3, 1), datetime(2020, 6, 1), "day")
+        hit['close'] = 0.0
+        again = cache.get_cached_data("TEST", datetime(2020, 3, 1), datetime(2020, 6, 1), "day")
+        assert (again['close'] != 0.0).all()
+
+    print(f"✓ Sub-ranges served from cache ({stats})")
+
+
+def test_rolling_window_up_to_now_hits():
+    """'Last N days up to now' requests keep hitting as the window moves"""
+    print("\nTesting open-ended fill...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(tmp)
+        uncached = MarketDataCache(tmp, read_cache_bytes=0)
+        cache.save_data("TEST", create_frame("2020-01-01", 100), "day")
+
+        for minute in range(5):
+            start, now = datetime(2020, 2, 1, 10, minute), datetime(2020, 5, 1, 10, minute)
+            pd.testing.assert_frame_equal(cache.get_cached_data("TEST", start, now, "day"),
+                                          uncached.get_cached_data("TEST", start, now, "day"))
+        assert cache.get_read_cache_stats()['misses'] == 1
+
+    print("✓ Moving window hits")
+
+
+def test_invalidation_and_eviction():
+    """Writes invalidate; the byte budget evicts least recently used entries"""
+    print("\nTesting invalidation and eviction...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(tmp)
+        cache.save_data("AAA", create_frame("2020-01-01", 100), "day")
+        start, end = datetime(2020, 1, 1), datetime(2020, 12, 31)
+
+        assert len(cache.get_cached_data("AAA", start, end, "day")) == 100
+        cache.save_data("AAA", create_frame("2020-04-10", 20, seed=1), "day")
+        assert len(cache.get_cached_data("AAA", start, end, "day")) == 120
+        cache.clear_cache("AAA", "day")
+        assert cache.get_cached_data("AAA", start, end, "day") is None
+        assert cache.get_read_cache_stats()['hits'] == 0
+
+    lru = ReadCache(max_bytes=35_000)  # Room for two of the three frames
+    frames = {name: create_frame("2020-01-01", 100, seed=i) for i, name in enumerate("ABC")}
+    for name, frame in frames.items():
+        lru.put(name, "day", "0", "9", frame, frame['date'].astype(str).to_numpy())
+        lru.get("A", "day", "0", "9")  # Keep A recently used
+    assert lru.get("A", "day", "0", "9") is not None
+    assert lru.get("B", "day", "0", "9") is None
+    assert lru.stats()['evictions'] >= 1 and lru.bytes <= lru.max_bytes
+
+    # A result computed before an invalidation is not stored
+    generation = lru.generation
+    lru.invalidate("A")
+    lru.put("A", "day", "0", "9", frames["A"], frames["A"]['date'].astype(str).to_numpy(),
+            generation)
+    assert lru.get("A", "day", "0", "9") is None
+
+    print("✓ Invalidation and eviction OK")
+
+
+if __name__ == "__main__":
+    test_sub_ranges_match_sqlite()
+    test_rolling_window_up_to_now_hits()
+    test_invalidation_and_eviction()
+    print("\n✅ All read cache tests passed!")
@@ -0,0 +1,91 @@
+"""
+Test the return formats of the cache read path and batch bar processing
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config.settings import TradingConfig
+from data.cache_manager import MarketDataCache, frame_to_arrays, format_frame
+from scanner.enhanced_bar_processor import EnhancedBarProcessor
+
+
+def create_frame(start: str, periods: int, seed: int = 0) -> pd.DataFrame:
+    """Weekday OHLCV frame with IST-aware dates"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, periods))
+    return pd.DataFrame({
+        'date': pd.date_range(start, periods=periods, freq='B', tz='Asia/Kolkata'),
+        'open': close + 0.1,
+        'high': close + 1.0,
+        'low': close - 1.0,
+        'close': close,
+        'volume': rng.integers(1000, 5000, periods),
+    })
+
+
+def test_merge_and_get_data_formats():
+    """records / dataframe / numpy return the same bars"""
+    print("Testing return formats...")
+
+    full = create_frame("2020-01-01", 200)
+
+    def fetch(symbol, start, end, interval):
+        dates = full['date'].dt.tz_localize(None)
+        return full[(dates >= start) & (dates <= end)].reset_index(drop=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(tmp)
+        start, end = datetime(2020, 1, 1), datetime(2020, 10, 6, 12)
+
+        frame = cache.merge_and_get_data("TEST", start, end, "day", fetch)
+        records = cache.merge_and_get_data("TEST", start, end, "day", fetch, return_format="records")
+        arrays = cache.merge_and_get_data("TEST", start, end, "day", fetch, return_format="numpy")
+
+        assert len(frame) == len(records) == len(arrays['close']) == 200
+        assert np.array_equal(arrays['close'], frame['close'].values)
+        assert np.array_equal(arrays['volume'], full['volume'].values.astype(float))
+        assert np.array_equal(arrays['timestamp'], frame_to_arrays(full)['timestamp'])
+        assert records[0]['close'] == frame['close'].iloc[0]
+
+        empty = cache.merge_and_get_data("NONE", start, end, "day",
+                                         lambda *args: pd.DataFrame(), return_format="numpy")
+        assert all(len(column) == 0 for column in empty.values())
+
+    assert format_frame(pd.DataFrame(), "records") == []
+    try:
+        format_frame(full, "arrow")
+        assert False, "Unknown format accepted"
+    except ValueError:
+        pass
+
+    print("✓ Formats agree")
+
+
+def test_process_bars_matches_process_bar():
+    """Batch ingestion from arrays gives the same results as bar by bar"""
+    print("\nTesting process_bars...")
+
+    arrays = frame_to_arrays(create_frame("2020-01-01", 150, seed=4))
+    columns = [arrays[name] for name in ('open', 'high', 'low', 'close', 'volume')]
+
+    single = EnhancedBarProcessor(TradingConfig(), "TEST", "day")
+    expected = [single.process_bar(*bar) for bar in zip(*(column.tolist() for column in columns))]
+    batch = EnhancedBarProcessor(TradingConfig(), "TEST", "day").process_bars(*columns)
+
+    assert len(batch) == 150
+    assert batch == expected
+
+    print("✓ Batch results identical")
+
+
+if __name__ == "__main__":
+    test_merge_and_get_data_formats()
+    test_process_bars_matches_process_bar()
+    print("\n✅ All return format tests passed!")
@@ -0,0 +1,242 @@
+"""
+Test the sharded multi-process scanning engine
+Signals must match running every symbol's processor in-process
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import tempfile
+from dataclasses import replace
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config.settings import TradingConfig
+from data.cache_manager import MarketDataCache
+from scanner.enhanced_bar_processor import EnhancedBarProcessor
+from scanner.sharded_engine import ClosedBar, ShardedScanEngine, shard_of
+from utils.latency import LatencyTracer
+
+# Short ML warm-up so a few hundred bars produce signals
+CONFIG = TradingConfig(max_bars_back=100)
+
+
+def create_bars(symbol: str, n_bars: int, seed: int, start: int = 1_700_000_000):
+    """Random-walk closed bars, one per 5 minutes"""
+    rng = np.random.default_rng(seed)
+    close = 500 + np.cumsum(rng.normal(0, 3, n_bars))
+    open_ = close + rng.normal(0, 1, n_bars)
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 2, n_bars))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 2, n_bars))
+    return [ClosedBar(symbol, start + 300 * i, open_[i], high[i], low[i], close[i], 1000.0)
+            for i in range(n_bars)]
+
+
+def expected_signals(bars):
+    """(symbol, bar_index, type) of every entry signal, processed in-process"""
+    processors = {}
+    signals = set()
+    for bar in bars:
+        processor = processors.setdefault(
+            bar.symbol, EnhancedBarProcessor(CONFIG, bar.symbol, "5minute"))
+        result = processor.process_bar(bar.open, bar.high, bar.low, bar.close, bar.volume)
+        if result.start_long_trade or result.start_short_trade:
+            signals.add((bar.symbol, result.bar_index, 'BUY' if result.start_long_trade else 'SELL'))
+    return signals
+
+
+def test_shard_assignment_is_stable():
+    """Same symbol, same worker; every worker gets symbols"""
+    print("Testing shard assignment...")
+
+    symbols = [f"SYM{i}" for i in range(200)]
+    shards = [shard_of(symbol, 4) for symbol in symbols]
+    assert shards == [shard_of(symbol, 4) for symbol in symbols]
+    assert set(shards) == {0, 1, 2, 3}
+
+    print("✓ Shards stable")
+
+
+def test_signals_match_in_process():
+    """Interleaved bars of several symbols give the in-process signals"""
+    print("\nTesting sharded signals...")
+
+    per_symbol = [create_bars(f"SYM{i}", 300, seed=i) for i in range(4)]
+    # Interleave like a live feed: every symbol's bar i, then bar i + 1
+    bars = [bar for group in zip(*per_symbol) for bar in group]
+    expected = expected_signals(bars)
+    assert expected, "Test data produced no signals"
+
+    with ShardedScanEngine(CONFIG, timeframe="5minute", workers=2, queue_size=4) as engine:
+        for start in range(0, len(bars), 50):
+            engine.submit_many(bars[start:start + 50])
+    signals = engine.get_signals()
+
+    assert {(s['symbol'], s['bar_index'], s['type']) for s in signals} == expected
+    stats = engine.stats()
+    assert stats['bars'] == len(bars)
+    assert stats['symbols'] == 4
+    assert stats['stale'] == 0 and stats['errors'] == 0
+
+    print(f"✓ {len(signals)} signals match")
+
+
+def test_priming_matches_in_process():
+    """Primed history plus live bars equals processing everything live"""
+    print("\nTesting history priming...")
+
+    bars = create_bars("AAA", 300, seed=2)
+    expected = {signal for signal in expected_signals(bars) if signal[1] >= 250}
+    assert expected, "Test data produced no live signals"
+
+    history = bars[:250]
+    with ShardedScanEngine(CONFIG, timeframe="5minute", workers=1) as engine:
+        engine.prime("AAA", [b.timestamp for b in history], [b.open for b in history],
+                     [b.high for b in history], [b.low for b in history],
+                     [b.close for b in history], [b.volume for b in history])
+        # Bars already covered by the history are dropped as stale
+        engine.submit_many(bars[240:])
+    signals = engine.get_signals()
+
+    assert {(s['symbol'], s['bar_index'], s['type']) for s in signals} == expected
+    stats = engine.stats()
+    assert stats['primed'] == 250 and stats['bars'] == 50 and stats['stale'] == 10
+
+    print("✓ Priming matches")
+
+
+def test_coalescing_and_backpressure():
+    """Revisions pending for a busy worker coalesce; submit blocks past max_pending"""
+    print("\nTesting coalescing and backpressure...")
+
+    history = create_bars("AAA", 1500, seed=1)
+    live = create_bars("AAA", 5, seed=2, start=history[-1].timestamp + 300)
+
+    with ShardedScanEngine(CONFIG, timeframe="5minute", workers=1, queue_size=1, max_pending=3) as engine:
+        # A long warm-up keeps the worker busy while live bars arrive
+        engine.prime("AAA", [b.timestamp for b in history], [b.open for b in history],
+                     [b.high for b in history], [b.low for b in history],
+                     [b.close for b in history])
+        engine.submit(live[0])
+        engine.submit(live[1])
+        revised = ClosedBar(**{**live[1].__dict__, 'close': live[1].close + 1.0})
+        engine.submit(revised)
+        assert engine.router_stats['coalesced'] == 1
+        engine.submit_many(live[2:])
+    stats = engine.stats()
+
+    assert stats['blocked'] >= 1
+    assert stats['bars'] == 5  # The revision replaced the pending bar
+    assert stats['submitted'] == 6
+
+    print("✓ Coalesced and blocked")
+
+
+def test_left_behind_bars_are_delivered():
+    """Bars left in the outbox by a full inbox are sent without another submit"""
+    print("\nTesting router flusher...")
+
+    bars = create_bars("AAA", 40, seed=5)
+    with ShardedScanEngine(CONFIG, timeframe="5minute", workers=1, queue_size=1) as engine:
+        for bar in bars:
+            engine.submit(bar)
+        deadline = time.monotonic() + 15
+        while engine.pending() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert engine.pending() == 0
+        delivered = engine.router_stats['batches']
+    stats = engine.stats()
+
+    assert stats['bars'] == 40 and stats['errors'] == 0
+    assert engine.router_stats['batches'] == delivered  # stop() had nothing left to send
+
+    print(f"✓ 40 bars delivered in {delivered} batches while idle")
+
+
+def test_hot_add_symbol():
+    """A symbol added at runtime warms up in the background and misses no live bar"""
+    print("\nTesting hot-added symbols...")
+
+    other = create_bars("OLD", 420, seed=3)
+    bars = create_bars("NEW", 420, seed=19)
+    history, live = bars[:300], bars[300:]
+    revised = ClosedBar(**{**live[5].__dict__, 'close': (live[5].high + live[5].low) / 2})
+    final = live[:5] + [revised] + live[6:]
+    expected = {signal for signal in expected_signals(other + history + final)
+                if signal[0] == "OLD" or signal[1] >= 300}
+    assert any(signal[0] == "NEW" for signal in expected), "Test data produced no live signals"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(tmp)
+        cache.save_data("NEW", pd.DataFrame({
+            'date': pd.to_datetime([b.timestamp for b in history], unit='s', utc=True),
+            'open': [b.open for b in history], 'high': [b.high for b in history],
+            'low': [b.low for b in history], 'close': [b.close for b in history],
+            'volume': [b.volume for b in history],
+        }), "5minute")
+
+        with ShardedScanEngine(CONFIG, timeframe="5minute", workers=1) as engine:
+            engine.submit_many(other[:300])
+            assert engine.add_symbols(["NEW", "OLD"], cache, datetime(2023, 1, 1),
+                                      datetime(2024, 1, 1)) == ["NEW"]
+            assert engine.add_symbols(["NEW"], cache, datetime(2023, 1, 1),
+                                      datetime(2024, 1, 1)) == []
+            # Live bars keep coming while NEW warms up
+            for i in range(60):
+                engine.submit_many([other[300 + i], live[i]] + ([revised] if i == 5 else []))
+            assert engine.wait_warm(timeout=60)
+            assert engine.warming() == []
+            for i in range(60, 120):
+                engine.submit_many([other[300 + i], live[i]])
+        signals = engine.get_signals()
+        stats = engine.stats()
+
+    assert {(s['symbol'], s['bar_index'], s['type']) for s in signals} == expected
+    assert engine.router_stats['warmed'] == 1
+    assert stats['installed'] == 1 and stats['errors'] == 0
+    assert stats['bars'] == 420 + 60 + engine.router_stats['backfilled']
+
+    print(f"✓ NEW went live after {engine.router_stats['backfilled']} backfilled bars; "
+          f"{len(signals)} signals match")
+
+
+def test_workers_are_traced():
+    """Tick and close times travel with the bars; worker histograms merge on stop"""
+    print("\nTesting worker latency tracing...")
+
+    now = time.time()
+    symbols = ["AAA", "BBB", "CCC"]
+    per_symbol = [create_bars(symbol, 40, seed=i) for i, symbol in enumerate(symbols)]
+    steps = [[replace(bar, received=now - 0.2, closed_at=now - 0.1) for bar in step]
+             for step in zip(*per_symbol)]
+    bars = [bar for step in steps for bar in step]
+    tracer = LatencyTracer()
+
+    with ShardedScanEngine(CONFIG, timeframe="5minute", workers=2, tracer=tracer) as engine:
+        # Like a live feed: one bar per symbol per interval
+        for step in steps:
+            engine.submit_many(step)
+    snapshot = tracer.snapshot()
+
+    for stage in ('candle_close', 'dequeue', 'process_start', 'process_end'):
+        assert snapshot['stages'][stage]['count'] == len(bars), stage
+    assert abs(snapshot['stages']['candle_close']['mean'] - 0.1) < 0.01
+    assert snapshot['since_first']['process_end']['min'] >= 0.2
+    assert sorted(snapshot['symbols']) == symbols
+    assert all(summary['count'] == 40 for summary in snapshot['symbols'].values())
+
+    print(f"✓ {len(bars)} bars traced over {engine.workers} workers")
+
+
+if __name__ == "__main__":
+    test_shard_assignment_is_stable()
+    test_signals_match_in_process()
+    test_priming_matches_in_process()
+    test_coalescing_and_backpressure()
+    test_left_behind_bars_are_delivered()
+    test_hot_add_symbol()
+    test_workers_are_traced()
+    print("\n✅ All sharded engine tests passed!")
@@ -0,0 +1,162 @@
+"""
+Test the asynchronous signal sink
+Batched background writes, overflow policies and flush-on-close
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import csv
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+
+from scanner.enhanced_bar_processor import BarResult
+from scanner.signal_sink import (
+    AsyncSignalSink, SinkOutput, JSONLOutput, CSVOutput, SQLiteOutput, record_from_result
+)
+
+
+class GatedOutput(SinkOutput):
+    """Collects batches; write_batch waits until the gate opens"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+        self.batches = []
+
+    def write_batch(self, records):
+        self.entered.set()
+        self.gate.wait(10)
+        self.batches.append([record['n'] for record in records])
+
+    def records(self):
+        return [n for batch in self.batches for n in batch]
+
+
+class FailingOutput(SinkOutput):
+    def write_batch(self, records):
+        raise IOError("disk full")
+
+
+def make_result(bar_index: int, long_entry: bool) -> BarResult:
+    return BarResult(
+        bar_index=bar_index, open=100.0, high=101.0, low=99.0, close=100.5,
+        prediction=6.0, signal=1, start_long_trade=long_entry, start_short_trade=False,
+        end_long_trade=False, end_short_trade=False,
+        filter_states={'volatility': True, 'regime': True, 'adx': True, 'kernel': True},
+        is_early_signal_flip=False, prediction_strength=0.75, stop_loss=98.0, take_profit=105.0)
+
+
+def test_outputs_receive_every_signal():
+    """JSONL, CSV and SQLite outputs all get the emitted results on close"""
+    print("Testing JSONL/CSV/SQLite outputs...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl_path = os.path.join(tmp, "signals.jsonl")
+        csv_path = os.path.join(tmp, "signals.csv")
+        db_path = os.path.join(tmp, "signals.db")
+        with AsyncSignalSink([JSONLOutput(jsonl_path), CSVOutput(csv_path), SQLiteOutput(db_path)],
+                             batch_size=16) as sink:
+            for i in range(100):
+                # Only every other bar is an entry
+                sink.emit_result("AAA", make_result(i, long_entry=i % 2 == 0),
+                                 timestamp=1_700_000_000 + 300 * i)
+        assert sink.stats['written'] == 50
+        assert sink.stats['batches'] >= 4
+
+        with open(jsonl_path) as f:
+            lines = [json.loads(line) for line in f]
+        assert [line['bar_index'] for line in lines] == list(range(0, 100, 2))
+        assert lines[0]['filters']['regime'] is True
+        assert lines[0]['timestamp'].startswith("2023-11-15")
+
+        with open(csv_path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 50
+        assert rows[1]['bar_index'] == '2' and rows[1]['start_long'] == 'True'
+
+        conn = sqlite3.connect(db_path)
+        count, symbol = conn.execute("SELECT COUNT(*), MAX(symbol) FROM signals").fetchone()
+        conn.close()
+        assert (count, symbol) == (50, "AAA")
+
+    assert record_from_result("AAA", make_result(1, True))['timestamp'] is None
+    print("✓ All outputs written")
+
+
+def test_emit_never_waits_on_io():
+    """A stalled output does not slow emit(); overflow drops per policy"""
+    print("\nTesting overflow policies...")
+
+    for policy, expected in (('drop_oldest', list(range(90, 100))),
+                             ('drop_newest', list(range(1, 11)))):
+        output = GatedOutput()
+        sink = AsyncSignalSink([output], max_buffer=10, batch_size=1, overflow=policy)
+        sink.emit({'n': 0})
+        assert output.entered.wait(5)  # Writer stuck on record 0
+
+        start = time.perf_counter()
+        accepted = sum(sink.emit({'n': n}) for n in range(1, 100))
+        elapsed = time.perf_counter() - start
+        assert elapsed < 0.5
+
+        output.gate.set()
+        sink.close()
+        assert output.records() == [0] + expected
+        assert sink.stats['dropped'] == 89
+        assert accepted == (99 if policy == 'drop_oldest' else 10)
+        print(f"✓ {policy}: kept {expected[0]}..{expected[-1]}, emit took {elapsed * 1e3:.1f} ms")
+
+
+def test_block_policy_and_flush():
+    """'block' waits for room instead of dropping; flush() skips the batching delay"""
+    print("\nTesting block policy and flush...")
+
+    output = GatedOutput()
+    sink = AsyncSignalSink([output], max_buffer=5, batch_size=100,
+                           flush_interval=30.0, overflow='block')
+    sink.emit({'n': 0})
+    assert sink.flush(timeout=1.0) is False  # Output still stalled
+    producer = threading.Thread(target=lambda: [sink.emit({'n': n}) for n in range(1, 20)])
+    producer.start()
+    time.sleep(0.2)
+    assert producer.is_alive()  # Blocked on the full buffer
+    output.gate.set()
+    producer.join(5)
+    assert not producer.is_alive()
+
+    start = time.perf_counter()
+    assert sink.flush(timeout=5.0)
+    assert time.perf_counter() - start < 5.0
+    assert output.records() == list(range(20))
+    assert sink.stats['dropped'] == 0
+    sink.close()
+    assert sink.emit({'n': 99}) is False  # Closed
+
+    print("✓ Blocked, then flushed without waiting for a full batch")
+
+
+def test_failing_output_isolated():
+    """An output that raises is counted; the others still get every batch"""
+    print("\nTesting failing output...")
+
+    output = GatedOutput()
+    output.gate.set()
+    with AsyncSignalSink([FailingOutput(), output], batch_size=10) as sink:
+        for n in range(25):
+            sink.emit({'n': n})
+    assert output.records() == list(range(25))
+    assert sink.stats['errors'] == sink.stats['batches'] >= 3
+
+    print("✓ Failure isolated")
+
+
+if __name__ == "__main__":
+    test_outputs_receive_every_signal()
+    test_emit_never_waits_on_io()
+    test_block_policy_and_flush()
+    test_failing_output_isolated()
+    print("\n✅ All signal sink tests passed!")
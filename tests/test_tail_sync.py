@@ -0,0 +1,110 @@
+"""
+Test the incremental tail sync against a stub of KiteConnect.historical_data
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tempfile
+import threading
+from datetime import datetime
+
+from data.cache_manager import MarketDataCache
+from data.fetch_planner import HistoricalFetcher, TokenBucket, candles_to_frame
+from data.tail_sync import sync_tail, run_every
+from data.trading_calendar import NSE_CALENDAR, from_epoch, to_epoch
+
+
+class SessionKite:
+    """Stub returning one candle per calendar bar in the requested range"""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def historical_data(self, instrument_token, from_date, to_date, interval,
+                        continuous=False, oi=False):
+        with self._lock:
+            self.calls.append((instrument_token, from_date, to_date))
+        return [{'date': from_epoch(t), 'open': 100.0, 'high': 101.0, 'low': 99.0,
+                 'close': 100.0 + instrument_token, 'volume': 10}
+                for t in NSE_CALENDAR.bar_times(from_date, to_date, interval)]
+
+
+def make_fetcher(kite):
+    return HistoricalFetcher(kite, TokenBucket(rate=1000, capacity=1000), max_workers=2)
+
+
+def test_tail_sync_fetches_only_new_bars():
+    """One call per stale symbol, none when up to date, history never re-read"""
+    print("Testing tail sync...")
+
+    tokens = {"AAA": 1, "BBB": 2, "CCC": 3}
+    clock = {'now': to_epoch(datetime(2024, 6, 3, 11, 2))}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(tmp, clock=lambda: clock['now'])
+        kite = SessionKite()
+        fetcher = make_fetcher(kite)
+
+        # Seed history with the normal prefetch path
+        start = datetime(2024, 5, 20)
+        for symbol, token in tokens.items():
+            candles = kite.historical_data(token, start, from_epoch(clock['now']), "5minute")
+            cache.save_data(symbol, candles_to_frame(candles), "5minute",
+                            covered=(start, from_epoch(clock['now'])))
+        kite.calls.clear()
+
+        # Same moment: only the still-open 11:00 candle is pending
+        synced = sync_tail(cache, fetcher, tokens, "5minute")
+        assert synced == {"AAA": 1, "BBB": 1, "CCC": 1}
+        assert all(frm == datetime(2024, 6, 3, 11, 0) for _, frm, _ in kite.calls)
+
+        # 30 minutes later: 6 bars each, one call each
+        kite.calls.clear()
+        clock['now'] += 30 * 60
+        synced = sync_tail(cache, fetcher, tokens, "5minute")
+        assert synced == {"AAA": 7, "BBB": 7, "CCC": 7}
+        assert len(kite.calls) == 3
+
+        # Friday after the close, then over the weekend: no calls at all
+        clock['now'] = to_epoch(datetime(2024, 6, 7, 16, 0))
+        sync_tail(cache, fetcher, tokens, "5minute")
+        kite.calls.clear()
+        clock['now'] = to_epoch(datetime(2024, 6, 9, 12, 0))  # Sunday
+        synced = sync_tail(cache, fetcher, tokens, "5minute")
+        assert kite.calls == [] and set(synced.values()) == {0}
+
+        # The cache is complete and gap-free
+        expected = NSE_CALENDAR.bar_times(start, datetime(2024, 6, 9), "5minute")
+        arrays = cache.get_arrays("AAA", start, datetime(2024, 6, 9), "5minute")
+        assert len(arrays['timestamp']) == len(expected)
+        assert cache.get_missing_date_ranges("BBB", start, datetime(2024, 6, 9), "5minute") == []
+
+    print("✓ Only new bars fetched")
+
+
+def test_run_every_stops():
+    """Scheduler runs the job until stopped, surviving errors"""
+    print("\nTesting scheduler...")
+
+    stop = threading.Event()
+    runs = []
+
+    def job():
+        runs.append(1)
+        if len(runs) == 1:
+            raise RuntimeError("transient")
+        if len(runs) == 3:
+            stop.set()
+
+    run_every(job, 0.01, stop)
+    assert len(runs) == 3
+
+    print("✓ Scheduler OK")
+
+
+if __name__ == "__main__":
+    test_tail_sync_fetches_only_new_bars()
+    test_run_every_stops()
+    print("\n✅ All tail sync tests passed!")
@@ -0,0 +1,80 @@
+"""
+Test the NSE trading calendar
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+
+from data.trading_calendar import TradingCalendar, NSE_CALENDAR, from_epoch, to_epoch
+
+
+def test_trading_days_skip_weekends_and_holidays():
+    """Weekends and listed holidays are closed"""
+    print("Testing trading days...")
+
+    days = NSE_CALENDAR.trading_days("2024-01-19", "2024-01-26")
+    # Sat/Sun 20-21, Ram Mandir holiday 22, Republic Day 26
+    assert [str(day) for day in days] == ["2024-01-19", "2024-01-23", "2024-01-24", "2024-01-25"]
+    assert not NSE_CALENDAR.is_trading_day("2025-12-25")
+    assert NSE_CALENDAR.is_trading_day("2025-12-24")
+
+    calendar = TradingCalendar(holidays=[])
+    assert calendar.is_trading_day("2024-01-22")
+    calendar.add_holidays(["2024-01-22"])
+    assert not calendar.is_trading_day("2024-01-22")
+
+    print("✓ Closed days skipped")
+
+
+def test_holidays_cover_backfill_years():
+    """Every year of an 8-year backfill has its holidays; other years are flagged"""
+    print("\nTesting holiday coverage...")
+
+    assert set(range(2018, 2027)) <= NSE_CALENDAR.years
+    for day in ("2018-03-02", "2019-10-21", "2020-11-16", "2021-11-05",
+                "2022-10-26", "2023-06-29", "2026-01-26"):
+        assert not NSE_CALENDAR.is_trading_day(day), day
+    # 2020: 366 days, 104 weekend days, 12 weekday holidays
+    assert len(NSE_CALENDAR.trading_days("2020-01-01", "2020-12-31")) == 250
+
+    calendar = TradingCalendar()
+    calendar.trading_days("2026-12-28", "2027-01-08")
+    calendar.trading_days("2027-02-01", "2027-02-05")
+    assert calendar._warned_years == {2027}  # Warned once
+    calendar.add_holidays(["2028-01-26"])
+    calendar.is_trading_day("2028-02-01")
+    assert calendar._warned_years == {2027}
+
+    print(f"✓ Holidays listed for {min(NSE_CALENDAR.years)}-{max(NSE_CALENDAR.years)}")
+
+
+def test_bar_times():
+    """Intraday bars follow the 09:15-15:30 session; day bars are stamped at midnight"""
+    print("\nTesting bar timestamps...")
+
+    minute = NSE_CALENDAR.bar_times(datetime(2024, 1, 19), datetime(2024, 1, 23, 23, 59), "minute")
+    assert len(minute) == 2 * 375
+    assert from_epoch(minute[0]) == datetime(2024, 1, 19, 9, 15)
+    assert from_epoch(minute[-1]) == datetime(2024, 1, 23, 15, 29)
+
+    hourly = NSE_CALENDAR.bar_times(datetime(2024, 1, 19), datetime(2024, 1, 19, 23), "60minute")
+    assert [from_epoch(t).strftime("%H:%M") for t in hourly] == [
+        "09:15", "10:15", "11:15", "12:15", "13:15", "14:15", "15:15"]
+
+    # A request starting mid-session still expects that day's bar
+    day = NSE_CALENDAR.expected_bars(datetime(2024, 1, 19, 11), datetime(2024, 1, 23, 8), "day")
+    assert [from_epoch(t) for t in day] == [datetime(2024, 1, 19)]
+
+    # Naive datetimes are IST
+    assert to_epoch(datetime(2024, 1, 19, 9, 15)) == to_epoch("2024-01-19 09:15:00+05:30")
+
+    print("✓ Bar timestamps OK")
+
+
+if __name__ == "__main__":
+    test_trading_days_skip_weekends_and_holidays()
+    test_holidays_cover_backfill_years()
+    test_bar_times()
+    print("\n✅ All trading calendar tests passed!")
@@ -0,0 +1,315 @@
+"""
+Pipeline Latency Tracing
+Timestamps of each bar through the live pipeline, aggregated into
+fixed-memory histograms
+
+    tick -> candle_close -> dequeue -> process_start -> process_end -> sink_write
+
+Components mark (symbol, bar timestamp, stage) as a bar passes; the tracer
+records, per stage, the time since the previous marked stage and the time
+since the bar's first mark (its last tick), plus per symbol the time from
+the last tick to the end stage (process_end: the signal decision).
+
+Histograms are HDR-style: log-linear buckets over microseconds with a
+fixed relative error (about 1% by default), so memory does not grow with
+the number of samples. Read them with snapshot() or export them in the
+Prometheus text format (write_prometheus() for the node_exporter textfile
+collector).
+
+Marks use the epoch clock (time.time) so timestamps taken in different
+processes can be compared.
+"""
+import os
+import math
+import time
+import threading
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+PIPELINE_STAGES = ('tick', 'candle_close', 'dequeue', 'process_start', 'process_end', 'sink_write')
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class LatencyHistogram:
+    """
+    Fixed-memory latency histogram (log-linear buckets, microsecond units)
+
+    Values below 2**sub_bucket_bits microseconds are exact; above that each
+    power of two is split into 2**(sub_bucket_bits - 1) buckets, so the
+    relative error stays below 2**(1 - sub_bucket_bits). Values above
+    max_seconds are counted in the top bucket.
+    """
+
+    def __init__(self, max_seconds: float = 60.0, sub_bucket_bits: int = 7):
+        """
+        Args:
+            max_seconds: Largest value tracked exactly (larger ones are clamped)
+            sub_bucket_bits: Precision (7 = under 1.6% error, 128 exact microseconds)
+        """
+        self.max_seconds = max_seconds
+        self._sub_bits = sub_bucket_bits
+        self._half = 1 << (sub_bucket_bits - 1)
+        self._max_value = int(max_seconds * 1e6)
+        self._counts = np.zeros(self._index(self._max_value) + 1, dtype=np.uint32)
+        self.count = 0
+        self.total = 0.0  # Seconds
+        self.min = math.inf
+        self.max = 0.0
+        self.clamped = 0
+
+    def _index(self, value: int) -> int:
+        """Bucket of a value in microseconds"""
+        bucket = max(0, value.bit_length() - self._sub_bits)
+        return ((bucket + 1) * self._half) + (value >> bucket) - self._half
+
+    def _highest(self, index: int) -> int:
+        """Largest value (microseconds) that falls into a bucket"""
+        bucket = index // self._half - 1
+        if bucket < 0:
+            return index
+        sub = index - bucket * self._half
+        return ((sub + 1) << bucket) - 1
+
+    def record(self, seconds: float):
+        """Add one latency (negative values count as zero)"""
+        value = int(seconds * 1e6) if seconds > 0 else 0
+        if value > self._max_value:
+            value = self._max_value
+            self.clamped += 1
+        self._counts[self._index(value)] += 1
+        self.count += 1
+        self.total += max(seconds, 0.0)
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, quantile: float) -> float:
+        """
+        Latency at a quantile (0-1), in seconds
+
+        Returns the upper edge of the bucket holding that rank, like HdrHistogram.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(quantile * self.count))
+        index = int(np.searchsorted(np.cumsum(self._counts), rank))
+        return min(self._highest(index) / 1e6, self.max)
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Add another histogram with the same layout"""
+        if other._counts.shape != self._counts.shape:
+            raise ValueError("Histograms have different bucket layouts")
+        self._counts += other._counts
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.clamped += other.clamped
+
+    def reset(self):
+        """Drop all samples"""
+        self._counts[:] = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.clamped = 0
+
+    def summary(self, quantiles: Sequence[float] = QUANTILES) -> Dict[str, float]:
+        """count, mean, min, max and the quantiles (p50, p99, p999, ...) in seconds"""
+        result = {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+        }
+        for quantile in quantiles:
+            result[_quantile_name(quantile)] = self.percentile(quantile)
+        return result
+
+    @property
+    def nbytes(self) -> int:
+        return self._counts.nbytes
+
+
+def _quantile_name(quantile: float) -> str:
+    """0.5 -> 'p50', 0.99 -> 'p99', 0.999 -> 'p999'"""
+    return 'p' + f"{quantile * 100:g}".replace('.', '')
+
+
+class LatencyTracer:
+    """
+    Per-bar pipeline tracing with per-stage and per-symbol histograms
+
+    Key features:
+    - mark(symbol, bar_timestamp, stage) from any thread
+    - Stage histograms: time since the previous marked stage
+    - Cumulative histograms: time since the bar's first mark (last tick)
+    - Per-symbol histograms: last tick to end_stage
+    - Bounded: a few open traces per symbol, fixed-size histograms
+    - snapshot() and Prometheus text export
+    - Histograms of tracers in other processes merged in with merge()
+    """
+
+    def __init__(self, stages: Sequence[str] = PIPELINE_STAGES, end_stage: str = 'process_end',
+                 max_seconds: float = 60.0, sub_bucket_bits: int = 7,
+                 open_traces: int = 4, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            stages: Stage names in pipeline order
+            end_stage: Stage that ends a bar's per-symbol latency
+            max_seconds: Histogram range
+            sub_bucket_bits: Histogram precision (see LatencyHistogram)
+            open_traces: Bars per symbol traced at once (the oldest is dropped)
+            clock: Epoch-seconds time source for marks without a time
+        """
+        if end_stage not in stages:
+            raise ValueError(f"end_stage {end_stage!r} is not one of {tuple(stages)}")
+        self.stages = tuple(stages)
+        self.end_stage = end_stage
+        self.max_seconds = max_seconds
+        self.sub_bucket_bits = sub_bucket_bits
+        self.open_traces = open_traces
+        self.clock = clock
+        self._stage_index = {stage: i for i, stage in enumerate(self.stages)}
+        self._end_index = self._stage_index[end_stage]
+        self._new_histogram = lambda: LatencyHistogram(max_seconds, sub_bucket_bits)
+
+        self.stage_latency = {stage: self._new_histogram() for stage in self.stages}
+        self.since_first = {stage: self._new_histogram() for stage in self.stages}
+        self.symbol_latency: Dict[Hashable, LatencyHistogram] = {}
+        # {symbol: {bar_timestamp: [time per stage or None]}} (insertion order = age)
+        self._traces: Dict[Hashable, Dict[int, List[Optional[float]]]] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, symbol: Hashable, bar_timestamp: int, stage: str, at: Optional[float] = None):
+        """
+        Record that a bar reached a stage
+
+        Args:
+            symbol: Symbol (or instrument token)
+            bar_timestamp: Bar open, epoch seconds (identifies the bar)
+            stage: One of the tracer's stages
+            at: When, epoch seconds (None = now)
+        """
+        if at is None:
+            at = self.clock()
+        index = self._stage_index[stage]
+        with self._lock:
+            traces = self._traces.get(symbol)
+            if traces is None:
+                traces = self._traces[symbol] = {}
+            trace = traces.get(bar_timestamp)
+            if trace is None:
+                trace = traces[bar_timestamp] = [None] * len(self.stages)
+                if len(traces) > self.open_traces:
+                    del traces[next(iter(traces))]
+            trace[index] = at
+
+            previous = next((trace[i] for i in range(index - 1, -1, -1) if trace[i] is not None), None)
+            if previous is None:
+                return  # First mark of this bar
+            self.stage_latency[stage].record(at - previous)
+            first = next(t for t in trace if t is not None)
+            self.since_first[stage].record(at - first)
+            if index == self._end_index:
+                histogram = self.symbol_latency.get(symbol)
+                if histogram is None:
+                    histogram = self.symbol_latency[symbol] = self._new_histogram()
+                histogram.record(at - first)
+
+    def layout(self) -> Dict:
+        """Constructor arguments for a compatible tracer (e.g. in a worker process)"""
+        return {'stages': self.stages, 'end_stage': self.end_stage,
+                'max_seconds': self.max_seconds, 'sub_bucket_bits': self.sub_bucket_bits,
+                'open_traces': self.open_traces}
+
+    def histograms(self) -> Dict[str, Dict[Hashable, LatencyHistogram]]:
+        """
+        The recorded histograms, picklable (the tracer itself is not)
+
+        Returns:
+            {'stages': {stage: histogram}, 'since_first': {stage: histogram},
+             'symbols': {symbol: histogram}}
+        """
+        with self._lock:
+            return {'stages': dict(self.stage_latency), 'since_first': dict(self.since_first),
+                    'symbols': dict(self.symbol_latency)}
+
+    def merge(self, histograms: Dict[str, Dict[Hashable, LatencyHistogram]]):
+        """
+        Add the histograms() of a tracer with the same layout()
+
+        Open traces are not merged: stages of one bar must be marked in one tracer.
+        """
+        with self._lock:
+            for stage, histogram in histograms['stages'].items():
+                self.stage_latency[stage].merge(histogram)
+            for stage, histogram in histograms['since_first'].items():
+                self.since_first[stage].merge(histogram)
+            for symbol, histogram in histograms['symbols'].items():
+                mine = self.symbol_latency.get(symbol)
+                if mine is None:
+                    mine = self.symbol_latency[symbol] = self._new_histogram()
+                mine.merge(histogram)
+
+    def reset(self):
+        """Drop all samples and open traces"""
+        with self._lock:
+            for histogram in list(self.stage_latency.values()) + list(self.since_first.values()):
+                histogram.reset()
+            self.symbol_latency.clear()
+            self._traces.clear()
+
+    def snapshot(self, quantiles: Sequence[float] = QUANTILES) -> Dict[str, Dict]:
+        """
+        Current latency summaries (seconds)
+
+        Returns:
+            {'stages': {stage: summary}, 'since_first': {stage: summary},
+             'symbols': {symbol: summary}} - see LatencyHistogram.summary()
+        """
+        with self._lock:
+            return {
+                'stages': {stage: h.summary(quantiles) for stage, h in self.stage_latency.items()},
+                'since_first': {stage: h.summary(quantiles) for stage, h in self.since_first.items()},
+                'symbols': {symbol: h.summary(quantiles) for symbol, h in self.symbol_latency.items()},
+            }
+
+    def prometheus_text(self, prefix: str = "scanner", quantiles: Sequence[float] = QUANTILES) -> str:
+        """Histograms as Prometheus summaries (text exposition format)"""
+        metrics = (
+            ('stage_latency_seconds', "Time since the previous pipeline stage", 'stage',
+             self.stage_latency),
+            ('since_tick_latency_seconds', "Time since the bar's last tick", 'stage',
+             self.since_first),
+            ('symbol_latency_seconds', f"Last tick to {self.end_stage} per symbol", 'symbol',
+             self.symbol_latency),
+        )
+        lines = []
+        with self._lock:
+            for name, description, label, histograms in metrics:
+                metric = f"{prefix}_{name}"
+                lines.append(f"# HELP {metric} {description}")
+                lines.append(f"# TYPE {metric} summary")
+                for key, histogram in histograms.items():
+                    if histogram.count == 0:
+                        continue
+                    value = _escape_label(key)
+                    for quantile in quantiles:
+                        lines.append(f'{metric}{{{label}="{value}",quantile="{quantile:g}"}} '
+                                     f'{histogram.percentile(quantile):.6f}')
+                    lines.append(f'{metric}_sum{{{label}="{value}"}} {histogram.total:.6f}')
+                    lines.append(f'{metric}_count{{{label}="{value}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, prefix: str = "scanner"):
+        """Write prometheus_text() atomically (for the node_exporter textfile collector)"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(self.prometheus_text(prefix))
+        os.replace(temp_path, path)
+
+
+def _escape_label(value: Hashable) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')